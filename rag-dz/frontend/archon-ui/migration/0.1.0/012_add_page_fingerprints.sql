@@ -0,0 +1,25 @@
+-- =====================================================
+-- Add content fingerprints to archon_page_metadata for incremental recrawls
+-- =====================================================
+-- Refreshing a knowledge source previously re-chunked and re-embedded every page.
+-- These columns let the crawler send conditional requests (ETag / Last-Modified)
+-- and skip pages whose content hash did not change.
+-- =====================================================
+
+ALTER TABLE archon_page_metadata
+ADD COLUMN IF NOT EXISTS content_hash TEXT,
+ADD COLUMN IF NOT EXISTS etag TEXT,
+ADD COLUMN IF NOT EXISTS last_modified TEXT;
+
+COMMENT ON COLUMN archon_page_metadata.content_hash IS 'SHA-256 of full_content, used to skip unchanged pages on recrawl';
+COMMENT ON COLUMN archon_page_metadata.etag IS 'ETag response header from the last crawl (for If-None-Match)';
+COMMENT ON COLUMN archon_page_metadata.last_modified IS 'Last-Modified response header from the last crawl (for If-Modified-Since)';
+
+-- Record migration application for tracking
+INSERT INTO archon_migrations (version, migration_name)
+VALUES ('0.1.0', '012_add_page_fingerprints')
+ON CONFLICT (version, migration_name) DO NOTHING;
+
+-- =====================================================
+-- MIGRATION COMPLETE
+-- =====================================================
@@ -158,7 +158,10 @@ INSERT INTO archon_settings (key, value, is_encrypted, category, description) VA
 ('MEMORY_THRESHOLD_PERCENT', '80', false, 'rag_strategy', 'Memory usage threshold for crawler dispatcher (50-90)'),
 ('DISPATCHER_CHECK_INTERVAL', '0.5', false, 'rag_strategy', 'How often to check memory usage in seconds (0.1-2.0)'),
 ('CODE_EXTRACTION_BATCH_SIZE', '40', false, 'rag_strategy', 'Number of code blocks to extract per batch (20-100) - increased for better performance'),
-('CODE_SUMMARY_MAX_WORKERS', '3', false, 'rag_strategy', 'Maximum parallel workers for code summarization (1-10)'),
+('CODE_SUMMARY_MAX_WORKERS', '3', false, 'rag_strategy', 'Initial parallel workers for code summarization (1-10), adapted to provider rate limits'),
+('CODE_SUMMARY_MAX_CONCURRENCY', '12', false, 'rag_strategy', 'Upper bound for adaptive code summarization concurrency (1-32)'),
+('CODE_SUMMARY_BATCH_SIZE', '1', false, 'rag_strategy', 'Code blocks summarized per LLM prompt (1 = one prompt per block)'),
+('CODE_SUMMARY_LATENCY_TARGET', '30', false, 'rag_strategy', 'Seconds per summary request above which adaptive concurrency backs off (0 = disabled)'),
 ('CONTEXTUAL_EMBEDDING_BATCH_SIZE', '50', false, 'rag_strategy', 'Number of chunks to process in contextual embedding batch API calls (20-100)')
 ON CONFLICT (key) DO UPDATE SET
     value = EXCLUDED.value,
@@ -296,6 +299,11 @@ CREATE TABLE IF NOT EXISTS archon_page_metadata (
     char_count INT NOT NULL,
     chunk_count INT NOT NULL DEFAULT 0,
 
+    -- Fingerprints for incremental recrawls
+    content_hash TEXT,
+    etag TEXT,
+    last_modified TEXT,
+
     -- Timestamps
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW(),
@@ -333,6 +341,9 @@ COMMENT ON COLUMN archon_page_metadata.section_order IS 'Order of section in llm
 COMMENT ON COLUMN archon_page_metadata.word_count IS 'Number of words in full_content';
 COMMENT ON COLUMN archon_page_metadata.char_count IS 'Number of characters in full_content';
 COMMENT ON COLUMN archon_page_metadata.chunk_count IS 'Number of chunks created from this page';
+COMMENT ON COLUMN archon_page_metadata.content_hash IS 'SHA-256 of full_content, used to skip unchanged pages on recrawl';
+COMMENT ON COLUMN archon_page_metadata.etag IS 'ETag response header from the last crawl (for If-None-Match)';
+COMMENT ON COLUMN archon_page_metadata.last_modified IS 'Last-Modified response header from the last crawl (for If-Modified-Since)';
 COMMENT ON COLUMN archon_page_metadata.metadata IS 'Flexible JSON metadata (page_type, knowledge_type, tags, etc)';
 COMMENT ON COLUMN archon_crawled_pages.page_id IS 'Foreign key linking chunk to parent page';
 
@@ -1062,7 +1073,8 @@ VALUES
   ('0.1.0', '008_add_migration_tracking'),
   ('0.1.0', '009_add_cascade_delete_constraints'),
   ('0.1.0', '010_add_provider_placeholders'),
-  ('0.1.0', '011_add_page_metadata_table')
+  ('0.1.0', '011_add_page_metadata_table'),
+  ('0.1.0', '012_add_page_fingerprints')
 ON CONFLICT (version, migration_name) DO NOTHING;
 
 -- Enable Row Level Security on migrations table
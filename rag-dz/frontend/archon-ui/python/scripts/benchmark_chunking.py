@@ -0,0 +1,112 @@
+"""
+Benchmark the single-pass chunker against the previous smart_chunk_text.
+
+Usage (from the python/ directory):
+    uv run python scripts/benchmark_chunking.py [--size-mb 4]
+
+The legacy implementation is reproduced here verbatim so the comparison keeps
+working after the service switched to the streaming chunker.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.server.services.storage.text_chunker import (  # noqa: E402
+    approximate_token_count,
+    iter_text_chunks,
+)
+
+
+def legacy_smart_chunk_text(text: str, chunk_size: int = 5000) -> list[str]:
+    """Previous BaseStorageService.smart_chunk_text implementation."""
+    chunks = []
+    start = 0
+    text_length = len(text)
+
+    while start < text_length:
+        end = start + chunk_size
+        if end >= text_length:
+            chunk = text[start:].strip()
+            if chunk:
+                chunks.append(chunk)
+            break
+
+        chunk = text[start:end]
+        code_block_pos = chunk.rfind("```")
+        if code_block_pos != -1 and code_block_pos > chunk_size * 0.3:
+            end = start + code_block_pos
+        elif "\n\n" in chunk:
+            last_break = chunk.rfind("\n\n")
+            if last_break > chunk_size * 0.3:
+                end = start + last_break
+        elif ". " in chunk:
+            last_period = chunk.rfind(". ")
+            if last_period > chunk_size * 0.3:
+                end = start + last_period + 1
+
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end
+
+    if chunks:
+        combined_chunks: list[str] = []
+        i = 0
+        while i < len(chunks):
+            current = chunks[i]
+            while len(current) < 200 and i + 1 < len(chunks):
+                i += 1
+                current = current + "\n\n" + chunks[i]
+            combined_chunks.append(current)
+            i += 1
+        chunks = combined_chunks
+
+    return chunks
+
+
+def build_document(size_bytes: int) -> str:
+    """Build a markdown document mixing prose, Arabic text, headings and code."""
+    section = (
+        "## Configuration\n\n"
+        "The service reads its settings at startup. Each value can be overridden. "
+        "Les paramètres sont chargés au démarrage.\n\n"
+        "يقرأ الخادم إعداداته عند بدء التشغيل. يمكن تجاوز كل قيمة.\n\n"
+        "```python\nsettings = load_settings()\nclient = Client(settings)\n```\n\n"
+    )
+    return section * max(1, size_bytes // len(section))
+
+
+def timed(label: str, func) -> list[str]:
+    start = time.perf_counter()
+    chunks = func()
+    elapsed = time.perf_counter() - start
+    sizes = [len(c) for c in chunks] or [0]
+    print(
+        f"{label:<28} {elapsed * 1000:9.1f} ms  chunks={len(chunks):6d}  "
+        f"avg_chars={sum(sizes) / len(sizes):7.0f}"
+    )
+    return chunks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=4.0, help="Document size in MB")
+    args = parser.parse_args()
+
+    text = build_document(int(args.size_mb * 1024 * 1024))
+    print(f"Document: {len(text) / 1024 / 1024:.1f} MB\n")
+
+    timed("legacy (chars=5000)", lambda: legacy_smart_chunk_text(text, 5000))
+    timed("streaming (chars=5000)", lambda: list(iter_text_chunks(text, 5000)))
+    timed(
+        "streaming (tokens=1200/100)",
+        lambda: list(iter_text_chunks(text, 1200, 100, approximate_token_count)),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -610,8 +610,13 @@ async def get_knowledge_item_code_examples(
 
 
 @router.post("/knowledge-items/{source_id}/refresh")
-async def refresh_knowledge_item(source_id: str):
-    """Refresh a knowledge item by re-crawling its URL with the same metadata."""
+async def refresh_knowledge_item(source_id: str, incremental: bool = True):
+    """Refresh a knowledge item by re-crawling its URL with the same metadata.
+
+    With ``incremental`` (default), pages are fetched with conditional requests and
+    only pages whose content changed are re-chunked and re-embedded. Pass
+    ``incremental=false`` to force a full re-embed (e.g. after changing embedding model).
+    """
     
     # Validate API key before starting expensive refresh operation
     logger.info("🔍 About to validate API key for refresh...")
@@ -687,6 +692,7 @@ async def refresh_knowledge_item(source_id: str):
             "max_depth": max_depth,
             "extract_code_examples": True,
             "generate_summary": True,
+            "incremental": incremental,
         }
 
         # Create a wrapped task that acquires the semaphore
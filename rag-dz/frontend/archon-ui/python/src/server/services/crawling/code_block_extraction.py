@@ -0,0 +1,975 @@
+"""
+Code Block Extraction
+
+Pure, CPU-bound code block extraction used by CodeExtractionService.
+
+Everything in this module is synchronous and depends only on its arguments
+(the document text and a frozen CodeExtractionSettings), so it can run in the
+ThreadingService process pool instead of on the event loop. All regular
+expressions are compiled once at import time - in a pool worker that means
+once per process rather than once per document.
+"""
+
+import re
+import time
+from typing import Any
+
+from ...config.logfire_config import get_logger
+from ..settings_snapshot import CodeExtractionSettings
+
+logger = get_logger(__name__)
+
+# Language-specific patterns for better extraction
+LANGUAGE_PATTERNS = {
+    "typescript": {
+        "block_start": r"^\s*(export\s+)?(class|interface|function|const|type|enum)\s+\w+",
+        "block_end": r"^\}(\s*;)?$",
+        "min_indicators": [":", "{", "}", "=>", "function", "class", "interface", "type"],
+    },
+    "javascript": {
+        "block_start": r"^\s*(export\s+)?(class|function|const|let|var)\s+\w+",
+        "block_end": r"^\}(\s*;)?$",
+        "min_indicators": ["function", "{", "}", "=>", "const", "let", "var"],
+    },
+    "python": {
+        "block_start": r"^\s*(class|def|async\s+def)\s+\w+",
+        "block_end": r"^\S",  # Unindented line
+        "min_indicators": ["def", ":", "return", "self", "import", "class"],
+    },
+    "java": {
+        "block_start": r"^\s*(public|private|protected)?\s*(class|interface|enum)\s+\w+",
+        "block_end": r"^\}$",
+        "min_indicators": ["class", "public", "private", "{", "}", ";"],
+    },
+    "rust": {
+        "block_start": r"^\s*(pub\s+)?(fn|struct|impl|trait|enum)\s+\w+",
+        "block_end": r"^\}$",
+        "min_indicators": ["fn", "let", "mut", "impl", "struct", "->"],
+    },
+    "go": {
+        "block_start": r"^\s*(func|type|struct)\s+\w+",
+        "block_end": r"^\}$",
+        "min_indicators": ["func", "type", "struct", "{", "}", ":="],
+    },
+}
+
+_DOTALL_I = re.DOTALL | re.IGNORECASE
+
+# HTML code block patterns - order matters, more specific patterns first
+_HTML_CODE_PATTERNS = [
+    (re.compile(pattern, _DOTALL_I), source_type)
+    for pattern, source_type in [
+        # GitHub/GitLab patterns
+        (
+            r'<div[^>]*class=["\'][^"\']*highlight[^"\']*["\'][^>]*>.*?<pre[^>]*class=["\'][^"\']*(?:language-)?(\w+)[^"\']*["\'][^>]*><code[^>]*>(.*?)</code></pre>',
+            "github-highlight",
+        ),
+        (
+            r'<div[^>]*class=["\'][^"\']*snippet-clipboard-content[^"\']*["\'][^>]*>.*?<pre[^>]*><code[^>]*>(.*?)</code></pre>',
+            "github-snippet",
+        ),
+        # Docusaurus patterns
+        (
+            r'<div[^>]*class=["\'][^"\']*codeBlockContainer[^"\']*["\'][^>]*>.*?<pre[^>]*class=["\'][^"\']*prism-code[^"\']*language-(\w+)[^"\']*["\'][^>]*>(.*?)</pre>',
+            "docusaurus",
+        ),
+        (
+            r'<div[^>]*class=["\'][^"\']*language-(\w+)[^"\']*["\'][^>]*>.*?<pre[^>]*class=["\'][^"\']*prism-code[^"\']*["\'][^>]*>(.*?)</pre>',
+            "docusaurus-alt",
+        ),
+        # Milkdown specific patterns - check their actual HTML structure
+        (
+            r'<pre[^>]*><code[^>]*class=["\'][^"\']*language-(\w+)[^"\']*["\'][^>]*>(.*?)</code></pre>',
+            "milkdown-typed",
+        ),
+        (
+            r'<div[^>]*class=["\'][^"\']*code-wrapper[^"\']*["\'][^>]*>.*?<pre[^>]*>(.*?)</pre>',
+            "milkdown-wrapper",
+        ),
+        (
+            r'<div[^>]*class=["\'][^"\']*code-block-wrapper[^"\']*["\'][^>]*>.*?<pre[^>]*><code[^>]*>(.*?)</code></pre>',
+            "milkdown-wrapper-code",
+        ),
+        (
+            r'<div[^>]*class=["\'][^"\']*milkdown-code-block[^"\']*["\'][^>]*>.*?<pre[^>]*><code[^>]*>(.*?)</code></pre>',
+            "milkdown-code-block",
+        ),
+        (
+            r'<pre[^>]*class=["\'][^"\']*code-block[^"\']*["\'][^>]*><code[^>]*>(.*?)</code></pre>',
+            "milkdown",
+        ),
+        (r"<div[^>]*data-code-block[^>]*>.*?<pre[^>]*>(.*?)</pre>", "milkdown-alt"),
+        (
+            r'<div[^>]*class=["\'][^"\']*milkdown[^"\']*["\'][^>]*>.*?<pre[^>]*><code[^>]*>(.*?)</code></pre>',
+            "milkdown-div",
+        ),
+        # Monaco Editor - capture all view-lines content
+        (
+            r'<div[^>]*class=["\'][^"\']*monaco-editor[^"\']*["\'][^>]*>.*?<div[^>]*class=["\'][^"\']*view-lines[^"\']*[^>]*>(.*?)</div>(?=.*?</div>.*?</div>)',
+            "monaco",
+        ),
+        # CodeMirror patterns
+        (
+            r'<div[^>]*class=["\'][^"\']*cm-content[^"\']*["\'][^>]*>((?:<div[^>]*class=["\'][^"\']*cm-line[^"\']*["\'][^>]*>.*?</div>\s*)+)</div>',
+            "codemirror",
+        ),
+        (
+            r'<div[^>]*class=["\'][^"\']*CodeMirror[^"\']*["\'][^>]*>.*?<div[^>]*class=["\'][^"\']*CodeMirror-code[^"\']*["\'][^>]*>(.*?)</div>',
+            "codemirror-legacy",
+        ),
+        # Prism.js with language - must be before generic pre
+        (
+            r'<pre[^>]*class=["\'][^"\']*language-(\w+)[^"\']*["\'][^>]*>\s*<code[^>]*>(.*?)</code>\s*</pre>',
+            "prism",
+        ),
+        (
+            r'<pre[^>]*>\s*<code[^>]*class=["\'][^"\']*language-(\w+)[^"\']*["\'][^>]*>(.*?)</code>\s*</pre>',
+            "prism-alt",
+        ),
+        # highlight.js - must be before generic pre/code
+        (
+            r'<pre[^>]*><code[^>]*class=["\'][^"\']*hljs(?:\s+language-(\w+))?[^"\']*["\'][^>]*>(.*?)</code></pre>',
+            "hljs",
+        ),
+        (
+            r'<pre[^>]*class=["\'][^"\']*hljs[^"\']*["\'][^>]*><code[^>]*>(.*?)</code></pre>',
+            "hljs-pre",
+        ),
+        # Shiki patterns (VitePress, Astro, etc.)
+        (
+            r'<pre[^>]*class=["\'][^"\']*shiki[^"\']*["\'][^>]*(?:.*?style=["\'][^"\']*background-color[^"\']*["\'])?[^>]*>\s*<code[^>]*>(.*?)</code>\s*</pre>',
+            "shiki",
+        ),
+        (r'<pre[^>]*class=["\'][^"\']*astro-code[^"\']*["\'][^>]*>(.*?)</pre>', "astro-shiki"),
+        (
+            r'<div[^>]*class=["\'][^"\']*astro-code[^"\']*["\'][^>]*>.*?<pre[^>]*>(.*?)</pre>',
+            "astro-wrapper",
+        ),
+        # VitePress/Vue patterns
+        (
+            r'<div[^>]*class=["\'][^"\']*language-(\w+)[^"\']*["\'][^>]*>.*?<pre[^>]*>(.*?)</pre>',
+            "vitepress",
+        ),
+        (
+            r'<div[^>]*class=["\'][^"\']*vp-code[^"\']*["\'][^>]*>.*?<pre[^>]*>(.*?)</pre>',
+            "vitepress-vp",
+        ),
+        # Nextra patterns
+        (r"<div[^>]*data-nextra-code[^>]*>.*?<pre[^>]*>(.*?)</pre>", "nextra"),
+        (
+            r'<pre[^>]*class=["\'][^"\']*nx-[^"\']*["\'][^>]*><code[^>]*>(.*?)</code></pre>',
+            "nextra-nx",
+        ),
+        # Standard pre/code patterns - should be near the end
+        (
+            r'<pre[^>]*><code[^>]*class=["\'][^"\']*language-(\w+)[^"\']*["\'][^>]*>(.*?)</code></pre>',
+            "standard-lang",
+        ),
+        (r"<pre[^>]*>\s*<code[^>]*>(.*?)</code>\s*</pre>", "standard"),
+        # Generic patterns - should be last
+        (
+            r'<div[^>]*class=["\'][^"\']*code-block[^"\']*["\'][^>]*>.*?<pre[^>]*>(.*?)</pre>',
+            "generic-div",
+        ),
+        (
+            r'<div[^>]*class=["\'][^"\']*codeblock[^"\']*["\'][^>]*>(.*?)</div>',
+            "generic-codeblock",
+        ),
+        (
+            r'<div[^>]*class=["\'][^"\']*highlight[^"\']*["\'][^>]*>.*?<pre[^>]*>(.*?)</pre>',
+            "highlight",
+        ),
+    ]
+]
+# Patterns that capture the language in group 1 and the code in group 2
+_LANGUAGE_GROUP_SOURCE_TYPES = {"standard-lang", "prism", "vitepress", "hljs", "milkdown-typed"}
+
+_LANGUAGE_CLASS_RE = re.compile(r'class=["\'].*?language-(\w+)')
+_CM_LINE_RE = re.compile(r'<div[^>]*class=["\'][^"\']*cm-line[^"\']*["\'][^>]*>(.*?)</div>', re.DOTALL)
+_STANDALONE_CODE_RE = re.compile(r"<code[^>]*>(.*?)</code>", _DOTALL_I)
+_SPAN_OPEN_RE = re.compile(r"<span[^>]*>")
+_SPAN_CLOSE_RE = re.compile(r"</span>")
+_SPAN_CLOSE_BEFORE_WORD_RE = re.compile(r"</span>(?=[A-Za-z0-9])")
+_DIV_OPEN_RE = re.compile(r"<div[^>]*>")
+_DIV_CLOSE_RE = re.compile(r"</div>")
+_ANY_TAG_RE = re.compile(r"<[^>]+>")
+_ANY_TAG_OPTIONAL_SLASH_RE = re.compile(r"</?[^>]+>")
+_MULTI_SPACE_RE = re.compile(r" +")
+_DOUBLE_SPACE_RE = re.compile(r" {2,}")
+
+_BACKTICK_BLOCK_RE = re.compile(r"```(\w*)[^\n]*\n(.*?)```", re.DOTALL | re.MULTILINE)
+_LANGUAGE_LABEL_RE = re.compile(
+    r"(?:^|\n)((?:typescript|javascript|python|java|c\+\+|rust|go|ruby|php|swift|kotlin|scala|r|matlab|julia|dart|elixir|erlang|haskell|clojure|lua|perl|shell|bash|sql|html|css|xml|json|yaml|toml|ini|dockerfile|makefile|cmake|gradle|maven|npm|yarn|pip|cargo|gem|pod|composer|nuget|apt|yum|brew|choco|snap|flatpak|appimage|msi|exe|dmg|pkg|deb|rpm|tar|zip|7z|rar|gz|bz2|xz|zst|lz4|lzo|lzma|lzip|lzop|compress|uncompress|gzip|gunzip|bzip2|bunzip2|xz|unxz|zstd|unzstd|lz4|unlz4|lzo|unlzo|lzma|unlzma|lzip|lunzip|lzop|unlzop)\s*(?:code|example|snippet)?)[:\s]*\n((?:(?:^[ \t]+.*\n?)+)|(?:.*\n)+?)(?=\n(?:[A-Z][a-z]+\s*:|^\s*$|\n#|\n\*|\n-|\n\d+\.))",
+    re.IGNORECASE | re.MULTILINE,
+)
+_LEADING_WORD_RE = re.compile(r"(\w+)")
+_PDF_SECTION_SPLIT_RE = re.compile(r"\n\n+|--- Page \d+ ---")
+
+_PDF_CODE_PATTERNS = [
+    (re.compile(pattern, re.IGNORECASE | re.MULTILINE), weight)
+    for pattern, weight in [
+        (r"\bfrom \w+(?:\.\w+)* import\b", 3),  # Python imports (strong)
+        (r"\bdef \w+\s*\(", 3),  # Function definitions (strong)
+        (r"\bclass \w+\s*[\(:]", 3),  # Class definitions (strong)
+        (r"\w+\s*=\s*\w+\(", 2),  # Function calls assigned (medium)
+        (r"\w+\s*=\s*\[.*\]", 2),  # List assignments (medium)
+        (r"\w+\.\w+\(", 2),  # Method calls (medium)
+        (r"^\s*#[^#]", 1),  # Single-line comments (weak)
+        (r"\bpip install\b", 2),  # Package management (medium)
+        (r"\bpytest\b", 2),  # Testing commands (medium)
+        (r"\bgit clone\b", 2),  # Git commands (medium)
+        (r":\s*\n\s+\w+:", 2),  # YAML structure (medium)
+        (r"\blambda\s+\w+:", 2),  # Lambda functions (medium)
+    ]
+]
+_PDF_PROSE_PATTERNS = [
+    (re.compile(pattern, re.IGNORECASE | re.MULTILINE), weight)
+    for pattern, weight in [
+        (r"\b(the|this|that|these|those|are|is|was|were|will|would|should|could|have|has|had)\b", 1),
+        (r"[.!?]\s+[A-Z]", 2),  # Sentence endings
+        (r"\b(however|therefore|furthermore|moreover|additionally|specifically)\b", 2),
+        (r"\bTable of Contents\b", 3),
+        (r"\bAPI Reference\b", 2),
+    ]
+]
+
+_LANGUAGE_DETECTION_PATTERNS = {
+    lang: [re.compile(pattern, re.MULTILINE) for pattern in patterns]
+    for lang, patterns in {
+        "python": [
+            r"\bdef\s+\w+\s*\(",
+            r"\bclass\s+\w+",
+            r"\bimport\s+\w+",
+            r"\bfrom\s+\w+\s+import",
+        ],
+        "javascript": [
+            r"\bfunction\s+\w+\s*\(",
+            r"\bconst\s+\w+\s*=",
+            r"\blet\s+\w+\s*=",
+            r"\bvar\s+\w+\s*=",
+        ],
+        "typescript": [
+            r"\binterface\s+\w+",
+            r":\s*\w+\[\]",
+            r"\btype\s+\w+\s*=",
+            r"\bclass\s+\w+.*\{",
+        ],
+        "java": [
+            r"\bpublic\s+class\s+\w+",
+            r"\bprivate\s+\w+\s+\w+",
+            r"\bpublic\s+static\s+void\s+main",
+        ],
+        "rust": [r"\bfn\s+\w+\s*\(", r"\blet\s+mut\s+\w+", r"\bimpl\s+\w+", r"\bstruct\s+\w+"],
+        "go": [r"\bfunc\s+\w+\s*\(", r"\bpackage\s+\w+", r"\btype\s+\w+\s+struct"],
+    }.items()
+}
+
+_BOUNDARY_PATTERNS = [
+    re.compile(pattern, re.MULTILINE)
+    for pattern in [
+        r"\n}\s*$",  # Closing brace at end of line
+        r"\n}\s*;?\s*$",  # Closing brace with optional semicolon
+        r"\n\)\s*;?\s*$",  # Closing parenthesis
+        r"\n\s*$\n\s*$",  # Double newline (paragraph break)
+        r"\n(?=class\s)",  # Before next class
+        r"\n(?=function\s)",  # Before next function
+        r"\n(?=def\s)",  # Before next Python function
+        r"\n(?=export\s)",  # Before next export
+        r"\n(?=const\s)",  # Before next const declaration
+        r"\n(?=//)",  # Before comment block
+        r"\n(?=#)",  # Before Python comment
+        r"\n(?=\*)",  # Before JSDoc/comment
+        r"\n(?=```)",  # Before next code block
+    ]
+]
+_LANGUAGE_BLOCK_END_PATTERNS = {
+    lang: re.compile(info["block_end"], re.MULTILINE) for lang, info in LANGUAGE_PATTERNS.items()
+}
+
+_HTML_ENTITY_REPLACEMENTS = {
+    "&lt;": "<",
+    "&gt;": ">",
+    "&amp;": "&",
+    "&quot;": '"',
+    "&#39;": "'",
+    "&nbsp;": " ",
+    "&#x27;": "'",
+    "&#x2F;": "/",
+    "&#60;": "<",
+    "&#62;": ">",
+}
+
+# Common patterns where spaces are missing between keywords after span removal
+_SPACING_FIXES = [
+    (re.compile(pattern), replacement)
+    for pattern, replacement in [
+        # Import statements
+        (r"(\b(?:from|import|as)\b)([A-Za-z])", r"\1 \2"),
+        # Function/class definitions
+        (r"(\b(?:def|class|async|await|return|raise|yield)\b)([A-Za-z])", r"\1 \2"),
+        # Control flow
+        (r"(\b(?:if|elif|else|for|while|try|except|finally|with)\b)([A-Za-z])", r"\1 \2"),
+        # Type hints and declarations
+        (
+            r"(\b(?:int|str|float|bool|list|dict|tuple|set|None|True|False)\b)([A-Za-z])",
+            r"\1 \2",
+        ),
+        # Common Python keywords
+        (r"(\b(?:and|or|not|in|is|lambda)\b)([A-Za-z])", r"\1 \2"),
+        # Fix missing spaces around operators (but be careful with negative numbers)
+        (r"([A-Za-z_)])(\+|-|\*|/|=|<|>|%)", r"\1 \2"),
+        (r"(\+|-|\*|/|=|<|>|%)([A-Za-z_(])", r"\1 \2"),
+    ]
+]
+_PYTHON_IMPORT_FIX_RE = re.compile(r"(\b(?:from|import)\b)(\w+)(\b(?:import)\b)")
+_PYTHON_COLON_FIX_RE = re.compile(
+    r"(\b(?:def|class|if|elif|else|for|while|try|except|finally|with)\b[^:]+)$", re.MULTILINE
+)
+
+_BAD_CODE_PATTERNS = [
+    re.compile(pattern)
+    for pattern in [
+        # Concatenated keywords without spaces (but allow camelCase)
+        r"\b(from|import|def|class|if|for|while|return)(?=[a-z])",
+        # HTML entities that weren't decoded
+        r"&[lg]t;|&amp;|&quot;|&#\d+;",
+        # Excessive HTML tags
+        r"<[^>]{50,}>",  # Very long HTML tags
+        # Multiple spans in a row (indicates poor extraction)
+        r"(<span[^>]*>){5,}",
+        # Suspicious character sequences
+        r"[^\s]{200,}",  # Very long unbroken strings (increased threshold)
+    ]
+]
+_CODE_INDICATORS = {
+    name: re.compile(pattern)
+    for name, pattern in {
+        "function_calls": r"\w+\s*\([^)]*\)",
+        "assignments": r"\w+\s*=\s*.+",
+        "control_flow": r"\b(if|for|while|switch|case|try|catch|except)\b",
+        "declarations": r"\b(var|let|const|def|class|function|interface|type|struct|enum)\b",
+        "imports": r"\b(import|from|require|include|using|use)\b",
+        "brackets": r"[\{\}\[\]]",
+        "operators": r"[\+\-\*\/\%\&\|\^<>=!]",
+        "method_chains": r"\.\w+",
+        "arrows": r"(=>|->)",
+        "keywords": r"\b(return|break|continue|yield|await|async)\b",
+    }.items()
+}
+# Comment line styles: single line comments, Python docstrings and JSDoc
+_COMMENT_LINE_RE = re.compile(r"""^\s*(?://|#|/\*|\*|<!--|\"\"\"|''')""")
+_PROSE_INDICATORS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in [
+        r"\b(the|this|that|these|those|is|are|was|were|will|would|should|could|have|has|had)\b",
+        r"[.!?]\s+[A-Z]",  # Sentence endings followed by capital letter
+        r"\b(however|therefore|furthermore|moreover|nevertheless)\b",
+    ]
+]
+
+_DIAGRAM_LANGUAGES = {"mermaid", "plantuml", "graphviz", "dot", "diagram"}
+
+# Base minimum lengths by language
+_BASE_MIN_LENGTHS = {
+    "json": 100,  # JSON can be short
+    "yaml": 100,  # YAML too
+    "xml": 100,  # XML structures
+    "html": 150,  # HTML snippets
+    "css": 150,  # CSS rules
+    "sql": 150,  # SQL queries
+    "python": 200,  # Python functions
+    "javascript": 250,  # JavaScript typically longer
+    "typescript": 250,  # TypeScript typically longer
+    "java": 300,  # Java even more verbose
+    "c++": 300,  # C++ similar to Java
+    "cpp": 300,  # C++ alternative
+    "c": 250,  # C slightly less verbose
+    "rust": 250,  # Rust medium verbosity
+    "go": 200,  # Go is concise
+}
+
+_TEXT_FILE_SUFFIXES = (".txt", ".text", ".md", ".html", ".htm")
+
+
+def _make_block(
+    code: str, language: str, context_before: str, context_after: str, source_type: str | None
+) -> dict[str, Any]:
+    block = {
+        "code": code,
+        "language": language,
+        "context_before": context_before,
+        "context_after": context_after,
+        "full_context": f"{context_before}\n\n{code}\n\n{context_after}",
+    }
+    if source_type:
+        block["source_type"] = source_type
+    return block
+
+
+def extract_document_code_blocks(
+    url: str,
+    html_content: str,
+    markdown: str,
+    content_type: str,
+    settings: CodeExtractionSettings,
+) -> tuple[list[dict[str, Any]], float]:
+    """
+    Extract code blocks from a single crawled document.
+
+    Text files use the text extractor, PDFs the PDF extractor, and anything else
+    (or a text/PDF document that yielded nothing) falls back to HTML patterns.
+    Markdown fence extraction is left to the caller.
+
+    Args:
+        url: Source URL of the document
+        html_content: Raw HTML (or raw text for text files)
+        markdown: Markdown rendering of the document
+        content_type: Response content type, if known
+        settings: Code extraction settings
+
+    Returns:
+        Tuple of (code blocks, extraction time in seconds)
+    """
+    start_time = time.perf_counter()
+    code_blocks: list[dict[str, Any]] = []
+
+    is_text_file = (
+        url.endswith(_TEXT_FILE_SUFFIXES)
+        or "text/plain" in content_type
+        or "text/markdown" in content_type
+    )
+    is_pdf_file = url.endswith(".pdf") or "application/pdf" in content_type
+
+    if is_text_file:
+        # For text files the HTML content should be the raw text (not wrapped in <pre>)
+        text_content = html_content or markdown
+        if text_content:
+            code_blocks = extract_text_file_code_blocks(text_content, url, settings)
+    elif is_pdf_file:
+        pdf_content = html_content or markdown
+        if pdf_content:
+            code_blocks = extract_pdf_code_blocks(pdf_content, url, settings)
+
+    if not code_blocks and html_content and not is_text_file:
+        code_blocks = extract_html_code_blocks(html_content, settings)
+
+    return code_blocks, time.perf_counter() - start_time
+
+
+def extract_html_code_blocks(content: str, settings: CodeExtractionSettings) -> list[dict[str, Any]]:
+    """
+    Extract code blocks from HTML patterns in content.
+    This is a fallback when markdown conversion didn't preserve code blocks.
+
+    Args:
+        content: The content to search for HTML code patterns
+        settings: Code extraction settings
+
+    Returns:
+        List of code blocks with metadata
+    """
+    code_blocks = []
+    extracted_positions = set()  # Track already extracted code block positions
+
+    for pattern, source_type in _HTML_CODE_PATTERNS:
+        for match in pattern.finditer(content):
+            # Extract code content based on pattern type
+            if source_type in _LANGUAGE_GROUP_SOURCE_TYPES:
+                # These patterns capture language in group 1, code in group 2
+                if match.lastindex and match.lastindex >= 2:
+                    language = match.group(1)
+                    code_content = match.group(2).strip()
+                else:
+                    code_content = match.group(1).strip()
+                    language = ""
+            else:
+                # Most patterns have code in group 1
+                code_content = match.group(1).strip()
+                # Try to extract language from the full match
+                lang_match = _LANGUAGE_CLASS_RE.search(match.group(0))
+                language = lang_match.group(1) if lang_match else ""
+            # hljs without a language class leaves group 1 empty
+            language = language or ""
+
+            # Get the start position for complete block extraction
+            code_start_pos = match.start()
+
+            # For CodeMirror, extract text from cm-lines
+            if source_type == "codemirror":
+                cm_lines = _CM_LINE_RE.findall(code_content)
+                if cm_lines:
+                    # Remove span and other tags but keep content
+                    code_content = "\n".join(
+                        _ANY_TAG_RE.sub("", _SPAN_CLOSE_RE.sub("", _SPAN_OPEN_RE.sub("", line)))
+                        for line in cm_lines
+                    )
+                else:
+                    # Fallback: just clean HTML
+                    code_content = _SPAN_OPEN_RE.sub("", code_content)
+                    code_content = _SPAN_CLOSE_RE.sub("", code_content)
+                    code_content = _ANY_TAG_RE.sub("\n", code_content)
+
+            # For Monaco, extract text from nested divs
+            if source_type == "monaco":
+                code_content = _DIV_OPEN_RE.sub("\n", code_content)
+                code_content = _DIV_CLOSE_RE.sub("", code_content)
+                code_content = _SPAN_OPEN_RE.sub("", code_content)
+                code_content = _SPAN_CLOSE_RE.sub("", code_content)
+
+            # Calculate dynamic minimum length
+            context_for_length = content[max(0, code_start_pos - 500) : code_start_pos + 500]
+            min_length = calculate_min_length(language, context_for_length, settings)
+
+            # Skip if initial content is too short
+            if len(code_content) < min_length:
+                # Try to find complete block if we have a language
+                if not (language and code_start_pos > 0):
+                    continue
+                complete_code, _ = find_complete_code_block(
+                    content, code_start_pos, min_length, language, settings.max_code_block_length
+                )
+                if len(complete_code) < min_length:
+                    continue
+                code_content = complete_code
+
+            # Extract position info for deduplication
+            start_pos = match.start()
+            end_pos = (
+                match.end()
+                if len(code_content) <= len(match.group(0))
+                else code_start_pos + len(code_content)
+            )
+
+            # Skip matches overlapping an existing extraction
+            if any(
+                not (end_pos <= existing_start or start_pos >= existing_end)
+                for existing_start, existing_end in extracted_positions
+            ):
+                continue
+            extracted_positions.add((start_pos, end_pos))
+
+            context_before = content[max(0, start_pos - 1000) : start_pos].strip()
+            context_after = content[end_pos : min(len(content), end_pos + 1000)].strip()
+
+            cleaned_code = clean_code_content(code_content, language)
+            if validate_code_quality(cleaned_code, language, settings):
+                logger.debug(
+                    f"Extracted code block | source_type={source_type} | language={language} | min_length={min_length} | original_length={len(code_content)} | cleaned_length={len(cleaned_code)}"
+                )
+                code_blocks.append(
+                    _make_block(cleaned_code, language, context_before, context_after, source_type)
+                )
+
+    # Standalone <code>...</code>, only if we didn't find pre/code blocks
+    if not code_blocks:
+        for match in _STANDALONE_CODE_RE.finditer(content):
+            cleaned_code = clean_code_content(match.group(1).strip(), "")
+
+            # Use a minimal length for standalone code tags
+            if len(cleaned_code) >= 100 and validate_code_quality(cleaned_code, "", settings):
+                start_pos = match.start()
+                end_pos = match.end()
+                context_before = content[max(0, start_pos - 1000) : start_pos].strip()
+                context_after = content[end_pos : min(len(content), end_pos + 1000)].strip()
+                code_blocks.append(_make_block(cleaned_code, "", context_before, context_after, None))
+
+    return code_blocks
+
+
+def extract_text_file_code_blocks(
+    content: str, url: str, settings: CodeExtractionSettings, min_length: int | None = None
+) -> list[dict[str, Any]]:
+    """
+    Extract code blocks from plain text files (like .txt files).
+    Handles formats like llms.txt where code blocks may be indicated by:
+    - Triple backticks (```)
+    - Language indicators (e.g., "typescript", "python")
+    - Indentation patterns
+
+    Args:
+        content: The plain text content
+        url: The URL of the text file for context
+        settings: Code extraction settings
+        min_length: Fixed minimum length for code blocks (dynamic when None)
+
+    Returns:
+        List of code blocks with metadata
+    """
+    code_blocks = []
+
+    # Method 1: Triple backtick code blocks (Markdown style); the language may
+    # be followed by additional text (e.g. "typescript TypeScript")
+    for match in _BACKTICK_BLOCK_RE.finditer(content):
+        language = match.group(1) or ""
+        code_content = match.group(2).strip()
+        start_pos = match.start()
+        end_pos = match.end()
+
+        if min_length is None:
+            context_around = content[max(0, start_pos - 500) : min(len(content), end_pos + 500)]
+            actual_min_length = calculate_min_length(language, context_around, settings)
+        else:
+            actual_min_length = min_length
+
+        if len(code_content) < actual_min_length:
+            continue
+
+        context_before = content[max(0, start_pos - 500) : start_pos].strip()
+        context_after = content[end_pos : min(len(content), end_pos + 500)].strip()
+
+        cleaned_code = clean_code_content(code_content, language)
+        if validate_code_quality(cleaned_code, language, settings):
+            code_blocks.append(
+                _make_block(cleaned_code, language, context_before, context_after, "text_backticks")
+            )
+
+    # Method 2: Language-labeled code blocks (e.g., "TypeScript:" or "Python example:")
+    for match in _LANGUAGE_LABEL_RE.finditer(content):
+        language_match = _LEADING_WORD_RE.match(match.group(1).lower())
+        language = language_match.group(1) if language_match else ""
+        code_content = match.group(2).strip()
+
+        if min_length is None:
+            actual_min_length = calculate_min_length(language, code_content[:500], settings)
+        else:
+            actual_min_length = min_length
+
+        if len(code_content) < actual_min_length:
+            continue
+
+        start_pos = match.start()
+        end_pos = match.end()
+        context_before = content[max(0, start_pos - 500) : start_pos].strip()
+        context_after = content[end_pos : min(len(content), end_pos + 500)].strip()
+
+        cleaned_code = clean_code_content(code_content, language)
+        if validate_code_quality(cleaned_code, language, settings):
+            code_blocks.append(
+                _make_block(cleaned_code, language, context_before, context_after, "text_language_label")
+            )
+
+    # Method 3: Consistently indented blocks (at least 4 spaces), only as a
+    # last resort since this is heuristic
+    if not code_blocks:
+        threshold = min_length if min_length is not None else settings.min_code_block_length
+        lines = content.split("\n")
+        current_block: list[str] = []
+        block_start_idx = 0
+
+        for i, line in enumerate(lines):
+            stripped = line.lstrip()
+            indent = len(line) - len(stripped)
+
+            if indent >= 4 and stripped:
+                if not current_block:
+                    block_start_idx = i
+                current_block.append(line)
+            elif current_block:
+                # End of indented block, check if it's code
+                code_content = "\n".join(current_block)
+                current_block = []
+                if len(code_content) < threshold:
+                    continue
+
+                language = detect_language_from_content(code_content)
+                context_before = "\n".join(lines[max(0, block_start_idx - 10) : block_start_idx]).strip()
+                context_after = "\n".join(lines[i : min(len(lines), i + 10)]).strip()
+
+                cleaned_code = clean_code_content(code_content, language)
+                if validate_code_quality(cleaned_code, language, settings):
+                    code_blocks.append(
+                        _make_block(cleaned_code, language, context_before, context_after, "text_indented")
+                    )
+
+    logger.debug(f"Text file extraction complete | total_blocks={len(code_blocks)} | url={url}")
+    return code_blocks
+
+
+def extract_pdf_code_blocks(content: str, url: str, settings: CodeExtractionSettings) -> list[dict[str, Any]]:
+    """
+    Extract code blocks from PDF-extracted text that lacks markdown formatting.
+    PDFs lose markdown delimiters, so distinct code segments separated by prose
+    are detected in plain text.
+
+    Args:
+        content: Text extracted from the PDF
+        url: The URL of the PDF for context
+        settings: Code extraction settings
+
+    Returns:
+        List of code blocks with metadata
+    """
+    code_blocks = []
+    min_length = settings.min_code_block_length
+
+    # Double newlines and page breaks are natural boundaries
+    sections = _PDF_SECTION_SPLIT_RE.split(content)
+
+    for i, section in enumerate(sections):
+        section = section.strip()
+        if len(section) < 50 or not is_pdf_section_code_like(section):
+            continue
+
+        language = detect_language_from_content(section)
+        cleaned_code = clean_code_content(section, language)
+
+        if len(cleaned_code) >= min_length and validate_code_quality(cleaned_code, language, settings):
+            # Get context from adjacent sections
+            context_before = sections[i - 1].strip() if i > 0 else ""
+            context_after = sections[i + 1].strip() if i < len(sections) - 1 else ""
+            code_blocks.append(
+                _make_block(cleaned_code, language, context_before, context_after, "pdf_section")
+            )
+
+    logger.debug(f"PDF code extraction complete | total_blocks={len(code_blocks)} | url={url}")
+    return code_blocks
+
+
+def is_pdf_section_code_like(section: str) -> bool:
+    """Determine if a PDF section contains code rather than prose."""
+    code_score = sum(len(pattern.findall(section)) * weight for pattern, weight in _PDF_CODE_PATTERNS)
+    prose_score = sum(len(pattern.findall(section)) * weight for pattern, weight in _PDF_PROSE_PATTERNS)
+
+    non_empty_lines = [line.strip() for line in section.split("\n") if line.strip()]
+    if not non_empty_lines:
+        return False
+
+    # If section is mostly single words or very short lines, probably not code
+    short_lines = sum(1 for line in non_empty_lines if len(line.split()) < 3)
+    if short_lines / len(non_empty_lines) > 0.7:
+        prose_score += 3
+
+    # If section has common code structure indicators
+    if any("(" in line and ")" in line for line in non_empty_lines[:5]):
+        code_score += 2
+
+    # Code-like if code score significantly higher than prose score
+    return code_score > prose_score and code_score > 2
+
+
+def detect_language_from_content(code: str) -> str:
+    """
+    Try to detect programming language from code content.
+    This is a simple heuristic approach.
+    """
+    scores = {}
+    for lang, patterns in _LANGUAGE_DETECTION_PATTERNS.items():
+        score = sum(1 for pattern in patterns if pattern.search(code))
+        if score > 0:
+            scores[lang] = score
+
+    # Return language with highest score
+    if scores:
+        return max(scores, key=scores.get)
+    return ""
+
+
+def find_complete_code_block(
+    content: str,
+    start_pos: int,
+    min_length: int = 250,
+    language: str = "",
+    max_length: int = 5000,
+) -> tuple[str, int]:
+    """
+    Find a complete code block starting from a position, extending until a natural boundary.
+
+    Args:
+        content: The full content to search in
+        start_pos: Starting position in the content
+        min_length: Minimum length for the code block
+        language: Detected language for language-specific patterns
+        max_length: Maximum length to extend to
+
+    Returns:
+        Tuple of (complete_code_block, end_position)
+    """
+    # Start with the minimum content
+    if start_pos + min_length > len(content):
+        return content[start_pos:], len(content)
+
+    boundary_patterns = _BOUNDARY_PATTERNS
+    language_end = _LANGUAGE_BLOCK_END_PATTERNS.get(language.lower()) if language else None
+    if language_end is not None:
+        boundary_patterns = [language_end, *_BOUNDARY_PATTERNS]
+
+    # Extend until we find a boundary
+    extended_pos = start_pos + min_length
+    while extended_pos < len(content):
+        # Check next 500 characters for a boundary
+        lookahead = content[extended_pos : min(extended_pos + 500, len(content))]
+
+        for pattern in boundary_patterns:
+            match = pattern.search(lookahead)
+            if match:
+                final_pos = extended_pos + match.end()
+                return content[start_pos:final_pos].rstrip(), final_pos
+
+        # If no boundary found, extend by another chunk
+        extended_pos += 100
+        if extended_pos - start_pos > max_length:
+            break
+
+    return content[start_pos:extended_pos].rstrip(), extended_pos
+
+
+def calculate_min_length(language: str, context: str, settings: CodeExtractionSettings) -> int:
+    """
+    Calculate appropriate minimum length based on language and context.
+
+    Args:
+        language: The detected programming language
+        context: Surrounding context of the code
+        settings: Code extraction settings
+
+    Returns:
+        Calculated minimum length
+    """
+    default_min = settings.min_code_block_length
+    if not settings.enable_contextual_length:
+        return default_min
+
+    min_length = _BASE_MIN_LENGTHS.get(language.lower(), default_min)
+
+    # Adjust based on context clues
+    context_lower = context.lower()
+    if any(word in context_lower for word in ["example", "snippet", "sample", "demo"]):
+        min_length = int(min_length * 0.7)  # Examples can be shorter
+    elif any(word in context_lower for word in ["implementation", "complete", "full"]):
+        min_length = int(min_length * 1.5)  # Full implementations should be longer
+    elif any(word in context_lower for word in ["minimal", "simple", "basic"]):
+        min_length = int(min_length * 0.8)  # Simple examples can be shorter
+
+    # Ensure reasonable bounds
+    return max(100, min(1000, min_length))
+
+
+def decode_html_entities(text: str) -> str:
+    """Decode common HTML entities and clean HTML tags from code."""
+    # Spans without spaces between them indicate syntax highlighting - preserve the structure
+    if "</span><span" in text:
+        text = _SPAN_CLOSE_RE.sub("", text)
+    else:
+        # Normal span usage - only add space if there isn't already whitespace
+        text = _SPAN_CLOSE_BEFORE_WORD_RE.sub(" ", text)
+    text = _SPAN_OPEN_RE.sub("", text)
+
+    # Remove any other HTML tags but preserve their content
+    text = _ANY_TAG_OPTIONAL_SLASH_RE.sub("", text)
+
+    for entity, char in _HTML_ENTITY_REPLACEMENTS.items():
+        text = text.replace(entity, char)
+
+    # Replace escaped newlines with actual newlines
+    text = text.replace("\\n", "\n")
+
+    # Collapse repeated spaces and trim trailing spaces, preserving indentation
+    return "\n".join(_MULTI_SPACE_RE.sub(" ", line).rstrip() for line in text.split("\n"))
+
+
+def clean_code_content(code: str, language: str = "") -> str:
+    """
+    Clean and fix common issues in extracted code content.
+
+    Args:
+        code: The code content to clean
+        language: The detected language (optional)
+
+    Returns:
+        Cleaned code content
+    """
+    code = decode_html_entities(code)
+
+    for pattern, replacement in _SPACING_FIXES:
+        code = pattern.sub(replacement, code)
+
+    if language.lower() in ["python", "py"]:
+        code = _PYTHON_IMPORT_FIX_RE.sub(r"\1 \2 \3", code)
+        # Fix missing colons
+        code = _PYTHON_COLON_FIX_RE.sub(r"\1:", code)
+
+    # Remove backticks that might have been included
+    if code.startswith("```") and code.endswith("```"):
+        lines = code.split("\n")
+        if len(lines) > 2:
+            code = "\n".join(lines[1:-1])
+    elif code.startswith("`") and code.endswith("`"):
+        code = code[1:-1]
+
+    # Remove remaining excessive spaces while preserving indentation
+    cleaned_lines = []
+    for line in code.split("\n"):
+        stripped = line.lstrip()
+        indent = line[: len(line) - len(stripped)]
+        cleaned_lines.append(indent + _DOUBLE_SPACE_RE.sub(" ", stripped))
+
+    return "\n".join(cleaned_lines).strip()
+
+
+def validate_code_quality(code: str, language: str, settings: CodeExtractionSettings) -> bool:
+    """
+    Enhanced validation to ensure extracted content is actual code.
+
+    Args:
+        code: The code content to validate
+        language: The detected language (may be empty)
+        settings: Code extraction settings
+
+    Returns:
+        True if code passes quality checks, False otherwise
+    """
+    if not code or len(code.strip()) < 20:
+        return False
+
+    # Skip diagram languages if filtering is enabled
+    if settings.enable_diagram_filtering and language.lower() in _DIAGRAM_LANGUAGES:
+        return False
+
+    # Formatting issues that indicate poor extraction
+    for pattern in _BAD_CODE_PATTERNS:
+        if pattern.search(code):
+            logger.debug(f"Code failed quality check: pattern '{pattern.pattern}' found")
+            return False
+
+    # Minimum code complexity using various indicators
+    indicator_count = sum(1 for pattern in _CODE_INDICATORS.values() if pattern.search(code))
+    if indicator_count < settings.min_code_indicators:
+        return False
+
+    lines = code.split("\n")
+    non_empty_lines = [line for line in lines if line.strip()]
+    if not non_empty_lines:
+        return False
+
+    # Allow up to 70% comments (documentation is important)
+    comment_lines = sum(1 for line in lines if _COMMENT_LINE_RE.match(line.strip()))
+    if comment_lines / len(non_empty_lines) > 0.7:
+        return False
+
+    # Language-specific validation: need at least 2 language-specific indicators
+    lang_info = LANGUAGE_PATTERNS.get(language.lower())
+    if lang_info:
+        code_lower = code.lower()
+        found_lang_indicators = sum(
+            1 for indicator in lang_info["min_indicators"] if indicator in code_lower
+        )
+        if found_lang_indicators < 2:
+            return False
+
+    # Too few meaningful lines
+    if len(non_empty_lines) < 3:
+        return False
+
+    # Too many very long lines
+    very_long_lines = sum(1 for line in lines if len(line) > 300)
+    if very_long_lines > len(lines) * 0.5:
+        return False
+
+    # Check if it's mostly prose/documentation
+    if settings.enable_prose_filtering:
+        word_count = len(code.split())
+        prose_score = sum(len(pattern.findall(code)) for pattern in _PROSE_INDICATORS)
+        if word_count > 0 and prose_score / word_count > settings.max_prose_ratio:
+            return False
+
+    return True
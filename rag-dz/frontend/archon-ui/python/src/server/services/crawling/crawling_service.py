@@ -17,11 +17,13 @@ from ...config.logfire_config import get_logger, safe_logfire_error, safe_logfir
 from ...utils import get_supabase_client
 from ...utils.progress.progress_tracker import ProgressTracker
 from ..credential_service import credential_service
+from ..settings_snapshot import get_rag_settings_snapshot
 
 # Import strategies
 # Import operations
 from .discovery_service import DiscoveryService
 from .document_storage_operations import DocumentStorageOperations
+from .helpers.page_fingerprint import find_unchanged_urls
 from .helpers.site_config import SiteConfig
 
 # Import helpers
@@ -115,6 +117,8 @@ class CrawlingService:
         self.supabase_client = supabase_client or get_supabase_client()
         self.progress_id = progress_id
         self.progress_tracker = None
+        # Settings taken once at the start of a crawl and shared by all stages
+        self.settings_snapshot = None
 
         # Initialize helpers
         self.url_handler = URLHandler()
@@ -139,6 +143,9 @@ class CrawlingService:
         self.progress_mapper = ProgressMapper()
         # Cancellation support
         self._cancelled = False
+        # Incremental recrawl state: stored fingerprints and URLs skipped via 304 responses
+        self.page_fingerprints: dict[str, dict[str, Any]] = {}
+        self.not_modified_urls: set[str] = set()
 
     def set_progress_id(self, progress_id: str):
         """Set the progress ID for HTTP polling updates."""
@@ -252,6 +259,20 @@ class CrawlingService:
         link_text_fallbacks: dict[str, str] | None = None,
     ) -> list[dict[str, Any]]:
         """Batch crawl multiple URLs in parallel."""
+        if self.page_fingerprints:
+            # Incremental recrawl: drop URLs the server reports as not modified
+            not_modified = await find_unchanged_urls(
+                urls, self.page_fingerprints, max_concurrent=max_concurrent or 10
+            )
+            if not_modified:
+                self.not_modified_urls.update(not_modified)
+                urls = [u for u in urls if u not in not_modified]
+                safe_logfire_info(
+                    f"Incremental recrawl: skipping {len(not_modified)} not-modified pages | remaining={len(urls)}"
+                )
+            if not urls:
+                return []
+
         return await self.batch_strategy.crawl_batch_with_progress(
             urls,
             self.url_handler.transform_github_url,
@@ -260,6 +281,7 @@ class CrawlingService:
             progress_callback,
             self._check_cancellation,  # Pass cancellation check
             link_text_fallbacks,  # Pass link text fallbacks
+            settings_snapshot=self.settings_snapshot,
         )
 
     async def crawl_recursive_with_progress(
@@ -278,6 +300,7 @@ class CrawlingService:
             max_concurrent,
             progress_callback,
             self._check_cancellation,  # Pass cancellation check
+            settings_snapshot=self.settings_snapshot,
         )
 
     # Orchestration methods
@@ -346,6 +369,13 @@ class CrawlingService:
             url = str(request.get("url", ""))
             safe_logfire_info(f"Starting async crawl orchestration | url={url} | task_id={task_id}")
 
+            try:
+                self.settings_snapshot = await get_rag_settings_snapshot()
+            except Exception as e:
+                # Strategies load settings (or fall back to defaults) themselves
+                logger.warning(f"Failed to load settings snapshot: {e}")
+                self.settings_snapshot = None
+
             # Start the progress tracker if available
             if self.progress_tracker:
                 await self.progress_tracker.start({
@@ -383,6 +413,12 @@ class CrawlingService:
                 "starting", 100, f"Starting crawl of {url}", current_url=url
             )
 
+            # Incremental recrawl: load stored page fingerprints for this source
+            if request.get("incremental"):
+                self.page_fingerprints = await self.page_storage_ops.get_page_fingerprints(
+                    original_source_id
+                )
+
             # Check for cancellation before proceeding
             self._check_cancellation()
 
@@ -500,7 +536,7 @@ class CrawlingService:
             # Send heartbeat after potentially long crawl operation
             await send_heartbeat_if_needed()
 
-            if not crawl_results:
+            if not crawl_results and not self.not_modified_urls:
                 raise ValueError("No content was crawled from the provided URL")
 
             # Processing stage
@@ -558,7 +594,15 @@ class CrawlingService:
                 source_url=url,
                 source_display_name=source_display_name,
                 url_to_page_id=None,  # Will be populated after page storage
+                page_fingerprints=self.page_fingerprints or None,
+                not_modified_urls=self.not_modified_urls or None,
             )
+            unchanged_pages = len(self.not_modified_urls) + len(storage_results.get("unchanged_urls", []))
+            if unchanged_pages:
+                safe_logfire_info(
+                    f"Incremental recrawl | unchanged_pages={unchanged_pages} | "
+                    f"changed_pages={len(storage_results['url_to_full_document'])}"
+                )
 
             # Update progress tracker with source_id now that it's created
             if self.progress_tracker and storage_results.get("source_id"):
@@ -639,14 +683,21 @@ class CrawlingService:
                         )
                         embedding_provider = None
 
+                    # Only changed pages need their code examples re-extracted
+                    unchanged_urls = set(storage_results.get("unchanged_urls", []))
+                    changed_results = [
+                        doc for doc in crawl_results
+                        if (doc.get("url") or "").strip() not in unchanged_urls
+                    ]
                     code_examples_count = await self.doc_storage_ops.extract_and_store_code_examples(
-                        crawl_results,
+                        changed_results,
                         storage_results["url_to_full_document"],
                         storage_results["source_id"],
                         code_progress_callback,
                         self._check_cancellation,
                         provider,
                         embedding_provider,
+                        settings_snapshot=self.settings_snapshot,
                     )
                 except RuntimeError as e:
                     # Code extraction failed, continue crawl with warning
@@ -687,6 +738,7 @@ class CrawlingService:
                 code_examples_found=code_examples_count,
                 processed_pages=len(crawl_results),
                 total_pages=len(crawl_results),
+                unchanged_pages=unchanged_pages,
             )
 
             # Mark crawl as completed
@@ -696,6 +748,7 @@ class CrawlingService:
                     "code_examples_found": code_examples_count,
                     "processed_pages": len(crawl_results),
                     "total_pages": len(crawl_results),
+                    "unchanged_pages": unchanged_pages,
                     "sourceId": storage_results.get("source_id", ""),
                     "log": "Crawl completed successfully!",
                 })
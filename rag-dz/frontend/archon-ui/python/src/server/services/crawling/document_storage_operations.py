@@ -10,10 +10,14 @@ from collections.abc import Callable
 from typing import Any
 
 from ...config.logfire_config import get_logger, safe_logfire_error, safe_logfire_info
+from ..settings_snapshot import RagSettingsSnapshot
 from ..source_management_service import extract_source_summary, update_source_info
 from ..storage.document_storage_service import add_documents_to_supabase
 from ..storage.storage_services import DocumentStorageService
+from ..storage.text_chunker import CHUNK_OVERLAP_TOKENS, CHUNK_SIZE_TOKENS
 from .code_extraction_service import CodeExtractionService
+from .helpers.page_fingerprint import compute_content_hash
+from .page_storage_operations import PageStorageOperations
 
 logger = get_logger(__name__)
 
@@ -45,6 +49,8 @@ class DocumentStorageOperations:
         source_url: str | None = None,
         source_display_name: str | None = None,
         url_to_page_id: dict[str, str] | None = None,
+        page_fingerprints: dict[str, dict[str, Any]] | None = None,
+        not_modified_urls: set[str] | None = None,
     ) -> dict[str, Any]:
         """
         Process crawled documents and store them in the database.
@@ -58,12 +64,17 @@ class DocumentStorageOperations:
             cancellation_check: Optional function to check for cancellation
             source_url: Optional original URL that was crawled
             source_display_name: Optional human-readable name for the source
+            page_fingerprints: Optional stored page fingerprints for incremental recrawls.
+                Pages whose content hash matches are skipped (no re-chunking or re-embedding).
+            not_modified_urls: Optional URLs skipped before crawling (304 Not Modified).
+                Their stored word counts are carried into the source total.
 
         Returns:
             Dict containing storage statistics and document mappings
         """
         # Reuse initialized storage service for chunking
         storage_service = self.doc_storage_service
+        page_storage_ops = PageStorageOperations(self.supabase_client)
 
         # Prepare data for chunked storage
         all_urls = []
@@ -72,8 +83,18 @@ class DocumentStorageOperations:
         all_metadatas = []
         source_word_counts = {}
         url_to_full_document = {}
+        url_to_validators = {}
+        unchanged_urls = []
         processed_docs = 0
 
+        # Pages skipped on 304 never reach crawl_results: keep their stored word counts
+        for url in not_modified_urls or ():
+            fingerprint = (page_fingerprints or {}).get(url)
+            if fingerprint:
+                source_word_counts[original_source_id] = (
+                    source_word_counts.get(original_source_id, 0) + (fingerprint.get("word_count") or 0)
+                )
+
         # Process and chunk each document
         for doc_index, doc in enumerate(crawl_results):
             # Check for cancellation during document processing
@@ -97,14 +118,39 @@ class DocumentStorageOperations:
                 logger.debug(f"Skipping document {doc_index}: empty {'URL' if not doc_url else 'content'}")
                 continue
 
+            # Incremental recrawl: skip pages whose content did not change
+            fingerprint = (page_fingerprints or {}).get(doc_url)
+            if fingerprint and fingerprint.get("content_hash") == compute_content_hash(markdown_content):
+                unchanged_urls.append(doc_url)
+                source_word_counts[original_source_id] = (
+                    source_word_counts.get(original_source_id, 0) + (fingerprint.get("word_count") or 0)
+                )
+                # Keep validators fresh so the next recrawl can use conditional requests
+                if (doc.get("etag"), doc.get("last_modified")) != (
+                    fingerprint.get("etag"), fingerprint.get("last_modified")
+                ) and (doc.get("etag") or doc.get("last_modified")):
+                    await page_storage_ops.update_page_validators(
+                        fingerprint["id"], doc.get("etag"), doc.get("last_modified")
+                    )
+                continue
+
             # Increment processed document count
             processed_docs += 1
 
             # Store full document for code extraction context
             url_to_full_document[doc_url] = markdown_content
+            url_to_validators[doc_url] = {
+                "etag": doc.get("etag"),
+                "last_modified": doc.get("last_modified"),
+            }
 
             # CHUNK THE CONTENT
-            chunks = await storage_service.smart_chunk_text_async(markdown_content, chunk_size=5000)
+            chunks = await storage_service.smart_chunk_text_async(
+                markdown_content,
+                chunk_size=CHUNK_SIZE_TOKENS,
+                chunk_overlap=CHUNK_OVERLAP_TOKENS,
+                size_unit="tokens",
+            )
 
             # Use the original source_id for all documents
             source_id = original_source_id
@@ -165,9 +211,6 @@ class DocumentStorageOperations:
             )
 
         # Store pages AFTER source is created but BEFORE chunks (FK constraint requirement)
-        from .page_storage_operations import PageStorageOperations
-        page_storage_ops = PageStorageOperations(self.supabase_client)
-
         # Check if this is an llms-full.txt file
         is_llms_full = crawl_type == "llms-txt" or (
             len(url_to_full_document) == 1 and
@@ -204,7 +247,10 @@ class DocumentStorageOperations:
                 # Update url_to_full_document with section content
                 url_to_full_document[section.url] = section.content
                 section_chunks = await storage_service.smart_chunk_text_async(
-                    section.content, chunk_size=5000
+                    section.content,
+                    chunk_size=CHUNK_SIZE_TOKENS,
+                    chunk_overlap=CHUNK_OVERLAP_TOKENS,
+                    size_unit="tokens",
                 )
 
                 for i, chunk in enumerate(section_chunks):
@@ -234,6 +280,7 @@ class DocumentStorageOperations:
                 reconstructed_crawl_results.append({
                     "url": url,
                     "markdown": markdown,
+                    **url_to_validators.get(url, {}),
                 })
 
             if reconstructed_crawl_results:
@@ -257,7 +304,8 @@ class DocumentStorageOperations:
         # Log chunking results
         avg_chunks = (len(all_contents) / processed_docs) if processed_docs > 0 else 0.0
         safe_logfire_info(
-            f"Document storage | processed={processed_docs}/{len(crawl_results)} | chunks={len(all_contents)} | avg_chunks_per_doc={avg_chunks:.1f}"
+            f"Document storage | processed={processed_docs}/{len(crawl_results)} | unchanged={len(unchanged_urls)} "
+            f"| chunks={len(all_contents)} | avg_chunks_per_doc={avg_chunks:.1f}"
         )
 
         # Call add_documents_to_supabase with the correct parameters
@@ -285,7 +333,8 @@ class DocumentStorageOperations:
             'chunks_stored': chunks_stored,
             'total_word_count': sum(source_word_counts.values()),
             'url_to_full_document': url_to_full_document,
-            'source_id': original_source_id
+            'source_id': original_source_id,
+            'unchanged_urls': unchanged_urls,
         }
 
     async def _create_source_records(
@@ -325,6 +374,11 @@ class DocumentStorageOperations:
                 source_id_word_counts[source_id] = 0
             source_id_word_counts[source_id] += metadata.get('word_count', 0)
 
+        # source_word_counts also covers pages skipped as unchanged during incremental recrawls
+        for source_id, word_count in source_word_counts.items():
+            if source_id in source_id_word_counts:
+                source_id_word_counts[source_id] = max(source_id_word_counts[source_id], word_count)
+
         safe_logfire_info(
             f"Found {len(unique_source_ids)} unique source_ids: {list(unique_source_ids)}"
         )
@@ -444,6 +498,7 @@ class DocumentStorageOperations:
         cancellation_check: Callable[[], None] | None = None,
         provider: str | None = None,
         embedding_provider: str | None = None,
+        settings_snapshot: RagSettingsSnapshot | None = None,
     ) -> int:
         """
         Extract code examples from crawled documents and store them.
@@ -456,6 +511,7 @@ class DocumentStorageOperations:
             cancellation_check: Optional function to check for cancellation
             provider: Optional LLM provider to use for code summaries
             embedding_provider: Optional embedding provider override for code example embeddings
+            settings_snapshot: Optional settings taken at the start of the crawl
 
         Returns:
             Number of code examples stored
@@ -468,6 +524,7 @@ class DocumentStorageOperations:
             cancellation_check,
             provider,
             embedding_provider,
+            settings_snapshot=settings_snapshot,
         )
 
         return result
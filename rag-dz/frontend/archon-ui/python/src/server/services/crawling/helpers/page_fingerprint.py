@@ -0,0 +1,122 @@
+"""
+Page Fingerprint Helpers
+
+Utilities for incremental recrawls: content hashing of crawled pages and
+conditional HTTP probes (If-None-Match / If-Modified-Since) that let the
+crawler skip pages the server reports as unchanged.
+"""
+
+import asyncio
+import hashlib
+from typing import Any
+
+import httpx
+
+from ....config.logfire_config import get_logger
+
+logger = get_logger(__name__)
+
+# Timeout for a single conditional probe - probes are HEAD requests, no body is downloaded
+PROBE_TIMEOUT_SECONDS = 10.0
+
+# Statuses meaning the server does not support HEAD for this URL
+HEAD_UNSUPPORTED_STATUSES = {405, 501}
+
+
+def compute_content_hash(content: str) -> str:
+    """
+    Compute a stable fingerprint for page content.
+
+    Whitespace at the edges is ignored so cosmetic trailing newlines
+    do not force a re-embed.
+
+    Args:
+        content: Markdown content of the page
+
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    return hashlib.sha256(content.strip().encode("utf-8")).hexdigest()
+
+
+def extract_validators(response_headers: dict[str, Any] | None) -> dict[str, str | None]:
+    """
+    Extract HTTP cache validators from a response header mapping.
+
+    Args:
+        response_headers: Response headers as returned by the crawler (any key case)
+
+    Returns:
+        Dict with "etag" and "last_modified" keys (values may be None)
+    """
+    if not response_headers:
+        return {"etag": None, "last_modified": None}
+
+    normalized = {str(k).lower(): v for k, v in response_headers.items()}
+    return {
+        "etag": normalized.get("etag"),
+        "last_modified": normalized.get("last-modified"),
+    }
+
+
+async def find_unchanged_urls(
+    urls: list[str],
+    fingerprints: dict[str, dict[str, Any]],
+    max_concurrent: int = 10,
+) -> set[str]:
+    """
+    Send conditional requests for URLs with stored validators.
+
+    Probes are conditional HEAD requests. Servers that reject HEAD get a
+    conditional GET whose response is closed without reading the body, so a
+    changed page is only downloaded once, by the crawler.
+
+    A URL is considered unchanged only when the server answers 304 Not Modified.
+    Any error, missing validator or other status keeps the URL in the crawl.
+
+    Args:
+        urls: Candidate URLs to crawl
+        fingerprints: {url: page fingerprint} as returned by PageStorageOperations.get_page_fingerprints
+        max_concurrent: Maximum number of probes in flight
+
+    Returns:
+        Set of URLs that can be skipped
+    """
+    candidates = []
+    for url in urls:
+        fingerprint = fingerprints.get(url)
+        if fingerprint and (fingerprint.get("etag") or fingerprint.get("last_modified")):
+            candidates.append((url, fingerprint))
+
+    if not candidates:
+        return set()
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrent))
+    unchanged: set[str] = set()
+
+    async def probe(client: httpx.AsyncClient, url: str, fingerprint: dict[str, Any]) -> None:
+        headers = {}
+        if fingerprint.get("etag"):
+            headers["If-None-Match"] = fingerprint["etag"]
+        if fingerprint.get("last_modified"):
+            headers["If-Modified-Since"] = fingerprint["last_modified"]
+
+        async with semaphore:
+            try:
+                response = await client.head(url, headers=headers)
+                status_code = response.status_code
+                if status_code in HEAD_UNSUPPORTED_STATUSES:
+                    async with client.stream("GET", url, headers=headers) as streamed:
+                        status_code = streamed.status_code
+                if status_code == 304:
+                    unchanged.add(url)
+            except httpx.HTTPError as e:
+                logger.debug(f"Conditional probe failed for {url}: {e}")
+
+    async with httpx.AsyncClient(timeout=PROBE_TIMEOUT_SECONDS, follow_redirects=True) as client:
+        await asyncio.gather(*(probe(client, url, fp) for url, fp in candidates))
+
+    logger.info(
+        f"Conditional probes: {len(unchanged)}/{len(candidates)} pages reported not modified"
+    )
+    return unchanged
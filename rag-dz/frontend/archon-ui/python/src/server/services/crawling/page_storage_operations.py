@@ -11,6 +11,7 @@ from postgrest.exceptions import APIError
 
 from ...config.logfire_config import get_logger, safe_logfire_error, safe_logfire_info
 from .helpers.llms_full_parser import parse_llms_full_sections
+from .helpers.page_fingerprint import compute_content_hash
 
 logger = get_logger(__name__)
 
@@ -79,6 +80,9 @@ class PageStorageOperations:
                 "word_count": word_count,
                 "char_count": char_count,
                 "chunk_count": 0,  # Will be updated after chunking
+                "content_hash": compute_content_hash(markdown),
+                "etag": doc.get("etag"),
+                "last_modified": doc.get("last_modified"),
                 "metadata": {
                     "knowledge_type": request.get("knowledge_type", "documentation"),
                     "crawl_type": crawl_type,
@@ -173,6 +177,7 @@ class PageStorageOperations:
                 "word_count": section.word_count,
                 "char_count": len(section.content),
                 "chunk_count": 0,  # Will be updated after chunking
+                "content_hash": compute_content_hash(section.content),
                 "metadata": {
                     "knowledge_type": request.get("knowledge_type", "documentation"),
                     "crawl_type": crawl_type,
@@ -223,6 +228,71 @@ class PageStorageOperations:
 
         return url_to_page_id
 
+    async def get_page_fingerprints(self, source_id: str) -> dict[str, dict[str, Any]]:
+        """
+        Load stored fingerprints for every page of a source.
+
+        Used by incremental recrawls to send conditional requests and to
+        detect pages whose content did not change.
+
+        Args:
+            source_id: The source ID to load pages for
+
+        Returns:
+            {url: {id, content_hash, etag, last_modified, word_count, chunk_count}}
+            (empty dict if the lookup fails, which falls back to a full recrawl)
+        """
+        fingerprints: dict[str, dict[str, Any]] = {}
+        try:
+            result = (
+                self.supabase_client.table("archon_page_metadata")
+                .select("id, url, content_hash, etag, last_modified, word_count, chunk_count")
+                .eq("source_id", source_id)
+                .execute()
+            )
+            for page in result.data or []:
+                fingerprints[page["url"]] = page
+
+            safe_logfire_info(
+                f"Loaded {len(fingerprints)} page fingerprints | source_id={source_id}"
+            )
+
+        except APIError as e:
+            logger.warning(
+                f"Database error loading page fingerprints for source {source_id}: {e}", exc_info=True
+            )
+        except Exception as e:
+            logger.warning(
+                f"Unexpected error loading page fingerprints for source {source_id}: {e}", exc_info=True
+            )
+
+        return fingerprints
+
+    async def update_page_validators(
+        self, page_id: str, etag: str | None, last_modified: str | None
+    ) -> None:
+        """
+        Refresh the HTTP cache validators of an unchanged page.
+
+        Args:
+            page_id: The UUID of the page to update
+            etag: New ETag header value
+            last_modified: New Last-Modified header value
+        """
+        try:
+            self.supabase_client.table("archon_page_metadata").update(
+                {"etag": etag, "last_modified": last_modified}
+            ).eq("id", page_id).execute()
+
+        except APIError as e:
+            logger.warning(
+                f"Database error updating validators for page {page_id}: {e}", exc_info=True
+            )
+        except Exception as e:
+            logger.warning(
+                f"Unexpected error updating validators for page {page_id}: {e}", exc_info=True
+            )
+
     async def update_page_chunk_count(self, page_id: str, chunk_count: int) -> None:
         """
         Update the chunk_count field for a page after chunking is complete.
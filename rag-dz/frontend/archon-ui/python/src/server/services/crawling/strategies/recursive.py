@@ -12,7 +12,8 @@ from urllib.parse import urldefrag
 from crawl4ai import CacheMode, CrawlerRunConfig, MemoryAdaptiveDispatcher
 
 from ....config.logfire_config import get_logger
-from ...credential_service import credential_service
+from ...settings_snapshot import CRAWL_SETTING_KEYS, CrawlSettings, RagSettingsSnapshot, get_rag_settings_snapshot
+from ..helpers.page_fingerprint import extract_validators
 from ..helpers.url_handler import URLHandler
 
 logger = get_logger(__name__)
@@ -42,6 +43,7 @@ class RecursiveCrawlStrategy:
         max_concurrent: int | None = None,
         progress_callback: Callable[..., Awaitable[None]] | None = None,
         cancellation_check: Callable[[], None] | None = None,
+        settings_snapshot: RagSettingsSnapshot | None = None,
     ) -> list[dict[str, Any]]:
         """
         Recursively crawl internal links from start URLs up to a maximum depth with progress reporting.
@@ -54,6 +56,7 @@ class RecursiveCrawlStrategy:
             max_concurrent: Maximum concurrent crawls
             progress_callback: Optional callback for progress updates
             cancellation_check: Optional function to check for cancellation
+            settings_snapshot: Settings taken at the start of the crawl (shared snapshot if None)
 
         Returns:
             List of crawl results
@@ -64,31 +67,15 @@ class RecursiveCrawlStrategy:
                 await progress_callback("error", 0, "Crawler not available")
             return []
 
-        # Load settings from database - fail fast on configuration errors
+        # Load settings - fail fast on configuration errors
         try:
-            settings = await credential_service.get_credentials_by_category("rag_strategy")
-
-            # Clamp batch_size to prevent zero step in range()
-            raw_batch_size = int(settings.get("CRAWL_BATCH_SIZE", "50"))
-            batch_size = max(1, raw_batch_size)
-            if batch_size != raw_batch_size:
-                logger.warning(f"Invalid CRAWL_BATCH_SIZE={raw_batch_size}, clamped to {batch_size}")
-
-            if max_concurrent is None:
-                # CRAWL_MAX_CONCURRENT: Pages to crawl in parallel within this single crawl operation
-                # (Different from server-level CONCURRENT_CRAWL_LIMIT which limits total crawl operations)
-                raw_max_concurrent = int(settings.get("CRAWL_MAX_CONCURRENT", "10"))
-                max_concurrent = max(1, raw_max_concurrent)
-                if max_concurrent != raw_max_concurrent:
-                    logger.warning(f"Invalid CRAWL_MAX_CONCURRENT={raw_max_concurrent}, clamped to {max_concurrent}")
-
-            # Clamp memory threshold to sane bounds for dispatcher
-            raw_memory_threshold = float(settings.get("MEMORY_THRESHOLD_PERCENT", "80"))
-            memory_threshold = min(99.0, max(10.0, raw_memory_threshold))
-            if memory_threshold != raw_memory_threshold:
-                logger.warning(f"Invalid MEMORY_THRESHOLD_PERCENT={raw_memory_threshold}, clamped to {memory_threshold}")
-            check_interval = float(settings.get("DISPATCHER_CHECK_INTERVAL", "0.5"))
-        except (ValueError, KeyError, TypeError) as e:
+            if settings_snapshot is None:
+                settings_snapshot = await get_rag_settings_snapshot()
+            invalid_keys = settings_snapshot.invalid_keys & CRAWL_SETTING_KEYS
+            if invalid_keys:
+                raise ValueError(f"Invalid crawl settings: {', '.join(sorted(invalid_keys))}")
+            settings = settings_snapshot.crawl
+        except ValueError as e:
             # Critical configuration errors should fail fast
             logger.error(f"Invalid crawl settings format: {e}", exc_info=True)
             raise ValueError(f"Failed to load crawler configuration: {e}") from e
@@ -97,12 +84,15 @@ class RecursiveCrawlStrategy:
             logger.error(
                 f"Failed to load crawl settings from database: {e}, using defaults", exc_info=True
             )
-            batch_size = 50
-            if max_concurrent is None:
-                max_concurrent = 10  # Safe default to prevent memory issues
-            memory_threshold = 80.0
-            check_interval = 0.5
-            settings = {}  # Empty dict for defaults
+            settings = CrawlSettings()
+
+        batch_size = settings.batch_size
+        if max_concurrent is None:
+            # CRAWL_MAX_CONCURRENT: Pages to crawl in parallel within this single crawl operation
+            # (Different from server-level CONCURRENT_CRAWL_LIMIT which limits total crawl operations)
+            max_concurrent = settings.max_concurrent
+        memory_threshold = settings.memory_threshold_percent
+        check_interval = settings.dispatcher_check_interval
 
         # Check if start URLs include documentation sites
         has_doc_sites = any(is_documentation_site_func(url) for url in start_urls)
@@ -115,9 +105,9 @@ class RecursiveCrawlStrategy:
                 cache_mode=CacheMode.BYPASS,
                 stream=True,  # Enable streaming for faster parallel processing
                 markdown_generator=self.markdown_generator,
-                wait_until=settings.get("CRAWL_WAIT_STRATEGY", "domcontentloaded"),
-                page_timeout=int(settings.get("CRAWL_PAGE_TIMEOUT", "30000")),
-                delay_before_return_html=float(settings.get("CRAWL_DELAY_BEFORE_HTML", "1.0")),
+                wait_until=settings.wait_strategy,
+                page_timeout=settings.page_timeout or 30000,
+                delay_before_return_html=1.0 if settings.delay_before_html is None else settings.delay_before_html,
                 wait_for_images=False,  # Skip images for faster crawling
                 scan_full_page=True,  # Trigger lazy loading
                 exclude_all_images=False,
@@ -130,9 +120,9 @@ class RecursiveCrawlStrategy:
                 cache_mode=CacheMode.BYPASS,
                 stream=True,  # Enable streaming
                 markdown_generator=self.markdown_generator,
-                wait_until=settings.get("CRAWL_WAIT_STRATEGY", "domcontentloaded"),
-                page_timeout=int(settings.get("CRAWL_PAGE_TIMEOUT", "45000")),
-                delay_before_return_html=float(settings.get("CRAWL_DELAY_BEFORE_HTML", "0.5")),
+                wait_until=settings.wait_strategy,
+                page_timeout=settings.page_timeout or 45000,
+                delay_before_return_html=0.5 if settings.delay_before_html is None else settings.delay_before_html,
                 scan_full_page=True,
             )
 
@@ -294,6 +284,8 @@ class RecursiveCrawlStrategy:
                             "markdown": result.markdown.fit_markdown,
                             "html": result.html,  # Always use raw HTML for code extraction
                             "title": title,
+                            # Cache validators for incremental recrawls
+                            **extract_validators(getattr(result, "response_headers", None)),
                         })
                         depth_successful += 1
 
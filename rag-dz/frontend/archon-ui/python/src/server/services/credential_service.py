@@ -45,6 +45,8 @@ class CredentialService:
         self._supabase: Client | None = None
         self._cache: dict[str, Any] = {}
         self._cache_initialized = False
+        # Bumped on every cache change so derived snapshots know when to rebuild
+        self._version = 0
         self._rag_settings_cache: dict[str, Any] | None = None
         self._rag_cache_timestamp: float | None = None
         self._rag_cache_ttl = 300  # 5 minutes TTL for RAG settings cache
@@ -149,6 +151,7 @@ class CredentialService:
 
             self._cache = credentials
             self._cache_initialized = True
+            self._version += 1
             logger.info(f"Loaded {len(credentials)} credentials from database")
 
             return credentials
@@ -176,6 +179,18 @@ class CredentialService:
 
         return value
 
+    @property
+    def version(self) -> int:
+        """Version of the credential cache, incremented whenever it changes."""
+        return self._version
+
+    async def get_plain_settings(self) -> dict[str, Any]:
+        """Get a copy of all non-encrypted settings from the cache."""
+        if not self._cache_initialized:
+            await self.load_all_credentials()
+
+        return {key: value for key, value in self._cache.items() if not isinstance(value, dict)}
+
     async def get_encrypted_credential_raw(self, key: str) -> str | None:
         """Get the raw encrypted value for a credential (without decryption)."""
         if not self._cache_initialized:
@@ -227,6 +242,7 @@ class CredentialService:
                 }
                 # Update cache with plain value
                 self._cache[key] = value
+            self._version += 1
 
             # Upsert to database with proper conflict handling
             # Since we validate service key at startup, permission errors here indicate actual database issues
@@ -283,6 +299,7 @@ class CredentialService:
             # Remove from cache
             if key in self._cache:
                 del self._cache[key]
+                self._version += 1
 
             # Invalidate RAG settings cache if this was a rag_strategy setting
             # We check the cache to see if the deleted key was in rag_strategy category
@@ -0,0 +1,200 @@
+"""
+Settings Snapshot
+
+Immutable, typed view of the crawl and code extraction settings.
+
+Hot paths (crawl strategies, code extraction, code summaries) read their knobs
+from a RagSettingsSnapshot taken once per operation instead of awaiting the
+credential service per setting. The shared snapshot is rebuilt when the
+credential service version changes (credentials loaded, set or deleted in this
+process), and the settings table is re-read once the snapshot is older than
+SNAPSHOT_TTL_SECONDS so changes made by other workers or replicas are picked up.
+Snapshots are plain frozen dataclasses, so they can be shipped to worker
+processes.
+"""
+
+import asyncio
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+from ..config.logfire_config import get_logger
+from .credential_service import credential_service
+
+logger = get_logger(__name__)
+
+# Same TTL as the credential service's rag_strategy cache
+SNAPSHOT_TTL_SECONDS = 300.0
+
+
+@dataclass(frozen=True)
+class CrawlSettings:
+    """Crawler knobs shared by the batch and recursive strategies."""
+
+    batch_size: int = 50
+    max_concurrent: int = 10
+    memory_threshold_percent: float = 80.0
+    dispatcher_check_interval: float = 0.5
+    wait_strategy: str = "domcontentloaded"
+    # None means "use the strategy's default" (it differs for documentation sites)
+    page_timeout: int | None = None
+    delay_before_html: float | None = None
+
+
+@dataclass(frozen=True)
+class CodeExtractionSettings:
+    """Knobs consumed by the pure code block extractors."""
+
+    min_code_block_length: int = 250
+    max_code_block_length: int = 5000
+    enable_prose_filtering: bool = True
+    max_prose_ratio: float = 0.15
+    min_code_indicators: int = 3
+    enable_diagram_filtering: bool = True
+    enable_contextual_length: bool = True
+
+
+@dataclass(frozen=True)
+class CodeSummarySettings:
+    """Knobs for LLM code summary generation."""
+
+    enabled: bool = True
+    max_workers: int = 3
+    max_concurrency: int = 12
+    batch_size: int = 1
+    # Latency above this (seconds) backs off the adaptive limiter; None disables it
+    latency_target: float | None = 30.0
+
+
+# Settings whose malformed values make a crawl fail fast instead of using defaults
+CRAWL_SETTING_KEYS = frozenset({
+    "CRAWL_BATCH_SIZE",
+    "CRAWL_MAX_CONCURRENT",
+    "MEMORY_THRESHOLD_PERCENT",
+    "DISPATCHER_CHECK_INTERVAL",
+    "CRAWL_PAGE_TIMEOUT",
+    "CRAWL_DELAY_BEFORE_HTML",
+})
+
+
+@dataclass(frozen=True)
+class RagSettingsSnapshot:
+    """Point-in-time settings for one crawl or extraction run."""
+
+    version: int = -1
+    crawl: CrawlSettings = field(default_factory=CrawlSettings)
+    code_extraction: CodeExtractionSettings = field(default_factory=CodeExtractionSettings)
+    code_summaries: CodeSummarySettings = field(default_factory=CodeSummarySettings)
+    # Keys present in the store whose values could not be parsed (defaults were used)
+    invalid_keys: frozenset[str] = frozenset()
+
+    @classmethod
+    def from_settings(cls, values: Mapping[str, Any], version: int = -1) -> "RagSettingsSnapshot":
+        """
+        Build a snapshot from raw setting values (strings as stored in archon_settings).
+
+        Missing or malformed values fall back to defaults; malformed keys are
+        recorded in invalid_keys. Out-of-range crawl values are clamped.
+        """
+        invalid: set[str] = set()
+
+        def read(key: str, default: Any, cast: type) -> Any:
+            raw = values.get(key)
+            if raw is None or isinstance(raw, dict):
+                return default
+            try:
+                if cast is bool:
+                    return str(raw).strip().lower() == "true"
+                if cast is int:
+                    return int(float(raw)) if str(raw).strip() else default
+                return cast(raw)
+            except (TypeError, ValueError):
+                invalid.add(key)
+                logger.warning(f"Invalid value for setting {key}={raw!r}, using default {default!r}")
+                return default
+
+        def clamped(key: str, value: Any, low: Any, high: Any = None) -> Any:
+            bounded = max(low, value) if high is None else min(high, max(low, value))
+            if bounded != value:
+                logger.warning(f"Invalid {key}={value}, clamped to {bounded}")
+            return bounded
+
+        crawl = CrawlSettings(
+            batch_size=clamped("CRAWL_BATCH_SIZE", read("CRAWL_BATCH_SIZE", 50, int), 1),
+            max_concurrent=clamped("CRAWL_MAX_CONCURRENT", read("CRAWL_MAX_CONCURRENT", 10, int), 1),
+            memory_threshold_percent=clamped(
+                "MEMORY_THRESHOLD_PERCENT", read("MEMORY_THRESHOLD_PERCENT", 80.0, float), 10.0, 99.0
+            ),
+            dispatcher_check_interval=read("DISPATCHER_CHECK_INTERVAL", 0.5, float),
+            wait_strategy=read("CRAWL_WAIT_STRATEGY", "domcontentloaded", str),
+            page_timeout=read("CRAWL_PAGE_TIMEOUT", None, int),
+            delay_before_html=read("CRAWL_DELAY_BEFORE_HTML", None, float),
+        )
+        code_extraction = CodeExtractionSettings(
+            min_code_block_length=read("MIN_CODE_BLOCK_LENGTH", 250, int),
+            max_code_block_length=read("MAX_CODE_BLOCK_LENGTH", 5000, int),
+            enable_prose_filtering=read("ENABLE_PROSE_FILTERING", True, bool),
+            max_prose_ratio=read("MAX_PROSE_RATIO", 0.15, float),
+            min_code_indicators=read("MIN_CODE_INDICATORS", 3, int),
+            enable_diagram_filtering=read("ENABLE_DIAGRAM_FILTERING", True, bool),
+            enable_contextual_length=read("ENABLE_CONTEXTUAL_LENGTH", True, bool),
+        )
+        max_workers = clamped("CODE_SUMMARY_MAX_WORKERS", read("CODE_SUMMARY_MAX_WORKERS", 3, int), 1)
+        code_summaries = CodeSummarySettings(
+            enabled=read("ENABLE_CODE_SUMMARIES", True, bool),
+            max_workers=max_workers,
+            max_concurrency=max(max_workers, read("CODE_SUMMARY_MAX_CONCURRENCY", 12, int)),
+            batch_size=clamped("CODE_SUMMARY_BATCH_SIZE", read("CODE_SUMMARY_BATCH_SIZE", 1, int), 1),
+            latency_target=read("CODE_SUMMARY_LATENCY_TARGET", 30.0, float) or None,
+        )
+
+        return cls(
+            version=version,
+            crawl=crawl,
+            code_extraction=code_extraction,
+            code_summaries=code_summaries,
+            invalid_keys=frozenset(invalid),
+        )
+
+
+_snapshot: RagSettingsSnapshot | None = None
+_snapshot_loaded_at = 0.0
+_refresh_lock = asyncio.Lock()
+
+
+async def _refresh_from_store() -> None:
+    """Re-read the settings table once the snapshot has expired (one caller at a time)."""
+    global _snapshot_loaded_at
+    async with _refresh_lock:
+        if time.monotonic() - _snapshot_loaded_at < SNAPSHOT_TTL_SECONDS:
+            return
+        try:
+            await credential_service.load_all_credentials()
+        except Exception as e:
+            # Keep serving the current snapshot; retry after another TTL
+            logger.warning(f"Failed to refresh settings from the database: {e}")
+        _snapshot_loaded_at = time.monotonic()
+
+
+async def get_rag_settings_snapshot() -> RagSettingsSnapshot:
+    """
+    Get the shared settings snapshot, rebuilding it if credentials changed.
+
+    Raises whatever the credential service raises when settings cannot be loaded;
+    callers decide whether defaults are acceptable.
+    """
+    global _snapshot, _snapshot_loaded_at
+    if _snapshot is not None and time.monotonic() - _snapshot_loaded_at >= SNAPSHOT_TTL_SECONDS:
+        await _refresh_from_store()
+
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == credential_service.version:
+        return snapshot
+
+    values = await credential_service.get_plain_settings()
+    snapshot = RagSettingsSnapshot.from_settings(values, credential_service.version)
+    _snapshot = snapshot
+    _snapshot_loaded_at = time.monotonic()
+    logger.debug(f"Rebuilt settings snapshot | version={snapshot.version}")
+    return snapshot
@@ -12,6 +12,7 @@ from .code_storage_service import (
 )
 from .document_storage_service import add_documents_to_supabase
 from .storage_services import DocumentStorageService
+from .text_chunker import iter_text_chunks
 
 __all__ = [
     # Base service
@@ -24,4 +25,6 @@ __all__ = [
     "extract_code_blocks",
     "generate_code_example_summary",
     "add_code_examples_to_supabase",
+    # Chunking utilities
+    "iter_text_chunks",
 ]
@@ -10,11 +10,12 @@ Provides common functionality for all document storage operations including:
 
 import re
 from abc import ABC, abstractmethod
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 from typing import Any
 from urllib.parse import urlparse
 
 from ...config.logfire_config import get_logger, safe_span
+from .text_chunker import chunk_text, get_token_counter, iter_text_chunks
 
 logger = get_logger(__name__)
 
@@ -36,114 +37,94 @@ class BaseStorageService(ABC):
 
         self.threading_service = get_utils_threading_service()
 
-    def smart_chunk_text(self, text: str, chunk_size: int = 5000) -> list[str]:
+    def iter_chunk_text(
+        self,
+        text: str,
+        chunk_size: int = 5000,
+        chunk_overlap: int = 0,
+        size_unit: str = "chars",
+    ) -> Iterator[str]:
+        """
+        Lazily split text into chunks in a single pass, preserving context.
+
+        Blocks are packed greedily so that:
+        1. Code blocks (```) stay complete units whenever they fit
+        2. Headings start a new chunk once the current chunk is reasonably full
+        3. Paragraphs are kept whole, falling back to sentence then word boundaries
+
+        Args:
+            text: Text to chunk
+            chunk_size: Maximum chunk size in size_unit (default: 5000)
+            chunk_overlap: Trailing context (in size_unit) repeated in the next chunk
+            size_unit: "chars" or "tokens" (tokenizer token counts)
+
+        Yields:
+            Text chunks in document order
+        """
+        if not text or not isinstance(text, str):
+            logger.warning("Invalid text provided for chunking")
+            return
+
+        length_function = get_token_counter() if size_unit == "tokens" else len
+        yield from iter_text_chunks(text, chunk_size, chunk_overlap, length_function)
+
+    def smart_chunk_text(
+        self,
+        text: str,
+        chunk_size: int = 5000,
+        chunk_overlap: int = 0,
+        size_unit: str = "chars",
+    ) -> list[str]:
         """
         Split text into chunks intelligently, preserving context.
 
-        This function implements a context-aware chunking strategy that:
-        1. Preserves code blocks (```) as complete units when possible
-        2. Prefers to break at paragraph boundaries (\\n\\n)
-        3. Falls back to sentence boundaries (. ) if needed
-        4. Only splits mid-content when absolutely necessary
+        See iter_chunk_text for the chunking strategy.
 
         Args:
             text: Text to chunk
-            chunk_size: Maximum chunk size (default: 5000)
+            chunk_size: Maximum chunk size in size_unit (default: 5000)
+            chunk_overlap: Trailing context (in size_unit) repeated in the next chunk
+            size_unit: "chars" or "tokens" (tokenizer token counts)
 
         Returns:
             List of text chunks
         """
-        if not text or not isinstance(text, str):
-            logger.warning("Invalid text provided for chunking")
-            return []
-
-        chunks = []
-        start = 0
-        text_length = len(text)
-
-        while start < text_length:
-            # Determine the end of this chunk
-            end = start + chunk_size
-
-            # If we're at the end of the text, take what's left
-            if end >= text_length:
-                chunk = text[start:].strip()
-                if chunk:
-                    chunks.append(chunk)
-                break
-
-            # Try to find a good break point
-            chunk = text[start:end]
-
-            # First, try to break at a code block boundary
-            code_block_pos = chunk.rfind("```")
-            if code_block_pos != -1 and code_block_pos > chunk_size * 0.3:
-                end = start + code_block_pos
-
-            # If no code block, try paragraph break
-            elif "\n\n" in chunk:
-                last_break = chunk.rfind("\n\n")
-                if last_break > chunk_size * 0.3:
-                    end = start + last_break
-
-            # If no paragraph break, try sentence break
-            elif ". " in chunk:
-                last_period = chunk.rfind(". ")
-                if last_period > chunk_size * 0.3:
-                    end = start + last_period + 1
-
-            # Extract chunk and clean it up
-            chunk = text[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
-
-            # Move start position for next chunk
-            start = end
-
-        # Combine consecutive small chunks (<200 chars) together
-        if chunks:
-            combined_chunks: list[str] = []
-            i = 0
-            while i < len(chunks):
-                current = chunks[i]
-
-                # Keep combining while current is small and there are more chunks
-                while len(current) < 200 and i + 1 < len(chunks):
-                    i += 1
-                    current = current + "\n\n" + chunks[i]
-
-                combined_chunks.append(current)
-                i += 1
-
-            chunks = combined_chunks
-
-        return chunks
+        return list(self.iter_chunk_text(text, chunk_size, chunk_overlap, size_unit))
 
     async def smart_chunk_text_async(
-        self, text: str, chunk_size: int = 5000, progress_callback: Callable | None = None
+        self,
+        text: str,
+        chunk_size: int = 5000,
+        progress_callback: Callable | None = None,
+        chunk_overlap: int = 0,
+        size_unit: str = "chars",
     ) -> list[str]:
         """
         Async version of smart_chunk_text with optional progress reporting.
 
         Args:
             text: Text to chunk
-            chunk_size: Maximum chunk size
+            chunk_size: Maximum chunk size in size_unit
             progress_callback: Optional callback for progress updates
+            chunk_overlap: Trailing context (in size_unit) repeated in the next chunk
+            size_unit: "chars" or "tokens" (tokenizer token counts)
 
         Returns:
             List of text chunks
         """
         with safe_span(
-            "smart_chunk_text_async", text_length=len(text), chunk_size=chunk_size
+            "smart_chunk_text_async", text_length=len(text), chunk_size=chunk_size, size_unit=size_unit
         ) as span:
             try:
-                # For large texts, run chunking in thread pool
+                # For large texts, run chunking in a worker process to keep the GIL free
                 if len(text) > 50000:  # 50KB threshold
-                    chunks = await self.threading_service.run_cpu_intensive(
-                        self.smart_chunk_text, text, chunk_size
+                    chunks = await self.threading_service.run_in_process_pool(
+                        chunk_text, text, chunk_size, chunk_overlap, size_unit
                     )
                 else:
-                    chunks = self.smart_chunk_text(text, chunk_size)
+                    chunks = self.smart_chunk_text(
+                        text, chunk_size, chunk_overlap=chunk_overlap, size_unit=size_unit
+                    )
 
                 if progress_callback:
                     await progress_callback("Text chunking completed", 100)
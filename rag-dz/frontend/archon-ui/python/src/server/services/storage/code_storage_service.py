@@ -15,6 +15,7 @@ from difflib import SequenceMatcher
 from typing import Any
 from urllib.parse import urlparse
 
+import openai
 from supabase import Client
 
 from ...config.logfire_config import search_logger
@@ -28,6 +29,8 @@ from ..llm_provider_service import (
     prepare_chat_completion_params,
     synthesize_json_from_reasoning,
 )
+from ..settings_snapshot import CodeSummarySettings, get_rag_settings_snapshot
+from ..threading_service import AdaptiveConcurrencyLimiter, get_threading_service
 
 
 def _extract_json_payload(raw_response: str, context_code: str = "", language: str = "") -> str:
@@ -601,7 +604,8 @@ async def _generate_code_example_summary_async(
     context_after: str,
     language: str = "",
     provider: str = None,
-    client = None
+    client = None,
+    limiter: AdaptiveConcurrencyLimiter | None = None,
 ) -> dict[str, str]:
     """
     Async version of generate_code_example_summary using unified LLM provider service.
@@ -613,6 +617,7 @@ async def _generate_code_example_summary_async(
         language: Programming language of the code
         provider: LLM provider to use (optional)
         client: Pre-initialized LLM client for reuse (optional, improves performance)
+        limiter: Optional adaptive limiter fed with latency and rate-limit signals
     """
 
     # Get model choice from credential service (RAG setting)
@@ -669,21 +674,46 @@ Format your response as JSON:
         # Reuse provided client for better performance
         return await _generate_summary_with_client(
             client, code, context_before, context_after, language, provider,
-            model_choice, guard_prompt, strict_prompt
+            model_choice, guard_prompt, strict_prompt, limiter
         )
     else:
         # Create new client (backward compatibility)
         async with get_llm_client(provider=provider) as new_client:
             return await _generate_summary_with_client(
                 new_client, code, context_before, context_after, language, provider,
-                model_choice, guard_prompt, strict_prompt
+                model_choice, guard_prompt, strict_prompt, limiter
             )
 
 
+async def _create_chat_completion(
+    llm_client, params: dict[str, Any], limiter: AdaptiveConcurrencyLimiter | None = None
+):
+    """
+    Create a chat completion, feeding latency and rate-limit headers to the limiter.
+
+    A rate-limited (429) request is not retried here: the limiter backs off and pauses
+    until the provider's retry-after, and the caller's own retry/fallback logic applies.
+    """
+    if limiter is None:
+        return await llm_client.chat.completions.create(**params)
+
+    await limiter.wait_if_blocked()
+    start_time = time.monotonic()
+    try:
+        raw_response = await llm_client.chat.completions.with_raw_response.create(**params)
+    except openai.RateLimitError as e:
+        limiter.record_rate_limited(getattr(getattr(e, "response", None), "headers", None))
+        raise
+
+    limiter.record_success(time.monotonic() - start_time, raw_response.headers)
+    return raw_response.parse()
+
+
 async def _generate_summary_with_client(
     llm_client, code: str, context_before: str, context_after: str,
     language: str, provider: str, model_choice: str,
-    guard_prompt: str, strict_prompt: str
+    guard_prompt: str, strict_prompt: str,
+    limiter: AdaptiveConcurrencyLimiter | None = None,
 ) -> dict[str, str]:
     """Helper function that generates summary using a provided client."""
     search_logger.info(
@@ -764,7 +794,7 @@ async def _generate_summary_with_client(
                         await asyncio.sleep(retry_delay)
 
                     final_params = prepare_chat_completion_params(model_choice, request_params)
-                    response = await llm_client.chat.completions.create(**final_params)
+                    response = await _create_chat_completion(llm_client, final_params, limiter)
                     last_response_obj = response
 
                     choice = response.choices[0] if response.choices else None
@@ -1013,17 +1043,115 @@ async def _generate_summary_with_client(
         }
 
 
+def _fallback_summary(language: str) -> dict[str, str]:
+    return {
+        "example_name": f"Code Example{f' ({language})' if language else ''}",
+        "summary": "Code example for demonstration purposes.",
+    }
+
+
+async def _generate_combined_summaries_async(
+    code_blocks: list[dict[str, Any]],
+    provider: str | None,
+    client,
+    limiter: AdaptiveConcurrencyLimiter | None = None,
+) -> list[dict[str, str] | None]:
+    """
+    Summarize several code blocks with a single LLM prompt.
+
+    Returns one entry per block; entries the model did not answer are None so the
+    caller can fall back to individual prompts.
+    """
+    model_choice = await _get_model_choice()
+    provider_lower = (provider or "openai").lower()
+
+    sections = []
+    for index, block in enumerate(code_blocks):
+        code = block["code"]
+        context_before = block.get("context_before", "")
+        context_after = block.get("context_after", "")
+        sections.append(
+            f'<code_example index="{index}" language="{block.get("language", "")}">\n'
+            f"<context_before>\n{context_before[-300:]}\n</context_before>\n"
+            f"<code>\n{code[:1500]}\n</code>\n"
+            f"<context_after>\n{context_after[:300]}\n</context_after>\n"
+            f"</code_example>"
+        )
+
+    prompt = (
+        "\n\n".join(sections)
+        + """
+
+For EACH code example above, provide:
+1. A concise, action-oriented name (1-4 words) that describes what the code DOES (e.g. "Parse JSON Response", "Connect PostgreSQL")
+2. A summary (2-3 sentences) describing what the example demonstrates and its purpose
+
+Respond with a JSON object only, with one entry per example index:
+{"summaries": [{"index": 0, "example_name": "...", "summary": "..."}]}"""
+    )
+
+    request_params = {
+        "model": model_choice,
+        "messages": [
+            {
+                "role": "system",
+                "content": "You are a helpful assistant that analyzes code examples and provides JSON responses with example names and summaries.",
+            },
+            {"role": "user", "content": prompt},
+        ],
+        "max_tokens": 300 * len(code_blocks) + 200,
+        "temperature": 0.3,
+    }
+    if provider_lower in {"openai", "google", "anthropic"}:
+        request_params["response_format"] = {"type": "json_object"}
+
+    results: list[dict[str, str] | None] = [None] * len(code_blocks)
+    try:
+        final_params = prepare_chat_completion_params(model_choice, request_params)
+        response = await _create_chat_completion(client, final_params, limiter)
+        content = ""
+        if response.choices:
+            content, _, _ = extract_message_text(response.choices[0])
+        payload = json.loads(_extract_json_payload(content or ""))
+        for item in payload.get("summaries", []):
+            index = item.get("index")
+            if isinstance(index, int) and 0 <= index < len(code_blocks):
+                if item.get("example_name") and item.get("summary"):
+                    results[index] = {
+                        "example_name": item["example_name"],
+                        "summary": item["summary"],
+                    }
+    except openai.RateLimitError:
+        raise
+    except Exception as e:
+        search_logger.warning(
+            f"Combined summary prompt failed for {len(code_blocks)} blocks, falling back to individual prompts: {e}"
+        )
+
+    return results
+
+
 async def generate_code_summaries_batch(
-    code_blocks: list[dict[str, Any]], max_workers: int = None, progress_callback=None, provider: str = None
+    code_blocks: list[dict[str, Any]],
+    max_workers: int = None,
+    progress_callback=None,
+    provider: str = None,
+    settings: CodeSummarySettings | None = None,
 ) -> list[dict[str, str]]:
     """
-    Generate summaries for multiple code blocks with rate limiting and proper worker management.
+    Generate summaries for multiple code blocks with adaptive rate limiting.
+
+    Concurrency starts at max_workers (CODE_SUMMARY_MAX_WORKERS) and is adjusted by an
+    AIMD limiter shared per provider: it grows while requests succeed and backs off on
+    429s, provider rate-limit headers or responses slower than CODE_SUMMARY_LATENCY_TARGET.
+    With CODE_SUMMARY_BATCH_SIZE > 1, several snippets are summarized per LLM prompt.
 
     Args:
         code_blocks: List of code block dictionaries
-        max_workers: Maximum number of concurrent API requests
+        max_workers: Initial number of concurrent API requests
         progress_callback: Optional callback for progress updates (async function)
         provider: LLM provider to use for generation (e.g., 'grok', 'openai', 'anthropic')
+        settings: Code summary settings (shared settings snapshot if None)
 
     Returns:
         List of summary dictionaries
@@ -1031,101 +1159,113 @@ async def generate_code_summaries_batch(
     if not code_blocks:
         return []
 
-    # Get max_workers from settings if not provided
-    if max_workers is None:
+    if settings is None:
         try:
-            if (
-                credential_service._cache_initialized
-                and "CODE_SUMMARY_MAX_WORKERS" in credential_service._cache
-            ):
-                max_workers = int(credential_service._cache["CODE_SUMMARY_MAX_WORKERS"])
-            else:
-                max_workers = int(os.getenv("CODE_SUMMARY_MAX_WORKERS", "3"))
-        except:
-            max_workers = 3  # Default fallback
+            settings = (await get_rag_settings_snapshot()).code_summaries
+        except Exception as e:
+            search_logger.warning(f"Failed to load code summary settings: {e}, using defaults")
+            settings = CodeSummarySettings()
+
+    if max_workers is None:
+        max_workers = settings.max_workers
+    max_concurrency = max(max_workers, settings.max_concurrency)
+    batch_size = settings.batch_size
+
+    limiter = get_threading_service().get_adaptive_limiter(
+        f"llm_summaries:{provider or 'default'}",
+        initial_limit=max_workers,
+        max_limit=max_concurrency,
+        latency_target=settings.latency_target,
+    )
 
     search_logger.info(
-        f"Generating summaries for {len(code_blocks)} code blocks with max_workers={max_workers}"
+        f"Generating summaries for {len(code_blocks)} code blocks | initial_workers={max_workers} "
+        f"| max_concurrency={max_concurrency} | batch_size={batch_size} | current_limit={limiter.current_limit}"
     )
 
     # Create a shared LLM client for all summaries (performance optimization)
     async with get_llm_client(provider=provider) as shared_client:
         search_logger.debug("Created shared LLM client for batch summary generation")
 
-        # Semaphore to limit concurrent requests
-        semaphore = asyncio.Semaphore(max_workers)
         completed_count = 0
         lock = asyncio.Lock()
 
-        async def generate_single_summary_with_limit(block: dict[str, Any]) -> dict[str, str]:
+        async def report_completed(count: int) -> None:
             nonlocal completed_count
-            async with semaphore:
-                # Add delay between requests to avoid rate limiting
-                await asyncio.sleep(0.5)  # 500ms delay between requests
+            async with lock:
+                completed_count += count
+                if progress_callback:
+                    # Simple progress based on summaries completed
+                    progress_percentage = int((completed_count / len(code_blocks)) * 100)
+                    await progress_callback({
+                        "status": "code_extraction",
+                        "percentage": progress_percentage,
+                        "log": f"Generated {completed_count}/{len(code_blocks)} code summaries",
+                        "completed_summaries": completed_count,
+                        "total_summaries": len(code_blocks),
+                    })
 
+        async def generate_single_summary_with_limit(block: dict[str, Any]) -> dict[str, str]:
+            async with limiter.slot():
                 # Call async version directly with shared client (no event loop overhead)
-                result = await _generate_code_example_summary_async(
+                return await _generate_code_example_summary_async(
                     block["code"],
                     block["context_before"],
                     block["context_after"],
                     block.get("language", ""),
                     provider,
-                    shared_client  # Pass shared client for reuse
+                    shared_client,  # Pass shared client for reuse
+                    limiter,
+                )
+
+        async def generate_group(group: list[dict[str, Any]]) -> list[dict[str, str]]:
+            if len(group) == 1:
+                result = await generate_single_summary_with_limit(group[0])
+                await report_completed(1)
+                return [result]
+
+            async with limiter.slot():
+                combined = await _generate_combined_summaries_async(
+                    group, provider, shared_client, limiter
                 )
+            await report_completed(sum(1 for item in combined if item is not None))
+
+            results = []
+            for block, summary in zip(group, combined, strict=True):
+                if summary is None:
+                    summary = await generate_single_summary_with_limit(block)
+                    await report_completed(1)
+                results.append(summary)
+            return results
 
-                # Update progress
-                async with lock:
-                    completed_count += 1
-                    if progress_callback:
-                        # Simple progress based on summaries completed
-                        progress_percentage = int((completed_count / len(code_blocks)) * 100)
-                        await progress_callback({
-                            "status": "code_extraction",
-                            "percentage": progress_percentage,
-                            "log": f"Generated {completed_count}/{len(code_blocks)} code summaries",
-                            "completed_summaries": completed_count,
-                            "total_summaries": len(code_blocks),
-                        })
-
-                return result
-
-        # Process all blocks concurrently but with rate limiting
+        groups = [code_blocks[i : i + batch_size] for i in range(0, len(code_blocks), batch_size)]
+
+        # Process all groups concurrently; the adaptive limiter bounds requests in flight
         try:
-            summaries = await asyncio.gather(
-                *[generate_single_summary_with_limit(block) for block in code_blocks],
+            group_results = await asyncio.gather(
+                *[generate_group(group) for group in groups],
                 return_exceptions=True,
             )
 
             # Handle any exceptions in the results
             final_summaries = []
-            for i, summary in enumerate(summaries):
-                if isinstance(summary, Exception):
-                    search_logger.error(f"Error generating summary for code block {i}: {summary}")
+            for group, result in zip(groups, group_results, strict=True):
+                if isinstance(result, Exception):
+                    search_logger.error(f"Error generating summaries for {len(group)} code block(s): {result}")
                     # Use fallback summary
-                    language = code_blocks[i].get("language", "")
-                    fallback = {
-                        "example_name": f"Code Example{f' ({language})' if language else ''}",
-                        "summary": "Code example for demonstration purposes.",
-                    }
-                    final_summaries.append(fallback)
+                    final_summaries.extend(_fallback_summary(block.get("language", "")) for block in group)
                 else:
-                    final_summaries.append(summary)
+                    final_summaries.extend(result)
 
-            search_logger.info(f"Successfully generated {len(final_summaries)} code summaries")
+            search_logger.info(
+                f"Successfully generated {len(final_summaries)} code summaries | limiter={limiter.get_stats()}"
+            )
             return final_summaries
 
         except Exception as e:
             search_logger.error(f"Error in batch summary generation: {e}")
             # Return fallback summaries for all blocks
-            fallback_summaries = []
-            for block in code_blocks:
-                language = block.get("language", "")
-                fallback = {
-                    "example_name": f"Code Example{f' ({language})' if language else ''}",
-                    "summary": "Code example for demonstration purposes.",
-                }
-                fallback_summaries.append(fallback)
-            return fallback_summaries
+            return [_fallback_summary(block.get("language", "")) for block in code_blocks]
 
 
 async def add_code_examples_to_supabase(
@@ -10,6 +10,7 @@ from typing import Any
 from ...config.logfire_config import get_logger, safe_span
 from .base_storage_service import BaseStorageService
 from .document_storage_service import add_documents_to_supabase
+from .text_chunker import CHUNK_OVERLAP_TOKENS, CHUNK_SIZE_TOKENS
 
 logger = get_logger(__name__)
 
@@ -63,10 +64,12 @@ class DocumentStorageService(BaseStorageService):
                 # Use base class chunking
                 chunks = await self.smart_chunk_text_async(
                     file_content,
-                    chunk_size=5000,
+                    chunk_size=CHUNK_SIZE_TOKENS,
                     progress_callback=lambda msg, pct: report_progress(
                         f"Chunking: {msg}", 10 + float(pct) * 0.2
                     ),
+                    chunk_overlap=CHUNK_OVERLAP_TOKENS,
+                    size_unit="tokens",
                 )
 
                 if not chunks:
@@ -0,0 +1,242 @@
+"""
+Text Chunker
+
+Single-pass, streaming text chunker used by the storage services.
+
+The chunker walks the text once, splitting it into structural blocks
+(fenced code blocks, headings, paragraphs), and greedily packs blocks into
+chunks whose size is measured by a pluggable length function - characters
+by default, or tokenizer tokens for embedding-aware sizing. Oversized blocks
+fall back to sentence and then word boundaries. Chunks are yielded as soon
+as they are complete so multi-MB pages never need a second buffer.
+"""
+
+import math
+import re
+from collections import deque
+from collections.abc import Callable, Iterator
+from functools import lru_cache
+
+from ...config.logfire_config import get_logger
+
+logger = get_logger(__name__)
+
+LengthFunction = Callable[[str], int]
+
+# Default token-based sizing for embedded chunks. Sizing in tokens rather than
+# characters keeps non-Latin text (e.g. Arabic) from over- or under-filling the
+# embedding context; the overlap carries context across chunk boundaries.
+CHUNK_SIZE_TOKENS = 1200
+CHUNK_OVERLAP_TOKENS = 100
+
+# A heading only starts a new chunk once the current chunk is this full
+HEADING_BREAK_RATIO = 0.6
+
+# One alternation per block kind; unterminated fences (even a bare fence line at
+# the very end, without a newline) run to the end of the text
+_BLOCK_RE = re.compile(
+    r"(?P<code>^[ \t]*(?P<fence>```|~~~)[^\n]*(?:\n|\Z).*?(?:^[ \t]*(?P=fence)[^\n]*$|\Z))"
+    r"|(?P<heading>^\#{1,6}[ \t][^\n]*$)"
+    r"|(?P<paragraph>(?:^(?![ \t]*(?:```|~~~)|\#{1,6}[ \t])[ \t]*\S[^\n]*(?:\n|\Z))+)",
+    re.MULTILINE | re.DOTALL,
+)
+# Sentence ends for Latin and Arabic scripts (., !, ?, Arabic question mark, Urdu full stop)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?؟۔])\s+")
+_WORD_RE = re.compile(r"\S+\s*")
+_APPROX_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+_PARAGRAPH_SEP = "\n\n"
+
+
+def approximate_token_count(text: str) -> int:
+    """
+    Estimate tokenizer tokens without a BPE vocabulary.
+
+    Counts words and punctuation, but never less than one token per four
+    characters so long Arabic words (several BPE tokens each) are not undercounted.
+    """
+    return max(len(_APPROX_TOKEN_RE.findall(text)), math.ceil(len(text) / 4))
+
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> LengthFunction:
+    """
+    Return a token counting function for chunk sizing.
+
+    Uses tiktoken's cl100k_base encoding (OpenAI embedding tokenizer) when it is
+    installed and its vocabulary is available, otherwise an approximation.
+    """
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable ({e}), using approximate token counts for chunking")
+        return approximate_token_count
+
+    def count_tokens(text: str) -> int:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    return count_tokens
+
+
+def _iter_blocks(text: str) -> Iterator[tuple[str, str]]:
+    """
+    Yield (kind, block) structural blocks in a single pass over the text.
+
+    Kinds are "code" (a complete fenced block), "heading" and "paragraph".
+    """
+    for match in _BLOCK_RE.finditer(text):
+        kind = match.lastgroup
+        block = match.group(kind).strip()
+        if block:
+            yield kind, block
+
+
+def _split_oversized(
+    block: str, kind: str, max_size: int, length: LengthFunction
+) -> Iterator[tuple[str, str, int]]:
+    """
+    Break a block larger than max_size into (piece, separator, size) units.
+
+    Code is split on lines, prose on sentences; anything still too large is
+    split on words, and single words longer than max_size are sliced.
+    """
+    if kind == "code":
+        pieces, separator = block.split("\n"), "\n"
+    else:
+        pieces, separator = _SENTENCE_END_RE.split(block), " "
+
+    for piece in pieces:
+        size = length(piece)
+        if size <= max_size:
+            yield piece, separator, size
+            continue
+
+        for word_match in _WORD_RE.finditer(piece):
+            word = word_match.group(0)
+            word_size = length(word)
+            if word_size <= max_size:
+                yield word, "", word_size
+                continue
+            step = max(1, len(word) * max_size // word_size)
+            for start in range(0, len(word), step):
+                fragment = word[start : start + step]
+                yield fragment, "", length(fragment)
+
+
+def iter_text_chunks(
+    text: str,
+    max_size: int = 5000,
+    overlap: int = 0,
+    length_function: LengthFunction = len,
+) -> Iterator[str]:
+    """
+    Lazily split text into chunks of at most max_size units.
+
+    Args:
+        text: Text to chunk
+        max_size: Maximum chunk size, measured with length_function
+        overlap: Size of trailing context repeated at the start of the next chunk
+        length_function: Size measure - len for characters or a token counter
+
+    Yields:
+        Text chunks in document order
+    """
+    if not text or not isinstance(text, str):
+        return
+
+    max_size = max(1, max_size)
+    overlap = max(0, min(overlap, max_size // 2))
+    separator_sizes = {sep: length_function(sep) for sep in (_PARAGRAPH_SEP, "\n", " ")}
+    separator_sizes[""] = 0
+
+    # Units in the current chunk: (text, separator before it, size)
+    current: deque[tuple[str, str, int]] = deque()
+    current_size = 0
+
+    def render() -> str:
+        parts = []
+        for i, (piece, separator, _) in enumerate(current):
+            parts.append(piece if i == 0 else separator + piece)
+        return "".join(parts).strip()
+
+    def start_next_chunk() -> None:
+        nonlocal current_size
+        if not overlap:
+            current.clear()
+            current_size = 0
+            return
+        # Keep the trailing units that fit in the overlap budget
+        kept: list[tuple[str, str, int]] = []
+        kept_size = 0
+        while current:
+            unit = current.pop()
+            if kept_size + unit[2] > overlap:
+                break
+            kept.append(unit)
+            kept_size += unit[2] + separator_sizes[unit[1]]
+        current.clear()
+        current.extend(reversed(kept))
+        current_size = sum(u[2] for u in current) + sum(
+            separator_sizes[u[1]] for i, u in enumerate(current) if i
+        )
+
+    def add(piece: str, separator: str, size: int) -> Iterator[str]:
+        nonlocal current_size
+        added = size + (separator_sizes[separator] if current else 0)
+        if current and current_size + added > max_size:
+            chunk = render()
+            if chunk:
+                yield chunk
+            start_next_chunk()
+            added = size + (separator_sizes[separator] if current else 0)
+            # Drop overlap that would push the new unit over the limit
+            while current and current_size + added > max_size:
+                dropped = current.popleft()
+                current_size -= dropped[2] + (separator_sizes[current[0][1]] if current else 0)
+                added = size + (separator_sizes[separator] if current else 0)
+        current.append((piece, separator, size))
+        current_size += added
+
+    for kind, block in _iter_blocks(text):
+        size = length_function(block)
+
+        if kind == "heading" and current and current_size >= max_size * HEADING_BREAK_RATIO:
+            chunk = render()
+            if chunk:
+                yield chunk
+            current.clear()
+            current_size = 0
+
+        if size <= max_size:
+            yield from add(block, _PARAGRAPH_SEP, size)
+            continue
+
+        first = True
+        for piece, separator, piece_size in _split_oversized(block, kind, max_size, length_function):
+            yield from add(piece, _PARAGRAPH_SEP if first else separator, piece_size)
+            first = False
+
+    chunk = render()
+    if chunk:
+        yield chunk
+
+
+def chunk_text(text: str, max_size: int = 5000, overlap: int = 0, size_unit: str = "chars") -> list[str]:
+    """
+    Chunk text into a list, measuring size in characters or tokens.
+
+    Module-level and argument-only so it can run in a worker process.
+
+    Args:
+        text: Text to chunk
+        max_size: Maximum chunk size in size_unit
+        overlap: Trailing context (in size_unit) repeated in the next chunk
+        size_unit: "chars" or "tokens" (tokenizer token counts)
+
+    Returns:
+        List of text chunks
+    """
+    length_function = get_token_counter() if size_unit == "tokens" else len
+    return list(iter_text_chunks(text, max_size, overlap, length_function))
@@ -9,13 +9,18 @@ Based on proven patterns from crawl4ai_mcp.py architecture.
 
 import asyncio
 import gc
+import multiprocessing
+import os
+import re
 import threading
 import time
 from collections import deque
 from collections.abc import Callable
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
+from datetime import datetime
 
 # Removed direct logging import - using unified config
 from enum import Enum
@@ -70,6 +75,13 @@ class ThreadingConfig:
     batch_size: int = 15
     yield_interval: float = 0.1  # How often to yield control to event loop
     health_check_interval: float = 30  # System health check frequency
+    # Process pool for pure-Python CPU work that would otherwise hold the GIL
+    enable_process_pool: bool = field(
+        default_factory=lambda: os.getenv("ENABLE_PROCESS_POOL", "true").lower() == "true"
+    )
+    process_workers: int = field(
+        default_factory=lambda: int(os.getenv("PROCESS_POOL_WORKERS", "0")) or max(1, (os.cpu_count() or 2) - 1)
+    )
 
 
 class RateLimiter:
@@ -81,6 +93,8 @@ class RateLimiter:
         self.token_usage = deque()
         self.semaphore = asyncio.Semaphore(config.max_concurrent)
         self._lock = asyncio.Lock()
+        # Provider-imposed pause (429 / exhausted quota) reported by adaptive limiters
+        self.blocked_until = 0.0
 
     async def acquire(self, estimated_tokens: int = 8000, progress_callback: Callable | None = None) -> bool:
         """Acquire permission to make API call with token awareness
@@ -91,7 +105,12 @@ class RateLimiter:
         """
         while True:  # Loop instead of recursion to avoid stack overflow
             wait_time_to_sleep = None
-            
+
+            pause = self.blocked_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+
             async with self._lock:
                 now = time.time()
 
@@ -140,6 +159,10 @@ class RateLimiter:
                     await asyncio.sleep(wait_time_to_sleep)
                 # Continue the loop to try again
 
+    def pause(self, seconds: float) -> None:
+        """Hold every caller until a provider-imposed pause has elapsed"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + max(0.0, seconds))
+
     def _can_make_request(self, estimated_tokens: int) -> bool:
         """Check if request can be made within limits"""
         # Check request rate limit
@@ -187,6 +210,168 @@ class RateLimiter:
         }
 
 
+def _parse_reset_duration(value: str | None) -> float | None:
+    """Parse rate-limit reset/retry values ("20", "1.5", "6m0s", "120ms") into seconds."""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limiter for calls to rate-limited providers.
+
+    The allowed concurrency grows additively (by roughly one slot per window of
+    successful requests) and is cut multiplicatively on 429 responses or when
+    latency exceeds the target. Provider rate-limit headers (OpenAI
+    ``x-ratelimit-*``, Anthropic ``anthropic-ratelimit-*``, ``retry-after``)
+    pause new requests until the quota resets instead of sleeping blindly.
+
+    When attached to a ``RateLimiter``, every slot also counts against its
+    per-minute request budget and provider pauses are propagated to it, so
+    other rate-limited operations back off on the same 429s.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 3,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        decrease_factor: float = 0.5,
+        latency_target: float | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial_limit)))
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.rate_limiter = rate_limiter
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.stats = {"successes": 0, "rate_limited": 0, "latency_decreases": 0}
+        self._condition = asyncio.Condition()
+
+    @property
+    def current_limit(self) -> int:
+        """Integer number of requests currently allowed in flight"""
+        return max(self.min_limit, int(self.limit))
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot for the duration of a request"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
+
+    async def acquire(self) -> None:
+        """Wait for a free slot, for any provider-imposed pause and for the shared request budget"""
+        while True:
+            await self.wait_if_blocked()
+            async with self._condition:
+                if self.in_flight < self.current_limit and time.monotonic() >= self.blocked_until:
+                    self.in_flight += 1
+                    break
+                try:
+                    # Wake on release, or re-check periodically while paused
+                    await asyncio.wait_for(self._condition.wait(), timeout=1.0)
+                except TimeoutError:
+                    pass
+
+        if self.rate_limiter is not None:
+            try:
+                # Counts the request only: token budgets are tracked for embeddings
+                await self.rate_limiter.acquire(estimated_tokens=0)
+            except BaseException:
+                await self.release()
+                raise
+
+    async def release(self) -> None:
+        async with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._condition.notify_all()
+
+    async def wait_if_blocked(self) -> None:
+        """Sleep until a rate-limit pause signalled by the provider has elapsed"""
+        delay = self.blocked_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record_success(self, latency: float | None = None, headers: Any = None) -> None:
+        """Additive increase after a successful request"""
+        self.stats["successes"] += 1
+        if self.latency_target and latency is not None and latency > self.latency_target:
+            self.stats["latency_decreases"] += 1
+            self.limit = max(float(self.min_limit), self.limit * (1 - (1 - self.decrease_factor) / 2))
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / max(self.limit, 1.0))
+        self.update_from_headers(headers)
+
+    def record_rate_limited(self, headers: Any = None, default_backoff: float = 1.0) -> None:
+        """Multiplicative decrease and pause after a 429 response"""
+        self.stats["rate_limited"] += 1
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+        retry_after = None
+        if headers:
+            retry_after = _parse_reset_duration(headers.get("retry-after"))
+        self._pause(retry_after if retry_after is not None else default_backoff)
+        self.update_from_headers(headers)
+        logfire_logger.warning(
+            "Provider rate limit hit, reducing concurrency",
+            extra={"limit": self.current_limit, "retry_after": retry_after},
+        )
+
+    def update_from_headers(self, headers: Any) -> None:
+        """Pause until reset when the provider reports the request quota is exhausted"""
+        if not headers:
+            return
+        for prefix in ("x-ratelimit", "anthropic-ratelimit"):
+            remaining = headers.get(f"{prefix}-remaining-requests")
+            if remaining is None:
+                continue
+            try:
+                remaining_requests = int(float(remaining))
+            except (TypeError, ValueError):
+                continue
+            if remaining_requests <= self.in_flight:
+                reset = headers.get(f"{prefix}-reset-requests")
+                reset_seconds = _parse_reset_duration(reset)
+                if reset_seconds is None and reset:
+                    # Anthropic reports an RFC 3339 timestamp rather than a duration
+                    try:
+                        reset_at = datetime.fromisoformat(str(reset).replace("Z", "+00:00"))
+                        reset_seconds = max(0.0, reset_at.timestamp() - time.time())
+                    except ValueError:
+                        reset_seconds = None
+                self._pause(reset_seconds if reset_seconds is not None else 1.0)
+            return
+
+    def _pause(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + max(0.0, seconds))
+        if self.rate_limiter is not None:
+            self.rate_limiter.pause(seconds)
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            **self.stats,
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "paused_for": max(0.0, self.blocked_until - time.monotonic()),
+        }
+
+
 class MemoryAdaptiveDispatcher:
     """Dynamically adjust concurrency based on memory usage"""
 
@@ -414,6 +599,9 @@ class ThreadingService:
         self.config = threading_config or ThreadingConfig()
         self.rate_limiter = RateLimiter(rate_limit_config or RateLimitConfig())
         self.memory_dispatcher = MemoryAdaptiveDispatcher(self.config)
+        # Per-provider AIMD limiters shared by every caller of the same provider,
+        # attached to rate_limiter so both see the same budget and 429 pauses
+        self.adaptive_limiters: dict[str, AdaptiveConcurrencyLimiter] = {}
 
         # Thread pools for different workload types
         self.cpu_executor = ThreadPoolExecutor(
@@ -422,6 +610,9 @@ class ThreadingService:
         self.io_executor = ThreadPoolExecutor(
             max_workers=self.config.max_workers * 2, thread_name_prefix="archon-io"
         )
+        # Process pool is created on first use so idle services don't spawn workers
+        self.process_executor: ProcessPoolExecutor | None = None
+        self._process_pool_lock = threading.Lock()
 
         self._running = False
         self._health_check_task = None
@@ -449,9 +640,12 @@ class ThreadingService:
             except asyncio.CancelledError:
                 pass
 
-        # Shutdown thread pools
+        # Shutdown thread and process pools
         self.cpu_executor.shutdown(wait=True)
         self.io_executor.shutdown(wait=True)
+        if self.process_executor is not None:
+            self.process_executor.shutdown(wait=True, cancel_futures=True)
+            self.process_executor = None
 
         logfire_logger.info("Threading service stopped")
 
@@ -478,11 +672,74 @@ class ThreadingService:
                     extra={"duration": duration, "tokens": estimated_tokens},
                 )
 
+    def get_adaptive_limiter(
+        self,
+        key: str,
+        initial_limit: int = 3,
+        max_limit: int = 16,
+        latency_target: float | None = None,
+    ) -> AdaptiveConcurrencyLimiter:
+        """Get (or create) the shared adaptive limiter for a provider/operation key
+
+        The latency target follows the caller's current settings, so changing it
+        applies to an existing limiter without resetting its learned limit.
+        """
+        limiter = self.adaptive_limiters.get(key)
+        if limiter is None:
+            limiter = AdaptiveConcurrencyLimiter(
+                initial_limit=initial_limit,
+                max_limit=max_limit,
+                latency_target=latency_target,
+                rate_limiter=self.rate_limiter,
+            )
+            self.adaptive_limiters[key] = limiter
+        else:
+            limiter.latency_target = latency_target
+        return limiter
+
     async def run_cpu_intensive(self, func: Callable, *args, **kwargs) -> Any:
         """Run CPU-intensive function in thread pool"""
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(self.cpu_executor, func, *args, **kwargs)
 
+    def _get_process_executor(self) -> ProcessPoolExecutor | None:
+        """Create the process pool on first use; None when process execution is disabled"""
+        if not self.config.enable_process_pool:
+            return None
+        with self._process_pool_lock:
+            if self.process_executor is None:
+                # spawn avoids forking a process that already runs threads and an event loop
+                self.process_executor = ProcessPoolExecutor(
+                    max_workers=self.config.process_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logfire_logger.info(
+                    "Process pool started", extra={"workers": self.config.process_workers}
+                )
+            return self.process_executor
+
+    async def run_in_process_pool(self, func: Callable, *args) -> Any:
+        """Run pure-Python CPU-bound work in a worker process.
+
+        func must be a module-level function and its arguments and result must be
+        picklable. Falls back to the CPU thread pool when the process pool is
+        disabled or a worker has died.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_process_executor()
+        if executor is not None:
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool as e:
+                logfire_logger.warning(
+                    "Process pool broken, falling back to thread pool", extra={"error": str(e)}
+                )
+                with self._process_pool_lock:
+                    if self.process_executor is executor:
+                        self.process_executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+        return await loop.run_in_executor(self.cpu_executor, func, *args)
+
     async def run_io_bound(self, func: Callable, *args, **kwargs) -> Any:
         """Run I/O-bound function in thread pool"""
         loop = asyncio.get_event_loop()
@@ -0,0 +1,175 @@
+"""
+Test adaptive (AIMD) concurrency for rate-limited provider calls.
+
+Covers limit growth and back-off, header-driven pauses and the code
+summary batch using the shared limiter.
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+from src.server.services.storage.code_storage_service import (
+    _create_chat_completion,
+    generate_code_summaries_batch,
+)
+from src.server.services.threading_service import (
+    AdaptiveConcurrencyLimiter,
+    RateLimitConfig,
+    RateLimiter,
+    ThreadingService,
+    _parse_reset_duration,
+)
+
+
+class TestParseResetDuration:
+    """Test parsing of provider reset/retry values."""
+
+    @pytest.mark.parametrize(
+        "value,expected",
+        [("20", 20.0), ("1.5", 1.5), ("6m0s", 360.0), ("120ms", 0.12), ("1h2m", 3720.0)],
+    )
+    def test_parses_durations(self, value, expected):
+        assert _parse_reset_duration(value) == pytest.approx(expected)
+
+    @pytest.mark.parametrize("value", [None, "", "2025-01-01T00:00:00Z"])
+    def test_unparseable_values(self, value):
+        assert _parse_reset_duration(value) is None
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """Test AIMD adjustments."""
+
+    def test_additive_increase_is_capped(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4)
+        for _ in range(50):
+            limiter.record_success()
+        assert limiter.current_limit == 4
+
+    def test_multiplicative_decrease_and_pause_on_rate_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, max_limit=16)
+        limiter.record_rate_limited({"retry-after": "2"})
+        assert limiter.current_limit == 4
+        assert limiter.blocked_until - time.monotonic() == pytest.approx(2.0, abs=0.1)
+
+    def test_slow_responses_reduce_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, latency_target=1.0)
+        limiter.record_success(latency=5.0)
+        assert limiter.current_limit < 8
+        assert limiter.stats["latency_decreases"] == 1
+
+    def test_exhausted_quota_header_pauses(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+        limiter.record_success(
+            headers={"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "3s"}
+        )
+        assert limiter.get_stats()["paused_for"] == pytest.approx(3.0, abs=0.1)
+
+    def test_shared_limiter_follows_latency_target_setting(self):
+        service = ThreadingService()
+        limiter = service.get_adaptive_limiter("llm_summaries:test", initial_limit=8, latency_target=10.0)
+        limiter.record_success(latency=12.0)
+        assert limiter.stats["latency_decreases"] == 1
+
+        assert service.get_adaptive_limiter("llm_summaries:test", latency_target=None) is limiter
+        limiter.record_success(latency=12.0)
+        assert limiter.stats["latency_decreases"] == 1
+
+    @pytest.mark.asyncio
+    async def test_slots_bound_in_flight_requests(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(request() for _ in range(6)))
+        assert peak == 2
+        assert limiter.in_flight == 0
+
+
+class TestSharedRateLimiter:
+    """Test the adaptive limiter attached to the service RateLimiter."""
+
+    @pytest.mark.asyncio
+    async def test_slots_count_against_request_budget(self):
+        service = ThreadingService()
+        limiter = service.get_adaptive_limiter("llm_summaries:test")
+        assert limiter.rate_limiter is service.rate_limiter
+
+        async with limiter.slot():
+            pass
+
+        assert service.rate_limiter._get_current_usage()["requests"] == 1
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_pauses_other_operations(self):
+        rate_limiter = RateLimiter(RateLimitConfig())
+        limiter = AdaptiveConcurrencyLimiter(rate_limiter=rate_limiter)
+
+        limiter.record_rate_limited({"retry-after": "0.2"})
+        start = time.monotonic()
+        assert await rate_limiter.acquire(estimated_tokens=100)
+
+        assert time.monotonic() - start == pytest.approx(0.2, abs=0.1)
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_completion_is_not_retried(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+        response = httpx.Response(
+            429, headers={"retry-after": "1"}, request=httpx.Request("POST", "https://api.test")
+        )
+        client = MagicMock()
+        client.chat.completions.with_raw_response.create = AsyncMock(
+            side_effect=openai.RateLimitError("rate limited", response=response, body=None)
+        )
+
+        with pytest.raises(openai.RateLimitError):
+            await _create_chat_completion(client, {"model": "test"}, limiter)
+
+        assert client.chat.completions.with_raw_response.create.await_count == 1
+        assert limiter.current_limit == 2
+        assert limiter.get_stats()["paused_for"] == pytest.approx(1.0, abs=0.1)
+
+
+class TestCodeSummaryBatch:
+    """Test generate_code_summaries_batch with the adaptive limiter."""
+
+    @pytest.mark.asyncio
+    async def test_preserves_order_and_falls_back_per_block(self):
+        blocks = [
+            {"code": f"print({i})", "context_before": "", "context_after": "", "language": "python"}
+            for i in range(5)
+        ]
+
+        async def fake_summary(code, *args, **kwargs):
+            if code == "print(3)":
+                raise RuntimeError("provider error")
+            return {"example_name": code, "summary": "ok"}
+
+        client_cm = AsyncMock()
+        client_cm.__aenter__.return_value = object()
+        progress = AsyncMock()
+
+        with patch(
+            "src.server.services.storage.code_storage_service.get_llm_client",
+            return_value=client_cm,
+        ), patch(
+            "src.server.services.storage.code_storage_service._generate_code_example_summary_async",
+            side_effect=fake_summary,
+        ):
+            summaries = await generate_code_summaries_batch(
+                blocks, max_workers=2, progress_callback=progress, provider="test-provider"
+            )
+
+        assert [s["example_name"] for s in summaries[:3]] == ["print(0)", "print(1)", "print(2)"]
+        assert summaries[3]["example_name"] == "Code Example (python)"
+        assert summaries[4]["example_name"] == "print(4)"
+        assert progress.await_count == 4
@@ -0,0 +1,142 @@
+"""
+Test process-pool friendly code block extraction.
+
+Covers the pure extraction functions and the process-pool dispatch in
+CodeExtractionService and ThreadingService.
+"""
+
+import asyncio
+import dataclasses
+import math
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from src.server.services.crawling import code_extraction_service
+from src.server.services.crawling.code_block_extraction import (
+    extract_document_code_blocks,
+    extract_html_code_blocks,
+    extract_text_file_code_blocks,
+    validate_code_quality,
+)
+from src.server.services.crawling.code_extraction_service import CodeExtractionService
+from src.server.services.settings_snapshot import CodeExtractionSettings, RagSettingsSnapshot
+from src.server.services.threading_service import ThreadingConfig, ThreadingService
+
+DEFAULT_SETTINGS = CodeExtractionSettings()
+
+PYTHON_SNIPPET = '''def handle_request(request, context):
+    """Handle one request."""
+    result = process(request.body)
+    if result is None:
+        return {"status": "error"}
+    for item in result.items:
+        context.emit(item)
+    return {"status": "ok", "count": len(result.items)}
+'''
+
+
+def _html_page(snippets: int = 3) -> str:
+    escaped = PYTHON_SNIPPET.replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+    body = "".join(
+        f'<p>Example {i} of the handler.</p><pre class="language-python"><code>{escaped}</code></pre>'
+        for i in range(snippets)
+    )
+    return f"<html><body>{body}</body></html>"
+
+
+class TestPureExtraction:
+    """Test the pure extraction functions."""
+
+    def test_html_extraction_decodes_entities(self):
+        blocks = extract_html_code_blocks(_html_page(2), DEFAULT_SETTINGS)
+        assert len(blocks) == 2
+        assert blocks[0]["language"] == "python"
+        assert blocks[0]["source_type"] == "prism"
+        assert '{"status": "error"}' in blocks[0]["code"]
+
+    def test_hljs_without_language_does_not_fail(self):
+        html = f'<pre><code class="hljs">{PYTHON_SNIPPET}</code></pre>'
+        blocks = extract_html_code_blocks(html, DEFAULT_SETTINGS)
+        assert blocks[0]["language"] == ""
+
+    def test_text_file_backticks(self):
+        content = f"# Guide\n\nHere is an example:\n\n```python\n{PYTHON_SNIPPET}```\n"
+        blocks = extract_text_file_code_blocks(content, "https://example.com/llms.txt", DEFAULT_SETTINGS)
+        assert [block["source_type"] for block in blocks] == ["text_backticks"]
+
+    def test_validation_respects_settings(self):
+        mermaid = "graph TD\n  A[Start] --> B{Is it?}\n  B -->|Yes| C[OK]\n  C --> D[Rethink]\n"
+        assert not validate_code_quality(mermaid, "mermaid", DEFAULT_SETTINGS)
+        assert validate_code_quality(PYTHON_SNIPPET, "python", DEFAULT_SETTINGS)
+        assert not validate_code_quality(
+            PYTHON_SNIPPET, "python", dataclasses.replace(DEFAULT_SETTINGS, min_code_indicators=20)
+        )
+
+    def test_document_extraction_reports_timing(self):
+        blocks, elapsed = extract_document_code_blocks(
+            "https://example.com/page", _html_page(1), "", "", DEFAULT_SETTINGS
+        )
+        assert len(blocks) == 1
+        assert elapsed >= 0
+
+
+class TestExtractionDispatch:
+    """Test CodeExtractionService document dispatch."""
+
+    @pytest.mark.asyncio
+    async def test_large_documents_use_process_pool_and_keep_order(self):
+        service = CodeExtractionService(Mock(), RagSettingsSnapshot())
+
+        threading_service = ThreadingService(ThreadingConfig(process_workers=2))
+        threading_service.run_in_process_pool = AsyncMock(
+            side_effect=lambda func, *args: func(*args)
+        )
+        small_page = _html_page(1)
+        large_page = _html_page(1) + " " * code_extraction_service.PROCESS_POOL_MIN_CHARS
+        crawl_results = [
+            {"url": "https://example.com/large", "html": large_page, "markdown": ""},
+            {"url": "https://example.com/small", "html": small_page, "markdown": ""},
+        ]
+        progress = AsyncMock()
+
+        with patch.object(code_extraction_service, "get_threading_service", return_value=threading_service):
+            blocks = await service._extract_code_blocks_from_documents(crawl_results, "src1", progress)
+
+        threading_service.run_in_process_pool.assert_awaited_once()
+        assert [b["source_url"] for b in blocks] == ["https://example.com/large", "https://example.com/small"]
+        assert all(b["source_id"] == "src1" for b in blocks)
+        assert progress.await_args.args[0]["completed_documents"] == 2
+
+    @pytest.mark.asyncio
+    async def test_cancellation_reports_and_raises(self):
+        service = CodeExtractionService(Mock(), RagSettingsSnapshot())
+        progress = AsyncMock()
+
+        def cancelled():
+            raise asyncio.CancelledError()
+
+        with pytest.raises(asyncio.CancelledError):
+            await service._extract_code_blocks_from_documents(
+                [{"url": "https://example.com/a", "html": _html_page(1)}], "src1", progress, cancelled
+            )
+        assert progress.await_args.args[0]["status"] == "cancelled"
+
+
+class TestProcessPool:
+    """Test ThreadingService.run_in_process_pool."""
+
+    @pytest.mark.asyncio
+    async def test_runs_in_worker_process(self):
+        service = ThreadingService(ThreadingConfig(process_workers=1))
+        try:
+            assert await service.run_in_process_pool(math.factorial, 10) == 3628800
+            assert service.process_executor is not None
+        finally:
+            service.process_executor.shutdown(wait=True)
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_threads_when_disabled(self):
+        service = ThreadingService(ThreadingConfig(enable_process_pool=False))
+        assert await service.run_in_process_pool(math.factorial, 5) == 120
+        assert service.process_executor is None
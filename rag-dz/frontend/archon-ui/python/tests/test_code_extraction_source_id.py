@@ -9,6 +9,7 @@ import pytest
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
 from src.server.services.crawling.code_extraction_service import CodeExtractionService
 from src.server.services.crawling.document_storage_operations import DocumentStorageOperations
+from src.server.services.settings_snapshot import RagSettingsSnapshot
 
 
 class TestCodeExtractionSourceId:
@@ -27,7 +28,7 @@ class TestCodeExtractionSourceId:
         # Track what gets passed to the internal extraction method
         extracted_blocks = []
         
-        async def mock_extract_blocks(crawl_results, source_id, progress_callback=None, start=0, end=100, cancellation_check=None):
+        async def mock_extract_blocks(crawl_results, source_id, progress_callback=None, cancellation_check=None, settings=None):
             # Simulate finding code blocks and verify source_id is passed correctly
             for doc in crawl_results:
                 extracted_blocks.append({
@@ -124,13 +125,13 @@ class TestCodeExtractionSourceId:
         code_service = CodeExtractionService(mock_supabase)
         
         # Patch internal methods
-        code_service._get_setting = AsyncMock(return_value=True)
+        code_service.settings_snapshot = RagSettingsSnapshot()
         
         # Create a mock that will track what source_id is used
         source_ids_seen = []
         
         original_extract = code_service._extract_code_blocks_from_documents
-        async def track_source_id(crawl_results, source_id, progress_callback=None, cancellation_check=None):
+        async def track_source_id(crawl_results, source_id, progress_callback=None, cancellation_check=None, settings=None):
             source_ids_seen.append(source_id)
             return []  # Return empty list to skip further processing
         
@@ -22,7 +22,7 @@ class TestDocumentStorageMetrics:
         
         # Mock the storage service
         doc_storage.doc_storage_service.smart_chunk_text = Mock(
-            side_effect=lambda text, chunk_size: ["chunk1", "chunk2"] if text else []
+            side_effect=lambda text, chunk_size, **kwargs: ["chunk1", "chunk2"] if text else []
         )
         
         # Mock internal methods
@@ -166,7 +166,7 @@ class TestDocumentStorageMetrics:
         # Track which documents are chunked
         chunked_urls = []
         
-        def mock_chunk(text, chunk_size):
+        def mock_chunk(text, chunk_size, **kwargs):
             if text:
                 return ["chunk"]
             return []
@@ -0,0 +1,174 @@
+"""
+Test incremental recrawl support.
+
+Ensures that unchanged pages (same content hash) are not re-chunked or
+re-embedded, and that conditional probes only skip 304 responses.
+"""
+
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import pytest
+
+from src.server.services.crawling.document_storage_operations import DocumentStorageOperations
+from src.server.services.crawling.helpers.page_fingerprint import (
+    compute_content_hash,
+    extract_validators,
+    find_unchanged_urls,
+)
+
+
+class TestPageFingerprint:
+    """Test fingerprint helpers."""
+
+    def test_content_hash_ignores_edge_whitespace(self):
+        assert compute_content_hash("# Title\n\nBody") == compute_content_hash("  # Title\n\nBody\n\n")
+        assert compute_content_hash("a") != compute_content_hash("b")
+
+    def test_extract_validators_is_case_insensitive(self):
+        validators = extract_validators({"ETag": '"abc"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"})
+        assert validators == {"etag": '"abc"', "last_modified": "Wed, 01 Jan 2025 00:00:00 GMT"}
+        assert extract_validators(None) == {"etag": None, "last_modified": None}
+
+    @pytest.mark.asyncio
+    async def test_find_unchanged_urls_only_skips_304(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, text="changed")
+
+        transport = httpx.MockTransport(handler)
+        original_client = httpx.AsyncClient
+
+        fingerprints = {
+            "https://example.com/same": {"etag": '"v1"'},
+            "https://example.com/changed": {"etag": '"old"'},
+            "https://example.com/no-validators": {"content_hash": "x"},
+        }
+
+        with patch(
+            "src.server.services.crawling.helpers.page_fingerprint.httpx.AsyncClient",
+            lambda **kwargs: original_client(transport=transport, **kwargs),
+        ):
+            unchanged = await find_unchanged_urls(
+                list(fingerprints.keys()) + ["https://example.com/new"], fingerprints
+            )
+
+        assert unchanged == {"https://example.com/same"}
+
+    @pytest.mark.asyncio
+    async def test_probes_use_head_and_fall_back_to_get_on_405(self):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append((request.method, request.url.path))
+            if request.url.path == "/no-head" and request.method == "HEAD":
+                return httpx.Response(405)
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, text="changed")
+
+        transport = httpx.MockTransport(handler)
+        original_client = httpx.AsyncClient
+        fingerprints = {
+            "https://example.com/same": {"etag": '"v1"'},
+            "https://example.com/no-head": {"etag": '"v1"'},
+            "https://example.com/changed": {"etag": '"old"'},
+        }
+
+        with patch(
+            "src.server.services.crawling.helpers.page_fingerprint.httpx.AsyncClient",
+            lambda **kwargs: original_client(transport=transport, **kwargs),
+        ):
+            unchanged = await find_unchanged_urls(list(fingerprints.keys()), fingerprints)
+
+        assert unchanged == {"https://example.com/same", "https://example.com/no-head"}
+        assert sorted(requests) == [
+            ("GET", "/no-head"), ("HEAD", "/changed"), ("HEAD", "/no-head"), ("HEAD", "/same"),
+        ]
+
+
+class TestIncrementalDocumentStorage:
+    """Test that document storage skips unchanged pages."""
+
+    @pytest.mark.asyncio
+    async def test_unchanged_pages_are_not_rechunked(self):
+        mock_supabase = Mock()
+        doc_storage = DocumentStorageOperations(mock_supabase)
+        doc_storage.doc_storage_service.smart_chunk_text_async = AsyncMock(return_value=["chunk"])
+        doc_storage._create_source_records = AsyncMock()
+
+        crawl_results = [
+            {"url": "https://example.com/same", "markdown": "Same content"},
+            {"url": "https://example.com/changed", "markdown": "New content"},
+        ]
+        fingerprints = {
+            "https://example.com/same": {
+                "id": "page-1",
+                "content_hash": compute_content_hash("Same content"),
+                "word_count": 2,
+            },
+            "https://example.com/changed": {
+                "id": "page-2",
+                "content_hash": compute_content_hash("Old content"),
+                "word_count": 2,
+            },
+        }
+
+        with patch(
+            "src.server.services.crawling.document_storage_operations.add_documents_to_supabase",
+            new_callable=AsyncMock,
+            return_value={"chunks_stored": 1},
+        ) as mock_add, patch(
+            "src.server.services.crawling.document_storage_operations.PageStorageOperations.store_pages",
+            new_callable=AsyncMock,
+            return_value={"https://example.com/changed": "page-2"},
+        ):
+            result = await doc_storage.process_and_store_documents(
+                crawl_results=crawl_results,
+                request={},
+                crawl_type="sitemap",
+                original_source_id="src1",
+                page_fingerprints=fingerprints,
+            )
+
+        assert result["unchanged_urls"] == ["https://example.com/same"]
+        assert list(result["url_to_full_document"].keys()) == ["https://example.com/changed"]
+        doc_storage.doc_storage_service.smart_chunk_text_async.assert_awaited_once()
+        assert mock_add.call_args.kwargs["urls"] == ["https://example.com/changed"]
+        # Word count covers the new chunk plus the stored count of the unchanged page
+        assert result["total_word_count"] == 1 + 2
+
+    @pytest.mark.asyncio
+    async def test_not_modified_pages_count_towards_source_words(self):
+        mock_supabase = Mock()
+        doc_storage = DocumentStorageOperations(mock_supabase)
+        doc_storage.doc_storage_service.smart_chunk_text_async = AsyncMock(return_value=["new chunk"])
+        doc_storage._create_source_records = AsyncMock()
+
+        fingerprints = {
+            "https://example.com/304": {"id": "page-1", "content_hash": "h1", "word_count": 40},
+            "https://example.com/changed": {"id": "page-2", "content_hash": "h2", "word_count": 5},
+        }
+
+        with patch(
+            "src.server.services.crawling.document_storage_operations.add_documents_to_supabase",
+            new_callable=AsyncMock,
+            return_value={"chunks_stored": 1},
+        ), patch(
+            "src.server.services.crawling.document_storage_operations.PageStorageOperations.store_pages",
+            new_callable=AsyncMock,
+            return_value={"https://example.com/changed": "page-2"},
+        ):
+            result = await doc_storage.process_and_store_documents(
+                crawl_results=[{"url": "https://example.com/changed", "markdown": "New content"}],
+                request={},
+                crawl_type="sitemap",
+                original_source_id="src1",
+                page_fingerprints=fingerprints,
+                not_modified_urls={"https://example.com/304"},
+            )
+
+        assert result["total_word_count"] == 2 + 40
+        source_word_counts = doc_storage._create_source_records.call_args.args[2]
+        assert source_word_counts == {"src1": 42}
@@ -0,0 +1,139 @@
+"""
+Test the typed settings snapshot used by crawl and code extraction hot paths.
+"""
+
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from src.server.services import settings_snapshot
+from src.server.services.crawling.strategies.batch import BatchCrawlStrategy
+from src.server.services.settings_snapshot import RagSettingsSnapshot, get_rag_settings_snapshot
+
+
+class TestFromSettings:
+    """Test building snapshots from raw setting values."""
+
+    def test_defaults_when_empty(self):
+        snapshot = RagSettingsSnapshot.from_settings({})
+        assert snapshot.crawl.batch_size == 50
+        assert snapshot.crawl.page_timeout is None
+        assert snapshot.code_extraction.min_code_block_length == 250
+        assert snapshot.code_summaries.enabled is True
+        assert snapshot.invalid_keys == frozenset()
+
+    def test_parses_string_values(self):
+        snapshot = RagSettingsSnapshot.from_settings({
+            "CRAWL_MAX_CONCURRENT": "4",
+            "CRAWL_PAGE_TIMEOUT": "60000",
+            "ENABLE_PROSE_FILTERING": "false",
+            "MAX_PROSE_RATIO": "0.3",
+            "ENABLE_CODE_SUMMARIES": "False",
+        })
+        assert snapshot.crawl.max_concurrent == 4
+        assert snapshot.crawl.page_timeout == 60000
+        assert snapshot.code_extraction.enable_prose_filtering is False
+        assert snapshot.code_extraction.max_prose_ratio == 0.3
+        assert snapshot.code_summaries.enabled is False
+
+    def test_clamps_out_of_range_values(self):
+        snapshot = RagSettingsSnapshot.from_settings({
+            "CRAWL_BATCH_SIZE": "0",
+            "MEMORY_THRESHOLD_PERCENT": "150",
+            "CODE_SUMMARY_MAX_WORKERS": "8",
+            "CODE_SUMMARY_MAX_CONCURRENCY": "2",
+        })
+        assert snapshot.crawl.batch_size == 1
+        assert snapshot.crawl.memory_threshold_percent == 99.0
+        assert snapshot.code_summaries.max_concurrency == 8
+
+    def test_code_summary_latency_target(self):
+        assert RagSettingsSnapshot.from_settings({}).code_summaries.latency_target == 30.0
+        snapshot = RagSettingsSnapshot.from_settings({"CODE_SUMMARY_LATENCY_TARGET": "12.5"})
+        assert snapshot.code_summaries.latency_target == 12.5
+        disabled = RagSettingsSnapshot.from_settings({"CODE_SUMMARY_LATENCY_TARGET": "0"})
+        assert disabled.code_summaries.latency_target is None
+
+    def test_records_invalid_keys(self):
+        snapshot = RagSettingsSnapshot.from_settings({"CRAWL_BATCH_SIZE": "lots", "MIN_CODE_BLOCK_LENGTH": "x"})
+        assert snapshot.crawl.batch_size == 50
+        assert snapshot.invalid_keys == {"CRAWL_BATCH_SIZE", "MIN_CODE_BLOCK_LENGTH"}
+
+
+class TestSharedSnapshot:
+    """Test rebuilding the shared snapshot on credential changes."""
+
+    @pytest.mark.asyncio
+    async def test_rebuilds_only_when_version_changes(self):
+        credentials = Mock()
+        credentials.version = 1
+        credentials.get_plain_settings = AsyncMock(return_value={"CRAWL_BATCH_SIZE": "20"})
+
+        with patch.object(settings_snapshot, "credential_service", credentials), patch.object(
+            settings_snapshot, "_snapshot", None
+        ):
+            first = await get_rag_settings_snapshot()
+            assert await get_rag_settings_snapshot() is first
+            assert credentials.get_plain_settings.await_count == 1
+
+            credentials.version = 2
+            credentials.get_plain_settings.return_value = {"CRAWL_BATCH_SIZE": "30"}
+            second = await get_rag_settings_snapshot()
+
+        assert first.crawl.batch_size == 20
+        assert second.crawl.batch_size == 30
+        assert second.version == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_snapshot_rereads_the_store(self):
+        """Settings changed by another worker are picked up after the TTL."""
+        credentials = Mock()
+        credentials.version = 1
+        credentials.get_plain_settings = AsyncMock(return_value={"CRAWL_BATCH_SIZE": "20"})
+
+        async def load_all_credentials():
+            credentials.version += 1
+            credentials.get_plain_settings.return_value = {"CRAWL_BATCH_SIZE": "40"}
+
+        credentials.load_all_credentials = AsyncMock(side_effect=load_all_credentials)
+
+        with patch.object(settings_snapshot, "credential_service", credentials), patch.object(
+            settings_snapshot, "_snapshot", None
+        ):
+            first = await get_rag_settings_snapshot()
+            assert await get_rag_settings_snapshot() is first
+            credentials.load_all_credentials.assert_not_awaited()
+
+            settings_snapshot._snapshot_loaded_at -= settings_snapshot.SNAPSHOT_TTL_SECONDS
+            refreshed = await get_rag_settings_snapshot()
+
+        assert credentials.load_all_credentials.await_count == 1
+        assert first.crawl.batch_size == 20
+        assert refreshed.crawl.batch_size == 40
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_current_snapshot(self):
+        credentials = Mock()
+        credentials.version = 1
+        credentials.get_plain_settings = AsyncMock(return_value={})
+        credentials.load_all_credentials = AsyncMock(side_effect=RuntimeError("database unavailable"))
+
+        with patch.object(settings_snapshot, "credential_service", credentials), patch.object(
+            settings_snapshot, "_snapshot", None
+        ):
+            first = await get_rag_settings_snapshot()
+            settings_snapshot._snapshot_loaded_at -= settings_snapshot.SNAPSHOT_TTL_SECONDS
+            assert await get_rag_settings_snapshot() is first
+            assert await get_rag_settings_snapshot() is first
+
+        assert credentials.load_all_credentials.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_crawl_setting_fails_fast(self):
+        strategy = BatchCrawlStrategy(Mock(), Mock())
+        snapshot = RagSettingsSnapshot.from_settings({"CRAWL_MAX_CONCURRENT": "many"})
+
+        with pytest.raises(ValueError, match="Failed to load crawler configuration"):
+            await strategy.crawl_batch_with_progress(
+                ["https://example.com"], lambda url: url, lambda url: False, settings_snapshot=snapshot
+            )
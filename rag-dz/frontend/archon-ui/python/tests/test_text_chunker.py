@@ -0,0 +1,88 @@
+"""
+Test the single-pass text chunker.
+
+Covers structure preservation (code fences, headings), size limits in
+characters and tokens, overlap, and the BaseStorageService wrappers.
+"""
+
+import pytest
+
+from src.server.services.storage.storage_services import DocumentStorageService
+from src.server.services.storage.text_chunker import (
+    approximate_token_count,
+    iter_text_chunks,
+)
+
+
+def _document(paragraphs: int = 40) -> str:
+    parts = ["# Guide", "Intro paragraph."]
+    for i in range(paragraphs):
+        parts.append(f"## Section {i}")
+        parts.append(f"Paragraph {i} explains things. " * 8)
+        parts.append(f"```python\ndef handler_{i}():\n    return {i}\n```")
+    return "\n\n".join(parts)
+
+
+class TestIterTextChunks:
+    """Test iter_text_chunks behaviour."""
+
+    def test_is_lazy_generator(self):
+        chunks = iter_text_chunks(_document(), 500)
+        assert next(chunks)
+        assert not isinstance(chunks, list)
+
+    def test_respects_character_limit(self):
+        chunks = list(iter_text_chunks(_document(), 500))
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 500 for chunk in chunks)
+
+    def test_keeps_code_fences_whole(self):
+        for chunk in iter_text_chunks(_document(), 500):
+            assert chunk.count("```") % 2 == 0
+
+    def test_respects_token_limit_with_overlap(self):
+        text = "مرحبا بكم في الجزائر. " * 400
+        chunks = list(
+            iter_text_chunks(text, 200, overlap=20, length_function=approximate_token_count)
+        )
+        assert len(chunks) > 1
+        assert all(approximate_token_count(chunk) <= 200 for chunk in chunks)
+        # Overlap repeats the tail of a chunk at the start of the next one
+        assert chunks[1].split(". ")[0] in chunks[0]
+
+    def test_splits_oversized_words(self):
+        chunks = list(iter_text_chunks("x" * 12000, 5000))
+        assert [len(c) for c in chunks] == [5000, 5000, 2000]
+
+    def test_no_content_is_lost_without_overlap(self):
+        text = _document(10)
+        chunks = list(iter_text_chunks(text, 300))
+        assert "".join(chunks).replace("\n", "").replace(" ", "") == text.replace("\n", "").replace(" ", "")
+
+    @pytest.mark.parametrize(
+        "text", ["intro\n```python", "intro\n\n~~~", "intro\n```python\nprint(1)"]
+    )
+    def test_unterminated_fence_at_end_is_kept(self, text):
+        chunks = list(iter_text_chunks(text, 500))
+        assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
+
+    @pytest.mark.parametrize("value", ["", None])
+    def test_empty_input(self, value):
+        assert list(iter_text_chunks(value, 100)) == []
+
+
+class TestStorageServiceChunking:
+    """Test BaseStorageService chunking wrappers."""
+
+    def test_smart_chunk_text_character_mode(self):
+        service = DocumentStorageService(supabase_client=object())
+        chunks = service.smart_chunk_text(_document(), chunk_size=1000)
+        assert chunks and all(len(chunk) <= 1000 for chunk in chunks)
+
+    @pytest.mark.asyncio
+    async def test_smart_chunk_text_async_token_mode(self):
+        service = DocumentStorageService(supabase_client=object())
+        chunks = await service.smart_chunk_text_async(
+            _document(), chunk_size=300, chunk_overlap=30, size_unit="tokens"
+        )
+        assert len(chunks) > 1
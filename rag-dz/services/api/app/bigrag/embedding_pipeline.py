@@ -13,6 +13,8 @@ from enum import Enum
 import httpx
 from pydantic import BaseModel, Field
 
+from ..core.model_registry import shared_sentence_transformer
+
 logger = logging.getLogger(__name__)
 
 
@@ -287,21 +289,16 @@ class LocalEmbedder(BaseEmbedder):
         model: EmbeddingModel = EmbeddingModel.MULTILINGUAL_E5,
     ):
         self.model = model
-        self._embedder = None
         
     def _load_model(self):
-        """Charger le modèle (lazy loading)"""
-        if self._embedder is None:
-            try:
-                from sentence_transformers import SentenceTransformer
-                self._embedder = SentenceTransformer(self.model.value)
-                logger.info(f"Loaded local embedding model: {self.model.value}")
-            except ImportError:
-                raise RuntimeError(
-                    "sentence-transformers not installed. "
-                    "Run: pip install sentence-transformers"
-                )
-        return self._embedder
+        """Modèle partagé via le registre de modèles (chargé une fois par processus)"""
+        try:
+            return shared_sentence_transformer(self.model.value)
+        except ImportError:
+            raise RuntimeError(
+                "sentence-transformers not installed. "
+                "Run: pip install sentence-transformers"
+            )
     
     async def embed(self, texts: List[str]) -> EmbeddingResult:
         """Générer embeddings localement"""
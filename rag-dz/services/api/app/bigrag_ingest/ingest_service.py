@@ -24,6 +24,8 @@ from qdrant_client import QdrantClient
 from qdrant_client.http import models as qdrant_models
 from qdrant_client.http.exceptions import UnexpectedResponse
 
+from ..core.model_registry import shared_sentence_transformer
+
 # Models
 from .ingest_models import (
     RAGDocument,
@@ -83,7 +85,7 @@ class EmbeddingPipeline:
         self.device = device
         
         # Initialiser le modèle
-        self._model = None
+        self._initialized = False
         self._openai_client = None
         self._vector_size = 768  # Défaut pour multilingual-mpnet
         
@@ -98,19 +100,23 @@ class EmbeddingPipeline:
         else:
             if not SENTENCE_TRANSFORMERS_AVAILABLE:
                 raise ImportError("sentence-transformers not installed")
-            self._model = SentenceTransformer(self.model_name, device=self.device)
-            self._vector_size = self._model.get_sentence_embedding_dimension()
+            self._vector_size = self._local_model().get_sentence_embedding_dimension()
             logger.info(f"Using local embeddings: {self.model_name} (dim={self._vector_size})")
+        self._initialized = True
+    
+    def _local_model(self):
+        """SentenceTransformer partagé (registre de modèles)"""
+        return shared_sentence_transformer(self.model_name, self.device)
     
     @property
     def vector_size(self) -> int:
-        if self._model is None and self._openai_client is None:
+        if not self._initialized:
             self._init_model()
         return self._vector_size
     
     def embed_text(self, text: str) -> List[float]:
         """Génère l'embedding pour un texte"""
-        if self._model is None and self._openai_client is None:
+        if not self._initialized:
             self._init_model()
         
         if self.use_openai and self._openai_client:
@@ -120,12 +126,12 @@ class EmbeddingPipeline:
             )
             return response.data[0].embedding
         else:
-            embedding = self._model.encode(text, convert_to_numpy=True)
+            embedding = self._local_model().encode(text, convert_to_numpy=True)
             return embedding.tolist()
     
     def embed_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
         """Génère les embeddings pour plusieurs textes"""
-        if self._model is None and self._openai_client is None:
+        if not self._initialized:
             self._init_model()
         
         if self.use_openai and self._openai_client:
@@ -139,7 +145,7 @@ class EmbeddingPipeline:
                 embeddings.extend([d.embedding for d in response.data])
             return embeddings
         else:
-            embeddings = self._model.encode(texts, convert_to_numpy=True, batch_size=batch_size)
+            embeddings = self._local_model().encode(texts, convert_to_numpy=True, batch_size=batch_size)
             return embeddings.tolist()
 
 
@@ -1,29 +1,19 @@
-from sentence_transformers import SentenceTransformer
-import threading
 import logging
 from ..config import get_settings
 from ..cache import embedding_cache
+from ..core.model_registry import get_model_registry, shared_sentence_transformer
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 MODEL_NAME = settings.embedding_model
-_model = None
-_lock = threading.Lock()
 
 def get_embedding_model():
-    """Récupère le modèle d'embeddings (singleton thread-safe)"""
-    global _model
-    if _model is None:
-        with _lock:
-            if _model is None:
-                logger.info(f"Loading embedding model: {MODEL_NAME}")
-                _model = SentenceTransformer(
-                    MODEL_NAME,
-                    device=settings.embedding_device
-                )
-                logger.info("Embedding model loaded successfully")
-    return _model
+    """Récupère le modèle d'embeddings (partagé via le registre de modèles)"""
+    return shared_sentence_transformer(MODEL_NAME, settings.embedding_device)
+
+# Préchargement au démarrage (MODEL_PRELOAD=embeddings)
+get_model_registry().register_preloader("embeddings", get_embedding_model)
 
 def embed_queries(queries: list[str], use_cache: bool = True) -> list[list[float]]:
     """
@@ -18,6 +18,8 @@ except ImportError:
     CrossEncoder = None
     CROSSENCODER_AVAILABLE = False
 
+from ..core.model_registry import get_model_registry, shared_cross_encoder
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_RERANKING_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
@@ -39,7 +41,19 @@ class RerankingStrategy:
             model_instance: Instance pré-chargée (optionnel)
         """
         self.model_name = model_name
-        self.model = model_instance or self._load_model()
+        self._model_instance = model_instance
+        self._load_failed = False
+        if model_instance is None:
+            self._load_model()  # Chargement au démarrage (modèle partagé)
+
+    @property
+    def model(self) -> Optional[Any]:
+        """Modèle injecté, ou CrossEncoder partagé du registre de modèles"""
+        if self._model_instance is not None:
+            return self._model_instance
+        if self._load_failed:
+            return None
+        return self._load_model()
 
     @classmethod
     def from_model(cls, model: Any, model_name: str = "custom_model") -> "RerankingStrategy":
@@ -56,16 +70,16 @@ class RerankingStrategy:
         return cls(model_name=model_name, model_instance=model)
 
     def _load_model(self) -> Optional[CrossEncoder]:
-        """Charge le modèle CrossEncoder pour le reranking."""
+        """Retourne le CrossEncoder partagé (chargé une fois par processus)."""
         if not CROSSENCODER_AVAILABLE:
             logger.warning("sentence-transformers non disponible - reranking désactivé")
             return None
 
         try:
-            logger.info(f"Chargement du modèle de reranking: {self.model_name}")
-            return CrossEncoder(self.model_name)
+            return shared_cross_encoder(self.model_name)
         except Exception as e:
             logger.error(f"Échec du chargement du modèle {self.model_name}: {e}")
+            self._load_failed = True
             return None
 
     def is_available(self) -> bool:
@@ -158,7 +172,8 @@ class RerankingStrategy:
         Returns:
             Liste réordonnée par rerank_score (plus haut d'abord)
         """
-        if not self.model or not results:
+        model = self.model
+        if not model or not results:
             logger.debug("Reranking ignoré - pas de modèle ou pas de résultats")
             return results
 
@@ -173,7 +188,7 @@ class RerankingStrategy:
                 return results
 
             # Obtenir les scores de reranking
-            scores = self.model.predict(query_doc_pairs)
+            scores = model.predict(query_doc_pairs)
 
             # Appliquer scores et trier
             reranked_results = self.apply_rerank_scores(
@@ -198,7 +213,10 @@ class RerankingStrategy:
             "model_name": self.model_name,
             "available": self.is_available(),
             "crossencoder_available": CROSSENCODER_AVAILABLE,
-            "model_loaded": self.model is not None,
+            "model_loaded": (
+                self._model_instance is not None
+                or get_model_registry().is_loaded(f"cross-encoder:{self.model_name}")
+            ),
         }
 
 
@@ -214,3 +232,9 @@ def load_reranking_config() -> Dict[str, Any]:
         "model_name": model_name,
         "top_k": top_k,
     }
+
+
+# Préchargement au démarrage (MODEL_PRELOAD=reranker)
+get_model_registry().register_preloader(
+    "reranker", lambda: shared_cross_encoder(load_reranking_config()["model_name"])
+)
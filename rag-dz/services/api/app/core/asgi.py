@@ -0,0 +1,54 @@
+"""
+ASGI - Base des middlewares ASGI purs
+=====================================
+Remplace BaseHTTPMiddleware pour la pile de middlewares de l'API
+
+- Un seul passage par couche: pas de tâche ni de flux mémoire intermédiaire
+- Corps de réponse transmis tel quel: le streaming (SSE, NDJSON, audio)
+  n'est jamais bufferisé et la contre-pression du client remonte jusqu'au
+  générateur de l'endpoint
+- Les scopes non HTTP (websocket, lifespan) traversent sans traitement
+"""
+
+from abc import ABC, abstractmethod
+from typing import Callable, Mapping
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class ASGIMiddleware(ABC):
+    """
+    Middleware ASGI pur: les sous-classes implémentent handle() pour les requêtes HTTP
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        await self.handle(scope, receive, send)
+
+    @abstractmethod
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Traite une requête HTTP (appeler self.app pour la transmettre)"""
+
+
+def send_with_headers(send: Send, headers: Callable[[], Mapping[str, str]]) -> Send:
+    """
+    Enveloppe `send` pour poser des headers sur http.response.start
+
+    `headers` est appelé au début de la réponse (valeurs calculées après
+    le traitement de la requête, ex. quota restant).
+    """
+
+    async def wrapped(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            response_headers = MutableHeaders(scope=message)
+            for name, value in headers().items():
+                response_headers[name] = value
+        await send(message)
+
+    return wrapped
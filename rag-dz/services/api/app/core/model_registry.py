@@ -0,0 +1,439 @@
+"""
+ModelRegistry - Résidence partagée des modèles ML du processus
+
+Un seul exemplaire de chaque modèle (Whisper, XTTS, CrossEncoder,
+SentenceTransformer) est chargé par processus et partagé entre services:
+- Préchargement au démarrage (MODEL_PRELOAD) → pas de cold start au 1er user
+- Budget mémoire (MODEL_MEMORY_BUDGET_MB) avec déchargement LRU des modèles inactifs
+- Statistiques: temps de chargement, mémoire résidente, hits, évictions
+
+Les services ne gardent pas de référence longue vers le modèle: ils appellent
+registry.get(name) à chaque utilisation (ou lease() pendant un calcul long),
+sinon un modèle déchargé resterait en mémoire.
+
+Configuration (env):
+- MODEL_MEMORY_BUDGET_MB: budget total (0 = illimité)
+- MODEL_MIN_IDLE_SEC: inactivité minimale avant déchargement LRU (défaut 60)
+- MODEL_PRELOAD: alias à précharger au démarrage (ex: "whisper,xtts,reranker,embeddings")
+"""
+
+import gc
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+try:
+    from ..monitoring import MODEL_LOAD_SECONDS, MODEL_RESIDENT_MB
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# MODEL ENTRY
+# ============================================
+
+@dataclass
+class ModelEntry:
+    """Modèle enregistré (chargé ou non)"""
+    name: str
+    loader: Callable[[], Any]
+    kind: str = "model"
+    size_mb: Optional[float] = None  # Taille déclarée (sinon mesurée)
+    pinned: bool = False  # Jamais déchargé par le LRU
+    unloader: Optional[Callable[[Any], None]] = None
+
+    instance: Any = None
+    resident_mb: float = 0.0
+    load_time_ms: Optional[int] = None
+    last_used: float = 0.0
+    leases: int = 0
+    loads: int = 0
+    hits: int = 0
+    evictions: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def loaded(self) -> bool:
+        return self.instance is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "loaded": self.loaded,
+            "pinned": self.pinned,
+            "resident_mb": round(self.resident_mb, 1) if self.loaded else 0.0,
+            "load_time_ms": self.load_time_ms,
+            "idle_sec": round(time.time() - self.last_used, 1) if self.loaded else None,
+            "leases": self.leases,
+            "loads": self.loads,
+            "hits": self.hits,
+            "evictions": self.evictions,
+        }
+
+
+def _process_rss_mb() -> Optional[float]:
+    if not PSUTIL_AVAILABLE:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def _parameters_mb(instance: Any) -> Optional[float]:
+    """Taille des poids pour les modèles torch (nn.Module ou wrapper .model)"""
+    for candidate in (instance, getattr(instance, "model", None)):
+        parameters = getattr(candidate, "parameters", None)
+        if not callable(parameters):
+            continue
+        try:
+            total = sum(p.numel() * p.element_size() for p in parameters())
+        except Exception:
+            continue
+        if total:
+            return total / (1024 * 1024)
+    return None
+
+
+# ============================================
+# MODEL REGISTRY
+# ============================================
+
+class ModelRegistry:
+    """
+    Registre process-wide des modèles chargés
+
+    - register(): déclare un loader (idempotent, aucun chargement)
+    - get(): retourne l'instance partagée, chargée à la demande
+    - lease(): get() + protection contre le déchargement pendant l'utilisation
+    - preload(): exécute les préchargeurs enregistrés (startup)
+    """
+
+    def __init__(
+        self,
+        memory_budget_mb: float = 0,
+        min_idle_sec: float = 60.0,
+    ):
+        self.memory_budget_mb = memory_budget_mb
+        self.min_idle_sec = min_idle_sec
+        self._entries: "OrderedDict[str, ModelEntry]" = OrderedDict()  # Ordre LRU
+        self._preloaders: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.RLock()
+
+    # ----------------------------------------
+    # REGISTRATION
+    # ----------------------------------------
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        kind: str = "model",
+        size_mb: Optional[float] = None,
+        pinned: bool = False,
+        unloader: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        """Déclare un modèle (le premier enregistrement gagne)"""
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = ModelEntry(
+                    name=name,
+                    loader=loader,
+                    kind=kind,
+                    size_mb=size_mb,
+                    pinned=pinned,
+                    unloader=unloader,
+                )
+
+    def register_preloader(self, alias: str, preload: Callable[[], Any]) -> None:
+        """Déclare un préchargeur (alias utilisable dans MODEL_PRELOAD)"""
+        with self._lock:
+            self._preloaders.setdefault(alias, preload)
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._entries
+
+    def is_loaded(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return entry is not None and entry.loaded
+
+    # ----------------------------------------
+    # ACCESS
+    # ----------------------------------------
+
+    def get(self, name: str) -> Any:
+        """
+        Retourne l'instance partagée du modèle, en la chargeant si nécessaire
+
+        Les appels concurrents pendant un chargement attendent le même
+        chargement (un seul exemplaire en mémoire).
+
+        Raises:
+            KeyError: modèle non enregistré
+            Exception: erreur du loader (propagée, rien n'est mis en cache)
+        """
+        entry = self._entry(name)
+
+        instance = entry.instance
+        if instance is not None:
+            self._touch(entry, hit=True)
+            return instance
+
+        with entry.lock:
+            if entry.instance is None:
+                self._load(entry)
+            else:
+                entry.hits += 1
+            instance = entry.instance
+
+        self._touch(entry)
+        self._enforce_budget(keep=name)
+        return instance
+
+    def get_or_load(self, name: str, loader: Callable[[], Any], **options) -> Any:
+        """register() + get()"""
+        self.register(name, loader, **options)
+        return self.get(name)
+
+    @contextmanager
+    def lease(self, name: str) -> Iterator[Any]:
+        """Utilise un modèle sans qu'il puisse être déchargé entre-temps"""
+        entry = self._entry(name)
+        with self._lock:
+            entry.leases += 1
+        try:
+            yield self.get(name)
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                entry.last_used = time.time()
+
+    def unload(self, name: str) -> bool:
+        """Décharge un modèle (rechargé au prochain get)"""
+        entry = self._entry(name)
+        with entry.lock:
+            if entry.instance is None:
+                return False
+            self._unload(entry)
+            return True
+
+    # ----------------------------------------
+    # PRELOAD
+    # ----------------------------------------
+
+    def preload(self, aliases: List[str]) -> Dict[str, Any]:
+        """
+        Précharge des modèles (alias de préchargeur ou nom de modèle)
+
+        Un échec n'empêche pas les autres préchargements.
+
+        Returns:
+            {alias: "loaded" | message d'erreur}
+        """
+        results = {}
+        for alias in aliases:
+            start = time.time()
+            try:
+                if alias in self._preloaders:
+                    self._preloaders[alias]()
+                elif alias in self._entries:
+                    self.get(alias)
+                else:
+                    results[alias] = "unknown model"
+                    logger.warning(f"Preload: unknown model '{alias}'")
+                    continue
+                results[alias] = "loaded"
+                logger.info(f"Preloaded {alias} in {time.time() - start:.1f}s")
+            except Exception as e:
+                results[alias] = f"error: {e}"
+                logger.error(f"Preload {alias} failed: {e}")
+        return results
+
+    # ----------------------------------------
+    # STATS
+    # ----------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = [entry.to_dict() for entry in self._entries.values()]
+            resident = self._resident_mb()
+        return {
+            "memory_budget_mb": self.memory_budget_mb or None,
+            "resident_mb": round(resident, 1),
+            "loaded": sum(1 for m in models if m["loaded"]),
+            "preloaders": sorted(self._preloaders),
+            "process_rss_mb": round(_process_rss_mb(), 1) if PSUTIL_AVAILABLE else None,
+            "models": models,
+        }
+
+    # ----------------------------------------
+    # INTERNALS
+    # ----------------------------------------
+
+    def _entry(self, name: str) -> ModelEntry:
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Model not registered: {name}")
+        return entry
+
+    def _touch(self, entry: ModelEntry, hit: bool = False) -> None:
+        with self._lock:
+            entry.last_used = time.time()
+            if hit:
+                entry.hits += 1
+            if entry.name in self._entries:
+                self._entries.move_to_end(entry.name)
+
+    def _load(self, entry: ModelEntry) -> None:
+        """Charge le modèle (appelé sous entry.lock)"""
+        if entry.size_mb:
+            # Libérer la place avant de charger si la taille est connue
+            self._enforce_budget(keep=entry.name, incoming_mb=entry.size_mb)
+
+        logger.info(f"Loading model {entry.name}")
+        rss_before = _process_rss_mb()
+        start = time.time()
+        instance = entry.loader()
+        load_time = time.time() - start
+        rss_after = _process_rss_mb()
+
+        measured = _parameters_mb(instance)
+        if measured is None and rss_before is not None and rss_after is not None:
+            measured = max(0.0, rss_after - rss_before)
+
+        entry.instance = instance
+        entry.resident_mb = entry.size_mb or measured or 0.0
+        entry.load_time_ms = int(load_time * 1000)
+        entry.loads += 1
+
+        if METRICS_AVAILABLE:
+            MODEL_LOAD_SECONDS.labels(model=entry.name).set(load_time)
+            MODEL_RESIDENT_MB.labels(model=entry.name).set(entry.resident_mb)
+        logger.info(f"Model {entry.name} loaded in {load_time:.1f}s (~{entry.resident_mb:.0f} MB)")
+
+    def _unload(self, entry: ModelEntry) -> None:
+        """Décharge le modèle (appelé sous entry.lock)"""
+        instance, entry.instance = entry.instance, None
+        if entry.unloader:
+            try:
+                entry.unloader(instance)
+            except Exception as e:
+                logger.warning(f"Unloader for {entry.name} failed: {e}")
+        del instance
+        gc.collect()
+        _empty_device_cache()
+
+        if METRICS_AVAILABLE:
+            MODEL_RESIDENT_MB.labels(model=entry.name).set(0)
+        logger.info(f"Model {entry.name} unloaded ({entry.resident_mb:.0f} MB)")
+
+    def _resident_mb(self) -> float:
+        return sum(e.resident_mb for e in self._entries.values() if e.loaded)
+
+    def _enforce_budget(self, keep: str, incoming_mb: float = 0.0) -> None:
+        """Décharge les modèles inactifs les moins récemment utilisés (LRU)"""
+        if not self.memory_budget_mb:
+            return
+
+        now = time.time()
+        with self._lock:
+            if self._resident_mb() + incoming_mb <= self.memory_budget_mb:
+                return
+            candidates = [
+                e for e in self._entries.values()  # Du moins au plus récent
+                if e.loaded and e.name != keep and not e.pinned and e.leases == 0
+                and now - e.last_used >= self.min_idle_sec
+            ]
+
+        for entry in candidates:
+            if self._resident_mb() + incoming_mb <= self.memory_budget_mb:
+                return
+            # Ne pas bloquer sur un modèle en cours de (dé)chargement
+            if not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.instance is not None and entry.leases == 0:
+                    self._unload(entry)
+                    entry.evictions += 1
+            finally:
+                entry.lock.release()
+
+        if self._resident_mb() + incoming_mb > self.memory_budget_mb:
+            logger.warning(
+                f"Model memory budget exceeded: {self._resident_mb() + incoming_mb:.0f} MB "
+                f"> {self.memory_budget_mb:.0f} MB (no idle model to unload)"
+            )
+
+
+def _empty_device_cache() -> None:
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+# ============================================
+# SHARED LOADERS
+# ============================================
+
+def shared_cross_encoder(model_name: str) -> Any:
+    """CrossEncoder partagé (reranking)"""
+    def load():
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(model_name)
+
+    return get_model_registry().get_or_load(f"cross-encoder:{model_name}", load, kind="reranker")
+
+
+def shared_sentence_transformer(model_name: str, device: Optional[str] = None) -> Any:
+    """SentenceTransformer partagé (embeddings)"""
+    def load():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name, device=device)
+
+    return get_model_registry().get_or_load(
+        f"sentence-transformer:{model_name}:{device or 'auto'}", load, kind="embedding"
+    )
+
+
+# ============================================
+# SINGLETON
+# ============================================
+
+_model_registry: Optional[ModelRegistry] = None
+_model_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Retourne le registre de modèles du processus"""
+    global _model_registry
+    if _model_registry is None:
+        with _model_registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry(
+                    memory_budget_mb=float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0")),
+                    min_idle_sec=float(os.getenv("MODEL_MIN_IDLE_SEC", "60")),
+                )
+    return _model_registry
+
+
+def preload_configured_models() -> Dict[str, Any]:
+    """Précharge les modèles listés dans MODEL_PRELOAD (appelé au démarrage)"""
+    aliases = [a.strip() for a in os.getenv("MODEL_PRELOAD", "").split(",") if a.strip()]
+    if not aliases:
+        return {}
+    return get_model_registry().preload(aliases)
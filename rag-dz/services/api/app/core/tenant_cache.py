@@ -0,0 +1,289 @@
+"""
+Tenant Cache - Résolution API key → tenant
+==========================================
+Cache en mémoire (TTL + LRU) devant la requête api_keys/tenants
+
+- Clé: SHA-256 de l'API key (la clé en clair n'est jamais conservée)
+- Cache négatif court pour les clés invalides (scans, clients mal configurés)
+- Requêtes simultanées pour la même clé: une seule lecture base (single-flight)
+- Lecture via le pool async de app.db (plus de connexion TCP par requête)
+- Invalidation à la révocation: LISTEN/NOTIFY Postgres (trigger de la
+  migration 020) ou canal Redis pub/sub, le TTL reste le filet de sécurité
+
+Configuration (env):
+- TENANT_CACHE_TTL_SEC: durée de vie d'un tenant résolu (défaut 60)
+- TENANT_CACHE_NEGATIVE_TTL_SEC: durée de vie d'une clé invalide (défaut 10)
+- TENANT_CACHE_MAX_ENTRIES: taille max (défaut 10000)
+- TENANT_CACHE_INVALIDATION: postgres | redis | none (défaut postgres)
+- TENANT_CACHE_CHANNEL: canal NOTIFY / pub-sub (défaut api_key_changes)
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Callable, Awaitable
+
+
+logger = logging.getLogger(__name__)
+
+TENANT_CACHE_TTL_SEC = float(os.getenv("TENANT_CACHE_TTL_SEC", "60"))
+TENANT_CACHE_NEGATIVE_TTL_SEC = float(os.getenv("TENANT_CACHE_NEGATIVE_TTL_SEC", "10"))
+TENANT_CACHE_MAX_ENTRIES = int(os.getenv("TENANT_CACHE_MAX_ENTRIES", "10000"))
+TENANT_CACHE_INVALIDATION = os.getenv("TENANT_CACHE_INVALIDATION", "postgres").lower()
+TENANT_CACHE_CHANNEL = os.getenv("TENANT_CACHE_CHANNEL", "api_key_changes")
+
+
+def hash_api_key(api_key: str) -> str:
+    """Même hash que api_keys.key_hash"""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+# ============================================
+# CACHE TTL + LRU
+# ============================================
+
+class TenantCache:
+    """
+    Cache key_hash → tenant (ou None pour une clé invalide)
+
+    Thread-safe; les entrées expirées sont ignorées à la lecture.
+    """
+
+    def __init__(
+        self,
+        ttl_sec: float = TENANT_CACHE_TTL_SEC,
+        negative_ttl_sec: float = TENANT_CACHE_NEGATIVE_TTL_SEC,
+        max_entries: int = TENANT_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl_sec = ttl_sec
+        self.negative_ttl_sec = negative_ttl_sec
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[dict], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+        # Incrémenté à chaque invalidation: une lecture base commencée avant
+        # une révocation ne doit pas être remise en cache après
+        self.generation = 0
+
+    def get(self, key_hash: str) -> Tuple[bool, Optional[dict]]:
+        """(trouvé, tenant): trouvé=True avec tenant=None pour une clé invalide en cache"""
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key_hash]
+                self.stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key_hash)
+            self.stats["hits" if entry[0] is not None else "negative_hits"] += 1
+            return True, entry[0]
+
+    def put(self, key_hash: str, tenant: Optional[dict], generation: Optional[int] = None) -> None:
+        ttl = self.ttl_sec if tenant is not None else self.negative_ttl_sec
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key_hash] = (tenant, time.monotonic() + ttl)
+            self._entries.move_to_end(key_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, key_hash: str) -> bool:
+        with self._lock:
+            self.generation += 1
+            removed = self._entries.pop(key_hash, None) is not None
+            if removed:
+                self.stats["invalidations"] += 1
+            return removed
+
+    def invalidate_tenant(self, tenant_id: str) -> int:
+        """Supprime toutes les clés d'un tenant (suspension, changement de plan)"""
+        with self._lock:
+            self.generation += 1
+            keys = [k for k, (tenant, _) in self._entries.items() if tenant and tenant.get("id") == tenant_id]
+            for key in keys:
+                del self._entries[key]
+            self.stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["negative_hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_ratio": round((lookups - self.stats["misses"]) / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "ttl_sec": self.ttl_sec,
+                "negative_ttl_sec": self.negative_ttl_sec,
+            }
+
+
+# ============================================
+# RÉSOLUTION
+# ============================================
+
+async def _db_lookup(key_hash: str) -> Optional[dict]:
+    from ..db import get_tenant_by_key_hash_async
+    return await get_tenant_by_key_hash_async(key_hash)
+
+
+class TenantResolver:
+    """
+    Résolution API key → tenant avec cache et single-flight
+
+    Une erreur base de données n'est pas mise en cache et refuse la requête
+    (même comportement que get_tenant_by_key).
+    """
+
+    def __init__(
+        self,
+        cache: Optional[TenantCache] = None,
+        lookup: Optional[Callable[[str], Awaitable[Optional[dict]]]] = None,
+    ):
+        self.cache = cache or TenantCache()
+        self._lookup = lookup or _db_lookup
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    async def resolve(self, api_key: str) -> Optional[dict]:
+        if not api_key:
+            return None
+        key_hash = hash_api_key(api_key)
+
+        found, tenant = self.cache.get(key_hash)
+        if found:
+            return tenant
+
+        pending = self._inflight.get(key_hash)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key_hash] = future
+        generation = self.cache.generation
+        try:
+            tenant = await self._lookup(key_hash)
+            self.cache.put(key_hash, tenant, generation)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Tenant lookup failed: {e}")
+            tenant = None
+        finally:
+            self._inflight.pop(key_hash, None)
+        future.set_result(tenant)
+        return tenant
+
+    # ----------------------------------------
+    # INVALIDATION
+    # ----------------------------------------
+
+    def handle_invalidation(self, payload: str) -> None:
+        """
+        Message d'invalidation (NOTIFY ou pub/sub)
+
+        Formats: {"key_hash": "..."}, {"tenant_id": "..."}, "*" (tout vider)
+        ou un key_hash brut.
+        """
+        payload = (payload or "").strip()
+        if payload == "*":
+            self.cache.clear()
+            return
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            message = {"key_hash": payload}
+        if not isinstance(message, dict):
+            return
+        if message.get("key_hash"):
+            self.cache.invalidate(message["key_hash"])
+        if message.get("tenant_id"):
+            self.cache.invalidate_tenant(str(message["tenant_id"]))
+
+    def start_listener(self, mode: str = TENANT_CACHE_INVALIDATION, channel: str = TENANT_CACHE_CHANNEL) -> None:
+        """Écoute les révocations en tâche de fond (reconnexion automatique)"""
+        if self._listener is not None or mode == "none":
+            return
+        listen = self._listen_redis if mode == "redis" else self._listen_postgres
+        self._listener = asyncio.create_task(self._run_listener(listen, channel), name="tenant-cache-listener")
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    async def _run_listener(self, listen: Callable[[str], Awaitable[None]], channel: str) -> None:
+        delay = 1.0
+        while True:
+            try:
+                await listen(channel)
+                delay = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Tenant cache listener disconnected: {e} (retry in {delay:.0f}s)")
+            # Messages perdus pendant la coupure: repartir d'un cache vide
+            self.cache.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    async def _listen_postgres(self, channel: str) -> None:
+        import psycopg
+        from ..config import get_settings
+
+        async with await psycopg.AsyncConnection.connect(get_settings().postgres_url, autocommit=True) as conn:
+            await conn.execute(f"LISTEN {channel}")
+            logger.info(f"Tenant cache: LISTEN {channel}")
+            async for notify in conn.notifies():
+                self.handle_invalidation(notify.payload)
+
+    async def _listen_redis(self, channel: str) -> None:
+        import redis.asyncio as aioredis
+        from ..config import get_settings
+
+        settings = get_settings()
+        client = aioredis.from_url(settings.redis_url, password=settings.redis_password or None, decode_responses=True)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            logger.info(f"Tenant cache: SUBSCRIBE {channel}")
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    self.handle_invalidation(message.get("data", ""))
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+# ============================================
+# INSTANCE GLOBALE
+# ============================================
+
+_resolver: Optional[TenantResolver] = None
+
+
+def get_tenant_resolver() -> TenantResolver:
+    global _resolver
+    if _resolver is None:
+        _resolver = TenantResolver()
+    return _resolver
+
+
+async def resolve_tenant(api_key: str) -> Optional[dict]:
+    """Tenant actif pour une API key (cache + pool async)"""
+    return await get_tenant_resolver().resolve(api_key)
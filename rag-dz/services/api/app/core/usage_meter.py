@@ -0,0 +1,448 @@
+"""
+Usage Meter - Metering asynchrone par lots
+==========================================
+Enregistrement des événements d'usage (usage_events) hors du chemin des requêtes
+
+- record(): ajout dans une file mémoire bornée, aucune I/O côté requête
+- Tâche de fond: vidage par lots via COPY dans une table temporaire puis
+  INSERT ... SELECT (COPY FROM n'est pas supporté sur une table soumise au RLS)
+- Rollups tenant/minute (usage_rollups_minute, migration 021) mis à jour dans
+  la même transaction que le lot: billing et quotas lisent l'agrégat
+- Chaque événement porte un event_id (migration 025): un lot expiré côté
+  client mais committé côté serveur est rejoué sans doublon, ni dans
+  usage_events ni dans les rollups
+- Postgres lent ou indisponible: les lots sont déversés sur disque (JSONL)
+  et rejoués dès qu'un vidage réussit
+- Lot refusé pour données invalides (DataError/IntegrityError): coupé en deux
+  jusqu'à isoler les lignes fautives, seules écartées en .rejected
+- File pleine (base et disque en retard): l'événement est abandonné et compté
+
+Configuration (env):
+- USAGE_QUEUE_MAX: événements en attente max (défaut 50000)
+- USAGE_BATCH_SIZE: événements par lot (défaut 500)
+- USAGE_FLUSH_INTERVAL_SEC: délai max avant vidage (défaut 2)
+- USAGE_FLUSH_TIMEOUT_SEC: au-delà, le lot part sur disque (défaut 5)
+- USAGE_SPILL_DIR: dossier des lots en attente de rejeu
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import tempfile
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+
+
+try:
+    from psycopg import DataError, IntegrityError
+    DATA_ERRORS: Tuple[type, ...] = (DataError, IntegrityError)
+except ImportError:
+    DATA_ERRORS = ()
+
+logger = logging.getLogger(__name__)
+
+USAGE_QUEUE_MAX = int(os.getenv("USAGE_QUEUE_MAX", "50000"))
+USAGE_BATCH_SIZE = int(os.getenv("USAGE_BATCH_SIZE", "500"))
+USAGE_FLUSH_INTERVAL_SEC = float(os.getenv("USAGE_FLUSH_INTERVAL_SEC", "2"))
+USAGE_FLUSH_TIMEOUT_SEC = float(os.getenv("USAGE_FLUSH_TIMEOUT_SEC", "5"))
+DEFAULT_SPILL_DIR = os.path.join(tempfile.gettempdir(), "iafactory_usage_spill")
+
+USAGE_COLUMNS = (
+    "tenant_id", "request_id", "route", "method",
+    "tokens_input", "tokens_output", "audio_seconds", "ocr_pages",
+    "latency_ms", "model_used", "status_code", "event_id", "created_at",
+)
+
+UsageRow = Tuple[Any, ...]
+
+# Issue d'une écriture de lot
+WRITTEN, RETRY, INVALID = "written", "retry", "invalid"
+
+
+def usage_row(event: dict) -> UsageRow:
+    """Événement → ligne usage_events (mêmes défauts que insert_usage, identifiant et horodatage à l'enregistrement)"""
+    return (
+        event.get("tenant_id"),
+        event.get("request_id"),
+        event.get("route"),
+        event.get("method", "POST"),
+        event.get("tokens_input", 0),
+        event.get("tokens_output", 0),
+        event.get("audio_seconds", 0),
+        event.get("ocr_pages", 0),
+        event.get("latency_ms", 0),
+        event.get("model_used", "unknown"),
+        event.get("status_code", 200),
+        event.get("event_id") or str(uuid.uuid4()),
+        event.get("created_at") or datetime.now(timezone.utc),
+    )
+
+
+# ============================================
+# ÉCRITURE POSTGRES
+# ============================================
+
+_COLUMNS_SQL = ", ".join(USAGE_COLUMNS)
+
+# Temporaire par connexion du pool, vidée à chaque COMMIT
+STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS usage_events_staging (
+        tenant_id UUID, request_id VARCHAR(255), route VARCHAR(255), method VARCHAR(10),
+        tokens_input INTEGER, tokens_output INTEGER, audio_seconds REAL, ocr_pages INTEGER,
+        latency_ms INTEGER, model_used VARCHAR(100), status_code INTEGER,
+        event_id UUID, created_at TIMESTAMP WITH TIME ZONE
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Un seul ordre: les rollups n'agrègent que les lignes réellement insérées,
+# un lot rejoué après un timeout (déjà committé) ne compte pas deux fois
+INSERT_FROM_STAGING_SQL = f"""
+    WITH inserted AS (
+        INSERT INTO usage_events ({_COLUMNS_SQL})
+        SELECT {_COLUMNS_SQL} FROM usage_events_staging
+        ON CONFLICT (event_id) DO NOTHING
+        RETURNING tenant_id, created_at, status_code, tokens_input, tokens_output,
+                  audio_seconds, ocr_pages, latency_ms
+    )
+    INSERT INTO usage_rollups_minute
+        (tenant_id, bucket, requests, errors, tokens_input, tokens_output,
+         audio_seconds, ocr_pages, latency_ms_total)
+    SELECT tenant_id, date_trunc('minute', created_at), COUNT(*),
+           COUNT(*) FILTER (WHERE status_code >= 500),
+           COALESCE(SUM(tokens_input), 0), COALESCE(SUM(tokens_output), 0),
+           COALESCE(SUM(audio_seconds), 0), COALESCE(SUM(ocr_pages), 0),
+           COALESCE(SUM(latency_ms), 0)
+    FROM inserted
+    GROUP BY 1, 2
+    ON CONFLICT (tenant_id, bucket) DO UPDATE SET
+        requests = usage_rollups_minute.requests + EXCLUDED.requests,
+        errors = usage_rollups_minute.errors + EXCLUDED.errors,
+        tokens_input = usage_rollups_minute.tokens_input + EXCLUDED.tokens_input,
+        tokens_output = usage_rollups_minute.tokens_output + EXCLUDED.tokens_output,
+        audio_seconds = usage_rollups_minute.audio_seconds + EXCLUDED.audio_seconds,
+        ocr_pages = usage_rollups_minute.ocr_pages + EXCLUDED.ocr_pages,
+        latency_ms_total = usage_rollups_minute.latency_ms_total + EXCLUDED.latency_ms_total
+"""
+
+TENANT_USAGE_SQL = """
+    SELECT COALESCE(SUM(requests), 0), COALESCE(SUM(errors), 0),
+           COALESCE(SUM(tokens_input), 0), COALESCE(SUM(tokens_output), 0),
+           COALESCE(SUM(audio_seconds), 0), COALESCE(SUM(ocr_pages), 0)
+    FROM usage_rollups_minute
+    WHERE tenant_id = %s AND bucket >= date_trunc('minute', %s::TIMESTAMPTZ)
+"""
+
+
+async def write_usage_batch(rows: List[UsageRow]) -> None:
+    """Un lot = une transaction: COPY, puis insertion usage_events et rollups (idempotente par event_id)"""
+    from ..db import get_tenant_connection
+
+    # Lot multi-tenants: contexte super-admin local à la transaction
+    async with get_tenant_connection(is_superadmin=True) as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(STAGING_SQL)
+            async with cur.copy(f"COPY usage_events_staging ({_COLUMNS_SQL}) FROM STDIN") as copy:
+                for row in rows:
+                    await copy.write_row(row)
+            await cur.execute(INSERT_FROM_STAGING_SQL)
+
+
+async def get_tenant_usage(tenant_id: str, since: datetime) -> Dict[str, Any]:
+    """
+    Usage agrégé d'un tenant depuis `since` (billing, quotas)
+
+    Lu dans les rollups: les événements encore en file (au plus
+    USAGE_FLUSH_INTERVAL_SEC) ne sont pas comptés.
+    """
+    from ..db import get_tenant_connection
+
+    async with get_tenant_connection(tenant_id) as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(TENANT_USAGE_SQL, (tenant_id, since), prepare=True)
+            row = await cur.fetchone()
+
+    return {
+        "requests": int(row[0]),
+        "errors": int(row[1]),
+        "tokens_input": int(row[2]),
+        "tokens_output": int(row[3]),
+        "audio_seconds": float(row[4]),
+        "ocr_pages": int(row[5]),
+    }
+
+
+# ============================================
+# METER
+# ============================================
+
+class UsageMeter:
+    """
+    File d'événements d'usage vidée par lots en tâche de fond
+
+    record() est thread-safe et ne bloque jamais.
+    """
+
+    def __init__(
+        self,
+        writer: Optional[Callable[[List[UsageRow]], Awaitable[None]]] = None,
+        max_queue: int = USAGE_QUEUE_MAX,
+        batch_size: int = USAGE_BATCH_SIZE,
+        flush_interval_sec: float = USAGE_FLUSH_INTERVAL_SEC,
+        flush_timeout_sec: float = USAGE_FLUSH_TIMEOUT_SEC,
+        spill_dir: Optional[str] = None,
+    ):
+        self._writer = writer or write_usage_batch
+        self.max_queue = max_queue
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_sec = flush_interval_sec
+        self.flush_timeout_sec = flush_timeout_sec
+        self.spill_dir = Path(spill_dir or os.getenv("USAGE_SPILL_DIR", DEFAULT_SPILL_DIR))
+        self._queue: deque = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.stats = {
+            "recorded": 0, "dropped": 0, "flushed": 0, "batches": 0,
+            "failures": 0, "spilled": 0, "replayed": 0, "rejected": 0,
+        }
+        self.last_flush_ms: Optional[float] = None
+
+    # ----------------------------------------
+    # CHEMIN REQUÊTE
+    # ----------------------------------------
+
+    def record(self, event: dict) -> bool:
+        """Met l'événement en file (False si la file est pleine)"""
+        if len(self._queue) >= self.max_queue:
+            self.stats["dropped"] += 1
+            return False
+        self._queue.append(usage_row(event))
+        self.stats["recorded"] += 1
+        if len(self._queue) >= self.batch_size:
+            self._wake()
+        return True
+
+    def _wake(self) -> None:
+        if self._wakeup is None or self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # ----------------------------------------
+    # CYCLE DE VIE
+    # ----------------------------------------
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="usage-meter")
+        logger.info(f"Usage meter started (batch={self.batch_size}, interval={self.flush_interval_sec}s)")
+
+    async def stop(self) -> None:
+        """Dernier vidage (ou déversement sur disque) avant l'arrêt"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval_sec)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Usage meter flush error: {e}")
+            if self._stopping:
+                return
+
+    # ----------------------------------------
+    # VIDAGE
+    # ----------------------------------------
+
+    async def flush(self) -> int:
+        """Vide la file par lots puis rejoue les lots sur disque; retourne les événements écrits"""
+        written = 0
+        while self._queue:
+            batch = self._take_batch()
+            count, retry = await self._write_isolating(batch)
+            written += count
+            if retry:
+                # Base lente/indisponible: ce qui attend part sur disque
+                while self._queue:
+                    retry.extend(self._take_batch())
+                await asyncio.to_thread(self._spill, retry)
+                return written
+
+        written += await self._replay_spill()
+        return written
+
+    def _take_batch(self) -> List[UsageRow]:
+        return [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+
+    async def _write(self, rows: List[UsageRow]) -> str:
+        """WRITTEN, RETRY (erreur transitoire, timeout) ou INVALID (données refusées)"""
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._writer(rows), self.flush_timeout_sec)
+        except asyncio.CancelledError:
+            raise
+        except DATA_ERRORS as e:
+            self.stats["failures"] += 1
+            logger.warning(f"Usage batch rejected by the database ({len(rows)} events): {e!r}")
+            return INVALID
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.warning(f"Usage batch write failed ({len(rows)} events): {e!r}")
+            return RETRY
+        self.last_flush_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.stats["batches"] += 1
+        self.stats["flushed"] += len(rows)
+        return WRITTEN
+
+    async def _write_isolating(self, rows: List[UsageRow]) -> Tuple[int, List[UsageRow]]:
+        """
+        Écrit le lot; refusé pour données invalides, il est coupé en deux
+        jusqu'à isoler les lignes fautives, mises en quarantaine.
+
+        Retourne (événements écrits, lignes à réessayer plus tard).
+        """
+        if not rows:
+            return 0, []
+        status = await self._write(rows)
+        if status == WRITTEN:
+            return len(rows), []
+        if status == RETRY:
+            return 0, list(rows)
+        if len(rows) == 1:
+            await asyncio.to_thread(self._quarantine, rows)
+            return 0, []
+        middle = len(rows) // 2
+        written, retry = await self._write_isolating(rows[:middle])
+        if retry:
+            return written, retry + list(rows[middle:])
+        count, retry = await self._write_isolating(rows[middle:])
+        return written + count, retry
+
+    # ----------------------------------------
+    # DÉVERSEMENT DISQUE
+    # ----------------------------------------
+
+    def _spill(self, rows: List[UsageRow]) -> None:
+        """Un fichier par lot (rejeu lot par lot, sans doublon partiel)"""
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(0, len(rows), self.batch_size):
+            self._write_spill_file(self.spill_dir / f"{time.time_ns()}_{i}.jsonl", rows[i:i + self.batch_size])
+        self.stats["spilled"] += len(rows)
+        logger.warning(f"Usage meter: {len(rows)} events spilled to {self.spill_dir}")
+
+    def _quarantine(self, rows: List[UsageRow]) -> None:
+        """Lignes refusées par la base: écartées en .rejected (jamais rejouées)"""
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self._write_spill_file(self.spill_dir / f"{time.time_ns()}.rejected", rows)
+        self.stats["rejected"] += len(rows)
+        logger.error(f"Usage meter: {len(rows)} events rejected by the database, kept in {self.spill_dir}")
+
+    @staticmethod
+    def _write_spill_file(path: Path, rows: List[UsageRow]) -> None:
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps([*row[:-1], row[-1].isoformat()]) + "\n")
+        os.replace(tmp, path)
+
+    def _spill_files(self) -> List[Path]:
+        if not self.spill_dir.exists():
+            return []
+        return sorted(self.spill_dir.glob("*.jsonl"))
+
+    @staticmethod
+    def _load_spill(path: Path) -> List[UsageRow]:
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    values = json.loads(line)
+                    if len(values) == len(USAGE_COLUMNS) - 1:
+                        # Fichier antérieur à event_id (migration 025)
+                        values.insert(-1, str(uuid.uuid4()))
+                    rows.append((*values[:-1], datetime.fromisoformat(values[-1])))
+        return rows
+
+    async def _replay_spill(self) -> int:
+        """
+        Rejoue les lots sur disque, du plus ancien au plus récent.
+
+        Erreur transitoire: arrêt, le lot reste sur disque pour le prochain
+        vidage. Données invalides: seules les lignes fautives sont écartées.
+        """
+        replayed = 0
+        for path in await asyncio.to_thread(self._spill_files):
+            try:
+                rows = await asyncio.to_thread(self._load_spill, path)
+            except (OSError, ValueError) as e:
+                logger.error(f"Unreadable usage spill file {path.name}: {e}")
+                await asyncio.to_thread(os.replace, path, path.with_suffix(".rejected"))
+                continue
+            count, retry = await self._write_isolating(rows)
+            self.stats["replayed"] += count
+            replayed += count
+            if retry:
+                if len(retry) < len(rows):
+                    # Lot entamé: on ne garde que le reste (pas de doublon au rejeu)
+                    await asyncio.to_thread(self._write_spill_file, path, retry)
+                break
+            await asyncio.to_thread(path.unlink)
+        return replayed
+
+    # ----------------------------------------
+    # STATS
+    # ----------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "queued": len(self._queue),
+            "spill_files": len(self._spill_files()),
+            "last_flush_ms": self.last_flush_ms,
+            "running": self._task is not None,
+        }
+
+
+# ============================================
+# INSTANCE GLOBALE
+# ============================================
+
+_usage_meter: Optional[UsageMeter] = None
+
+
+def get_usage_meter() -> UsageMeter:
+    global _usage_meter
+    if _usage_meter is None:
+        _usage_meter = UsageMeter()
+    return _usage_meter
+
+
+def record_usage(event: dict) -> bool:
+    """Enregistre un événement d'usage sans I/O (vidé en arrière-plan)"""
+    return get_usage_meter().record(event)
@@ -0,0 +1,461 @@
+"""
+WS Broker - État WebSocket partagé entre workers / replicas
+===========================================================
+Backend du ConnectionManager (app/websocket.py) pour les salons de chat:
+diffusion des messages, présence, indicateurs de frappe, numéros de
+séquence et rejeu après reconnexion.
+
+Backends:
+- memory: un seul processus (défaut, comportement historique)
+- redis: plusieurs workers uvicorn / replicas
+    * messages de salon: INCR (séquence) + XADD (journal de rejeu) +
+      PUBLISH dans un seul script Lua, donc un aller-retour par message
+    * présence et frappe: ZSET par salon, score = expiration; chaque nœud
+      rafraîchit ses membres locaux, ceux d'un nœud mort expirent seuls
+    * un seul canal pub/sub par préfixe, chaque nœud ne livre qu'à ses
+      connexions locales et ignore ses propres messages (déjà livrés)
+
+Séquences: chaque message persistant d'un salon reçoit un champ "seq"
+croissant. Un client reconnecté envoie son dernier seq et reçoit les
+messages manqués (dans la limite de WS_REPLAY_SIZE), sinon une demande
+de resynchronisation. Présence et frappe sont éphémères (sans seq).
+
+Configuration (env):
+- WS_BROKER: memory | redis (défaut memory)
+- WS_BROKER_PREFIX: préfixe des clés et du canal Redis (défaut ws)
+- WS_REPLAY_SIZE: messages conservés par salon pour le rejeu (défaut 500)
+- WS_ROOM_TTL_SEC: durée de vie du journal d'un salon inactif (défaut 86400)
+- WS_PRESENCE_TTL_SEC: expiration de la présence sans rafraîchissement (défaut 60)
+- WS_TYPING_TTL_SEC: expiration d'un indicateur de frappe (défaut 10)
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from collections import deque
+from typing import Optional, Dict, Any, List, Set, Tuple, Callable, Deque
+
+
+logger = logging.getLogger(__name__)
+
+WS_BROKER = os.getenv("WS_BROKER", "memory").lower()
+WS_BROKER_PREFIX = os.getenv("WS_BROKER_PREFIX", "ws")
+WS_REPLAY_SIZE = int(os.getenv("WS_REPLAY_SIZE", "500"))
+WS_ROOM_TTL_SEC = int(os.getenv("WS_ROOM_TTL_SEC", "86400"))
+WS_PRESENCE_TTL_SEC = float(os.getenv("WS_PRESENCE_TTL_SEC", "60"))
+WS_TYPING_TTL_SEC = float(os.getenv("WS_TYPING_TTL_SEC", "10"))
+
+# Livraison locale d'un message reçu d'un autre nœud: (meta, texte JSON)
+Deliver = Callable[[Dict[str, Any], str], None]
+
+
+def with_seq(text: str, seq: int) -> str:
+    """Ajoute "seq" en tête d'un objet JSON déjà sérialisé (sans re-sérialiser)"""
+    if text == "{}":
+        return '{"seq":%d}' % seq
+    return '{"seq":%d,%s' % (seq, text[1:])
+
+
+def encode_envelope(meta: Dict[str, Any], text: str) -> str:
+    """Message pub/sub: en-tête JSON, saut de ligne, message tel quel"""
+    return json.dumps(meta, separators=(",", ":")) + "\n" + text
+
+
+def decode_envelope(data: str) -> Tuple[Dict[str, Any], str]:
+    header, _, text = data.partition("\n")
+    return json.loads(header), text
+
+
+# ============================================
+# INTERFACE
+# ============================================
+
+class WSBroker:
+    """
+    Interface commune des backends
+
+    Tient aussi la liste des membres locaux (salon -> users connectés à ce
+    nœud), utilisée pour rafraîchir la présence.
+    """
+
+    name = "base"
+
+    def __init__(self, replay_size: int = WS_REPLAY_SIZE, typing_ttl_sec: float = WS_TYPING_TTL_SEC):
+        self.node_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.replay_size = replay_size
+        self.typing_ttl_sec = typing_ttl_sec
+        self.local_members: Dict[str, Set[int]] = {}
+        self.stats = {"published": 0, "received": 0, "replayed": 0, "errors": 0}
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        pass
+
+    # --- Diffusion ---
+
+    async def publish_room(
+        self, room_id: str, text: str, exclude_user: Optional[int] = None, persist: bool = True
+    ) -> Tuple[Optional[int], str]:
+        """
+        Publie un message de salon vers les autres nœuds
+
+        Retourne (seq, texte à livrer localement); seq est None pour un
+        message éphémère ou si le backend est indisponible.
+        """
+        raise NotImplementedError
+
+    async def publish_tenant(self, tenant_id: str, text: str) -> None:
+        await self._publish_envelope({"node": self.node_id, "kind": "tenant", "tenant_id": tenant_id}, text)
+
+    async def _publish_envelope(self, meta: Dict[str, Any], text: str) -> None:
+        raise NotImplementedError
+
+    def _on_envelope(self, data: str) -> None:
+        """Message reçu du canal: livré aux connexions locales sauf s'il vient de ce nœud"""
+        try:
+            meta, text = decode_envelope(data)
+        except ValueError:
+            logger.warning("WS broker: malformed envelope ignored")
+            return
+        if meta.get("node") == self.node_id or self._deliver is None:
+            return
+        self.stats["received"] += 1
+        self._deliver(meta, text)
+
+    # --- Rejeu ---
+
+    async def replay(self, room_id: str, after_seq: int) -> Tuple[List[str], bool]:
+        """
+        Messages du salon après after_seq
+
+        Retourne (messages, complet); si des messages ont quitté le journal,
+        ([], False): le client doit recharger l'historique.
+        """
+        raise NotImplementedError
+
+    # --- Présence / frappe ---
+
+    async def join(self, room_id: str, user_id: int) -> None:
+        self.local_members.setdefault(room_id, set()).add(user_id)
+
+    async def leave(self, room_id: str, user_id: int) -> None:
+        members = self.local_members.get(room_id)
+        if members is not None:
+            members.discard(user_id)
+            if not members:
+                del self.local_members[room_id]
+
+    async def room_members(self, room_id: str) -> List[int]:
+        raise NotImplementedError
+
+    async def set_typing(self, room_id: str, user_id: int, is_typing: bool) -> None:
+        raise NotImplementedError
+
+    async def typing_users(self, room_id: str) -> List[int]:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "backend": self.name,
+            "node_id": self.node_id,
+            "local_rooms": len(self.local_members),
+        }
+
+
+# ============================================
+# BACKEND MÉMOIRE (un seul nœud)
+# ============================================
+
+class InMemoryBroker(WSBroker):
+    """Séquences et journal en mémoire; aucun autre nœud à prévenir"""
+
+    name = "memory"
+
+    def __init__(self, replay_size: int = WS_REPLAY_SIZE, typing_ttl_sec: float = WS_TYPING_TTL_SEC):
+        super().__init__(replay_size, typing_ttl_sec)
+        self.seqs: Dict[str, int] = {}
+        self.logs: Dict[str, Deque[Tuple[int, str]]] = {}
+        self.typing: Dict[str, Dict[int, float]] = {}
+
+    async def publish_room(self, room_id, text, exclude_user=None, persist=True):
+        seq = None
+        if persist:
+            seq = self.seqs.get(room_id, 0) + 1
+            self.seqs[room_id] = seq
+            text = with_seq(text, seq)
+            log = self.logs.get(room_id)
+            if log is None:
+                log = self.logs[room_id] = deque(maxlen=self.replay_size)
+            log.append((seq, text))
+        meta = {"node": self.node_id, "kind": "room", "room_id": room_id, "exclude": exclude_user}
+        await self._publish_envelope(meta, text)
+        return seq, text
+
+    async def _publish_envelope(self, meta, text):
+        self.stats["published"] += 1
+
+    async def replay(self, room_id, after_seq):
+        current = self.seqs.get(room_id, 0)
+        log = self.logs.get(room_id, ())
+        texts = [text for seq, text in log if seq > after_seq]
+        if after_seq > current or len(texts) != current - after_seq:
+            return [], False  # journal réinitialisé ou messages déjà évincés
+        self.stats["replayed"] += len(texts)
+        return texts, True
+
+    async def room_members(self, room_id):
+        return sorted(self.local_members.get(room_id, ()))
+
+    async def set_typing(self, room_id, user_id, is_typing):
+        users = self.typing.setdefault(room_id, {})
+        if is_typing:
+            users[user_id] = time.monotonic() + self.typing_ttl_sec
+        else:
+            users.pop(user_id, None)
+
+    async def typing_users(self, room_id):
+        now = time.monotonic()
+        users = self.typing.get(room_id, {})
+        for user_id in [u for u, expires in users.items() if expires <= now]:
+            del users[user_id]
+        return sorted(users)
+
+
+# ============================================
+# BACKEND REDIS (multi-nœuds)
+# ============================================
+
+# KEYS: seq, journal (même slot Cluster)  ARGV: message, taille journal, TTL, en-tête, canal
+# Le canal n'est pas une clé: le pub/sub Redis Cluster est diffusé à tous les nœuds
+_PUBLISH_ROOM_LUA = """
+local seq = redis.call('INCR', KEYS[1])
+local text
+if ARGV[1] == '{}' then
+    text = '{"seq":' .. seq .. '}'
+else
+    text = '{"seq":' .. seq .. ',' .. string.sub(ARGV[1], 2)
+end
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], seq .. '-0', 'm', text)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('PUBLISH', ARGV[5], ARGV[4] .. '\\n' .. text)
+return seq
+"""
+
+
+class RedisBroker(WSBroker):
+    """Pub/sub + streams Redis; connexion établie au start()"""
+
+    name = "redis"
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        prefix: str = WS_BROKER_PREFIX,
+        replay_size: int = WS_REPLAY_SIZE,
+        room_ttl_sec: int = WS_ROOM_TTL_SEC,
+        presence_ttl_sec: float = WS_PRESENCE_TTL_SEC,
+        typing_ttl_sec: float = WS_TYPING_TTL_SEC,
+    ):
+        super().__init__(replay_size, typing_ttl_sec)
+        self.redis_url = redis_url
+        self.prefix = prefix
+        self.channel = f"{prefix}:events"
+        self.room_ttl_sec = room_ttl_sec
+        self.presence_ttl_sec = presence_ttl_sec
+        self.listener_connected = False
+        self._client = None
+        self._publish_script = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _key(self, kind: str, room_id: str) -> str:
+        # Hash tag {room_id}: les clés d'une room partagent un slot Redis Cluster
+        return f"{self.prefix}:{kind}:{{{room_id}}}"
+
+    async def start(self, deliver):
+        import redis.asyncio as aioredis
+        from ..config import get_settings
+
+        await super().start(deliver)
+        settings = get_settings()
+        self._client = aioredis.from_url(
+            self.redis_url or settings.redis_url,
+            password=settings.redis_password or None,
+            decode_responses=True,
+        )
+        self._publish_script = self._client.register_script(_PUBLISH_ROOM_LUA)
+        self._tasks = [
+            asyncio.create_task(self._run_listener(), name="ws-broker-listener"),
+            asyncio.create_task(self._run_heartbeat(), name="ws-broker-heartbeat"),
+        ]
+        logger.info(f"WS broker: redis, node {self.node_id}, channel {self.channel}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client is not None:
+            # Présence de ce nœud retirée tout de suite (sinon expiration au TTL)
+            try:
+                async with self._client.pipeline(transaction=False) as pipe:
+                    for room_id, users in self.local_members.items():
+                        pipe.zrem(self._key("presence", room_id), *users)
+                    await pipe.execute()
+            except Exception as e:
+                logger.debug(f"WS broker: presence cleanup skipped: {e}")
+            await self._client.aclose()
+            self._client = None
+
+    # --- Diffusion ---
+
+    async def publish_room(self, room_id, text, exclude_user=None, persist=True):
+        meta = {"node": self.node_id, "kind": "room", "room_id": room_id, "exclude": exclude_user}
+        if not persist:
+            await self._publish_envelope(meta, text)
+            return None, text
+        try:
+            seq = int(await self._publish_script(
+                keys=[self._key("seq", room_id), self._key("log", room_id)],
+                args=[text, self.replay_size, self.room_ttl_sec, json.dumps(meta, separators=(",", ":")), self.channel],
+            ))
+        except Exception as e:
+            # Redis indisponible: livraison locale seulement, sans seq
+            self.stats["errors"] += 1
+            logger.warning(f"WS broker: room publish failed ({room_id}): {e}")
+            return None, text
+        self.stats["published"] += 1
+        return seq, with_seq(text, seq)
+
+    async def _publish_envelope(self, meta, text):
+        try:
+            await self._client.publish(self.channel, encode_envelope(meta, text))
+            self.stats["published"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"WS broker: publish failed: {e}")
+
+    async def _run_listener(self):
+        delay = 1.0
+        while True:
+            pubsub = self._client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self.listener_connected = True
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._on_envelope(message.get("data", ""))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Messages perdus pendant la coupure: les clients les rejouent par seq
+                logger.warning(f"WS broker listener disconnected: {e} (retry in {delay:.0f}s)")
+            finally:
+                self.listener_connected = False
+                await pubsub.aclose()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    # --- Rejeu ---
+
+    async def replay(self, room_id, after_seq):
+        current = int(await self._client.get(self._key("seq", room_id)) or 0)
+        missed = current - after_seq
+        if missed < 0 or missed > self.replay_size:
+            return [], False
+        if missed == 0:
+            return [], True
+        entries = await self._client.xrange(self._key("log", room_id), min=f"{after_seq + 1}-0", max="+", count=missed)
+        if len(entries) != missed:
+            return [], False  # journal tronqué (MAXLEN approximatif) ou expiré
+        self.stats["replayed"] += missed
+        return [fields["m"] for _, fields in entries], True
+
+    # --- Présence / frappe ---
+
+    async def join(self, room_id, user_id):
+        await super().join(room_id, user_id)
+        key = self._key("presence", room_id)
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                pipe.zadd(key, {str(user_id): time.time() + self.presence_ttl_sec})
+                pipe.expire(key, int(self.presence_ttl_sec * 2))
+                await pipe.execute()
+        except Exception as e:
+            # Le heartbeat republiera la présence locale
+            self.stats["errors"] += 1
+            logger.warning(f"WS broker: join failed ({room_id}): {e}")
+
+    async def leave(self, room_id, user_id):
+        await super().leave(room_id, user_id)
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                pipe.zrem(self._key("presence", room_id), str(user_id))
+                pipe.zrem(self._key("typing", room_id), str(user_id))
+                await pipe.execute()
+        except Exception as e:
+            # Sans rafraîchissement, l'entrée expire au TTL de présence
+            self.stats["errors"] += 1
+            logger.warning(f"WS broker: leave failed ({room_id}): {e}")
+
+    async def _run_heartbeat(self):
+        """Rafraîchit la présence des membres locaux (TTL / 3)"""
+        while True:
+            await asyncio.sleep(self.presence_ttl_sec / 3)
+            try:
+                expires = time.time() + self.presence_ttl_sec
+                async with self._client.pipeline(transaction=False) as pipe:
+                    for room_id, users in list(self.local_members.items()):
+                        key = self._key("presence", room_id)
+                        pipe.zadd(key, {str(user_id): expires for user_id in users})
+                        pipe.zremrangebyscore(key, "-inf", time.time())
+                        pipe.expire(key, int(self.presence_ttl_sec * 2))
+                    await pipe.execute()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WS broker: presence heartbeat failed: {e}")
+
+    async def _live_members(self, key: str) -> List[int]:
+        return sorted(int(user_id) for user_id in await self._client.zrangebyscore(key, time.time(), "+inf"))
+
+    async def room_members(self, room_id):
+        return await self._live_members(self._key("presence", room_id))
+
+    async def set_typing(self, room_id, user_id, is_typing):
+        key = self._key("typing", room_id)
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                if is_typing:
+                    pipe.zadd(key, {str(user_id): time.time() + self.typing_ttl_sec})
+                    pipe.expire(key, int(self.typing_ttl_sec * 2))
+                else:
+                    pipe.zrem(key, str(user_id))
+                await pipe.execute()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"WS broker: typing update failed ({room_id}): {e}")
+
+    async def typing_users(self, room_id):
+        return await self._live_members(self._key("typing", room_id))
+
+    def get_stats(self):
+        return {**super().get_stats(), "listener_connected": self.listener_connected}
+
+
+def create_broker(backend: str = WS_BROKER) -> WSBroker:
+    """Backend choisi par WS_BROKER"""
+    if backend == "redis":
+        return RedisBroker()
+    if backend != "memory":
+        logger.warning(f"Unknown WS_BROKER={backend!r}, using memory")
+    return InMemoryBroker()
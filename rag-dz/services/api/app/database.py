@@ -10,6 +10,9 @@ from contextlib import asynccontextmanager
 import logging
 from typing import Optional, AsyncGenerator
 from .config import get_settings
+from .db import get_async_db_connection, get_tenant_connection, set_rls_context
+from .core.tenant_cache import resolve_tenant
+from .core.usage_meter import record_usage
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -21,55 +24,27 @@ def sha256(s: str) -> str:
 
 
 # ============================================
-# SYNC DATABASE (Existant - pour migrations)
+# CONNEXIONS (pool async partagé, app.db)
 # ============================================
 
 @asynccontextmanager
-async def get_db_connection():
+async def get_db_connection() -> AsyncGenerator[psycopg.AsyncConnection, None]:
     """
-    Connection synchrone PostgreSQL (pour migrations et scripts)
+    Connexion async empruntée au pool (autocommit, sans contexte tenant)
     """
-    conn = psycopg.connect(settings.postgres_url, autocommit=True)
-    try:
+    async with get_async_db_connection() as conn:
         yield conn
-    finally:
-        conn.close()
 
 
 async def get_tenant_by_key(api_key: str) -> Optional[dict]:
     """
-    Récupérer tenant depuis API key (existant)
+    Récupérer tenant depuis API key (via le cache de résolution)
     """
     if not api_key:
         return None
 
-    key_hash = sha256(api_key)
-
     try:
-        async with get_db_connection() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute("""
-                    SELECT t.id, t.name, k.plan, k.rate_limit_per_minute,
-                           k.quota_tokens_monthly, k.quota_audio_seconds_monthly,
-                           k.quota_ocr_pages_monthly
-                    FROM api_keys k
-                    JOIN tenants t ON k.tenant_id = t.id
-                    WHERE k.key_hash = %s AND k.revoked = false AND t.status = 'active'
-                """, (key_hash,))
-
-                row = await cur.fetchone()
-                if not row:
-                    return None
-
-                return {
-                    "id": str(row[0]),
-                    "name": row[1],
-                    "plan": row[2],
-                    "rate_limit_per_minute": row[3],
-                    "quota_tokens": row[4],
-                    "quota_audio_seconds": row[5],
-                    "quota_ocr_pages": row[6]
-                }
+        return await resolve_tenant(api_key)
     except Exception as e:
         logger.error(f"Database error in get_tenant_by_key: {e}")
         return None
@@ -77,31 +52,9 @@ async def get_tenant_by_key(api_key: str) -> Optional[dict]:
 
 async def insert_usage(event: dict):
     """
-    Insérer événement usage (existant)
+    Enregistrer événement usage (mis en file, écrit par lots par le usage meter)
     """
-    try:
-        async with get_db_connection() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute("""
-                    INSERT INTO usage_events (tenant_id, request_id, route, method,
-                    tokens_input, tokens_output, audio_seconds, ocr_pages,
-                    latency_ms, model_used, status_code)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    event.get("tenant_id"),
-                    event.get("request_id"),
-                    event.get("route"),
-                    event.get("method", "POST"),
-                    event.get("tokens_input", 0),
-                    event.get("tokens_output", 0),
-                    event.get("audio_seconds", 0),
-                    event.get("ocr_pages", 0),
-                    event.get("latency_ms", 0),
-                    event.get("model_used", "unknown"),
-                    event.get("status_code", 200)
-                ))
-    except Exception as e:
-        logger.error(f"Failed to insert usage: {e}")
+    record_usage(event)
 
 
 # ============================================
@@ -112,7 +65,9 @@ class TenantAwareDBSession:
     """
     Session DB async avec support RLS multi-tenant
 
-    Configure automatiquement set_tenant() au début de chaque session
+    Configure automatiquement le tenant RLS au début de chaque session.
+    La connexion doit être dans une transaction: le contexte est local à
+    celle-ci et ne suit pas la connexion une fois rendue au pool.
     """
 
     def __init__(self, conn: psycopg.AsyncConnection, tenant_id: Optional[str] = None):
@@ -124,11 +79,7 @@ class TenantAwareDBSession:
         """Début de session - configurer tenant_id via RLS"""
         if self.tenant_id and not self._tenant_configured:
             try:
-                # Appeler fonction PostgreSQL set_tenant()
-                await self.conn.execute(
-                    "SELECT set_tenant(%s::UUID)",
-                    (self.tenant_id,)
-                )
+                await set_rls_context(self.conn, self.tenant_id)
                 logger.debug(f"RLS tenant configured: {self.tenant_id}")
                 self._tenant_configured = True
 
@@ -154,7 +105,7 @@ async def get_db_session_with_tenant(
 
     Args:
         tenant_id: UUID du tenant (depuis request.state.tenant_id)
-        is_superadmin: Si True, active enable_superadmin_mode()
+        is_superadmin: Si True, active le bypass RLS (app.is_superadmin)
 
     Usage dans un router:
         @router.get("/api/projects")
@@ -167,42 +118,19 @@ async def get_db_session_with_tenant(
                 # Retourne SEULEMENT les projets du tenant
                 return result.fetchall()
     """
-    # Créer connection async
-    conn = await psycopg.AsyncConnection.connect(
-        settings.postgres_url,
-        autocommit=False  # Transaction par défaut
-    )
-
+    # Connexion du pool, transaction avec contexte RLS local
+    # (rien ne subsiste sur la connexion une fois rendue au pool)
     try:
-        # Si super-admin, activer mode bypass RLS
-        if is_superadmin:
-            await conn.execute("SELECT enable_superadmin_mode()")
-            logger.info("Super-admin mode enabled for session")
-
-        # Si tenant_id fourni, configurer RLS
-        elif tenant_id:
-            await conn.execute(
-                "SELECT set_tenant(%s::UUID)",
-                (tenant_id,)
-            )
-            logger.debug(f"Tenant context set: {tenant_id}")
-
-        # Retourner connection
-        yield conn
-
-        # Commit transaction si pas d'erreur
-        await conn.commit()
-
+        async with get_tenant_connection(tenant_id, is_superadmin=is_superadmin) as conn:
+            if is_superadmin:
+                logger.info("Super-admin mode enabled for session")
+            elif tenant_id:
+                logger.debug(f"Tenant context set: {tenant_id}")
+            yield conn
     except Exception as e:
-        # Rollback en cas d'erreur
-        await conn.rollback()
         logger.error(f"Database session error: {e}")
         raise
 
-    finally:
-        # Fermer connection
-        await conn.close()
-
 
 # ============================================
 # DEPENDENCY INJECTION POUR FASTAPI
@@ -257,7 +185,7 @@ async def verify_tenant_exists(tenant_id: str) -> bool:
                     "SELECT 1 FROM tenants WHERE id = %s AND status = 'active'",
                     (tenant_id,)
                 )
-                return cur.fetchone() is not None
+                return await cur.fetchone() is not None
     except Exception as e:
         logger.error(f"Error verifying tenant {tenant_id}: {e}")
         return False
@@ -1,17 +1,49 @@
+import os
+import asyncio
 import hashlib
 import psycopg
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 import logging
+from typing import Optional
 from .config import get_settings
 
+try:
+    from psycopg_pool import AsyncConnectionPool
+    PSYCOPG_POOL_AVAILABLE = True
+except ImportError:
+    PSYCOPG_POOL_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT_SEC = float(os.getenv("DB_POOL_TIMEOUT_SEC", "30"))
+# Exécutions avant préparation automatique côté serveur ("none" derrière pgbouncer en mode transaction)
+_prepare_threshold = os.getenv("DB_PREPARE_THRESHOLD", "5").strip().lower()
+DB_PREPARE_THRESHOLD = None if _prepare_threshold in ("", "none", "off") else int(_prepare_threshold)
+
+try:
+    from .monitoring import DB_POOL_CONNECTIONS, DB_POOL_WAIT_SECONDS
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+
+TENANT_BY_KEY_SQL = """
+    SELECT t.id, t.name, k.plan, k.rate_limit_per_minute,
+           k.quota_tokens_monthly, k.quota_audio_seconds_monthly, 
+           k.quota_ocr_pages_monthly
+    FROM api_keys k 
+    JOIN tenants t ON k.tenant_id = t.id
+    WHERE k.key_hash = %s AND k.revoked = false AND t.status = 'active'
+"""
+
 def sha256(s: str) -> str:
     return hashlib.sha256(s.encode()).hexdigest()
 
 @contextmanager
 def get_db_connection():
+    """Connexion synchrone directe (scripts, code sync). Handlers async: get_tenant_connection"""
     with psycopg.connect(settings.postgres_url, autocommit=True) as conn:
         yield conn
 
@@ -21,26 +53,124 @@ def get_tenant_by_key(api_key: str):
     key_hash = sha256(api_key)
     try:
         with get_db_connection() as conn, conn.cursor() as cur:
-            cur.execute("""
-                SELECT t.id, t.name, k.plan, k.rate_limit_per_minute,
-                       k.quota_tokens_monthly, k.quota_audio_seconds_monthly, 
-                       k.quota_ocr_pages_monthly
-                FROM api_keys k 
-                JOIN tenants t ON k.tenant_id = t.id
-                WHERE k.key_hash = %s AND k.revoked = false AND t.status = 'active'
-            """, (key_hash,))
-            row = cur.fetchone()
-            if not row:
-                return None
-            return {
-                "id": str(row[0]), "name": row[1], "plan": row[2],
-                "rate_limit_per_minute": row[3], "quota_tokens": row[4],
-                "quota_audio_seconds": row[5], "quota_ocr_pages": row[6]
-            }
+            cur.execute(TENANT_BY_KEY_SQL, (key_hash,))
+            return _tenant_from_row(cur.fetchone())
     except Exception as e:
         logger.error(f"Database error: {e}")
         return None
 
+def _tenant_from_row(row) -> Optional[dict]:
+    if not row:
+        return None
+    return {
+        "id": str(row[0]), "name": row[1], "plan": row[2],
+        "rate_limit_per_minute": row[3], "quota_tokens": row[4],
+        "quota_audio_seconds": row[5], "quota_ocr_pages": row[6]
+    }
+
+# ============================================
+# ASYNC (pool de connexions)
+# ============================================
+
+_async_pool: Optional["AsyncConnectionPool"] = None
+_async_pool_lock = asyncio.Lock()
+
+async def get_async_pool() -> Optional["AsyncConnectionPool"]:
+    """Pool async partagé (None si psycopg_pool n'est pas installé)"""
+    global _async_pool
+    if not PSYCOPG_POOL_AVAILABLE:
+        return None
+    if _async_pool is None:
+        async with _async_pool_lock:
+            if _async_pool is None:
+                pool = AsyncConnectionPool(
+                    settings.postgres_url,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT_SEC,
+                    kwargs={"autocommit": True, "prepare_threshold": DB_PREPARE_THRESHOLD},
+                    name="iafactory-db",
+                    open=False,
+                )
+                await pool.open()
+                _async_pool = pool
+    return _async_pool
+
+async def close_async_pool() -> None:
+    global _async_pool
+    if _async_pool is not None:
+        pool, _async_pool = _async_pool, None
+        await pool.close()
+
+@asynccontextmanager
+async def get_async_db_connection():
+    """Connexion async empruntée au pool (connexion directe sans psycopg_pool)"""
+    pool = await get_async_pool()
+    if pool is not None:
+        async with pool.connection() as conn:
+            yield conn
+    else:
+        async with await psycopg.AsyncConnection.connect(settings.postgres_url, autocommit=True) as conn:
+            yield conn
+
+# Variables RLS locales à la transaction (is_local=true): elles disparaissent
+# au COMMIT/ROLLBACK, une connexion rendue au pool ne garde aucun tenant
+RLS_CONTEXT_SQL = """
+    SELECT set_config('app.current_tenant_id', %s, true),
+           set_config('app.current_user_id', %s, true),
+           set_config('app.is_superadmin', %s, true)
+"""
+
+async def set_rls_context(
+    conn,
+    tenant_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    is_superadmin: bool = False,
+) -> None:
+    """Contexte RLS (get_current_tenant, get_current_user_id, is_superadmin) pour la transaction en cours"""
+    await conn.execute(
+        RLS_CONTEXT_SQL,
+        (str(tenant_id or ""), str(user_id or ""), "true" if is_superadmin else "false"),
+        prepare=True,
+    )
+
+@asynccontextmanager
+async def get_tenant_connection(
+    tenant_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    is_superadmin: bool = False,
+):
+    """
+    Connexion du pool dans une transaction avec le contexte RLS du tenant.
+
+    Commit en sortie normale, rollback sur exception.
+    """
+    async with get_async_db_connection() as conn:
+        async with conn.transaction():
+            await set_rls_context(conn, tenant_id, user_id, is_superadmin)
+            yield conn
+
+async def get_tenant_by_key_hash_async(key_hash: str) -> Optional[dict]:
+    """
+    Tenant actif pour un hash de clé, None si clé inconnue/révoquée.
+    Les erreurs base de données sont propagées (pas de cache négatif sur panne).
+    """
+    async with get_async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(TENANT_BY_KEY_SQL, (key_hash,), prepare=True)
+        return _tenant_from_row(await cur.fetchone())
+
+def get_db_pool_stats() -> dict:
+    """Statistiques du pool (taille, connexions libres, attentes) + export Prometheus"""
+    if _async_pool is None:
+        return {"status": "closed" if PSYCOPG_POOL_AVAILABLE else "unavailable"}
+    stats = _async_pool.get_stats()
+    if METRICS_AVAILABLE:
+        DB_POOL_CONNECTIONS.labels(state="size").set(stats.get("pool_size", 0))
+        DB_POOL_CONNECTIONS.labels(state="available").set(stats.get("pool_available", 0))
+        DB_POOL_CONNECTIONS.labels(state="waiting").set(stats.get("requests_waiting", 0))
+        DB_POOL_WAIT_SECONDS.set(stats.get("requests_wait_ms", 0) / 1000)
+    return {"status": "open", "prepare_threshold": DB_PREPARE_THRESHOLD, **stats}
+
 def insert_usage(event: dict):
     try:
         with get_db_connection() as conn, conn.cursor() as cur:
@@ -1,7 +1,7 @@
 """
 FastAPI Dependencies for authentication and authorization
 """
-from fastapi import Depends, HTTPException, status, Header
+from fastapi import Depends, HTTPException, Request, status, Header
 from fastapi.security import OAuth2PasswordBearer
 from typing import Optional
 import logging
@@ -113,6 +113,29 @@ def get_current_superuser(current_user: UserInDB = Depends(get_current_active_us
     return current_user
 
 
+def get_current_tenant_id(request: Request) -> str:
+    """
+    Get the tenant of the current request
+
+    Args:
+        request: Incoming request (tenant set by TenantContextMiddleware)
+
+    Returns:
+        Tenant ID
+
+    Raises:
+        HTTPException: If the request has no tenant context
+    """
+    tenant_id = getattr(request.state, "tenant_id", None)
+    if not tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Tenant context required"
+        )
+
+    return tenant_id
+
+
 def optional_user(current_user: Optional[UserInDB] = Depends(get_current_user)) -> Optional[UserInDB]:
     """
     Optional user dependency - doesn't require authentication
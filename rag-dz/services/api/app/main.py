@@ -2,7 +2,9 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+import os
 import time
+import asyncio
 import logging
 
 from .middleware import RequestIDMiddleware
@@ -13,13 +15,22 @@ from .routers import test, upload, query, websocket_router, knowledge, progress,
 from .bigrag import bigrag_router
 from .bigrag_ingest import ingest_router
 from .ocr import ocr_router
+from .ocr.ocr_jobs import get_ocr_job_manager
+from .ocr.ocr_dz_pipeline import shutdown_page_pool
 from .darija import darija_router
 from .voice.stt_router import router as stt_router
 from .voice.tts_router import router as tts_router
 from .voice.voice_agent_router import router as voice_agent_router
 from .multi_llm import multi_llm_router
 from .team_seats import team_seats_router
+from .voice.tts_service import get_tts_service
 from .config import get_settings
+from .core.model_registry import get_model_registry, preload_configured_models
+from .core.tenant_cache import get_tenant_resolver
+from .core.usage_meter import get_usage_meter
+from .services.message_indexer import get_message_indexer
+from .websocket import manager as ws_manager
+from .db import close_async_pool, get_async_pool, get_db_pool_stats
 
 settings = get_settings()
 
@@ -109,12 +120,118 @@ app.include_router(tenants.router, tags=["Tenants"])  # Multi-Tenant Management
 app.include_router(chat_rooms.router, tags=["Chat Rooms"])  # Chat Multi-User Rooms 💬
 app.include_router(websocket_router.router, tags=["WebSocket"])
 
+@app.on_event("startup")
+async def preload_models():
+    """Précharge les modèles ML listés dans MODEL_PRELOAD (évite le cold start du 1er user)"""
+    results = await asyncio.to_thread(preload_configured_models)
+    if results:
+        logger.info(f"Model preload: {results}")
+
+@app.on_event("startup")
+async def prewarm_tts_cache():
+    """Pré-remplit le cache audio TTS depuis TTS_CACHE_PREWARM_FILE (en arrière-plan)"""
+    path = os.getenv("TTS_CACHE_PREWARM_FILE")
+    if path and os.path.exists(path):
+        asyncio.create_task(get_tts_service().prewarm_from_file(path))
+
+@app.on_event("startup")
+async def open_db_pool():
+    """Ouvre le pool async PostgreSQL (les connexions min_size s'établissent en arrière-plan)"""
+    try:
+        await get_async_pool()
+    except Exception as e:
+        logger.warning(f"DB pool not opened at startup: {e}")
+
+@app.on_event("startup")
+async def start_usage_meter():
+    """Metering par lots (usage_events + rollups), rejoue les lots déversés sur disque"""
+    await get_usage_meter().start()
+
+@app.on_event("shutdown")
+async def stop_usage_meter():
+    await get_usage_meter().stop()  # dernier lot avant close_db_pool
+
+@app.on_event("startup")
+async def start_message_indexer():
+    """Indexation Qdrant des messages par lots, reprend l'outbox laissée au redémarrage"""
+    await get_message_indexer().start()
+
+@app.on_event("shutdown")
+async def stop_message_indexer():
+    await get_message_indexer().stop()  # lots en cours terminés avant close_db_pool
+
+@app.on_event("startup")
+async def start_tenant_cache_listener():
+    """Invalidation du cache API key → tenant à la révocation (NOTIFY/pub-sub)"""
+    get_tenant_resolver().start_listener()
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    await get_tenant_resolver().stop_listener()
+    await close_async_pool()
+
+@app.on_event("startup")
+async def start_ocr_jobs():
+    """Démarre les workers OCR batch et reprend les jobs interrompus"""
+    await get_ocr_job_manager().start()
+
+@app.on_event("shutdown")
+async def stop_ocr_jobs():
+    await get_ocr_job_manager().stop()
+    shutdown_page_pool()
+
+@app.on_event("startup")
+async def start_websocket_broker():
+    """Salons WebSocket partagés entre workers (WS_BROKER=redis) ou en mémoire"""
+    try:
+        await ws_manager.start()
+    except Exception as e:
+        logger.warning(f"WebSocket broker not started: {e}")
+
+@app.on_event("shutdown")
+async def close_websockets():
+    await ws_manager.stop()
+
 @app.get("/health")
 async def health():
     return {"status": "healthy", "timestamp": time.time(), "service": "IAFactory"}
 
+@app.get("/health/models")
+async def models_health():
+    """Modèles résidents: mémoire, temps de chargement, hits, évictions"""
+    return get_model_registry().stats()
+
+@app.get("/health/tenant-cache")
+async def tenant_cache_health():
+    """Cache de résolution API key → tenant: hits, clés invalides, invalidations"""
+    return get_tenant_resolver().cache.get_stats()
+
+@app.get("/health/db-pool")
+async def db_pool_health():
+    """Pool PostgreSQL: connexions ouvertes/libres, requêtes en attente, temps d'attente"""
+    return get_db_pool_stats()
+
+@app.get("/health/usage-meter")
+async def usage_meter_health():
+    """Metering: événements en file, lots écrits, déversements disque, pertes"""
+    return get_usage_meter().get_stats()
+
+@app.get("/health/message-indexer")
+async def message_indexer_health():
+    """Indexation vectorielle: messages en attente, âge du plus ancien, lots, lettres mortes"""
+    indexer = get_message_indexer()
+    await indexer.refresh_lag()
+    return indexer.get_stats()
+
+@app.get("/health/websocket")
+async def websocket_health():
+    """Fan-out WebSocket: connexions, profondeur des files d'envoi, clients lents"""
+    return ws_manager.get_stats()
+
 @app.get("/metrics")
 async def metrics():
+    get_db_pool_stats()  # rafraîchit les jauges db_pool_*
+    ws_manager.get_stats()  # rafraîchit les jauges ws_*
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/")
@@ -4,9 +4,11 @@ import time
 import hashlib
 import logging
 from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
-from app.db import get_tenant_by_key, insert_usage
+from starlette.types import Receive, Scope, Send
+from app.core.asgi import ASGIMiddleware, send_with_headers
+from app.core.usage_meter import record_usage
+from app.core.tenant_cache import resolve_tenant
 
 from .rate_limiter import RateLimiter, get_rate_limiter
 from .tenant_middleware import (
@@ -19,51 +21,59 @@ from .tenant_middleware import (
 
 logger = logging.getLogger(__name__)
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class RequestIDMiddleware(ASGIMiddleware):
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
         request_id = hashlib.sha256(str(time.time_ns()).encode()).hexdigest()[:16]
-        request.state.request_id = request_id
-        response = await call_next(request)
-        response.headers["X-Request-Id"] = request_id
-        return response
+        scope.setdefault("state", {})["request_id"] = request_id
+        await self.app(scope, receive, send_with_headers(send, lambda: {"X-Request-Id": request_id}))
+
+class AuthMiddleware(ASGIMiddleware):
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        request = Request(scope, receive)
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
         # Autoriser les requêtes OPTIONS pour CORS
         if request.method == "OPTIONS":
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
         # Routes publiques
         if request.url.path in ["/health", "/metrics", "/docs", "/openapi.json", "/"]:
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
         api_key = request.headers.get("X-API-Key") or request.headers.get("Authorization", "").replace("Bearer ", "")
         if not api_key:
-            return JSONResponse({"error": "API key required"}, status_code=401)
+            return await JSONResponse({"error": "API key required"}, status_code=401)(scope, receive, send)
 
-        tenant = get_tenant_by_key(api_key)
+        tenant = await resolve_tenant(api_key)
         if not tenant:
-            return JSONResponse({"error": "Invalid API key"}, status_code=401)
+            return await JSONResponse({"error": "Invalid API key"}, status_code=401)(scope, receive, send)
 
         request.state.tenant = tenant
 
         start_time = time.time()
-        response = await call_next(request)
-        latency_ms = int((time.time() - start_time) * 1000)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
         try:
-            insert_usage({
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Latence jusqu'à la fin du corps (réponses streamées comprises)
+            latency_ms = int((time.time() - start_time) * 1000)
+
+            # Metering hors chemin critique: mise en file, écriture par lots en arrière-plan
+            record_usage({
                 "tenant_id": tenant["id"],
-                "request_id": request.state.request_id,
+                "request_id": getattr(request.state, "request_id", None),
                 "route": request.url.path,
                 "method": request.method,
                 "latency_ms": latency_ms,
-                "status_code": response.status_code
+                "status_code": status_code
             })
-        except Exception as e:
-            logger.error(f"Failed to log usage: {e}")
 
-        return response
 
 __all__ = [
     "RequestIDMiddleware",
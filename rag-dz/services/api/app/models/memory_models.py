@@ -361,20 +361,23 @@ class GetConversationsRequest(BaseModel):
     is_archived: bool = False
     limit: int = Field(default=20, le=100)
     offset: int = 0
+    cursor: Optional[str] = None  # Keyset (last_message_at, id)
 
 
 class GetConversationsResponse(BaseModel):
     """Réponse liste conversations"""
     conversations: List[ChatSessionSummary]
-    total: int
+    total: Optional[int] = None  # Absent en pagination par curseur
     has_more: bool
+    next_cursor: Optional[str] = None
 
 
 class GetMessagesRequest(BaseModel):
     """Requête messages d'une session"""
     session_id: str
     limit: int = Field(default=50, le=200)
-    before_id: Optional[str] = None  # Pagination cursor
+    before_id: Optional[str] = None  # Legacy: id du plus ancien message reçu
+    cursor: Optional[str] = None  # Keyset (created_at, id)
 
 
 class GetMessagesResponse(BaseModel):
@@ -382,6 +385,7 @@ class GetMessagesResponse(BaseModel):
     session_id: str
     messages: List[ChatMessage]
     has_more: bool
+    next_cursor: Optional[str] = None
 
 
 class GetMemoriesResponse(BaseModel):
@@ -27,6 +27,51 @@ ACTIVE_CONNECTIONS = Gauge(
     'Number of active connections'
 )
 
+MODEL_RESIDENT_MB = Gauge(
+    'model_resident_megabytes',
+    'Estimated resident memory of loaded ML models',
+    ['model']
+)
+
+MODEL_LOAD_SECONDS = Gauge(
+    'model_load_seconds',
+    'Duration of the last load of each ML model',
+    ['model']
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    'db_pool_connections',
+    'PostgreSQL async pool connections by state',
+    ['state']
+)
+
+DB_POOL_WAIT_SECONDS = Gauge(
+    'db_pool_wait_seconds_total',
+    'Cumulative time requests waited for a pooled connection'
+)
+
+WS_CONNECTIONS = Gauge(
+    'ws_connections',
+    'Open WebSocket connections'
+)
+
+WS_SEND_QUEUE_DEPTH = Gauge(
+    'ws_send_queue_depth',
+    'WebSocket per-connection send queue depth (total / max)',
+    ['stat']
+)
+
+MESSAGE_INDEX_PENDING = Gauge(
+    'message_index_outbox_rows',
+    'Chat messages waiting for vector indexing (pending / failed)',
+    ['state']
+)
+
+MESSAGE_INDEX_LAG_SECONDS = Gauge(
+    'message_index_lag_seconds',
+    'Age of the oldest chat message waiting for vector indexing'
+)
+
 def init_metrics():
     """Initialize monitoring system"""
     logger.info("Prometheus metrics initialized")
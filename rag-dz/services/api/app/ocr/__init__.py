@@ -14,6 +14,7 @@ from .ocr_utils import (
     estimate_confidence,
 )
 from .ocr_dz_pipeline import OCRPipeline, ocr_pipeline, OCRResult
+from .ocr_jobs import OCRJobManager, get_ocr_job_manager
 from .ocr_router import router as ocr_router
 
 __all__ = [
@@ -26,5 +27,7 @@ __all__ = [
     "OCRPipeline",
     "ocr_pipeline",
     "OCRResult",
+    "OCRJobManager",
+    "get_ocr_job_manager",
     "ocr_router",
 ]
@@ -8,10 +8,16 @@ Tesseract + Fallback IA (Claude Vision / GPT-4o)
 import os
 import io
 import base64
+import asyncio
+import hashlib
 import tempfile
 import logging
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import Optional, List, Literal, Tuple, Union, BinaryIO
+from typing import Optional, List, Literal, Tuple, Union, BinaryIO, Dict, Iterator, AsyncIterator
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
@@ -28,9 +34,16 @@ from .ocr_utils import (
     merge_pages_text,
     detect_pages_language,
     estimate_confidence,
+    score_text_layer,
     LanguageCode,
 )
 
+try:
+    import PyPDF2
+    PYPDF2_AVAILABLE = True
+except ImportError:
+    PYPDF2_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,14 +51,46 @@ logger = logging.getLogger(__name__)
 # CONFIGURATION
 # ============================================
 
+# OCR PDF parallèle: processus Tesseract et mémoire max des pages rastérisées en vol
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_MEMORY_CAP_MB = float(os.getenv("OCR_MEMORY_CAP_MB", "512"))
+
+# Qualité minimale de la couche texte native pour éviter l'OCR d'une page
+OCR_TEXT_LAYER_MIN_SCORE = float(os.getenv("OCR_TEXT_LAYER_MIN_SCORE", "0.6"))
+
+# Fallback Vision IA: appels simultanés, taille des images envoyées, cache
+OCR_FALLBACK_CONCURRENCY = int(os.getenv("OCR_FALLBACK_CONCURRENCY", "4"))
+OCR_FALLBACK_MAX_SIDE = int(os.getenv("OCR_FALLBACK_MAX_SIDE", "1568"))
+OCR_FALLBACK_JPEG_QUALITY = int(os.getenv("OCR_FALLBACK_JPEG_QUALITY", "85"))
+OCR_FALLBACK_CACHE_SIZE = int(os.getenv("OCR_FALLBACK_CACHE_SIZE", "512"))
+
+
+def estimate_page_image_mb(dpi: int) -> float:
+    """
+    Mémoire d'une page rastérisée (A4 niveaux de gris) + copies du prétraitement
+    
+    300 dpi ≈ 2480x3508 px ≈ 8.3 MB, x2 pour le prétraitement.
+    """
+    pixels = (8.27 * dpi) * (11.69 * dpi)
+    return pixels * 2 / (1024 * 1024)
+
+
 class OCREngine(str, Enum):
     """Moteur OCR utilisé"""
     TESSERACT = "tesseract"
     CLAUDE_VISION = "claude_vision"
     GPT4_VISION = "gpt4_vision"
+    TEXT_LAYER = "text_layer"
     HYBRID = "hybrid"
 
 
+class PageRoute(str, Enum):
+    """Traitement appliqué à une page PDF"""
+    TEXT_LAYER = "text_layer"      # Texte natif du PDF (pas d'OCR)
+    OCR = "ocr"                    # Page scannée ou couche texte illisible → Tesseract
+    LLM_FALLBACK = "llm_fallback"  # OCR peu fiable → Vision IA
+
+
 class TesseractConfig:
     """Configuration Tesseract pour différentes langues."""
     
@@ -97,6 +142,8 @@ class PageOCRResult(BaseModel):
     language: LanguageCode
     confidence: float = Field(..., ge=0.0, le=1.0)
     engine: OCREngine = OCREngine.TESSERACT
+    route: PageRoute = PageRoute.OCR
+    text_layer_score: Optional[float] = Field(None, description="Qualité de la couche texte native (PDF)")
 
 
 class OCRResult(BaseModel):
@@ -160,6 +207,12 @@ class OCRPipeline:
         default_language: LanguageCode = "fr",
         enable_fallback: bool = True,
         fallback_provider: Literal["claude", "openai"] = "claude",
+        page_workers: Optional[int] = None,
+        memory_cap_mb: Optional[float] = None,
+        page_executor: Optional[Executor] = None,
+        use_text_layer: bool = True,
+        text_layer_min_score: Optional[float] = None,
+        fallback_concurrency: Optional[int] = None,
     ):
         """
         Initialiser le pipeline OCR.
@@ -172,6 +225,12 @@ class OCRPipeline:
             default_language: Langue par défaut
             enable_fallback: Activer le fallback IA
             fallback_provider: Provider pour le fallback (claude ou openai)
+            page_workers: Processus OCR pour les PDF (défaut OCR_WORKERS, 1 = séquentiel)
+            memory_cap_mb: Mémoire max des pages rastérisées en vol (défaut OCR_MEMORY_CAP_MB)
+            page_executor: Executor pour l'OCR des pages (défaut: pool de processus partagé)
+            use_text_layer: Utiliser le texte natif des PDF numériques au lieu de l'OCR
+            text_layer_min_score: Qualité min de la couche texte (défaut OCR_TEXT_LAYER_MIN_SCORE)
+            fallback_concurrency: Pages envoyées en parallèle au fallback IA (défaut OCR_FALLBACK_CONCURRENCY)
         """
         self.tesseract_path = tesseract_path
         self.poppler_path = poppler_path
@@ -180,6 +239,14 @@ class OCRPipeline:
         self.default_language = default_language
         self.enable_fallback = enable_fallback
         self.fallback_provider = fallback_provider
+        self.page_workers = page_workers if page_workers is not None else OCR_WORKERS
+        self.memory_cap_mb = memory_cap_mb if memory_cap_mb is not None else OCR_MEMORY_CAP_MB
+        self._page_executor = page_executor
+        self.use_text_layer = use_text_layer
+        self.text_layer_min_score = (
+            text_layer_min_score if text_layer_min_score is not None else OCR_TEXT_LAYER_MIN_SCORE
+        )
+        self.fallback_concurrency = max(1, fallback_concurrency or OCR_FALLBACK_CONCURRENCY)
         
         # Configurer Tesseract si chemin fourni
         if tesseract_path:
@@ -207,6 +274,8 @@ class OCRPipeline:
             logger.info("pdf2image disponible")
         except ImportError:
             logger.warning("pdf2image non disponible")
+        
+        self.text_layer_available = PYPDF2_AVAILABLE
     
     # ============================================
     # EXTRACTION IMAGE
@@ -341,6 +410,11 @@ class OCRPipeline:
         """
         Extraire le texte d'un PDF (scanné ou non).
         
+        Les pages avec une couche texte native exploitable sont lues
+        directement; les autres sont rastérisées une à une et OCRisées en
+        parallèle (voir iter_pdf_pages), la mémoire reste bornée par
+        memory_cap_mb. Le routage de chaque page est dans pages_detail.
+        
         Args:
             pdf_data: Données PDF (bytes, file-like, ou chemin)
             language_hint: Indice sur la langue
@@ -353,31 +427,9 @@ class OCRPipeline:
         import time
         start_time = time.time()
         
-        from pdf2image import convert_from_bytes, convert_from_path
-        from PIL import Image
-        
         # Charger le PDF
         try:
-            if isinstance(pdf_data, (str, Path)):
-                images = convert_from_path(
-                    str(pdf_data),
-                    dpi=dpi,
-                    poppler_path=self.poppler_path,
-                )
-            elif isinstance(pdf_data, bytes):
-                images = convert_from_bytes(
-                    pdf_data,
-                    dpi=dpi,
-                    poppler_path=self.poppler_path,
-                )
-            else:
-                # File-like object
-                pdf_bytes = pdf_data.read()
-                images = convert_from_bytes(
-                    pdf_bytes,
-                    dpi=dpi,
-                    poppler_path=self.poppler_path,
-                )
+            pdf_path, is_temp, total_pages = self._open_pdf(pdf_data)
         except Exception as e:
             logger.error(f"Erreur conversion PDF: {e}")
             return OCRResult(
@@ -388,25 +440,74 @@ class OCRPipeline:
                 error=f"Erreur conversion PDF: {str(e)}",
             )
         
-        # Limiter le nombre de pages
-        if max_pages:
-            images = images[:max_pages]
+        try:
+            # Limiter le nombre de pages
+            if max_pages:
+                total_pages = min(total_pages, max_pages)
+            
+            # OCR page par page (parallèle, résultats dans l'ordre)
+            pages_results = list(self._iter_pages(pdf_path, total_pages, language_hint, dpi))
+            
+            return self.build_pdf_result(pdf_path, pages_results, language_hint, dpi, start_time)
+        finally:
+            if is_temp:
+                _remove_temp_file(pdf_path)
+    
+    def build_pdf_result(
+        self,
+        pdf_path: str,
+        pages_results: List[PageOCRResult],
+        language_hint: Optional[LanguageCode] = None,
+        dpi: int = 300,
+        start_time: Optional[float] = None,
+    ) -> OCRResult:
+        """
+        Assembler le résultat d'un PDF à partir de ses pages.
+        
+        Applique le fallback IA aux pages OCRisées à faible confiance
+        (le PDF doit encore être sur disque), fusionne le texte et extrait
+        les métadonnées. Utilisé aussi par les jobs OCR (pages persistées).
+        """
+        import time
+        start_time = start_time or time.time()
         
-        total_pages = len(images)
-        pages_results: List[PageOCRResult] = []
         warnings: List[str] = []
+        if self.enable_fallback:
+            for page_result in pages_results:
+                if page_result.confidence < self.CONFIDENCE_THRESHOLD:
+                    warnings.append(
+                        f"Page {page_result.page_number}: confiance faible ({page_result.confidence:.2f})"
+                    )
         
-        # OCR page par page
-        for i, img in enumerate(images, 1):
-            logger.info(f"OCR page {i}/{total_pages}")
-            
-            page_result = self.extract_text_from_image(img, language_hint)
-            page_result.page_number = i
-            pages_results.append(page_result)
-            
-            # Vérifier si fallback nécessaire
-            if page_result.confidence < self.CONFIDENCE_THRESHOLD and self.enable_fallback:
-                warnings.append(f"Page {i}: confiance faible ({page_result.confidence:.2f})")
+        # Fallback IA page par page: seules les pages OCRisées à faible
+        # confiance sont envoyées (les pages texte natif n'en ont pas besoin)
+        fallback_used = False
+        low_confidence_pages = [
+            p for p in pages_results
+            if p.route == PageRoute.OCR and p.confidence < self.CONFIDENCE_THRESHOLD
+        ]
+        if self.enable_fallback and low_confidence_pages:
+            # Pages envoyées en parallèle (fallback_concurrency)
+            fallback_texts = _run_async(self._fallback_pdf_pages(
+                pdf_path,
+                [p.page_number for p in low_confidence_pages],
+                dpi,
+                language_hint,
+            ))
+            for page_result in low_confidence_pages:
+                fallback_result = fallback_texts.get(page_result.page_number)
+                if fallback_result and len(fallback_result) > len(page_result.text) * 0.5:
+                    page_result.text = fallback_result
+                    page_result.engine = (
+                        OCREngine.CLAUDE_VISION 
+                        if self.fallback_provider == "claude" 
+                        else OCREngine.GPT4_VISION
+                    )
+                    page_result.route = PageRoute.LLM_FALLBACK
+                    lang, _ = detect_language(fallback_result)
+                    page_result.language = lang
+                    page_result.confidence = estimate_confidence(fallback_result, lang)
+                    fallback_used = True
         
         # Fusionner les résultats
         texts = [p.text for p in pages_results]
@@ -415,32 +516,6 @@ class OCRPipeline:
         # Détecter la langue dominante
         dominant_lang, avg_confidence = detect_pages_language(texts)
         
-        # Vérifier si fallback nécessaire globalement
-        fallback_used = False
-        if avg_confidence < self.CONFIDENCE_THRESHOLD and self.enable_fallback:
-            # Tenter le fallback IA sur les pages à faible confiance
-            for i, page_result in enumerate(pages_results):
-                if page_result.confidence < self.CONFIDENCE_THRESHOLD:
-                    try:
-                        img_bytes = self._image_to_bytes(images[i])
-                        fallback_result = self.fallback_llm_ocr(img_bytes)
-                        if fallback_result and len(fallback_result) > len(page_result.text) * 0.5:
-                            pages_results[i].text = fallback_result
-                            pages_results[i].engine = (
-                                OCREngine.CLAUDE_VISION 
-                                if self.fallback_provider == "claude" 
-                                else OCREngine.GPT4_VISION
-                            )
-                            fallback_used = True
-                    except Exception as e:
-                        logger.warning(f"Fallback échoué page {i+1}: {e}")
-            
-            # Refusionner si fallback utilisé
-            if fallback_used:
-                texts = [p.text for p in pages_results]
-                merged_text = merge_pages_text(texts)
-                dominant_lang, avg_confidence = detect_pages_language(texts)
-        
         # Extraire les métadonnées
         from .ocr_utils import extract_dates_dz, extract_amounts_dzd
         dates = extract_dates_dz(merged_text)
@@ -455,8 +530,8 @@ class OCRPipeline:
             language_name=self._get_language_name(dominant_lang),
             confidence=avg_confidence,
             is_pdf=True,
-            pages=total_pages,
-            engine=OCREngine.HYBRID if fallback_used else OCREngine.TESSERACT,
+            pages=max(len(pages_results), 1),
+            engine=self._document_engine(pages_results),
             fallback_used=fallback_used,
             pages_detail=pages_results,
             extracted_dates=dates[:10],
@@ -465,6 +540,231 @@ class OCRPipeline:
             warnings=warnings,
         )
     
+    @staticmethod
+    def _document_engine(pages_results: List[PageOCRResult]) -> OCREngine:
+        """Moteur du document: celui de toutes les pages, sinon HYBRID."""
+        engines = {p.engine for p in pages_results}
+        if len(engines) == 1:
+            return engines.pop()
+        return OCREngine.HYBRID if engines else OCREngine.TESSERACT
+    
+    def iter_pdf_pages(
+        self,
+        pdf_data: Union[bytes, BinaryIO, str, Path],
+        language_hint: Optional[LanguageCode] = None,
+        max_pages: Optional[int] = None,
+        dpi: int = 300,
+        first_page: int = 1,
+    ) -> Iterator[PageOCRResult]:
+        """
+        OCR d'un PDF page par page, résultats produits dès qu'ils sont prêts.
+        
+        Les pages sont produites dans l'ordre à partir de first_page (reprise
+        d'un job); le fichier temporaire éventuel est supprimé à la fin (ou
+        à la fermeture du générateur).
+        Pas de fallback IA ici (voir build_pdf_result).
+        """
+        pdf_path, is_temp, total_pages = self._open_pdf(pdf_data)
+        try:
+            if max_pages:
+                total_pages = min(total_pages, max_pages)
+            yield from self._iter_pages(pdf_path, total_pages, language_hint, dpi, first_page)
+        finally:
+            if is_temp:
+                _remove_temp_file(pdf_path)
+    
+    async def stream_pdf_pages(
+        self,
+        pdf_data: Union[bytes, BinaryIO, str, Path],
+        language_hint: Optional[LanguageCode] = None,
+        max_pages: Optional[int] = None,
+        dpi: int = 300,
+        first_page: int = 1,
+    ) -> AsyncIterator[PageOCRResult]:
+        """Version async de iter_pdf_pages (le générateur tourne dans un thread)."""
+        pages = self.iter_pdf_pages(pdf_data, language_hint, max_pages, dpi, first_page)
+        try:
+            while True:
+                page_result = await asyncio.to_thread(next, pages, None)
+                if page_result is None:
+                    break
+                yield page_result
+        finally:
+            await asyncio.to_thread(pages.close)
+    
+    def _open_pdf(self, pdf_data: Union[bytes, BinaryIO, str, Path]) -> Tuple[str, bool, int]:
+        """
+        Préparer le PDF pour la rastérisation page par page.
+        
+        Returns:
+            (chemin, fichier temporaire ?, nombre de pages)
+        """
+        if isinstance(pdf_data, (str, Path)):
+            pdf_path, is_temp = str(pdf_data), False
+        else:
+            pdf_bytes = pdf_data if isinstance(pdf_data, bytes) else pdf_data.read()
+            fd, pdf_path = tempfile.mkstemp(suffix=".pdf", prefix="ocr_dz_")
+            with os.fdopen(fd, "wb") as f:
+                f.write(pdf_bytes)
+            is_temp = True
+        
+        try:
+            total_pages = _count_pdf_pages(pdf_path, self.poppler_path)
+        except Exception:
+            if is_temp:
+                _remove_temp_file(pdf_path)
+            raise
+        return pdf_path, is_temp, total_pages
+    
+    def page_window(self, dpi: int) -> int:
+        """Nombre de pages rastérisées en vol autorisé par le plafond mémoire."""
+        by_memory = int(self.memory_cap_mb // estimate_page_image_mb(dpi))
+        return max(1, min(self.page_workers, by_memory))
+    
+    def _iter_pages(
+        self,
+        pdf_path: str,
+        total_pages: int,
+        language_hint: Optional[LanguageCode],
+        dpi: int,
+        first_page: int = 1,
+    ) -> Iterator[PageOCRResult]:
+        """
+        Router chaque page puis produire les résultats dans l'ordre.
+        
+        Pré-passe sur la couche texte native: les pages dont le texte est
+        exploitable (score >= text_layer_min_score) ne sont ni rastérisées
+        ni OCRisées; les autres (scannées, texte illisible) passent par
+        Tesseract.
+        """
+        layer_texts = _extract_text_layer(pdf_path, total_pages) if self.use_text_layer else []
+        
+        native: Dict[int, PageOCRResult] = {}
+        layer_scores: Dict[int, float] = {}
+        for page_number, layer_text in enumerate(layer_texts, 1):
+            if page_number < first_page:
+                continue
+            score = score_text_layer(layer_text)
+            layer_scores[page_number] = score
+            if score >= self.text_layer_min_score:
+                native[page_number] = self._text_layer_page(page_number, layer_text, score, language_hint)
+        
+        ocr_page_numbers = [n for n in range(first_page, total_pages + 1) if n not in native]
+        if layer_texts:
+            logger.info(
+                f"Routage PDF: {len(native)} page(s) texte natif, "
+                f"{len(ocr_page_numbers)} page(s) OCR"
+            )
+        
+        ocr_results = self._ocr_pages(pdf_path, ocr_page_numbers, language_hint, dpi)
+        try:
+            for page_number in range(first_page, total_pages + 1):
+                if page_number in native:
+                    yield native[page_number]
+                    continue
+                page_result = next(ocr_results)
+                page_result.text_layer_score = layer_scores.get(page_number)
+                yield page_result
+        finally:
+            ocr_results.close()
+    
+    def _text_layer_page(
+        self,
+        page_number: int,
+        text: str,
+        score: float,
+        language_hint: Optional[LanguageCode],
+    ) -> PageOCRResult:
+        """Résultat de page depuis la couche texte native."""
+        language, _ = detect_language(text)
+        if language == "unknown" and language_hint:
+            language = language_hint
+        return PageOCRResult(
+            page_number=page_number,
+            text=clean_by_language(text, language),
+            language=language,
+            confidence=score,
+            engine=OCREngine.TEXT_LAYER,
+            route=PageRoute.TEXT_LAYER,
+            text_layer_score=score,
+        )
+    
+    def _ocr_pages(
+        self,
+        pdf_path: str,
+        page_numbers: List[int],
+        language_hint: Optional[LanguageCode],
+        dpi: int,
+    ) -> Iterator[PageOCRResult]:
+        """
+        Ordonnancer l'OCR des pages sur l'executor.
+        
+        Chaque tâche rastérise sa page (first_page=last_page) puis l'OCRise:
+        au plus page_window(dpi) images existent en même temps, et seul le
+        texte revient au processus principal. Résultats dans l'ordre de
+        page_numbers.
+        """
+        total = len(page_numbers)
+        window = self.page_window(dpi)
+        
+        if window <= 1 and self._page_executor is None:
+            # Séquentiel dans le processus courant (une seule page en mémoire)
+            for index, page_number in enumerate(page_numbers, 1):
+                logger.info(f"OCR page {page_number} ({index}/{total})")
+                try:
+                    image = _rasterize_pdf_page(pdf_path, page_number, dpi, self.poppler_path)
+                    try:
+                        page_result = self.extract_text_from_image(image, language_hint)
+                    finally:
+                        image.close()
+                    page_result.page_number = page_number
+                except Exception as e:
+                    logger.error(f"Erreur OCR page {page_number}: {e}")
+                    page_result = _empty_page_result(page_number)
+                yield page_result
+            return
+        
+        executor = self._page_executor or _get_page_pool(self.page_workers)
+        futures: Dict[int, Future] = {}
+        next_index = 0
+        next_to_yield = 0
+        
+        try:
+            while next_to_yield < total:
+                running = [f for f in futures.values() if not f.done()]
+                while next_index < total and len(running) < window:
+                    future = executor.submit(
+                        _ocr_pdf_page_worker,
+                        pdf_path,
+                        page_numbers[next_index],
+                        dpi,
+                        self.poppler_path,
+                        self.tesseract_path,
+                        language_hint,
+                    )
+                    futures[next_index] = future
+                    running.append(future)
+                    next_index += 1
+                
+                future = futures[next_to_yield]
+                if not future.done():
+                    wait(running, return_when=FIRST_COMPLETED)
+                    continue
+                
+                del futures[next_to_yield]
+                page_number = page_numbers[next_to_yield]
+                try:
+                    page_result = future.result()
+                except Exception as e:
+                    logger.error(f"Erreur OCR page {page_number}: {e}")
+                    page_result = _empty_page_result(page_number)
+                logger.info(f"OCR page {page_number} ({next_to_yield + 1}/{total})")
+                yield page_result
+                next_to_yield += 1
+        finally:
+            for future in futures.values():
+                future.cancel()
+    
     def _image_to_bytes(self, image: "Image.Image") -> bytes:
         """Convertir une image PIL en bytes."""
         buffer = io.BytesIO()
@@ -490,10 +790,21 @@ class OCRPipeline:
         Returns:
             Texte extrait ou None si échec
         """
+        # Image réduite/compressée avant envoi, puis cache par hash
+        image_bytes = await asyncio.to_thread(prepare_vision_image, image_bytes)
+        cache_key = _fallback_cache.key(image_bytes, self.fallback_provider, language_hint)
+        cached = _fallback_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         if self.fallback_provider == "claude":
-            return await self._claude_vision_ocr(image_bytes, language_hint)
+            text = await self._claude_vision_ocr(image_bytes, language_hint)
         else:
-            return await self._gpt4_vision_ocr(image_bytes, language_hint)
+            text = await self._gpt4_vision_ocr(image_bytes, language_hint)
+        
+        if text:
+            _fallback_cache.put(cache_key, text)
+        return text
     
     def fallback_llm_ocr(
         self,
@@ -503,27 +814,42 @@ class OCRPipeline:
         """
         OCR via LLM Vision - Version synchrone.
         """
-        import asyncio
-        
         try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # Dans un contexte async existant
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(
-                        asyncio.run,
-                        self.fallback_llm_ocr_async(image_bytes, language_hint)
-                    )
-                    return future.result(timeout=60)
-            else:
-                return loop.run_until_complete(
-                    self.fallback_llm_ocr_async(image_bytes, language_hint)
-                )
+            return _run_async(self.fallback_llm_ocr_async(image_bytes, language_hint))
         except Exception as e:
             logger.error(f"Erreur fallback LLM OCR: {e}")
             return None
     
+    async def _fallback_pdf_pages(
+        self,
+        pdf_path: str,
+        page_numbers: List[int],
+        dpi: int,
+        language_hint: Optional[LanguageCode] = None,
+    ) -> Dict[int, Optional[str]]:
+        """
+        Fallback IA concurrent sur des pages PDF.
+        
+        Au plus fallback_concurrency pages en vol: chaque page est
+        re-rastérisée puis réduite en JPEG (l'image pleine résolution est
+        libérée avant l'appel réseau).
+        """
+        semaphore = asyncio.Semaphore(self.fallback_concurrency)
+        
+        async def run(page_number: int) -> Optional[str]:
+            async with semaphore:
+                try:
+                    image_bytes = await asyncio.to_thread(
+                        _rasterize_vision_page, pdf_path, page_number, dpi, self.poppler_path
+                    )
+                    return await self.fallback_llm_ocr_async(image_bytes, language_hint)
+                except Exception as e:
+                    logger.warning(f"Fallback échoué page {page_number}: {e}")
+                    return None
+        
+        texts = await asyncio.gather(*(run(n) for n in page_numbers))
+        return dict(zip(page_numbers, texts))
+    
     async def _claude_vision_ocr(
         self,
         image_bytes: bytes,
@@ -572,7 +898,7 @@ Si le texte est mixte (arabe/français), préserve les deux langues."""
                                 "type": "image",
                                 "source": {
                                     "type": "base64",
-                                    "media_type": "image/png",
+                                    "media_type": _image_media_type(image_bytes),
                                     "data": image_b64,
                                 },
                             },
@@ -637,7 +963,7 @@ Retourne UNIQUEMENT le texte, sans commentaires."""
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/png;base64,{image_b64}",
+                                    "url": f"data:{_image_media_type(image_bytes)};base64,{image_b64}",
                                 },
                             },
                         ],
@@ -692,8 +1018,8 @@ Retourne UNIQUEMENT le texte, sans commentaires."""
         is_pdf = self._is_pdf(file_bytes, filename)
         
         if is_pdf:
-            # Traiter comme PDF
-            result = self.extract_text_from_pdf(file_bytes, language_hint)
+            # Traiter comme PDF (bloquant: hors de la boucle événementielle)
+            result = await asyncio.to_thread(self.extract_text_from_pdf, file_bytes, language_hint)
         else:
             # Traiter comme image
             try:
@@ -784,8 +1110,11 @@ Retourne UNIQUEMENT le texte, sans commentaires."""
             "version": "1.0.0",
             "tesseract_available": self.tesseract_available,
             "pdf_available": self.pdf_available,
+            "text_layer_available": self.text_layer_available,
             "fallback_enabled": self.enable_fallback,
             "fallback_provider": self.fallback_provider,
+            "fallback_concurrency": self.fallback_concurrency,
+            "fallback_cache": _fallback_cache.get_stats(),
             "openai_configured": bool(self.openai_api_key),
             "anthropic_configured": bool(self.anthropic_api_key),
             "supported_formats": ["pdf", "png", "jpg", "jpeg", "tiff", "bmp", "gif"],
@@ -793,6 +1122,270 @@ Retourne UNIQUEMENT le texte, sans commentaires."""
         }
 
 
+# ============================================
+# OCR DES PAGES PDF (WORKERS)
+# ============================================
+
+_page_pool: Optional[ProcessPoolExecutor] = None
+_page_pool_lock = threading.Lock()
+
+# Pipeline propre à chaque processus worker (créé au premier appel)
+_worker_pipelines: Dict[Optional[str], OCRPipeline] = {}
+
+
+def _get_page_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Pool de processus partagé pour l'OCR des pages (créé à la demande).
+    
+    Démarrage "spawn": le serveur est multi-threadé (boucle asyncio, pools de
+    threads), un fork copierait des verrous tenus par d'autres threads.
+    """
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(
+                max_workers=max(1, workers),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Pool OCR: {max(1, workers)} processus")
+        return _page_pool
+
+
+def shutdown_page_pool() -> None:
+    """Arrêter le pool de processus OCR (shutdown de l'application)."""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is not None:
+            _page_pool.shutdown(wait=False, cancel_futures=True)
+            _page_pool = None
+
+
+def _count_pdf_pages(pdf_path: str, poppler_path: Optional[str] = None) -> int:
+    """Nombre de pages du PDF (pdfinfo, sans rastériser)."""
+    from pdf2image import pdfinfo_from_path
+    return int(pdfinfo_from_path(pdf_path, poppler_path=poppler_path)["Pages"])
+
+
+def _extract_text_layer(pdf_path: str, max_pages: int) -> List[str]:
+    """
+    Texte natif de chaque page (PyPDF2), liste vide si indisponible.
+    
+    NFKC ramène les formes de présentation arabes (FB50-FEFF) aux lettres de base.
+    """
+    if not PYPDF2_AVAILABLE:
+        return []
+    
+    import unicodedata
+    
+    try:
+        reader = PyPDF2.PdfReader(pdf_path)
+        if reader.is_encrypted:
+            reader.decrypt("")
+        texts = []
+        for page in reader.pages[:max_pages]:
+            try:
+                texts.append(unicodedata.normalize("NFKC", page.extract_text() or ""))
+            except Exception as e:
+                logger.debug(f"Couche texte illisible: {e}")
+                texts.append("")
+        return texts
+    except Exception as e:
+        logger.warning(f"Lecture couche texte PDF impossible: {e}")
+        return []
+
+
+def _rasterize_pdf_page(
+    pdf_path: str,
+    page_number: int,
+    dpi: int,
+    poppler_path: Optional[str] = None,
+) -> "Image.Image":
+    """Rastériser une seule page (niveaux de gris, comme le prétraitement OCR)."""
+    from pdf2image import convert_from_path
+    images = convert_from_path(
+        pdf_path,
+        dpi=dpi,
+        first_page=page_number,
+        last_page=page_number,
+        grayscale=True,
+        poppler_path=poppler_path,
+    )
+    if not images:
+        raise ValueError(f"Page {page_number} introuvable")
+    return images[0]
+
+
+def _ocr_pdf_page_worker(
+    pdf_path: str,
+    page_number: int,
+    dpi: int,
+    poppler_path: Optional[str],
+    tesseract_path: Optional[str],
+    language_hint: Optional[LanguageCode],
+) -> PageOCRResult:
+    """Tâche worker: rastériser puis OCRiser une page, retourne le texte."""
+    pipeline = _worker_pipelines.get(tesseract_path)
+    if pipeline is None:
+        pipeline = OCRPipeline(
+            tesseract_path=tesseract_path,
+            poppler_path=poppler_path,
+            enable_fallback=False,
+            page_workers=1,
+        )
+        _worker_pipelines[tesseract_path] = pipeline
+    
+    image = _rasterize_pdf_page(pdf_path, page_number, dpi, poppler_path)
+    try:
+        page_result = pipeline.extract_text_from_image(image, language_hint)
+    finally:
+        image.close()
+    page_result.page_number = page_number
+    return page_result
+
+
+def _empty_page_result(page_number: int) -> PageOCRResult:
+    return PageOCRResult(
+        page_number=page_number,
+        text="",
+        language="unknown",
+        confidence=0.0,
+        engine=OCREngine.TESSERACT,
+    )
+
+
+def _remove_temp_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+# ============================================
+# FALLBACK VISION (IMAGES + CACHE)
+# ============================================
+
+def _encode_vision_image(
+    image: "Image.Image",
+    max_side: int = OCR_FALLBACK_MAX_SIDE,
+    quality: int = OCR_FALLBACK_JPEG_QUALITY,
+) -> bytes:
+    """Réduire (côté max) et compresser en JPEG niveaux de gris pour l'upload."""
+    from PIL import Image
+    
+    image = image.convert("L")
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def prepare_vision_image(image_bytes: bytes) -> bytes:
+    """Image prête pour le fallback IA (inchangée si illisible ou déjà plus petite)."""
+    from PIL import Image
+    
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            prepared = _encode_vision_image(image)
+    except Exception as e:
+        logger.debug(f"Image fallback non réduite: {e}")
+        return image_bytes
+    return prepared if len(prepared) < len(image_bytes) else image_bytes
+
+
+def _rasterize_vision_page(
+    pdf_path: str,
+    page_number: int,
+    dpi: int,
+    poppler_path: Optional[str] = None,
+) -> bytes:
+    """Rastériser une page PDF et l'encoder directement pour le fallback IA."""
+    image = _rasterize_pdf_page(pdf_path, page_number, dpi, poppler_path)
+    try:
+        return _encode_vision_image(image)
+    finally:
+        image.close()
+
+
+def _image_media_type(image_bytes: bytes) -> str:
+    if image_bytes[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    if image_bytes[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "image/png"
+
+
+class VisionOCRCache:
+    """
+    Cache LRU mémoire des textes du fallback IA
+    
+    Clé: SHA-256 de l'image envoyée + provider + langue. Une même page
+    (re-soumise, ou dupliquée dans un lot) ne coûte qu'un appel Vision.
+    """
+    
+    def __init__(self, max_entries: int = OCR_FALLBACK_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+    
+    @staticmethod
+    def key(image_bytes: bytes, provider: str, language_hint: Optional[str]) -> str:
+        digest = hashlib.sha256(image_bytes)
+        digest.update(f"|{provider}|{language_hint or ''}".encode())
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return text
+    
+    def put(self, key: str, text: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.stats = {"hits": 0, "misses": 0}
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries), "max_entries": self.max_entries}
+
+
+_fallback_cache = VisionOCRCache()
+
+
+def _run_async(coro):
+    """
+    Exécuter une coroutine depuis du code synchrone.
+    
+    Dans un thread sans boucle (cas de extract_text_from_pdf via
+    asyncio.to_thread): asyncio.run; sous une boucle active: thread dédié.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    
+    import concurrent.futures
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
 # ============================================
 # INSTANCE GLOBALE
 # ============================================
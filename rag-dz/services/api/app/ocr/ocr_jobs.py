@@ -0,0 +1,538 @@
+"""
+OCR_DZ - Jobs OCR batch
+=======================
+File de jobs OCR persistante pour les gros lots (archives, Journal Officiel)
+
+- Soumission: les uploads sont copiés dans inputs/ (jamais chargés en mémoire),
+  un job_id est retourné; chaque job appartient au tenant qui l'a soumis
+- Workers: pool local de tâches asyncio (OCR_JOB_WORKERS fichiers en parallèle,
+  les pages d'un PDF utilisent le pool de processus du pipeline)
+- Persistance incrémentale: chaque page PDF est ajoutée à un JSONL dès
+  qu'elle est OCRisée, l'état du job est réécrit atomiquement
+- Reprise: au démarrage, les jobs non terminés sont remis en file et les PDF
+  reprennent à la première page non persistée
+
+Arborescence:
+    <OCR_JOBS_DIR>/<job_id>/job.json
+    <OCR_JOBS_DIR>/<job_id>/inputs/<index>_<nom>
+    <OCR_JOBS_DIR>/<job_id>/pages/<index>.jsonl
+    <OCR_JOBS_DIR>/<job_id>/results/<index>.json
+
+Configuration (env):
+- OCR_JOBS_DIR: dossier des jobs
+- OCR_JOB_WORKERS: fichiers traités en parallèle (défaut 2)
+"""
+
+import os
+import uuid
+import shutil
+import asyncio
+import logging
+import tempfile
+from contextlib import aclosing
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Callable, AsyncIterator
+
+from pydantic import BaseModel, Field
+
+from .ocr_dz_pipeline import OCRPipeline, OCRResult, PageOCRResult, _count_pdf_pages
+from .ocr_utils import LanguageCode
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DIR = os.path.join(tempfile.gettempdir(), "iafactory_ocr_jobs")
+OCR_JOB_WORKERS = int(os.getenv("OCR_JOB_WORKERS", "2"))
+
+
+# ============================================
+# MODÈLES
+# ============================================
+
+class OCRJobStatus(str, Enum):
+    """État d'un job ou d'un fichier"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+TERMINAL_STATUSES = {OCRJobStatus.COMPLETED, OCRJobStatus.FAILED, OCRJobStatus.CANCELLED}
+
+
+class OCRJobFile(BaseModel):
+    """Progression d'un fichier du job"""
+    index: int
+    filename: str
+    is_pdf: bool = False
+    size_bytes: int = 0
+    status: OCRJobStatus = OCRJobStatus.QUEUED
+    pages_total: Optional[int] = None
+    pages_done: int = 0
+    language: Optional[LanguageCode] = None
+    confidence: Optional[float] = None
+    error: Optional[str] = None
+
+
+class OCRJob(BaseModel):
+    """Job OCR batch"""
+    job_id: str
+    tenant_id: Optional[str] = None  # Tenant propriétaire (filtrage API)
+    status: OCRJobStatus = OCRJobStatus.QUEUED
+    language_hint: Optional[LanguageCode] = None
+    enable_fallback: bool = True
+    dpi: int = 300
+    files: List[OCRJobFile] = Field(default_factory=list)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    error: Optional[str] = None
+
+    @property
+    def files_done(self) -> int:
+        return sum(1 for f in self.files if f.status in TERMINAL_STATUSES)
+
+    def summary(self) -> dict:
+        """État + compteurs (réponse API et événements de progression)"""
+        return {
+            **self.model_dump(mode="json"),
+            "files_total": len(self.files),
+            "files_done": self.files_done,
+            "files_failed": sum(1 for f in self.files if f.status == OCRJobStatus.FAILED),
+            "pages_done": sum(f.pages_done for f in self.files),
+        }
+
+
+# ============================================
+# STOCKAGE DISQUE
+# ============================================
+
+class OCRJobStore:
+    """
+    Persistance des jobs sur disque
+
+    Méthodes synchrones (appeler via asyncio.to_thread depuis le code async).
+    """
+
+    def __init__(self, root: str = DEFAULT_JOBS_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _job_dir(self, job_id: str) -> Path:
+        if not job_id.isalnum():  # job_id vient de l'URL
+            raise ValueError(f"job_id invalide: {job_id!r}")
+        return self.root / job_id
+
+    def new_input_path(self, job_id: str, index: int, filename: str) -> Path:
+        """Chemin de destination d'un fichier d'entrée (dossier inputs/ créé)"""
+        inputs_dir = self._job_dir(job_id) / "inputs"
+        inputs_dir.mkdir(parents=True, exist_ok=True)
+        safe_name = Path(filename).name or "document"
+        return inputs_dir / f"{index}_{safe_name}"
+
+    def input_path(self, job_id: str, index: int) -> Path:
+        matches = list((self._job_dir(job_id) / "inputs").glob(f"{index}_*"))
+        if not matches:
+            raise FileNotFoundError(f"Input {index} introuvable pour le job {job_id}")
+        return matches[0]
+
+    def _pages_path(self, job_id: str, index: int) -> Path:
+        return self._job_dir(job_id) / "pages" / f"{index}.jsonl"
+
+    def _result_path(self, job_id: str, index: int) -> Path:
+        return self._job_dir(job_id) / "results" / f"{index}.json"
+
+    # ----------------------------------------
+    # JOBS
+    # ----------------------------------------
+
+    def create(self, job: OCRJob, files: List[Tuple[str, Path]]) -> None:
+        """Placer les fichiers d'entrée dans inputs/ (déplacés si besoin) puis écrire l'état initial"""
+        job_dir = self._job_dir(job.job_id)
+        for sub in ("inputs", "pages", "results"):
+            (job_dir / sub).mkdir(parents=True, exist_ok=True)
+        for job_file, (_, path) in zip(job.files, files):
+            dest = self.new_input_path(job.job_id, job_file.index, job_file.filename)
+            if Path(path) != dest:
+                shutil.move(str(path), dest)
+        self.save(job)
+
+    def save(self, job: OCRJob) -> None:
+        """Écriture atomique de job.json"""
+        job.updated_at = datetime.utcnow()
+        job_dir = self._job_dir(job.job_id)
+        fd, tmp_path = tempfile.mkstemp(dir=job_dir, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(job.model_dump_json())
+        os.replace(tmp_path, job_dir / "job.json")
+
+    def load(self, job_id: str) -> Optional[OCRJob]:
+        try:
+            path = self._job_dir(job_id) / "job.json"
+            return OCRJob.model_validate_json(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def list_jobs(self) -> List[OCRJob]:
+        jobs = [self.load(path.parent.name) for path in self.root.glob("*/job.json")]
+        return sorted((j for j in jobs if j), key=lambda j: j.created_at, reverse=True)
+
+    def delete(self, job_id: str) -> None:
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+
+    # ----------------------------------------
+    # PAGES / RÉSULTATS
+    # ----------------------------------------
+
+    def append_page(self, job_id: str, index: int, page: PageOCRResult) -> None:
+        with open(self._pages_path(job_id, index), "a", encoding="utf-8") as f:
+            f.write(page.model_dump_json() + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read_pages(self, job_id: str, index: int, repair: bool = False) -> List[PageOCRResult]:
+        """
+        Pages persistées d'un fichier
+
+        Une dernière ligne tronquée (arrêt brutal) est ignorée; repair=True
+        réécrit le JSONL sans elle avant une reprise.
+        """
+        path = self._pages_path(job_id, index)
+        if not path.exists():
+            return []
+
+        pages: List[PageOCRResult] = []
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                pages.append(PageOCRResult.model_validate_json(line))
+            except ValueError:
+                break
+
+        if repair:
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(page.model_dump_json() + "\n" for page in pages)
+            os.replace(tmp_path, path)
+        return pages
+
+    def write_result(self, job_id: str, index: int, result: OCRResult) -> None:
+        path = self._result_path(job_id, index)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(result.model_dump_json())
+        os.replace(tmp_path, path)
+
+    def read_result(self, job_id: str, index: int) -> Optional[OCRResult]:
+        try:
+            return OCRResult.model_validate_json(self._result_path(job_id, index).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+
+def _job_file(index: int, filename: str, path: Path) -> OCRJobFile:
+    """Métadonnées d'un fichier d'entrée (type détecté sur les premiers octets)"""
+    with open(path, "rb") as f:
+        head = f.read(4)
+    return OCRJobFile(
+        index=index,
+        filename=filename,
+        is_pdf=head == b"%PDF" or filename.lower().endswith(".pdf"),
+        size_bytes=path.stat().st_size,
+    )
+
+
+# ============================================
+# GESTIONNAIRE DE JOBS
+# ============================================
+
+class OCRJobManager:
+    """
+    File de jobs OCR avec pool de workers local
+
+    L'état de référence est en mémoire (self._jobs) et recopié sur disque à
+    chaque progression; les abonnés (watch) sont réveillés à chaque écriture.
+    """
+
+    def __init__(
+        self,
+        store: Optional[OCRJobStore] = None,
+        workers: int = OCR_JOB_WORKERS,
+        pipeline_factory: Optional[Callable[[bool], OCRPipeline]] = None,
+    ):
+        self.store = store or OCRJobStore(os.getenv("OCR_JOBS_DIR", DEFAULT_JOBS_DIR))
+        self.workers = max(1, workers)
+        self._pipeline_factory = pipeline_factory or (
+            lambda enable_fallback: OCRPipeline(enable_fallback=enable_fallback)
+        )
+        self._pipelines: Dict[bool, OCRPipeline] = {}
+        self._jobs: Dict[str, OCRJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Optional[asyncio.Condition] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    # ----------------------------------------
+    # CYCLE DE VIE
+    # ----------------------------------------
+
+    async def start(self) -> int:
+        """Démarrer les workers et reprendre les jobs non terminés"""
+        if self.running:
+            return 0
+        self._queue = asyncio.Queue()
+        self._changed = asyncio.Condition()
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"ocr-job-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+        resumed = 0
+        for job in await asyncio.to_thread(self.store.list_jobs):
+            self._jobs[job.job_id] = job
+            if job.status in TERMINAL_STATUSES:
+                continue
+            for job_file in job.files:
+                if job_file.status not in TERMINAL_STATUSES:
+                    job_file.status = OCRJobStatus.QUEUED
+                    self._queue.put_nowait((job.job_id, job_file.index))
+            job.status = OCRJobStatus.QUEUED
+            await self._save(job)
+            resumed += 1
+
+        if resumed:
+            logger.info(f"OCR jobs: {resumed} job(s) repris")
+        return resumed
+
+    async def stop(self) -> None:
+        """Arrêter les workers (les jobs en cours reprendront au prochain start)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ----------------------------------------
+    # API
+    # ----------------------------------------
+
+    def new_job_id(self) -> str:
+        """Identifiant d'un job à soumettre (pour écrire ses entrées via store.new_input_path)"""
+        return uuid.uuid4().hex
+
+    async def submit(
+        self,
+        files: List[Tuple[str, Path]],
+        language_hint: Optional[LanguageCode] = None,
+        enable_fallback: bool = True,
+        dpi: int = 300,
+        tenant_id: Optional[str] = None,
+        job_id: Optional[str] = None,
+    ) -> OCRJob:
+        """
+        Mettre en file un job à partir de fichiers déjà sur disque
+
+        Args:
+            files: (nom d'origine, chemin); les chemins hors de inputs/ y sont déplacés
+            tenant_id: Tenant propriétaire (seul à voir le job via l'API)
+            job_id: Identifiant réservé par new_job_id() (entrées déjà écrites)
+        """
+        if not self.running:
+            await self.start()
+
+        job = OCRJob(
+            job_id=job_id or self.new_job_id(),
+            tenant_id=tenant_id,
+            language_hint=language_hint,
+            enable_fallback=enable_fallback,
+            dpi=dpi,
+            files=await asyncio.to_thread(
+                lambda: [_job_file(i, name, Path(path)) for i, (name, path) in enumerate(files)]
+            ),
+        )
+        await asyncio.to_thread(self.store.create, job, files)
+        self._jobs[job.job_id] = job
+
+        for job_file in job.files:
+            self._queue.put_nowait((job.job_id, job_file.index))
+        logger.info(f"OCR job {job.job_id}: {len(files)} fichier(s) en file")
+        return job
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        return self._jobs.get(job_id) or self.store.load(job_id)
+
+    def list_jobs(self, tenant_id: Optional[str] = None) -> List[OCRJob]:
+        """Jobs connus d'un tenant (les plus récents d'abord)"""
+        jobs = (job for job in self._jobs.values() if job.tenant_id == tenant_id)
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    async def cancel(self, job_id: str) -> Optional[OCRJob]:
+        """Annuler: les fichiers en file sont ignorés, le fichier en cours s'arrête à la page suivante"""
+        job = self._jobs.get(job_id)
+        if job is None or job.status in TERMINAL_STATUSES:
+            return job
+        job.status = OCRJobStatus.CANCELLED
+        for job_file in job.files:
+            if job_file.status not in TERMINAL_STATUSES:
+                job_file.status = OCRJobStatus.CANCELLED
+        await self._save(job)
+        return job
+
+    async def delete(self, job_id: str) -> bool:
+        """Annuler puis supprimer le job et ses fichiers"""
+        await self.cancel(job_id)
+        job = self._jobs.pop(job_id, None) or self.store.load(job_id)
+        if job is None:
+            return False
+        await asyncio.to_thread(self.store.delete, job_id)
+        return True
+
+    async def results(self, job_id: str) -> AsyncIterator[Tuple[OCRJobFile, Optional[OCRResult]]]:
+        """Résultats des fichiers terminés (dans l'ordre de soumission)"""
+        job = self.get(job_id)
+        if job is None:
+            return
+        for job_file in job.files:
+            result = None
+            if job_file.status == OCRJobStatus.COMPLETED:
+                result = await asyncio.to_thread(self.store.read_result, job_id, job_file.index)
+            yield job_file, result
+
+    async def watch(self, job_id: str, poll_interval: float = 15.0) -> AsyncIterator[dict]:
+        """Progression du job: un état à chaque changement, jusqu'à l'état final"""
+        last = None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            summary = job.summary()
+            if summary != last:
+                last = summary
+                yield summary
+            if job.status in TERMINAL_STATUSES or self._changed is None:
+                return
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    # ----------------------------------------
+    # WORKERS
+    # ----------------------------------------
+
+    async def _save(self, job: OCRJob) -> None:
+        await asyncio.to_thread(self.store.save, job)
+        if self._changed is not None:
+            async with self._changed:
+                self._changed.notify_all()
+
+    def _pipeline(self, enable_fallback: bool) -> OCRPipeline:
+        if enable_fallback not in self._pipelines:
+            self._pipelines[enable_fallback] = self._pipeline_factory(enable_fallback)
+        return self._pipelines[enable_fallback]
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id, index = await self._queue.get()
+            try:
+                job = self._jobs.get(job_id)
+                if job is None or job.files[index].status in TERMINAL_STATUSES:
+                    continue
+                await self._process_file(job, job.files[index])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"OCR job {job_id} worker {worker_id}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _process_file(self, job: OCRJob, job_file: OCRJobFile) -> None:
+        job_file.status = OCRJobStatus.RUNNING
+        if job.status == OCRJobStatus.QUEUED:
+            job.status = OCRJobStatus.RUNNING
+        await self._save(job)
+
+        pipeline = self._pipeline(job.enable_fallback)
+        try:
+            input_path = self.store.input_path(job.job_id, job_file.index)
+            if job_file.is_pdf:
+                result = await self._process_pdf(job, job_file, pipeline, input_path)
+            else:
+                data = await asyncio.to_thread(input_path.read_bytes)
+                result = await pipeline.auto_ocr(data, job_file.filename, job.language_hint)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"OCR job {job.job_id} fichier {job_file.filename}: {e}")
+            result = OCRResult(text="", language="unknown", is_pdf=job_file.is_pdf, pages=1, error=str(e))
+
+        if job_file.status == OCRJobStatus.CANCELLED or result is None:
+            await self._finish_job(job)
+            return
+
+        await asyncio.to_thread(self.store.write_result, job.job_id, job_file.index, result)
+        job_file.status = OCRJobStatus.FAILED if result.error else OCRJobStatus.COMPLETED
+        job_file.error = result.error
+        job_file.language = result.language
+        job_file.confidence = result.confidence
+        if not job_file.is_pdf:
+            job_file.pages_total = job_file.pages_done = result.pages
+        await self._finish_job(job)
+
+    async def _process_pdf(
+        self,
+        job: OCRJob,
+        job_file: OCRJobFile,
+        pipeline: OCRPipeline,
+        input_path: Path,
+    ) -> Optional[OCRResult]:
+        """OCR page par page, chaque page persistée; reprise après la dernière page écrite"""
+        start_time = asyncio.get_running_loop().time()
+        pages = await asyncio.to_thread(self.store.read_pages, job.job_id, job_file.index, True)
+        job_file.pages_total = await asyncio.to_thread(_count_pdf_pages, str(input_path), pipeline.poppler_path)
+        job_file.pages_done = len(pages)
+
+        if len(pages) < job_file.pages_total:
+            stream = pipeline.stream_pdf_pages(
+                str(input_path), job.language_hint, dpi=job.dpi, first_page=len(pages) + 1
+            )
+            async with aclosing(stream):
+                async for page in stream:
+                    if job_file.status == OCRJobStatus.CANCELLED:
+                        return None
+                    await asyncio.to_thread(self.store.append_page, job.job_id, job_file.index, page)
+                    pages.append(page)
+                    job_file.pages_done = len(pages)
+                    await self._save(job)
+
+        result = await asyncio.to_thread(
+            pipeline.build_pdf_result, str(input_path), pages, job.language_hint, job.dpi
+        )
+        result.processing_time_ms = int((asyncio.get_running_loop().time() - start_time) * 1000)
+        return result
+
+    async def _finish_job(self, job: OCRJob) -> None:
+        if job.status != OCRJobStatus.CANCELLED and all(f.status in TERMINAL_STATUSES for f in job.files):
+            failed = all(f.status == OCRJobStatus.FAILED for f in job.files)
+            job.status = OCRJobStatus.FAILED if failed else OCRJobStatus.COMPLETED
+            logger.info(f"OCR job {job.job_id}: {job.status.value} ({job.files_done} fichier(s))")
+        await self._save(job)
+
+
+# ============================================
+# INSTANCE GLOBALE
+# ============================================
+
+_job_manager: Optional[OCRJobManager] = None
+
+
+def get_ocr_job_manager() -> OCRJobManager:
+    """Gestionnaire de jobs OCR (singleton)"""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = OCRJobManager()
+    return _job_manager
@@ -5,21 +5,27 @@ Endpoints OCR multilingue (arabe/français/anglais)
 """
 
 import io
+import json
 import time
+import shutil
+import asyncio
 import logging
 from typing import Optional, List, Literal
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from .ocr_dz_pipeline import OCRPipeline, OCRResult, ocr_pipeline, OCREngine
+from .ocr_jobs import get_ocr_job_manager
 from .ocr_utils import (
     detect_language,
     clean_arabic,
     normalize_arabic,
     LanguageCode,
     get_language_name,
+    detect_pages_language,
 )
 
 logger = logging.getLogger(__name__)
@@ -212,6 +218,57 @@ async def extract_text_quick(
     }
 
 
+@router.post("/extract/stream")
+async def extract_pdf_stream(
+    file: UploadFile = File(..., description="PDF à OCR"),
+    language_hint: Optional[LanguageCode] = Form(None, description="Langue attendue (ar, fr, en)"),
+    max_pages: Optional[int] = Form(None, ge=1, description="Nombre max de pages"),
+    dpi: int = Form(300, ge=72, le=600, description="Résolution de rastérisation"),
+):
+    """
+    📄⚡ OCR d'un PDF streamé page par page
+    
+    Les pages avec une couche texte native sont lues directement, les pages
+    scannées sont OCRisées en parallèle (pool de processus, mémoire bornée)
+    et chaque PageOCRResult est envoyé en JSON sur sa propre ligne, dans
+    l'ordre des pages, dès qu'il est prêt. La dernière ligne est un résumé
+    (`{"done": true, ...}`). Pas de fallback IA (voir /extract).
+    """
+    file_bytes = await file.read()
+    
+    if len(file_bytes) == 0:
+        raise HTTPException(status_code=400, detail="Fichier vide")
+    
+    if not ocr_pipeline._is_pdf(file_bytes, file.filename):
+        raise HTTPException(status_code=400, detail="Seuls les PDF sont supportés")
+    
+    async def ndjson():
+        start_time = time.time()
+        texts: List[str] = []
+        routes: dict = {}
+        try:
+            async for page in ocr_pipeline.stream_pdf_pages(file_bytes, language_hint, max_pages, dpi):
+                texts.append(page.text)
+                routes[page.route.value] = routes.get(page.route.value, 0) + 1
+                yield page.model_dump_json() + "\n"
+        except Exception as e:
+            logger.error(f"Erreur OCR stream: {e}", exc_info=True)
+            yield json.dumps({"done": True, "error": str(e)}) + "\n"
+            return
+        
+        language, confidence = detect_pages_language(texts)
+        yield json.dumps({
+            "done": True,
+            "pages": len(texts),
+            "language": language,
+            "confidence": confidence,
+            "routes": routes,
+            "processing_time_ms": int((time.time() - start_time) * 1000),
+        }) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 # ============================================
 # ENDPOINTS DÉTECTION LANGUE
 # ============================================
@@ -379,6 +436,170 @@ async def extract_text_batch(
     )
 
 
+# ============================================
+# ENDPOINTS JOBS (BATCH ASYNCHRONE)
+# ============================================
+
+OCR_JOB_MAX_FILES = 500
+OCR_JOB_MAX_FILE_BYTES = 50 * 1024 * 1024  # 50 MB
+
+
+def _request_tenant_id(request: Request) -> Optional[str]:
+    """Tenant de la requête (JWT: request.state.tenant_id, clé API: request.state.tenant)"""
+    tenant_id = getattr(request.state, "tenant_id", None)
+    if tenant_id is None:
+        tenant_id = (getattr(request.state, "tenant", None) or {}).get("id")
+    return str(tenant_id) if tenant_id is not None else None
+
+
+def _get_tenant_job(job_id: str, tenant_id: Optional[str]):
+    """Job du tenant, 404 sinon (un job d'un autre tenant n'existe pas pour lui)"""
+    job = get_ocr_job_manager().get(job_id)
+    if job is None or job.tenant_id != tenant_id:
+        raise HTTPException(status_code=404, detail="Job introuvable")
+    return job
+
+
+def _copy_upload(upload: UploadFile, dest) -> int:
+    """Copie un upload (déjà spoolé par Starlette) vers dest par blocs; retourne la taille"""
+    upload.file.seek(0)
+    with open(dest, "wb") as f:
+        shutil.copyfileobj(upload.file, f, length=1024 * 1024)
+    return dest.stat().st_size
+
+
+@router.post("/jobs", status_code=202)
+async def create_ocr_job(
+    request: Request,
+    files: List[UploadFile] = File(..., description="Documents à OCR (PDF ou images)"),
+    language_hint: Optional[LanguageCode] = Form(None, description="Langue attendue (ar, fr, en)"),
+    enable_fallback: bool = Form(True, description="Activer fallback IA"),
+    dpi: int = Form(300, ge=72, le=600, description="Résolution de rastérisation"),
+):
+    """
+    🗂️ Créer un job OCR batch
+    
+    Les fichiers sont copiés sur disque (sans passer par la mémoire) puis
+    traités en arrière-plan par le pool de workers; la réponse contient le
+    job_id à suivre via /jobs/{job_id} (état), /jobs/{job_id}/events
+    (progression NDJSON) et /jobs/{job_id}/results. Le job n'est visible
+    que du tenant qui l'a créé. Les jobs interrompus reprennent au redémarrage.
+    """
+    if len(files) > OCR_JOB_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {OCR_JOB_MAX_FILES} fichiers par job",
+        )
+    
+    manager = get_ocr_job_manager()
+    job_id = manager.new_job_id()
+    staged = []
+    try:
+        for index, file in enumerate(files):
+            filename = file.filename or "document"
+            if file.size is not None and file.size > OCR_JOB_MAX_FILE_BYTES:
+                raise HTTPException(status_code=400, detail=f"Fichier trop volumineux (max 50 MB): {filename}")
+            dest = manager.store.new_input_path(job_id, index, filename)
+            size = await asyncio.to_thread(_copy_upload, file, dest)
+            if size == 0:
+                raise HTTPException(status_code=400, detail=f"Fichier vide: {filename}")
+            if size > OCR_JOB_MAX_FILE_BYTES:
+                raise HTTPException(status_code=400, detail=f"Fichier trop volumineux (max 50 MB): {filename}")
+            staged.append((filename, dest))
+        
+        job = await manager.submit(
+            staged,
+            language_hint=language_hint,
+            enable_fallback=enable_fallback,
+            dpi=dpi,
+            tenant_id=_request_tenant_id(request),
+            job_id=job_id,
+        )
+    except BaseException:
+        await asyncio.to_thread(manager.store.delete, job_id)
+        raise
+    return job.summary()
+
+
+@router.get("/jobs")
+async def list_ocr_jobs(request: Request):
+    """
+    📋 Lister les jobs OCR du tenant
+    """
+    jobs = get_ocr_job_manager().list_jobs(tenant_id=_request_tenant_id(request))
+    return {"jobs": [job.summary() for job in jobs]}
+
+
+@router.get("/jobs/{job_id}")
+async def get_ocr_job(job_id: str, request: Request):
+    """
+    📊 État d'un job OCR (progression par fichier et par page)
+    """
+    return _get_tenant_job(job_id, _request_tenant_id(request)).summary()
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_ocr_job_events(job_id: str, request: Request):
+    """
+    📡 Progression d'un job en NDJSON
+    
+    Une ligne (état complet du job) à chaque progression, jusqu'à l'état
+    final (completed, failed ou cancelled).
+    """
+    _get_tenant_job(job_id, _request_tenant_id(request))
+    manager = get_ocr_job_manager()
+    
+    async def ndjson():
+        async for summary in manager.watch(job_id):
+            yield json.dumps(summary, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/jobs/{job_id}/results")
+async def get_ocr_job_results(job_id: str, request: Request):
+    """
+    📄 Résultats d'un job en NDJSON
+    
+    Une ligne par fichier (ordre de soumission): `file` (progression) et
+    `result` (OCRResult, null tant que le fichier n'est pas terminé).
+    Disponible pendant l'exécution pour les fichiers déjà traités.
+    """
+    _get_tenant_job(job_id, _request_tenant_id(request))
+    manager = get_ocr_job_manager()
+    
+    async def ndjson():
+        async for job_file, result in manager.results(job_id):
+            yield json.dumps({
+                "file": job_file.model_dump(mode="json"),
+                "result": result.model_dump(mode="json") if result else None,
+            }, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_ocr_job(
+    job_id: str,
+    request: Request,
+    purge: bool = Query(False, description="Supprimer aussi les fichiers et résultats"),
+):
+    """
+    🛑 Annuler un job OCR (et le supprimer si purge=true)
+    """
+    _get_tenant_job(job_id, _request_tenant_id(request))
+    manager = get_ocr_job_manager()
+    if purge:
+        if not await manager.delete(job_id):
+            raise HTTPException(status_code=404, detail="Job introuvable")
+        return {"job_id": job_id, "deleted": True}
+    
+    job = await manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job introuvable")
+    return job.summary()
+
+
 # ============================================
 # ENDPOINTS STATUT ET DÉMO
 # ============================================
@@ -408,6 +629,8 @@ async def get_status():
             "/api/ocr/extract": "POST - Extraction OCR (PDF/image)",
             "/api/ocr/extract/quick": "POST - Extraction rapide",
             "/api/ocr/extract/batch": "POST - Extraction batch",
+            "/api/ocr/extract/stream": "POST - OCR PDF streamé page par page",
+            "/api/ocr/jobs": "POST - Job OCR batch en arrière-plan (reprise, progression)",
             "/api/ocr/detect-language": "POST - Détection langue",
             "/api/ocr/clean": "POST - Nettoyage texte",
             "/api/ocr/normalize-arabic": "POST - Normalisation arabe",
@@ -422,6 +645,7 @@ async def get_status():
         "limits": {
             "max_file_size_mb": 50,
             "max_batch_files": 10,
+            "max_job_files": OCR_JOB_MAX_FILES,
             "max_pdf_pages": 100,
         },
     }
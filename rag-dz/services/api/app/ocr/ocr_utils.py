@@ -370,6 +370,62 @@ def detect_pages_language(pages: List[str]) -> Tuple[LanguageCode, float]:
     return dominant_lang, avg_confidence  # type: ignore
 
 
+# ============================================
+# QUALITÉ DE LA COUCHE TEXTE PDF
+# ============================================
+
+# Glyphes sans table Unicode (pdfminer/PyPDF2)
+CID_PATTERN = re.compile(r'\(cid:\d+\)')
+
+# Caractères visibles minimum pour qu'une couche texte soit exploitable
+MIN_TEXT_LAYER_CHARS = 40
+
+
+def score_text_layer(text: str, min_chars: int = MIN_TEXT_LAYER_CHARS) -> float:
+    """
+    Évaluer la qualité du texte natif d'une page PDF.
+    
+    0 pour une page scannée (pas ou peu de texte) ou une couche texte
+    illisible (glyphes (cid:N), caractères de remplacement ou privés,
+    texte espacé lettre par lettre).
+    
+    Returns:
+        float: Qualité entre 0 et 1
+    """
+    if not text:
+        return 0.0
+    
+    text = CID_PATTERN.sub('\ufffd', text)
+    visible = [c for c in text if not c.isspace()]
+    if len(visible) < min_chars:
+        return 0.0
+    
+    # Caractères illisibles: remplacement, usage privé, contrôle, non assignés
+    garbage = sum(
+        1 for c in visible
+        if c == '\ufffd' or unicodedata.category(c) in ('Co', 'Cc', 'Cn', 'Cs')
+    )
+    garbage_ratio = garbage / len(visible)
+    if garbage_ratio > 0.1:
+        return 0.0
+    
+    alnum_ratio = sum(1 for c in visible if c.isalnum()) / len(visible)
+    
+    # Structure des mots: texte espacé ("L e  t e x t e") ou sans espaces
+    words = text.split()
+    avg_word_length = len(visible) / len(words)
+    single_char_ratio = sum(1 for w in words if len(w) == 1) / len(words)
+    if single_char_ratio > 0.5 or avg_word_length > 25:
+        structure = 0.3
+    elif avg_word_length < 2:
+        structure = 0.6
+    else:
+        structure = 1.0
+    
+    score = alnum_ratio * structure * (1 - garbage_ratio * 5)
+    return round(max(0.0, min(score, 1.0)), 3)
+
+
 # ============================================
 # ESTIMATION CONFIANCE OCR
 # ============================================
@@ -1,7 +1,10 @@
 """
 Utilitaires de pagination pour l'API
 """
-from typing import Generic, TypeVar, List, Optional
+import base64
+import json
+from datetime import datetime
+from typing import Generic, TypeVar, List, Optional, Tuple
 from pydantic import BaseModel, Field
 from math import ceil
 
@@ -104,6 +107,32 @@ class CursorPaginatedResponse(BaseModel, Generic[T]):
         )
 
 
+def encode_keyset_cursor(sort_value: datetime, item_id: str) -> str:
+    """
+    Encode un curseur keyset opaque (valeur de tri, id)
+
+    Le client renvoie le curseur tel quel; la requête suivante reprend
+    par `(colonne, id) < (sort_value, item_id)` sur l'index composite.
+    """
+    raw = json.dumps([sort_value.isoformat(), str(item_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_keyset_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Décode un curseur produit par encode_keyset_cursor
+
+    Raises:
+        ValueError: curseur invalide ou altéré
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, item_id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), str(item_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}") from e
+
+
 def paginate_list(
     items: List[T],
     params: PaginationParams
@@ -34,6 +34,7 @@ from app.models.memory_models import (
     GetConversationsResponse, GetMessagesResponse
 )
 from app.services.memory_service import get_memory_service
+from app.pagination import encode_keyset_cursor
 
 logger = logging.getLogger(__name__)
 
@@ -81,10 +82,11 @@ class QuickSendRequest(BaseModel):
 class ConversationListResponse(BaseModel):
     """Response liste conversations"""
     conversations: List[ChatSessionSummary]
-    total: int
+    total: Optional[int] = None  # Absent en pagination par curseur
     has_more: bool
     page: int
     limit: int
+    next_cursor: Optional[str] = None
 
 
 class ConversationDetailResponse(BaseModel):
@@ -92,6 +94,7 @@ class ConversationDetailResponse(BaseModel):
     session: ChatSession
     messages: List[ChatMessage]
     has_more_messages: bool
+    next_cursor: Optional[str] = None
 
 
 class MessageSentResponse(BaseModel):
@@ -108,6 +111,13 @@ class DeleteResponse(BaseModel):
     message: str
 
 
+def _messages_cursor(messages: List[ChatMessage], has_more: bool) -> Optional[str]:
+    """Curseur vers les messages plus anciens (page en ordre chronologique)"""
+    if not has_more or not messages:
+        return None
+    return encode_keyset_cursor(messages[0].created_at, messages[0].id)
+
+
 # ============================================
 # Session Endpoints
 # ============================================
@@ -124,6 +134,7 @@ async def list_conversations(
     is_archived: bool = Query(False, description="Inclure archives"),
     page: int = Query(1, ge=1, description="Page"),
     limit: int = Query(20, ge=1, le=100, description="Limite par page"),
+    cursor: Optional[str] = Query(None, description="Curseur next_cursor de la page precedente (remplace page)"),
     current_user: UserInDB = Depends(get_current_active_user)
 ):
     """Liste les conversations de l'utilisateur"""
@@ -131,24 +142,36 @@ async def list_conversations(
 
     offset = (page - 1) * limit
 
-    sessions, total = await service.get_sessions(
-        tenant_id=current_user.tenant_id,
-        user_id=current_user.id,
-        app_context=app_context,
-        is_archived=is_archived,
-        is_starred=is_starred,
-        limit=limit,
-        offset=offset
-    )
+    try:
+        sessions, total, has_more = await service.get_sessions(
+            tenant_id=current_user.tenant_id,
+            user_id=current_user.id,
+            app_context=app_context,
+            is_archived=is_archived,
+            is_starred=is_starred,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            with_total=cursor is None
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Curseur invalide"
+        )
 
-    has_more = (offset + len(sessions)) < total
+    next_cursor = None
+    if has_more and sessions:
+        last = sessions[-1]
+        next_cursor = encode_keyset_cursor(last.last_message_at, last.id)
 
     return ConversationListResponse(
         conversations=sessions,
         total=total,
         has_more=has_more,
         page=page,
-        limit=limit
+        limit=limit,
+        next_cursor=next_cursor
     )
 
 
@@ -218,13 +241,15 @@ async def get_conversation(
     messages, has_more = await service.get_messages(
         session_id=session_id,
         tenant_id=current_user.tenant_id,
-        limit=messages_limit
+        limit=messages_limit,
+        user_id=current_user.id
     )
 
     return ConversationDetailResponse(
         session=session,
         messages=messages,
-        has_more_messages=has_more
+        has_more_messages=has_more,
+        next_cursor=_messages_cursor(messages, has_more)
     )
 
 
@@ -322,6 +347,7 @@ async def get_messages(
     session_id: str,
     limit: int = Query(50, ge=1, le=200, description="Nombre de messages"),
     before_id: Optional[str] = Query(None, description="ID message pour pagination"),
+    cursor: Optional[str] = Query(None, description="Curseur next_cursor de la page precedente"),
     current_user: UserInDB = Depends(get_current_active_user)
 ):
     """Liste les messages d'une conversation"""
@@ -335,17 +361,26 @@ async def get_messages(
             detail="Conversation non trouvee"
         )
 
-    messages, has_more = await service.get_messages(
-        session_id=session_id,
-        tenant_id=current_user.tenant_id,
-        limit=limit,
-        before_id=before_id
-    )
+    try:
+        messages, has_more = await service.get_messages(
+            session_id=session_id,
+            tenant_id=current_user.tenant_id,
+            limit=limit,
+            before_id=before_id,
+            cursor=cursor,
+            user_id=current_user.id
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Curseur invalide"
+        )
 
     return GetMessagesResponse(
         session_id=session_id,
         messages=messages,
-        has_more=has_more
+        has_more=has_more,
+        next_cursor=_messages_cursor(messages, has_more)
     )
 
 
@@ -324,9 +324,9 @@ async def get_tenant_stats(request: Request, tenant_id: str):
             # Total tokens (this month)
             tokens = await db.execute("""
                 SELECT COALESCE(SUM(tokens_input + tokens_output), 0)
-                FROM usage_events
+                FROM usage_rollups_minute
                 WHERE tenant_id = %s
-                AND timestamp >= date_trunc('month', NOW())
+                AND bucket >= date_trunc('month', NOW())
             """, (tenant_id,))
             total_tokens = int((await tokens.fetchone())[0] or 0)
 
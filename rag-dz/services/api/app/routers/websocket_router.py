@@ -7,7 +7,8 @@ import json
 from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
 from ..websocket import manager, WSEventType
-from ..db import get_tenant_by_key, get_db_connection
+from ..db import get_db_connection
+from ..core.tenant_cache import resolve_tenant
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,17 @@ def get_user_by_api_key(api_key: str) -> Optional[dict]:
         conn.close()
 
 
+def parse_last_seq(value) -> Optional[int]:
+    """Client-supplied last_seq as a non-negative int, or None if invalid"""
+    if isinstance(value, bool):
+        return None
+    try:
+        seq = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return seq if seq >= 0 else None
+
+
 @router.websocket("/ws")
 async def websocket_endpoint(
     websocket: WebSocket,
@@ -57,13 +69,17 @@ async def websocket_endpoint(
 
     Messages format (chat):
         {
-            "action": "join_room|leave_room|typing|send_message",
+            "action": "join_room|leave_room|typing|resume|get_online",
             "room_id": "uuid",
+            "last_seq": 42,  # join_room / resume: replay messages after this seq
             "data": {...}
         }
+
+    Room messages carry a per-room "seq"; after a reconnect, send it back
+    as last_seq to receive what was missed (or a "resync_required" event).
     """
     # Authenticate
-    tenant = get_tenant_by_key(api_key)
+    tenant = await resolve_tenant(api_key)
     if not tenant:
         await websocket.close(code=4001, reason="Invalid API key")
         return
@@ -131,6 +147,16 @@ async def websocket_endpoint(
                     )
                     continue
 
+                last_seq = None
+                if action in ("join_room", "resume") and room_id:
+                    last_seq = parse_last_seq(message.get("last_seq", 0))
+                    if last_seq is None:
+                        await manager.send_personal_message(
+                            {"type": "error", "message": "Invalid last_seq"},
+                            websocket
+                        )
+                        continue
+
                 if action == "join_room" and room_id:
                     # Verify user is member of room before joining
                     conn = get_db_connection()
@@ -146,6 +172,8 @@ async def websocket_endpoint(
                                 {"type": "room_joined", "room_id": room_id},
                                 websocket
                             )
+                            if message.get("last_seq") is not None:
+                                await manager.resume_room(actual_user_id, room_id, last_seq)
                         else:
                             await manager.send_personal_message(
                                 {"type": "error", "message": "Not a member of this room"},
@@ -161,6 +189,10 @@ async def websocket_endpoint(
                         websocket
                     )
 
+                elif action == "resume" and room_id:
+                    if manager.is_user_in_room(actual_user_id, room_id):
+                        await manager.resume_room(actual_user_id, room_id, last_seq)
+
                 elif action == "typing" and room_id:
                     is_typing = message.get("is_typing", True)
                     await manager.set_typing(actual_user_id, room_id, is_typing)
@@ -168,14 +200,12 @@ async def websocket_endpoint(
                 elif action == "get_online":
                     # Get online status for a room
                     if room_id:
-                        online = manager.get_online_users_in_room(room_id)
-                        typing = manager.get_typing_users(room_id)
+                        presence = await manager.get_room_presence(room_id)
                         await manager.send_personal_message(
                             {
                                 "type": "online_status",
                                 "room_id": room_id,
-                                "online_users": online,
-                                "typing_users": typing
+                                **presence
                             },
                             websocket
                         )
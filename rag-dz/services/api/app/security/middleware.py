@@ -8,10 +8,11 @@ from typing import Dict, Optional
 from datetime import datetime, timedelta
 from collections import defaultdict
 from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
 from ..config import get_settings
-from ..db import get_tenant_by_key
+from ..core.asgi import ASGIMiddleware, send_with_headers
+from ..core.tenant_cache import resolve_tenant
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -91,13 +92,15 @@ class RateLimiter:
 rate_limiter = RateLimiter()
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware(ASGIMiddleware):
     """Middleware de rate limiting"""
 
-    async def dispatch(self, request: Request, call_next):
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        request = Request(scope, receive)
+
         # Skip pour routes publiques
         if request.url.path in ["/health", "/metrics", "/docs", "/openapi.json", "/"]:
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
         # Identifier (IP + tenant)
         client_ip = request.client.host if request.client else "unknown"
@@ -109,7 +112,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
 
         if not is_allowed:
             logger.warning(f"Rate limit exceeded for {identifier}")
-            return JSONResponse(
+            response = JSONResponse(
                 {
                     "error": "Rate limit exceeded",
                     "retry_after": retry_after,
@@ -118,18 +121,30 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 headers={"Retry-After": str(retry_after)}
             )
+            return await response(scope, receive, send)
 
         # Ajouter headers de rate limit
-        response = await call_next(request)
-        stats = rate_limiter.get_usage_stats(identifier)
-        response.headers["X-RateLimit-Limit"] = str(settings.rate_limit_per_minute)
-        response.headers["X-RateLimit-Remaining"] = str(stats["minute_remaining"])
-        response.headers["X-RateLimit-Reset"] = str(int(time.time()) + 60)
+        def rate_limit_headers():
+            stats = rate_limiter.get_usage_stats(identifier)
+            return {
+                "X-RateLimit-Limit": str(settings.rate_limit_per_minute),
+                "X-RateLimit-Remaining": str(stats["minute_remaining"]),
+                "X-RateLimit-Reset": str(int(time.time()) + 60),
+            }
+
+        await self.app(scope, receive, send_with_headers(send, rate_limit_headers))
+
 
-        return response
+# Headers de sécurité ajoutés à chaque réponse authentifiée
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+}
 
 
-class EnhancedAuthMiddleware(BaseHTTPMiddleware):
+class EnhancedAuthMiddleware(ASGIMiddleware):
     """
     Middleware d'authentification amélioré avec:
     - Validation tenant
@@ -137,10 +152,12 @@ class EnhancedAuthMiddleware(BaseHTTPMiddleware):
     - Headers de sécurité
     """
 
-    async def dispatch(self, request: Request, call_next):
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        request = Request(scope, receive)
+
         # OPTIONS pour CORS
         if request.method == "OPTIONS":
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
         # Routes publiques
         public_routes = ["/health", "/metrics", "/docs", "/openapi.json", "/"]
@@ -159,7 +176,7 @@ class EnhancedAuthMiddleware(BaseHTTPMiddleware):
         ]
 
         if request.url.path in public_routes or any(request.url.path.startswith(prefix) for prefix in public_api_prefixes):
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
         # Vérifier API key si activé
         if settings.enable_api_key_auth:
@@ -170,42 +187,37 @@ class EnhancedAuthMiddleware(BaseHTTPMiddleware):
 
             if not api_key:
                 logger.warning(f"Missing API key from {request.client.host if request.client else 'unknown'}")
-                return JSONResponse(
+                response = JSONResponse(
                     {"error": "API key required", "details": "Provide API key via X-API-Key header"},
                     status_code=status.HTTP_401_UNAUTHORIZED
                 )
+                return await response(scope, receive, send)
 
             # Dev bypass: accept API_SECRET_KEY directly
             if api_key == settings.api_secret_key:
                 request.state.tenant = {"id": "dev", "name": "Development", "plan": "enterprise"}
             else:
-                tenant = get_tenant_by_key(api_key)
+                tenant = await resolve_tenant(api_key)
                 if not tenant:
                     logger.warning(f"Invalid API key attempt from {request.client.host if request.client else 'unknown'}")
-                    return JSONResponse(
+                    response = JSONResponse(
                         {"error": "Invalid API key"},
                         status_code=status.HTTP_401_UNAUTHORIZED
                     )
+                    return await response(scope, receive, send)
                 request.state.tenant = tenant
 
             # Vérifier statut tenant (only if not dev tenant)
             if request.state.tenant.get("id") != "dev":
                 if request.state.tenant.get("plan") == "free" and request.url.path.startswith("/api/premium"):
-                    return JSONResponse(
+                    response = JSONResponse(
                         {"error": "Upgrade required", "message": "This endpoint requires a Pro or Enterprise plan"},
                         status_code=status.HTTP_403_FORBIDDEN
                     )
+                    return await response(scope, receive, send)
 
-        # Continuer avec la requête
-        response = await call_next(request)
-
-        # Ajouter headers de sécurité
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-
-        return response
+        # Continuer avec la requête, headers de sécurité sur la réponse
+        await self.app(scope, receive, send_with_headers(send, lambda: SECURITY_HEADERS))
 
 
 def hash_api_key(api_key: str) -> str:
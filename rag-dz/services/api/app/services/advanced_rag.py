@@ -14,6 +14,7 @@ import httpx
 from pydantic import BaseModel
 
 from app.config import get_settings
+from app.core.model_registry import shared_cross_encoder
 
 # Token tracking
 try:
@@ -320,7 +321,6 @@ class CrossEncoderReranker:
 
     def __init__(self):
         self.model_name = "cross-encoder/ms-marco-MiniLM-L-6-v2"
-        self._model = None
 
     async def rerank(
         self,
@@ -335,16 +335,14 @@ class CrossEncoderReranker:
             return []
 
         try:
-            # Load model lazily
-            if self._model is None:
-                from sentence_transformers import CrossEncoder
-                self._model = CrossEncoder(self.model_name)
+            # Modèle partagé (registre de modèles)
+            model = shared_cross_encoder(self.model_name)
 
             # Prepare pairs
             pairs = [(query, r.content) for r in results]
 
             # Get scores
-            scores = self._model.predict(pairs)
+            scores = model.predict(pairs)
 
             # Update result scores
             for result, score in zip(results, scores):
@@ -12,7 +12,7 @@ Memory Types:
 
 Features:
 - Automatic memory consolidation (working → long-term)
-- Semantic search for relevant memories
+- Semantic search for relevant memories (per-user float32 index, optional HNSW)
 - User preference learning
 - Conversation summarization
 - Memory importance scoring
@@ -20,17 +20,31 @@ Features:
 import asyncio
 import logging
 import json
+import heapq
 import hashlib
-from typing import Dict, Any, List, Optional, Tuple
+import uuid
+from typing import Dict, Any, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
 import os
 
+import numpy as np
 from pydantic import BaseModel, Field
 
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Users with at least this many embedded memories get an HNSW index (hnswlib)
+AGENT_MEMORY_HNSW_THRESHOLD = int(os.getenv("AGENT_MEMORY_HNSW_THRESHOLD", "20000"))
+# Recalls re-read a user's memories saved since the last load (other workers) after this delay
+AGENT_MEMORY_RELOAD_SEC = float(os.getenv("AGENT_MEMORY_RELOAD_SEC", "30"))
+
 
 # ============================================
 # MEMORY TYPES & MODELS
@@ -62,7 +76,7 @@ class Memory:
     content: str
     metadata: Dict[str, Any] = field(default_factory=dict)
     importance: MemoryImportance = MemoryImportance.MEDIUM
-    embedding: Optional[List[float]] = None
+    embedding: Optional[List[float]] = None  # LongTermMemory keeps it in its vector index
     created_at: datetime = field(default_factory=datetime.utcnow)
     last_accessed: datetime = field(default_factory=datetime.utcnow)
     access_count: int = 0
@@ -175,14 +189,477 @@ class WorkingMemory:
         self.attention_focus = None
 
 
+# ============================================
+# VECTOR INDEX
+# ============================================
+
+class UserVectorIndex:
+    """
+    Embeddings of one user as a contiguous float32 matrix
+
+    Rows are L2-normalized on insert, so cosine similarity is one
+    matrix-vector product and top-k an argpartition. Capacity doubles on
+    growth; removal moves the last row into the hole. Above hnsw_threshold
+    rows (when hnswlib is installed) an HNSW graph answers the queries.
+    """
+
+    HNSW_M = 16
+    HNSW_EF_CONSTRUCTION = 200
+    HNSW_EF_SEARCH = 64
+
+    def __init__(self, dim: int, hnsw_threshold: int = AGENT_MEMORY_HNSW_THRESHOLD):
+        self.dim = dim
+        self.hnsw_threshold = hnsw_threshold
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.type_codes = np.empty(0, dtype=np.int8)
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+
+        # HNSW labels are ints, stable across row moves
+        self._hnsw = None
+        self._labels: Dict[str, int] = {}
+        self._label_ids: Dict[int, str] = {}
+        self._next_label = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def uses_hnsw(self) -> bool:
+        return self._hnsw is not None
+
+    @staticmethod
+    def normalize(vector) -> np.ndarray:
+        """float32 unit vector (zero vector unchanged)"""
+        v = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    def add(self, memory_id: str, vector, type_code: int = 0):
+        """Add or replace one embedding"""
+        self.add_many([memory_id], self.normalize(vector)[None, :], [type_code])
+
+    def add_many(self, memory_ids: List[str], vectors: np.ndarray, type_codes: List[int]):
+        """Add normalized embeddings (one row per id) in a single copy"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(memory_ids), -1)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} != index dimension {self.dim}")
+        for memory_id in memory_ids:
+            if memory_id in self.rows:
+                self.remove(memory_id)
+
+        start, end = len(self.ids), len(self.ids) + len(memory_ids)
+        if end > self.vectors.shape[0]:
+            self._grow(max(16, end, self.vectors.shape[0] * 2))
+        self.vectors[start:end] = vectors
+        self.type_codes[start:end] = type_codes
+        for offset, memory_id in enumerate(memory_ids):
+            self.rows[memory_id] = start + offset
+        self.ids.extend(memory_ids)
+
+        if self._hnsw is not None:
+            self._hnsw_add(memory_ids, vectors)
+        elif HNSWLIB_AVAILABLE and end >= self.hnsw_threshold:
+            self._build_hnsw()
+
+    def remove(self, memory_id: str) -> bool:
+        row = self.rows.pop(memory_id, None)
+        if row is None:
+            return False
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.vectors[row] = self.vectors[last]
+            self.type_codes[row] = self.type_codes[last]
+            self.ids[row] = moved
+            self.rows[moved] = row
+        self.ids.pop()
+
+        label = self._labels.pop(memory_id, None)
+        if label is not None:
+            del self._label_ids[label]
+            self._hnsw.mark_deleted(label)
+        return True
+
+    def search(self, query: np.ndarray, k: int, type_code: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Top-k (memory_id, cosine similarity) for a normalized query vector"""
+        n = len(self.ids)
+        if n == 0 or k <= 0:
+            return []
+        if self._hnsw is not None:
+            return self._search_hnsw(query, k, type_code)
+
+        scores = self.vectors[:n] @ query
+        if type_code is not None:
+            scores = np.where(self.type_codes[:n] == type_code, scores, -np.inf)
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top if scores[i] != -np.inf]
+
+    def _grow(self, capacity: int):
+        n = len(self.ids)
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[:n] = self.vectors[:n]
+        type_codes = np.empty(capacity, dtype=np.int8)
+        type_codes[:n] = self.type_codes[:n]
+        self.vectors, self.type_codes = vectors, type_codes
+
+    # --- HNSW (hnswlib, optional) ---
+
+    def _build_hnsw(self):
+        n = len(self.ids)
+        index = hnswlib.Index(space="ip", dim=self.dim)
+        index.init_index(max_elements=max(2 * n, 1024), ef_construction=self.HNSW_EF_CONSTRUCTION, M=self.HNSW_M)
+        self._hnsw = index
+        self._hnsw_add(list(self.ids), self.vectors[:n])
+        logger.info(f"HNSW index built for {n} memories")
+
+    def _hnsw_add(self, memory_ids: List[str], vectors: np.ndarray):
+        index = self._hnsw
+        needed = index.get_current_count() + len(memory_ids)
+        if needed > index.get_max_elements():
+            index.resize_index(max(needed, 2 * index.get_max_elements()))
+        labels = np.arange(self._next_label, self._next_label + len(memory_ids))
+        self._next_label += len(memory_ids)
+        for memory_id, label in zip(memory_ids, labels.tolist()):
+            self._labels[memory_id] = label
+            self._label_ids[label] = memory_id
+        index.add_items(vectors, labels)
+
+    def _search_hnsw(self, query: np.ndarray, k: int, type_code: Optional[int]) -> List[Tuple[str, float]]:
+        k = min(k, len(self.ids))
+        accept = None
+        if type_code is not None:
+            accept = lambda label: self.type_codes[self.rows[self._label_ids[label]]] == type_code  # noqa: E731
+        self._hnsw.set_ef(max(self.HNSW_EF_SEARCH, k))
+        try:
+            labels, distances = self._hnsw.knn_query(query, k=k, filter=accept)
+        except RuntimeError:
+            # Fewer than k reachable results (selective type filter): exact scan
+            scores = self.vectors[:len(self.ids)] @ query
+            if type_code is not None:
+                scores = np.where(self.type_codes[:len(self.ids)] == type_code, scores, -np.inf)
+            top = np.argsort(-scores)[:k]
+            return [(self.ids[i], float(scores[i])) for i in top if scores[i] != -np.inf]
+        # space="ip": distance = 1 - inner product
+        return [(self._label_ids[label], 1.0 - float(d)) for label, d in zip(labels[0], distances[0])]
+
+
+# ============================================
+# LONG-TERM MEMORY PERSISTENCE
+# ============================================
+
+class MemoryStore:
+    """
+    Persistence of long-term memories ('memory' backend: process only)
+
+    Embeddings are stored normalized as float32 and loaded per user, on
+    the first recall for that user; later recalls only load memories
+    created since (saved by other workers).
+    """
+
+    name = "memory"
+
+    async def load_user(
+        self, user_id: str, created_since: Optional[datetime] = None
+    ) -> List[Tuple[Memory, Optional[np.ndarray]]]:
+        """A user's memories, only those created at or after created_since if given"""
+        return []
+
+    async def save(self, memory: Memory, vector: Optional[np.ndarray]):
+        pass
+
+    async def touch(self, memories: List[Memory]):
+        """Persist access stats updated by a recall (access_count, last_accessed)"""
+        pass
+
+    async def delete(self, memory_ids: List[str]):
+        pass
+
+    async def forget(self, created_before: Optional[datetime], importances: List[MemoryImportance]):
+        """Delete persisted memories older than created_before or with one of importances"""
+        pass
+
+
+class PostgresMemoryStore(MemoryStore):
+    """
+    Table agent_memories (migration 022), embedding as float32 BYTEA
+
+    A user's embeddings load straight into one matrix (np.frombuffer),
+    no per-element float parsing. Also used for 'supabase' (Postgres).
+    """
+
+    name = "postgres"
+
+    COLUMNS = (
+        "id, memory_type, content, metadata, importance, embedding, created_at, "
+        "last_accessed, access_count, user_id, session_id, agent_id, tags"
+    )
+
+    async def load_user(self, user_id, created_since=None):
+        from ..db import get_async_db_connection
+
+        query, params = f"SELECT {self.COLUMNS} FROM agent_memories WHERE user_id = %s", [user_id]
+        if created_since is not None:
+            query += " AND created_at >= %s"
+            params.append(created_since)
+        async with get_async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(query + " ORDER BY created_at", params, prepare=True)
+            rows = await cur.fetchall()
+
+        loaded = []
+        for row in rows:
+            (memory_id, memory_type, content, metadata, importance, embedding, created_at,
+             last_accessed, access_count, row_user_id, session_id, agent_id, tags) = row
+            memory = Memory(
+                id=memory_id,
+                memory_type=MemoryType(memory_type),
+                content=content,
+                metadata=metadata or {},
+                importance=MemoryImportance(importance),
+                created_at=created_at,
+                last_accessed=last_accessed,
+                access_count=access_count,
+                user_id=row_user_id,
+                session_id=session_id,
+                agent_id=agent_id,
+                tags=list(tags or []),
+            )
+            vector = np.frombuffer(embedding, dtype=np.float32) if embedding is not None else None
+            loaded.append((memory, vector))
+        return loaded
+
+    async def save(self, memory, vector):
+        from ..db import get_async_db_connection
+
+        async with get_async_db_connection() as conn:
+            await conn.execute(
+                f"""
+                INSERT INTO agent_memories ({self.COLUMNS})
+                VALUES (%s, %s, %s, %s::jsonb, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (id) DO UPDATE SET
+                    content = EXCLUDED.content,
+                    metadata = EXCLUDED.metadata,
+                    importance = EXCLUDED.importance,
+                    embedding = EXCLUDED.embedding,
+                    last_accessed = EXCLUDED.last_accessed,
+                    access_count = EXCLUDED.access_count,
+                    tags = EXCLUDED.tags
+                """,
+                (
+                    memory.id, memory.memory_type.value, memory.content, json.dumps(memory.metadata),
+                    memory.importance.value, vector.tobytes() if vector is not None else None,
+                    memory.created_at, memory.last_accessed, memory.access_count,
+                    memory.user_id, memory.session_id, memory.agent_id, memory.tags,
+                ),
+                prepare=True,
+            )
+
+    async def touch(self, memories):
+        from ..db import get_async_db_connection
+
+        # Increment rather than overwrite: other workers recall the same memories
+        async with get_async_db_connection() as conn:
+            await conn.execute(
+                "UPDATE agent_memories SET access_count = access_count + 1, last_accessed = %s WHERE id = ANY(%s)",
+                (max(memory.last_accessed for memory in memories), [memory.id for memory in memories]),
+                prepare=True,
+            )
+
+    async def delete(self, memory_ids):
+        from ..db import get_async_db_connection
+
+        async with get_async_db_connection() as conn:
+            await conn.execute("DELETE FROM agent_memories WHERE id = ANY(%s)", (list(memory_ids),))
+
+    async def forget(self, created_before, importances):
+        from ..db import get_async_db_connection
+
+        conditions, params = [], []
+        if created_before:
+            conditions.append("created_at < %s")
+            params.append(created_before)
+        if importances:
+            conditions.append("importance = ANY(%s)")
+            params.append([i.value for i in importances])
+        if not conditions:
+            return
+        async with get_async_db_connection() as conn:
+            await conn.execute(f"DELETE FROM agent_memories WHERE {' OR '.join(conditions)}", params)
+
+
+class QdrantMemoryStore(MemoryStore):
+    """
+    Qdrant collection agent_memories (payload = memory fields)
+
+    Point ids are UUIDv5 of the memory id; the client is synchronous and
+    runs in a worker thread.
+    """
+
+    name = "qdrant"
+    COLLECTION = "agent_memories"
+
+    def __init__(self):
+        self._client = None
+        self._collection_ready = False
+
+    def _get_client(self):
+        if self._client is None:
+            from qdrant_client import QdrantClient
+            from ..config import get_settings
+
+            settings = get_settings()
+            self._client = QdrantClient(
+                host=settings.qdrant_host,
+                port=settings.qdrant_port,
+                api_key=settings.qdrant_api_key or None,
+            )
+        return self._client
+
+    @staticmethod
+    def _point_id(memory_id: str) -> str:
+        return str(uuid.uuid5(uuid.NAMESPACE_OID, memory_id))
+
+    def _ensure_collection(self, dim: int):
+        if self._collection_ready:
+            return
+        from qdrant_client.models import Distance, VectorParams
+
+        client = self._get_client()
+        if not client.collection_exists(self.COLLECTION):
+            client.create_collection(self.COLLECTION, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+        self._collection_ready = True
+
+    async def load_user(self, user_id, created_since=None):
+        from qdrant_client.models import FieldCondition, Filter, MatchValue, Range
+
+        conditions = [FieldCondition(key="user_id", match=MatchValue(value=user_id))]
+        if created_since is not None:
+            conditions.append(FieldCondition(key="created_at", range=Range(gte=created_since.timestamp())))
+
+        def scroll():
+            client = self._get_client()
+            if not client.collection_exists(self.COLLECTION):
+                return []
+            points, offset = [], None
+            user_filter = Filter(must=conditions)
+            while True:
+                page, offset = client.scroll(
+                    self.COLLECTION, scroll_filter=user_filter, limit=1000,
+                    offset=offset, with_payload=True, with_vectors=True,
+                )
+                points.extend(page)
+                if offset is None:
+                    return points
+
+        loaded = []
+        for point in await asyncio.to_thread(scroll):
+            payload = point.payload
+            memory = Memory(
+                id=payload["id"],
+                memory_type=MemoryType(payload["memory_type"]),
+                content=payload["content"],
+                metadata=payload.get("metadata") or {},
+                importance=MemoryImportance(payload["importance"]),
+                created_at=datetime.fromtimestamp(payload["created_at"]),
+                last_accessed=datetime.fromtimestamp(payload.get("last_accessed", payload["created_at"])),
+                access_count=payload.get("access_count", 0),
+                user_id=payload.get("user_id"),
+                session_id=payload.get("session_id"),
+                agent_id=payload.get("agent_id"),
+                tags=payload.get("tags") or [],
+            )
+            vector = np.asarray(point.vector, dtype=np.float32) if point.vector else None
+            loaded.append((memory, vector))
+        return loaded
+
+    async def save(self, memory, vector):
+        if vector is None:
+            return  # a point without vector can't be recalled from Qdrant
+        from qdrant_client.models import PointStruct
+
+        payload = {
+            **memory.to_dict(),
+            "created_at": memory.created_at.timestamp(),
+            "last_accessed": memory.last_accessed.timestamp(),
+        }
+
+        def upsert():
+            self._ensure_collection(len(vector))
+            self._get_client().upsert(
+                self.COLLECTION,
+                points=[PointStruct(id=self._point_id(memory.id), vector=vector.tolist(), payload=payload)],
+            )
+
+        await asyncio.to_thread(upsert)
+
+    async def touch(self, memories):
+        def set_payloads():
+            client = self._get_client()
+            for memory in memories:
+                client.set_payload(
+                    self.COLLECTION,
+                    payload={"access_count": memory.access_count, "last_accessed": memory.last_accessed.timestamp()},
+                    points=[self._point_id(memory.id)],
+                )
+
+        await asyncio.to_thread(set_payloads)
+
+    async def delete(self, memory_ids):
+        from qdrant_client.models import PointIdsList
+
+        points = PointIdsList(points=[self._point_id(memory_id) for memory_id in memory_ids])
+        await asyncio.to_thread(self._get_client().delete, self.COLLECTION, points_selector=points)
+
+    async def forget(self, created_before, importances):
+        from qdrant_client.models import FieldCondition, Filter, FilterSelector, MatchAny, Range
+
+        conditions = []
+        if created_before:
+            conditions.append(FieldCondition(key="created_at", range=Range(lt=created_before.timestamp())))
+        if importances:
+            conditions.append(FieldCondition(key="importance", match=MatchAny(any=[i.value for i in importances])))
+        if conditions:
+            selector = FilterSelector(filter=Filter(should=conditions))
+            await asyncio.to_thread(self._get_client().delete, self.COLLECTION, points_selector=selector)
+
+
+MEMORY_STORES = {
+    "memory": MemoryStore,
+    "postgres": PostgresMemoryStore,
+    "supabase": PostgresMemoryStore,
+    "qdrant": QdrantMemoryStore,
+}
+
+
+def create_memory_store(storage_backend: str) -> MemoryStore:
+    """Persistence for a LongTermMemory storage_backend"""
+    store_class = MEMORY_STORES.get(storage_backend)
+    if store_class is None:
+        logger.warning(f"Unknown memory storage backend '{storage_backend}', using in-memory")
+        store_class = MemoryStore
+    return store_class()
+
+
 # ============================================
 # LONG-TERM MEMORY
 # ============================================
 
+IMPORTANCE_ORDER = [
+    MemoryImportance.LOW,
+    MemoryImportance.MEDIUM,
+    MemoryImportance.HIGH,
+    MemoryImportance.CRITICAL
+]
+
+MEMORY_TYPE_CODES = {memory_type: code for code, memory_type in enumerate(MemoryType)}
+
+
 class LongTermMemory:
     """
     Long-term memory - Persistent storage
-    Uses embeddings for semantic search
+    Uses embeddings for semantic search (one vector index per user)
     """
 
     def __init__(self, storage_backend: str = "memory"):
@@ -193,8 +670,15 @@ class LongTermMemory:
             storage_backend: 'memory' (in-memory), 'postgres', 'qdrant', 'supabase'
         """
         self.storage_backend = storage_backend
+        self.persistence = create_memory_store(storage_backend)
         self.memories: Dict[str, Memory] = {}
-        self.embeddings_index: Dict[str, List[float]] = {}
+
+        # user_id -> memory ids / vector index (None: memories without user)
+        self.user_memories: Dict[Optional[str], Set[str]] = {}
+        self.vector_indexes: Dict[Optional[str], UserVectorIndex] = {}
+        # user_id -> start of the last load from persistence
+        self._loaded_users: Dict[str, datetime] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
 
         # Try to load embeddings client
         self.embeddings_client = None
@@ -211,6 +695,65 @@ class LongTermMemory:
         data = f"{content}{user_id or ''}{datetime.utcnow().isoformat()}"
         return hashlib.md5(data.encode()).hexdigest()[:16]
 
+    def _add(self, memories: List[Tuple[Memory, Optional[np.ndarray]]]):
+        """Register memories and index their (normalized) embeddings"""
+        by_user: Dict[Optional[str], List[Tuple[Memory, np.ndarray]]] = {}
+        for memory, vector in memories:
+            self.memories[memory.id] = memory
+            self.user_memories.setdefault(memory.user_id, set()).add(memory.id)
+            if vector is not None:
+                by_user.setdefault(memory.user_id, []).append((memory, vector))
+
+        for user_id, indexed in by_user.items():
+            index = self.vector_indexes.get(user_id)
+            if index is None:
+                index = self.vector_indexes[user_id] = UserVectorIndex(dim=len(indexed[0][1]))
+            index.add_many(
+                [memory.id for memory, _ in indexed],
+                np.vstack([vector for _, vector in indexed]),
+                [MEMORY_TYPE_CODES[memory.memory_type] for memory, _ in indexed],
+            )
+
+    def _remove(self, memory_id: str) -> Optional[Memory]:
+        memory = self.memories.pop(memory_id, None)
+        if memory is None:
+            return None
+        self.user_memories.get(memory.user_id, set()).discard(memory_id)
+        index = self.vector_indexes.get(memory.user_id)
+        if index is not None:
+            index.remove(memory_id)
+        return memory
+
+    def _load_due(self, user_id: str, now: datetime) -> bool:
+        loaded_at = self._loaded_users.get(user_id)
+        return loaded_at is None or now - loaded_at >= timedelta(seconds=AGENT_MEMORY_RELOAD_SEC)
+
+    async def _ensure_loaded(self, user_id: Optional[str]):
+        """
+        Load a user's persisted memories on the first recall, then the ones
+        created since (stored by other workers) every AGENT_MEMORY_RELOAD_SEC
+        """
+        if user_id is None or self.persistence.name == "memory" or not self._load_due(user_id, datetime.utcnow()):
+            return
+        lock = self._load_locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            now = datetime.utcnow()
+            if not self._load_due(user_id, now):
+                return
+            loaded_at = self._loaded_users.get(user_id)
+            # One reload period of overlap: a memory is saved shortly after its
+            # created_at (embedding call), duplicates are skipped by id
+            since = loaded_at - timedelta(seconds=AGENT_MEMORY_RELOAD_SEC) if loaded_at else None
+            try:
+                loaded = await self.persistence.load_user(user_id, since)
+            except Exception as e:
+                logger.warning(f"Failed to load memories of user {user_id} from {self.persistence.name}: {e}")
+                return
+            self._add([(memory, vector) for memory, vector in loaded if memory.id not in self.memories])
+            self._loaded_users[user_id] = now
+            self._load_locks.pop(user_id, None)
+            logger.debug(f"Loaded {len(loaded)} memories for user {user_id}")
+
     async def store(
         self,
         content: str,
@@ -226,11 +769,11 @@ class LongTermMemory:
 
         memory_id = self._generate_id(content, user_id)
 
-        # Generate embedding if client available
-        embedding = None
+        # Generate embedding if client available (kept in the vector index only)
+        vector = None
         if self.embeddings_client:
             try:
-                embedding = await self._get_embedding(content)
+                vector = UserVectorIndex.normalize(await self._get_embedding(content))
             except Exception as e:
                 logger.warning(f"Failed to generate embedding: {e}")
 
@@ -239,7 +782,6 @@ class LongTermMemory:
             memory_type=memory_type,
             content=content,
             importance=importance,
-            embedding=embedding,
             user_id=user_id,
             session_id=session_id,
             agent_id=agent_id,
@@ -247,10 +789,12 @@ class LongTermMemory:
             tags=tags or [],
         )
 
-        self.memories[memory_id] = memory
+        self._add([(memory, vector)])
 
-        if embedding:
-            self.embeddings_index[memory_id] = embedding
+        try:
+            await self.persistence.save(memory, vector)
+        except Exception as e:
+            logger.warning(f"Failed to persist memory {memory_id} ({self.persistence.name}): {e}")
 
         logger.debug(f"Stored memory {memory_id}: {content[:50]}...")
 
@@ -265,53 +809,57 @@ class LongTermMemory:
     ) -> List[Memory]:
         """Retrieve relevant memories using semantic search"""
 
-        # Filter by user and type
-        candidates = [
-            m for m in self.memories.values()
-            if (user_id is None or m.user_id == user_id)
-            and (memory_type is None or m.memory_type == memory_type)
-        ]
+        await self._ensure_loaded(user_id)
 
-        if not candidates:
-            return []
+        # Only the user's index is searched (all indexes when user_id is None)
+        if user_id is None:
+            indexes = list(self.vector_indexes.values())
+        else:
+            indexes = [self.vector_indexes[user_id]] if user_id in self.vector_indexes else []
 
         # If embeddings available, do semantic search
-        if self.embeddings_client and self.embeddings_index:
+        if self.embeddings_client and any(len(index) for index in indexes):
             try:
-                query_embedding = await self._get_embedding(query)
-                scored = []
-
-                for memory in candidates:
-                    if memory.id in self.embeddings_index:
-                        similarity = self._cosine_similarity(
-                            query_embedding,
-                            self.embeddings_index[memory.id]
-                        )
-                        scored.append((memory, similarity))
-
-                # Sort by similarity
-                scored.sort(key=lambda x: x[1], reverse=True)
+                query_vector = UserVectorIndex.normalize(await self._get_embedding(query))
+                type_code = MEMORY_TYPE_CODES[memory_type] if memory_type else None
+                scored = [hit for index in indexes for hit in index.search(query_vector, limit, type_code)]
+                if len(indexes) > 1:
+                    scored = heapq.nlargest(limit, scored, key=lambda hit: hit[1])
 
                 # Update access counts
                 results = []
-                for memory, _ in scored[:limit]:
-                    memory.last_accessed = datetime.utcnow()
+                now = datetime.utcnow()
+                for memory_id, _ in scored[:limit]:
+                    memory = self.memories[memory_id]
+                    memory.last_accessed = now
                     memory.access_count += 1
                     results.append(memory)
 
+                if results:
+                    try:
+                        await self.persistence.touch(results)
+                    except Exception as e:
+                        logger.warning(f"Failed to persist memory access stats ({self.persistence.name}): {e}")
+
                 return results
 
             except Exception as e:
                 logger.warning(f"Semantic search failed: {e}")
 
-        # Fallback: keyword search
-        query_lower = query.lower()
+        # Fallback: keyword search (user's memories only)
+        if user_id is None:
+            candidates = self.memories.values()
+        else:
+            candidates = (self.memories[mid] for mid in self.user_memories.get(user_id, ()))
+        words = query.lower().split()
         scored = []
 
         for memory in candidates:
+            if memory_type is not None and memory.memory_type != memory_type:
+                continue
             # Simple keyword matching
             content_lower = memory.content.lower()
-            matches = sum(1 for word in query_lower.split() if word in content_lower)
+            matches = sum(1 for word in words if word in content_lower)
             if matches > 0:
                 scored.append((memory, matches))
 
@@ -331,18 +879,9 @@ class LongTermMemory:
 
         return response.data[0].embedding
 
-    def _cosine_similarity(self, a: List[float], b: List[float]) -> float:
-        """Calculate cosine similarity between two vectors"""
-        import math
-
-        dot_product = sum(x * y for x, y in zip(a, b))
-        norm_a = math.sqrt(sum(x ** 2 for x in a))
-        norm_b = math.sqrt(sum(x ** 2 for x in b))
-
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-
-        return dot_product / (norm_a * norm_b)
+    def indexed_count(self) -> int:
+        """Number of memories with an embedding in a vector index"""
+        return sum(len(index) for index in self.vector_indexes.values())
 
     async def forget(
         self,
@@ -354,14 +893,16 @@ class LongTermMemory:
         deleted = 0
 
         if memory_id:
-            if memory_id in self.memories:
-                del self.memories[memory_id]
-                if memory_id in self.embeddings_index:
-                    del self.embeddings_index[memory_id]
+            if self._remove(memory_id):
                 deleted = 1
+            try:
+                await self.persistence.delete([memory_id])
+            except Exception as e:
+                logger.warning(f"Failed to delete persisted memory {memory_id}: {e}")
         else:
             to_delete = []
             now = datetime.utcnow()
+            below = IMPORTANCE_ORDER[:IMPORTANCE_ORDER.index(importance_below)] if importance_below else []
 
             for mid, memory in self.memories.items():
                 should_delete = False
@@ -369,25 +910,23 @@ class LongTermMemory:
                 if older_than and (now - memory.created_at) > older_than:
                     should_delete = True
 
-                if importance_below:
-                    importance_order = [
-                        MemoryImportance.LOW,
-                        MemoryImportance.MEDIUM,
-                        MemoryImportance.HIGH,
-                        MemoryImportance.CRITICAL
-                    ]
-                    if importance_order.index(memory.importance) < importance_order.index(importance_below):
-                        should_delete = True
+                if memory.importance in below:
+                    should_delete = True
 
                 if should_delete:
                     to_delete.append(mid)
 
             for mid in to_delete:
-                del self.memories[mid]
-                if mid in self.embeddings_index:
-                    del self.embeddings_index[mid]
+                self._remove(mid)
                 deleted += 1
 
+            # Also memories of users not loaded in this process
+            if older_than or below:
+                try:
+                    await self.persistence.forget(now - older_than if older_than else None, below)
+                except Exception as e:
+                    logger.warning(f"Failed to forget persisted memories: {e}")
+
         logger.info(f"Forgot {deleted} memories")
         return deleted
 
@@ -470,7 +1009,7 @@ class AgentMemoryService:
         Initialize agent memory service
 
         Args:
-            storage_backend: Storage backend ('memory', 'postgres', 'qdrant')
+            storage_backend: Storage backend ('memory', 'postgres', 'qdrant', 'supabase')
         """
         # Memory stores
         self.working_memories: Dict[str, WorkingMemory] = {}  # Per session
@@ -694,7 +1233,10 @@ class AgentMemoryService:
             "working_memory_sessions": len(self.working_memories),
             "long_term_memories": len(self.long_term.memories),
             "user_profiles": len(self.user_profiles.profiles),
-            "embeddings_indexed": len(self.long_term.embeddings_index),
+            "embeddings_indexed": self.long_term.indexed_count(),
+            "vector_indexes": len(self.long_term.vector_indexes),
+            "hnsw_indexes": sum(index.uses_hnsw for index in self.long_term.vector_indexes.values()),
+            "storage_backend": self.long_term.persistence.name,
         }
 
 
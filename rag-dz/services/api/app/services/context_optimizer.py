@@ -2,11 +2,28 @@
 Context Window Optimizer - Intelligent Token Management
 Handles context compression, sliding windows, and summarization for long conversations
 Token tracking integre.
+
+Sessions longues (optimize(..., session_id=...)): fenêtre incrémentale
+- Comptage tokens mis en cache (par texte, LRU partagé) et par message de la fenêtre
+- Résumé glissant par session, régénéré seulement quand la fenêtre déborde
+  (ancien résumé + messages sortants, jamais tout l'historique)
+- État persisté dans chat_sessions.metadata["context_window"] (memory_service)
+
+Configuration (env):
+- CONTEXT_TOKEN_CACHE_SIZE: textes dont le nombre de tokens est gardé (défaut 50000)
+- CONTEXT_SESSION_CACHE_SIZE: états de session gardés en mémoire (défaut 1000)
+- CONTEXT_SUMMARY_TARGET_RATIO: après un débordement, la fenêtre récente
+  est ramenée à cette fraction du budget (défaut 0.6)
+- CONTEXT_SUMMARY_MAX_TOKENS: taille max du résumé glissant (défaut 400)
 """
+import os
+import zlib
+import hashlib
 import asyncio
 import logging
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field, asdict
 from enum import Enum
 
 import tiktoken
@@ -24,6 +41,18 @@ except ImportError:
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+CONTEXT_TOKEN_CACHE_SIZE = int(os.getenv("CONTEXT_TOKEN_CACHE_SIZE", "50000"))
+CONTEXT_SESSION_CACHE_SIZE = int(os.getenv("CONTEXT_SESSION_CACHE_SIZE", "1000"))
+CONTEXT_SUMMARY_TARGET_RATIO = float(os.getenv("CONTEXT_SUMMARY_TARGET_RATIO", "0.6"))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "400"))
+
+MESSAGE_OVERHEAD_TOKENS = 4  # <|start|>role ... <|end|>
+REPLY_PRIMING_TOKENS = 2
+
+# (encoding, SHA-1 du texte) -> nombre de tokens, partagé par tous les TokenizerService
+# Clé en empreinte: le cache ne retient pas les textes eux-mêmes (jusqu'à 50k entrées)
+_token_counts: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+
 
 class MessageRole(str, Enum):
     SYSTEM = "system"
@@ -31,6 +60,14 @@ class MessageRole(str, Enum):
     ASSISTANT = "assistant"
 
 
+def _scoring_role(role: str) -> MessageRole:
+    """Rôle pour le score d'importance (tool, function... comptés comme user)"""
+    try:
+        return MessageRole(role)
+    except ValueError:
+        return MessageRole.USER
+
+
 @dataclass
 class Message:
     """Chat message with token count"""
@@ -61,41 +98,54 @@ class TokenizerService:
         "llama": "cl100k_base",     # Approximation
     }
 
-    def __init__(self, model: str = "gpt-4o"):
+    def __init__(self, model: str = "gpt-4o", cache_size: int = CONTEXT_TOKEN_CACHE_SIZE):
         self.model = model
+        self.cache_size = cache_size
+        self.encoding_name = self.MODEL_ENCODINGS.get(
+            self.model.split("-")[0] + "-" + self.model.split("-")[1] if "-" in self.model else self.model,
+            "cl100k_base"
+        )
         self._encoder = None
 
     @property
     def encoder(self):
         if self._encoder is None:
-            encoding_name = self.MODEL_ENCODINGS.get(
-                self.model.split("-")[0] + "-" + self.model.split("-")[1] if "-" in self.model else self.model,
-                "cl100k_base"
-            )
             try:
-                self._encoder = tiktoken.get_encoding(encoding_name)
+                self._encoder = tiktoken.get_encoding(self.encoding_name)
             except Exception:
+                self.encoding_name = "cl100k_base"
                 self._encoder = tiktoken.get_encoding("cl100k_base")
         return self._encoder
 
     def count_tokens(self, text: str) -> int:
-        """Count tokens in text"""
-        return len(self.encoder.encode(text))
+        """Count tokens in text (cached per encoding and text)"""
+        key = (self.encoding_name, hashlib.sha1(text.encode()).digest())
+        count = _token_counts.get(key)
+        if count is not None:
+            _token_counts.move_to_end(key)
+            return count
+        count = len(self.encoder.encode(text))
+        if self.cache_size > 0:
+            _token_counts[key] = count
+            if len(_token_counts) > self.cache_size:
+                _token_counts.popitem(last=False)
+        return count
+
+    def message_tokens(self, message: Dict[str, str]) -> int:
+        """Tokens of one chat message, overhead included (reply priming excluded)"""
+        tokens = MESSAGE_OVERHEAD_TOKENS
+        for key, value in message.items():
+            tokens += self.count_tokens(str(value))
+            if key == "name":
+                tokens += -1
+        return tokens
 
     def count_message_tokens(self, messages: List[Dict[str, str]]) -> int:
         """
         Count tokens for chat messages with overhead
         Based on OpenAI's token counting guidelines
         """
-        tokens = 0
-        for message in messages:
-            tokens += 4  # Message overhead
-            for key, value in message.items():
-                tokens += self.count_tokens(str(value))
-                if key == "name":
-                    tokens += -1
-        tokens += 2  # Reply priming
-        return tokens
+        return sum(self.message_tokens(message) for message in messages) + REPLY_PRIMING_TOKENS
 
     def truncate_to_tokens(self, text: str, max_tokens: int) -> str:
         """Truncate text to max tokens"""
@@ -214,9 +264,9 @@ class ContextCompressor:
                     logger.warning("Insufficient tokens for summarization, falling back to truncation")
                     return self.tokenizer.truncate_to_tokens(content, max_tokens)
 
-            client = openai.OpenAI(api_key=settings.openai_api_key)
+            client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
 
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -246,6 +296,20 @@ class ContextCompressor:
             # Fallback: truncate
             return self.tokenizer.truncate_to_tokens(content, max_tokens)
 
+    async def summarize_into(
+        self,
+        previous_summary: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int = CONTEXT_SUMMARY_MAX_TOKENS,
+        tenant_id: Optional[str] = None
+    ) -> str:
+        """Rolling summary: previous summary + messages leaving the window"""
+        parts = []
+        if previous_summary:
+            parts.append(f"[Résumé précédent]\n{previous_summary}\n\n[Suite de la conversation]")
+        parts.extend(f"{m.get('role', 'user')}: {m.get('content', '')}" for m in messages)
+        return await self._generate_summary("\n".join(parts), max_tokens=max_tokens, tenant_id=tenant_id)
+
 
 class SlidingWindowManager:
     """
@@ -279,7 +343,7 @@ class SlidingWindowManager:
             msg_objects.append(Message(
                 role=MessageRole.SYSTEM,
                 content=system_prompt,
-                tokens=self.tokenizer.count_tokens(system_prompt),
+                tokens=self.tokenizer.message_tokens({"role": "system", "content": system_prompt}),
                 importance=1.0
             ))
 
@@ -289,7 +353,7 @@ class SlidingWindowManager:
             msg_objects.append(Message(
                 role=role,
                 content=content,
-                tokens=self.tokenizer.count_tokens(content),
+                tokens=self.tokenizer.message_tokens({"role": role.value, "content": content}),
                 importance=self._calculate_importance(role, content)
             ))
 
@@ -354,6 +418,231 @@ class SlidingWindowManager:
         ]
 
 
+# ============================================
+# INCREMENTAL CONTEXT WINDOW (per session)
+# ============================================
+
+def message_digest(message: Dict[str, str]) -> int:
+    """CRC32 of role + content: detects edited / deleted history without re-tokenizing"""
+    return zlib.crc32(f"{message.get('role', '')}\x00{message.get('content', '')}".encode())
+
+
+@dataclass
+class ContextWindowState:
+    """
+    Context window of a session, persisted in chat_sessions.metadata["context_window"]
+
+    The first summarized_count messages of the history are folded into
+    summary; token_counts / digests cover the following ones (live window).
+    """
+    summary: str = ""
+    summary_tokens: int = 0
+    summarized_count: int = 0
+    boundary_digest: int = 0  # digest of the last summarized message
+    token_counts: List[int] = field(default_factory=list)
+    digests: List[int] = field(default_factory=list)
+    encoding: str = ""
+    summaries_generated: int = 0
+
+    @property
+    def window_tokens(self) -> int:
+        return sum(self.token_counts)
+
+    def reset(self, encoding: str = ""):
+        self.__init__(encoding=encoding, summaries_generated=self.summaries_generated)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ContextWindowState":
+        known = cls.__dataclass_fields__.keys()
+        return cls(**{k: v for k, v in (data or {}).items() if k in known})
+
+
+class SessionContextStore:
+    """Persistence of ContextWindowState with the chat session (memory_service)"""
+
+    async def load(self, session_id: str, tenant_id: str) -> Optional[Dict[str, Any]]:
+        from app.services.memory_service import get_memory_service
+        return await get_memory_service().get_context_state(session_id, tenant_id)
+
+    async def save(self, session_id: str, tenant_id: str, state: Dict[str, Any]) -> None:
+        from app.services.memory_service import get_memory_service
+        await get_memory_service().save_context_state(session_id, tenant_id, state)
+
+
+class IncrementalContextWindow:
+    """
+    Context window maintained turn after turn for each session
+
+    Each turn only the new messages are tokenized; the window total is a
+    sum of cached counts. When it overflows, the oldest messages are folded
+    into the rolling summary until the recent window is back under
+    CONTEXT_SUMMARY_TARGET_RATIO of the budget, so the summary LLM is
+    called once per overflow rather than once per turn.
+    """
+
+    MIN_RECENT_MESSAGES = 4
+
+    def __init__(
+        self,
+        tokenizer: TokenizerService,
+        compressor: ContextCompressor,
+        store: Optional[SessionContextStore] = None,
+        target_ratio: float = CONTEXT_SUMMARY_TARGET_RATIO,
+        summary_max_tokens: int = CONTEXT_SUMMARY_MAX_TOKENS,
+        max_sessions: int = CONTEXT_SESSION_CACHE_SIZE,
+    ):
+        self.tokenizer = tokenizer
+        self.compressor = compressor
+        self.store = store if store is not None else SessionContextStore()
+        self.target_ratio = target_ratio
+        self.summary_max_tokens = summary_max_tokens
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, ContextWindowState]" = OrderedDict()
+        self.stats = {"turns": 0, "tokenized_messages": 0, "summaries": 0, "resets": 0}
+
+    async def _get_state(self, session_id: str, tenant_id: Optional[str]) -> ContextWindowState:
+        state = self.sessions.get(session_id)
+        if state is None:
+            data = None
+            if tenant_id:
+                try:
+                    data = await self.store.load(session_id, tenant_id)
+                except Exception as e:
+                    logger.warning(f"Context state of session {session_id} not loaded: {e}")
+            state = ContextWindowState.from_dict(data) if data else ContextWindowState()
+            self.sessions[session_id] = state
+            if len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(session_id)
+        return state
+
+    def _sync(self, state: ContextWindowState, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Align cached counts with the history; returns the live window messages"""
+        encoding = self.tokenizer.encoding_name
+        n = state.summarized_count
+        if state.encoding != encoding or len(messages) < n or (
+            n and message_digest(messages[n - 1]) != state.boundary_digest
+        ):
+            # Autre modèle, historique modifié ou tronqué: on repart de zéro
+            if state.encoding and (state.summarized_count or state.token_counts):
+                self.stats["resets"] += 1
+            state.reset(encoding)
+            n = 0
+
+        window = messages[n:]
+        keep = 0
+        for i, message in enumerate(window[:len(state.digests)]):
+            if state.digests[i] != message_digest(message):
+                break
+            keep = i + 1
+        del state.token_counts[keep:]
+        del state.digests[keep:]
+
+        for message in window[keep:]:
+            state.token_counts.append(self.tokenizer.message_tokens(message))
+            state.digests.append(message_digest(message))
+        self.stats["tokenized_messages"] += len(window) - keep
+        return window
+
+    async def _fold(
+        self,
+        state: ContextWindowState,
+        window: List[Dict[str, str]],
+        budget: int,
+        tenant_id: Optional[str]
+    ) -> List[Dict[str, str]]:
+        """Fold the oldest window messages into the summary; returns the new window"""
+        target = int(budget * self.target_ratio) - self.summary_max_tokens
+        cut, remaining = 0, state.window_tokens
+        max_cut = max(0, len(window) - self.MIN_RECENT_MESSAGES)
+        while cut < max_cut and remaining > target:
+            remaining -= state.token_counts[cut]
+            cut += 1
+        if cut == 0:
+            return window
+
+        summary = await self.compressor.summarize_into(
+            state.summary, window[:cut], max_tokens=self.summary_max_tokens, tenant_id=tenant_id
+        )
+        state.summary = summary
+        state.summary_tokens = self.tokenizer.message_tokens(self._summary_message(summary))
+        state.summarized_count += cut
+        state.boundary_digest = state.digests[cut - 1]
+        del state.token_counts[:cut]
+        del state.digests[:cut]
+        state.summaries_generated += 1
+        self.stats["summaries"] += 1
+        logger.info(f"Context window: folded {cut} messages into summary ({remaining} tokens left in window)")
+        return window[cut:]
+
+    @staticmethod
+    def _summary_message(summary: str) -> Dict[str, str]:
+        return {"role": "system", "content": f"[Résumé de la conversation précédente]\n{summary}"}
+
+    async def build(
+        self,
+        session_id: str,
+        messages: List[Dict[str, str]],
+        budget: int,
+        tenant_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Messages fitting in budget tokens (summary + recent window)
+
+        messages is the full chronological history of the session.
+        """
+        state = await self._get_state(session_id, tenant_id)
+        self.stats["turns"] += 1
+        previous = (state.summarized_count, state.summary)
+
+        window = self._sync(state, messages)
+        if state.summary_tokens + state.window_tokens + REPLY_PRIMING_TOKENS > budget:
+            window = await self._fold(state, window, budget, tenant_id)
+
+        result = ([self._summary_message(state.summary)] if state.summary else []) + [
+            {"role": m.get("role", "user"), "content": m.get("content", "")} for m in window
+        ]
+        tokens = state.summary_tokens + state.window_tokens + REPLY_PRIMING_TOKENS
+
+        if tokens > budget:
+            # Les derniers messages seuls dépassent le budget: compression sans LLM
+            # (non persistée, la fenêtre complète reste en cache); le rôle d'origine est conservé
+            compressed = await self.compressor.compress_by_importance(
+                [
+                    Message(
+                        role=_scoring_role(m["role"]), content=m["content"],
+                        tokens=self.tokenizer.message_tokens(m), metadata={"role": m["role"]},
+                    )
+                    for m in result
+                ],
+                budget - REPLY_PRIMING_TOKENS
+            )
+            result = [{"role": m.metadata["role"], "content": m.content} for m in compressed]
+            tokens = sum(m.tokens for m in compressed) + REPLY_PRIMING_TOKENS
+
+        summarized = (state.summarized_count, state.summary) != previous
+        if summarized and tenant_id:
+            try:
+                await self.store.save(session_id, tenant_id, state.to_dict())
+            except Exception as e:
+                logger.warning(f"Context state of session {session_id} not saved: {e}")
+
+        return {
+            "messages": result,
+            "tokens": tokens,
+            "summarized": summarized,
+            "summarized_count": state.summarized_count,
+            "summary_tokens": state.summary_tokens,
+        }
+
+    def forget(self, session_id: str):
+        self.sessions.pop(session_id, None)
+
+
 class ContextOptimizer:
     """
     Main context optimizer with full feature set
@@ -381,6 +670,7 @@ class ContextOptimizer:
             max_tokens=int(self.max_context * 0.8),  # Leave room for response
             model=model
         )
+        self.incremental = IncrementalContextWindow(self.tokenizer, self.window_manager.compressor)
 
     async def optimize(
         self,
@@ -388,7 +678,8 @@ class ContextOptimizer:
         system_prompt: str = None,
         max_response_tokens: int = 2000,
         rag_context: str = None,
-        tenant_id: Optional[str] = None
+        tenant_id: Optional[str] = None,
+        session_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Optimize context for LLM call with token tracking
@@ -399,6 +690,7 @@ class ContextOptimizer:
             max_response_tokens: Reserved tokens for response
             rag_context: Optional RAG context to include
             tenant_id: Tenant ID for token tracking
+            session_id: Chat session ID: incremental window with rolling summary
 
         Returns:
             Dict with optimized messages and metadata
@@ -416,6 +708,12 @@ class ContextOptimizer:
         # Available for conversation
         conversation_budget = available_tokens - fixed_tokens
 
+        if session_id:
+            return await self._optimize_session(
+                session_id, messages, system_prompt, rag_context,
+                conversation_budget, available_tokens, tenant_id
+            )
+
         # Optimize messages (with token tracking for summarization)
         optimized_messages = await self.window_manager.process_messages(
             messages,
@@ -451,6 +749,41 @@ class ContextOptimizer:
             "max_context": self.max_context
         }
 
+    async def _optimize_session(
+        self,
+        session_id: str,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str],
+        rag_context: Optional[str],
+        conversation_budget: int,
+        available_tokens: int,
+        tenant_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """Incremental path: only new messages are tokenized, summary reused between turns"""
+        final_messages = []
+        system_content = (system_prompt or "") + (f"\n\n[Contexte RAG]\n{rag_context}" if rag_context else "")
+        if system_content:
+            final_messages.append({"role": "system", "content": system_content})
+            conversation_budget = available_tokens - self.tokenizer.message_tokens(final_messages[0])
+
+        window = await self.incremental.build(session_id, messages, conversation_budget, tenant_id=tenant_id)
+        final_messages.extend(window["messages"])
+        total_tokens = window["tokens"] + (available_tokens - conversation_budget)
+
+        return {
+            "messages": final_messages,
+            "original_count": len(messages),
+            "optimized_count": len(window["messages"]),
+            "total_tokens": total_tokens,
+            "available_tokens": available_tokens,
+            "tokens_used_pct": round(total_tokens / available_tokens * 100, 1),
+            "model": self.model,
+            "max_context": self.max_context,
+            "summarized": window["summarized"],
+            "summarized_count": window["summarized_count"],
+            "summary_tokens": window["summary_tokens"],
+        }
+
     def get_token_stats(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
         """Get token statistics for messages"""
         total_tokens = self.tokenizer.count_message_tokens(messages)
@@ -471,7 +804,13 @@ class ContextOptimizer:
         }
 
 
+# One optimizer per model: session windows and token counts survive between calls
+_optimizers: Dict[str, ContextOptimizer] = {}
+
+
 # Factory function
 def get_context_optimizer(model: str = "gpt-4o") -> ContextOptimizer:
     """Get context optimizer for a model"""
-    return ContextOptimizer(model)
+    if model not in _optimizers:
+        _optimizers[model] = ContextOptimizer(model)
+    return _optimizers[model]
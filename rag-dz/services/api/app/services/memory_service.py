@@ -23,7 +23,9 @@ import psycopg
 from psycopg.rows import dict_row
 
 from ..config import get_settings
-from ..db import get_db_connection
+from ..db import get_tenant_connection, set_rls_context
+from ..pagination import decode_keyset_cursor
+from .message_indexer import enqueue_message_index, get_message_indexer
 
 # Token tracking
 try:
@@ -160,8 +162,8 @@ class QdrantVectorStore:
                 self._client = False
         return self._client if self._client else None
 
-    async def _get_embedding(self, text: str) -> Optional[List[float]]:
-        """Get embedding for text using OpenAI"""
+    def _get_embeddings_client(self):
+        """Get OpenAI client (None si non configuré)"""
         if self._embeddings_client is None:
             try:
                 from openai import AsyncOpenAI
@@ -172,20 +174,27 @@ class QdrantVectorStore:
             except Exception as e:
                 logger.warning(f"OpenAI not available: {e}")
                 self._embeddings_client = False
+        return self._embeddings_client if self._embeddings_client else None
 
-        if not self._embeddings_client:
+    async def _get_embedding(self, text: str) -> Optional[List[float]]:
+        """Get embedding for text using OpenAI"""
+        if not self._get_embeddings_client():
             return None
 
         try:
-            response = await self._embeddings_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text[:8000]
-            )
-            return response.data[0].embedding
+            return (await self._get_embeddings([text]))[0]
         except Exception as e:
             logger.warning(f"Embedding error: {e}")
             return None
 
+    async def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings d'un lot en un appel (erreurs propagées pour le retry)"""
+        response = await self._get_embeddings_client().embeddings.create(
+            model="text-embedding-3-small",
+            input=[text[:8000] for text in texts]
+        )
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
     async def upsert_message(
         self,
         message_id: str,
@@ -224,6 +233,37 @@ class QdrantVectorStore:
         except Exception as e:
             logger.warning(f"Qdrant upsert error: {e}")
 
+    async def upsert_messages(self, items: List[Dict[str, Any]]) -> int:
+        """
+        Index a batch of messages (un appel embeddings, un upsert Qdrant)
+
+        Appelé par MessageIndexer: les erreurs sont propagées pour que le
+        lot soit rejoué. Retourne 0 si Qdrant ou OpenAI n'est pas configuré.
+        """
+        client = self._get_client()
+        if not items or not client or not self._get_embeddings_client():
+            return 0
+
+        from qdrant_client.models import PointStruct
+
+        embeddings = await self._get_embeddings([item["content"] for item in items])
+        points = [
+            PointStruct(
+                id=item["message_id"],
+                vector=embedding,
+                payload={
+                    "session_id": item["session_id"],
+                    "user_id": item["user_id"],
+                    "tenant_id": item["tenant_id"],
+                    "content": item["content"][:500],
+                    "created_at": (item.get("created_at") or datetime.utcnow()).isoformat()
+                }
+            )
+            for item, embedding in zip(items, embeddings)
+        ]
+        await asyncio.to_thread(client.upsert, collection_name=self.COLLECTION_MESSAGES, points=points)
+        return len(points)
+
     async def upsert_memory(
         self,
         memory_id: str,
@@ -309,6 +349,58 @@ class QdrantVectorStore:
             return []
 
 
+# ============================================
+# Message Pagination (keyset)
+# ============================================
+
+# Propriétaire de la session pris comme utilisateur RLS (policy messages_select),
+# dans la même requête que la vérification tenant/propriétaire
+SESSION_OWNER_CONTEXT_SQL = """
+    SELECT cs.user_id,
+           set_config('app.current_user_id', COALESCE(cs.user_id::text, ''), true)
+    FROM chat_sessions cs
+    WHERE cs.id = %s AND cs.tenant_id = %s {owner_clause}
+"""
+
+
+def build_messages_page_query(
+    session_id: str,
+    limit: int,
+    before_id: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> Tuple[str, List[Any]]:
+    """
+    Requête keyset (created_at, id) d'une page de messages, plus récents d'abord
+
+    Sélectionne limit + 1 lignes (la dernière indique has_more). `cursor`
+    vient de encode_keyset_cursor et prime sur `before_id`.
+
+    Raises:
+        ValueError: curseur invalide
+    """
+    keyset = ""
+    params: List[Any] = [session_id]
+
+    if cursor:
+        created_at, message_id = decode_keyset_cursor(cursor)
+        keyset = "AND (m.created_at, m.id) < (%s, %s::uuid)"
+        params.extend([created_at, message_id])
+    elif before_id:
+        keyset = """AND (m.created_at, m.id) < (
+            SELECT b.created_at, b.id FROM chat_messages b
+            WHERE b.id = %s AND b.session_id = %s
+        )"""
+        params.extend([before_id, session_id])
+
+    params.append(limit + 1)
+    return f"""
+        SELECT * FROM chat_messages m
+        WHERE m.session_id = %s {keyset}
+        ORDER BY m.created_at DESC, m.id DESC
+        LIMIT %s
+    """, params
+
+
 # ============================================
 # Main Memory Service
 # ============================================
@@ -343,9 +435,9 @@ class MemoryService:
         """Create a new chat session"""
         session_id = str(uuid.uuid4())
 
-        with get_db_connection() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
-                cur.execute("""
+        async with get_tenant_connection(tenant_id, user_id) as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute("""
                     INSERT INTO chat_sessions
                     (id, tenant_id, user_id, title, app_context, language, agent_id, model, metadata)
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
@@ -361,7 +453,7 @@ class MemoryService:
                     session_data.model,
                     json.dumps(session_data.metadata)
                 ))
-                row = cur.fetchone()
+                row = await cur.fetchone()
 
         # Cache session
         await self.cache.set(
@@ -381,13 +473,13 @@ class MemoryService:
         # Check cache first
         cached = await self.cache.get(f"session:{session_id}")
 
-        with get_db_connection() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
-                cur.execute("""
+        async with get_tenant_connection(tenant_id) as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute("""
                     SELECT * FROM chat_sessions
                     WHERE id = %s AND tenant_id = %s
                 """, (session_id, tenant_id))
-                row = cur.fetchone()
+                row = await cur.fetchone()
 
         if not row:
             return None
@@ -402,45 +494,64 @@ class MemoryService:
         is_archived: bool = False,
         is_starred: Optional[bool] = None,
         limit: int = 20,
-        offset: int = 0
-    ) -> Tuple[List[ChatSessionSummary], int]:
-        """Get user's sessions with pagination"""
-        conditions = ["tenant_id = %s", "user_id = %s", "is_archived = %s"]
-        params = [tenant_id, user_id, is_archived]
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        with_total: bool = True
+    ) -> Tuple[List[ChatSessionSummary], Optional[int], bool]:
+        """
+        Get user's sessions, most recent activity first
+
+        Pagination keyset sur (last_message_at, id) quand `cursor` est fourni
+        (idx_sessions_user_recent), sinon OFFSET pour la compatibilité.
+        Le COUNT n'est fait que si with_total (None sinon).
+
+        Raises:
+            ValueError: curseur invalide
+        """
+        conditions = ["cs.tenant_id = %s", "cs.user_id = %s", "cs.is_archived = %s"]
+        params: List[Any] = [tenant_id, user_id, is_archived]
 
         if app_context:
-            conditions.append("app_context = %s")
+            conditions.append("cs.app_context = %s")
             params.append(app_context.value)
 
         if is_starred is not None:
-            conditions.append("is_starred = %s")
+            conditions.append("cs.is_starred = %s")
             params.append(is_starred)
 
-        where_clause = " AND ".join(conditions)
-
-        with get_db_connection() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
-                # Get total count
-                cur.execute(f"""
-                    SELECT COUNT(*) as total FROM chat_sessions WHERE {where_clause}
-                """, params)
-                total = cur.fetchone()["total"]
-
-                # Get sessions
-                cur.execute(f"""
+        filter_clause = " AND ".join(conditions)
+        filter_params = list(params)
+
+        if cursor:
+            last_message_at, last_id = decode_keyset_cursor(cursor)
+            conditions.append("(cs.last_message_at, cs.id) < (%s, %s::uuid)")
+            params.extend([last_message_at, last_id])
+            offset = 0
+
+        async with get_tenant_connection(tenant_id, user_id) as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                total = None
+                if with_total:
+                    await cur.execute(f"""
+                        SELECT COUNT(*) as total FROM chat_sessions cs WHERE {filter_clause}
+                    """, filter_params)
+                    total = (await cur.fetchone())["total"]
+
+                await cur.execute(f"""
                     SELECT cs.*,
                            (SELECT content FROM chat_messages
                             WHERE session_id = cs.id
-                            ORDER BY created_at ASC LIMIT 1) as preview
+                            ORDER BY created_at ASC, id ASC LIMIT 1) as preview
                     FROM chat_sessions cs
-                    WHERE {where_clause}
-                    ORDER BY last_message_at DESC NULLS LAST, created_at DESC
+                    WHERE {" AND ".join(conditions)}
+                    ORDER BY cs.last_message_at DESC, cs.id DESC
                     LIMIT %s OFFSET %s
-                """, params + [limit, offset])
-                rows = cur.fetchall()
+                """, params + [limit + 1, offset])
+                rows = await cur.fetchall()
 
-        sessions = [self._row_to_session_summary(r) for r in rows]
-        return sessions, total
+        has_more = len(rows) > limit
+        sessions = [self._row_to_session_summary(r) for r in rows[:limit]]
+        return sessions, total, has_more
 
     async def update_session(
         self,
@@ -474,15 +585,15 @@ class MemoryService:
         set_parts.append("updated_at = NOW()")
         params.extend([session_id, tenant_id])
 
-        with get_db_connection() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
-                cur.execute(f"""
+        async with get_tenant_connection(tenant_id) as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute(f"""
                     UPDATE chat_sessions
                     SET {", ".join(set_parts)}
                     WHERE id = %s AND tenant_id = %s
                     RETURNING *
                 """, params)
-                row = cur.fetchone()
+                row = await cur.fetchone()
 
         if not row:
             return None
@@ -494,9 +605,9 @@ class MemoryService:
 
     async def delete_session(self, session_id: str, tenant_id: str) -> bool:
         """Delete session and all messages"""
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
+        async with get_tenant_connection(tenant_id) as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("""
                     DELETE FROM chat_sessions
                     WHERE id = %s AND tenant_id = %s
                 """, (session_id, tenant_id))
@@ -507,6 +618,29 @@ class MemoryService:
 
         return deleted
 
+    async def get_context_state(self, session_id: str, tenant_id: str) -> Optional[Dict[str, Any]]:
+        """État de la fenêtre de contexte incrémentale (context_optimizer) de la session"""
+        async with get_tenant_connection(tenant_id) as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute("""
+                    SELECT metadata->'context_window' AS state FROM chat_sessions
+                    WHERE id = %s AND tenant_id = %s
+                """, (session_id, tenant_id), prepare=True)
+                row = await cur.fetchone()
+
+        return row["state"] if row else None
+
+    async def save_context_state(self, session_id: str, tenant_id: str, state: Dict[str, Any]) -> bool:
+        """Enregistre le résumé glissant dans metadata.context_window (sans toucher updated_at)"""
+        async with get_tenant_connection(tenant_id) as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                    UPDATE chat_sessions
+                    SET metadata = jsonb_set(COALESCE(metadata, '{}'::jsonb), '{context_window}', %s::jsonb)
+                    WHERE id = %s AND tenant_id = %s
+                """, (json.dumps(state), session_id, tenant_id), prepare=True)
+                return cur.rowcount > 0
+
     # ============================================
     # Message Management
     # ============================================
@@ -520,10 +654,27 @@ class MemoryService:
         """Add message to session"""
         message_id = str(uuid.uuid4())
 
-        with get_db_connection() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
+        async with get_tenant_connection(tenant_id) as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                # Update session stats (and get user_id for RLS + vector indexing)
+                await cur.execute("""
+                    UPDATE chat_sessions
+                    SET message_count = message_count + 1,
+                        total_tokens = total_tokens + %s,
+                        last_message_at = NOW(),
+                        updated_at = NOW()
+                    WHERE id = %s AND tenant_id = %s
+                    RETURNING user_id
+                """, (message.tokens_input + message.tokens_output, session_id, tenant_id), prepare=True)
+                session = await cur.fetchone()
+                if not session:
+                    raise ValueError(f"Session {session_id} not found")
+
+                # Policy messages_insert: l'utilisateur propriétaire de la session
+                await set_rls_context(conn, tenant_id, session["user_id"])
+
                 # Insert message
-                cur.execute("""
+                await cur.execute("""
                     INSERT INTO chat_messages
                     (id, session_id, role, content, tokens_input, tokens_output,
                      model_used, latency_ms, tool_calls, tool_results, metadata)
@@ -541,36 +692,13 @@ class MemoryService:
                     json.dumps(message.tool_calls) if message.tool_calls else None,
                     json.dumps(message.tool_results) if message.tool_results else None,
                     json.dumps(message.metadata)
-                ))
-                row = cur.fetchone()
+                ), prepare=True)
+                row = await cur.fetchone()
 
-                # Update session stats
-                cur.execute("""
-                    UPDATE chat_sessions
-                    SET message_count = message_count + 1,
-                        total_tokens = total_tokens + %s,
-                        last_message_at = NOW(),
-                        updated_at = NOW()
-                    WHERE id = %s
-                """, (message.tokens_input + message.tokens_output, session_id))
-
-                # Get user_id for vector indexing
-                cur.execute("""
-                    SELECT user_id FROM chat_sessions WHERE id = %s
-                """, (session_id,))
-                session = cur.fetchone()
-
-        # Index in vector store (async, non-blocking)
-        if session:
-            asyncio.create_task(
-                self.vector_store.upsert_message(
-                    message_id,
-                    message.content,
-                    session_id,
-                    session["user_id"],
-                    tenant_id
-                )
-            )
+                # Indexation vectorielle: outbox commitée avec le message
+                await enqueue_message_index(cur, message_id, session_id, tenant_id, session["user_id"])
+
+        get_message_indexer().notify()
 
         return self._row_to_message(row)
 
@@ -579,36 +707,38 @@ class MemoryService:
         session_id: str,
         tenant_id: str,
         limit: int = 50,
-        before_id: Optional[str] = None
+        before_id: Optional[str] = None,
+        cursor: Optional[str] = None,
+        user_id: Optional[str] = None
     ) -> Tuple[List[ChatMessage], bool]:
-        """Get messages for session with pagination"""
-        conditions = ["cm.session_id = %s"]
-        params = [session_id]
-
-        if before_id:
-            conditions.append("""
-                cm.created_at < (SELECT created_at FROM chat_messages WHERE id = %s)
-            """)
-            params.append(before_id)
-
-        with get_db_connection() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
-                # Verify session belongs to tenant
-                cur.execute("""
-                    SELECT id FROM chat_sessions
-                    WHERE id = %s AND tenant_id = %s
-                """, (session_id, tenant_id))
-                if not cur.fetchone():
+        """
+        Get messages for session, newest page first (chronological order)
+
+        La session (tenant, et propriétaire si user_id) est vérifiée dans la
+        requête qui pose son propriétaire comme utilisateur RLS, puis la page
+        est lue par parcours keyset (created_at, id) de idx_messages_session_keyset.
+
+        Raises:
+            ValueError: curseur invalide
+        """
+        query, params = build_messages_page_query(session_id, limit, before_id=before_id, cursor=cursor)
+        owner_params: List[Any] = [session_id, tenant_id]
+        owner_clause = ""
+        if user_id is not None:
+            owner_clause = "AND cs.user_id = %s"
+            owner_params.append(user_id)
+
+        async with get_tenant_connection(tenant_id) as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute(
+                    SESSION_OWNER_CONTEXT_SQL.format(owner_clause=owner_clause), owner_params, prepare=True
+                )
+                if not await cur.fetchone():
+                    # Session absente, autre tenant ou autre propriétaire
                     return [], False
 
-                # Get messages
-                cur.execute(f"""
-                    SELECT cm.* FROM chat_messages cm
-                    WHERE {" AND ".join(conditions)}
-                    ORDER BY cm.created_at DESC
-                    LIMIT %s
-                """, params + [limit + 1])
-                rows = cur.fetchall()
+                await cur.execute(query, params, prepare=True)
+                rows = await cur.fetchall()
 
         has_more = len(rows) > limit
         messages = [self._row_to_message(r) for r in rows[:limit]]
@@ -629,9 +759,9 @@ class MemoryService:
         """Create or update user memory"""
         memory_id = str(uuid.uuid4())
 
-        with get_db_connection() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
-                cur.execute("""
+        async with get_tenant_connection(tenant_id, user_id) as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute("""
                     INSERT INTO user_memories
                     (id, tenant_id, user_id, category, key, value, confidence,
                      source, source_message_id, metadata)
@@ -657,7 +787,7 @@ class MemoryService:
                     memory.source_message_id,
                     json.dumps(memory.metadata)
                 ))
-                row = cur.fetchone()
+                row = await cur.fetchone()
 
         # Index in vector store
         asyncio.create_task(
@@ -687,14 +817,14 @@ class MemoryService:
             conditions.append("category = %s")
             params.append(category.value)
 
-        with get_db_connection() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
-                cur.execute(f"""
+        async with get_tenant_connection(tenant_id, user_id) as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute(f"""
                     SELECT * FROM user_memories
                     WHERE {" AND ".join(conditions)}
                     ORDER BY category, key
                 """, params)
-                rows = cur.fetchall()
+                rows = await cur.fetchall()
 
         return [self._row_to_memory(r) for r in rows]
 
@@ -707,21 +837,21 @@ class MemoryService:
         reason: Optional[str] = None
     ) -> Optional[UserMemory]:
         """Update a memory (with correction tracking)"""
-        with get_db_connection() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
+        async with get_tenant_connection(tenant_id, user_id) as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
                 # Get current memory
-                cur.execute("""
+                await cur.execute("""
                     SELECT * FROM user_memories
                     WHERE id = %s AND tenant_id = %s AND user_id = %s
                 """, (memory_id, tenant_id, user_id))
-                current = cur.fetchone()
+                current = await cur.fetchone()
 
                 if not current:
                     return None
 
                 # Record correction if value changed
                 if updates.value and updates.value != current["value"]:
-                    cur.execute("""
+                    await cur.execute("""
                         INSERT INTO memory_corrections
                         (memory_id, old_value, new_value, corrected_by, reason)
                         VALUES (%s, %s, %s, %s, %s)
@@ -749,13 +879,13 @@ class MemoryService:
 
                 params.extend([memory_id, tenant_id, user_id])
 
-                cur.execute(f"""
+                await cur.execute(f"""
                     UPDATE user_memories
                     SET {", ".join(set_parts)}
                     WHERE id = %s AND tenant_id = %s AND user_id = %s
                     RETURNING *
                 """, params)
-                row = cur.fetchone()
+                row = await cur.fetchone()
 
         return self._row_to_memory(row) if row else None
 
@@ -766,9 +896,9 @@ class MemoryService:
         user_id: str
     ) -> bool:
         """Delete a memory (soft delete)"""
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
+        async with get_tenant_connection(tenant_id, user_id) as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("""
                     UPDATE user_memories
                     SET is_active = false, updated_at = NOW()
                     WHERE id = %s AND tenant_id = %s AND user_id = %s
@@ -804,9 +934,9 @@ class MemoryService:
 
         # Get recent topics from conversations
         if include_recent_topics:
-            with get_db_connection() as conn:
-                with conn.cursor(row_factory=dict_row) as cur:
-                    cur.execute("""
+            async with get_tenant_connection(tenant_id, user_id) as conn:
+                async with conn.cursor(row_factory=dict_row) as cur:
+                    await cur.execute("""
                         SELECT DISTINCT cs.title
                         FROM chat_sessions cs
                         WHERE cs.tenant_id = %s AND cs.user_id = %s
@@ -815,7 +945,7 @@ class MemoryService:
                         ORDER BY cs.last_message_at DESC
                         LIMIT 5
                     """, (tenant_id, user_id))
-                    rows = cur.fetchall()
+                    rows = await cur.fetchall()
                     context.recent_topics = [r["title"] for r in rows if r["title"]]
 
         return context
@@ -987,10 +1117,10 @@ class MemoryService:
         user_id: str
     ) -> MemoryStatsResponse:
         """Get user's memory statistics"""
-        with get_db_connection() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
+        async with get_tenant_connection(tenant_id, user_id) as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
                 # Memory stats
-                cur.execute("""
+                await cur.execute("""
                     SELECT
                         COUNT(*) as total_memories,
                         COUNT(*) FILTER (WHERE category = 'profile') as profile_count,
@@ -1003,20 +1133,20 @@ class MemoryService:
                     FROM user_memories
                     WHERE tenant_id = %s AND user_id = %s AND is_active = true
                 """, (tenant_id, user_id))
-                mem_stats = cur.fetchone()
+                mem_stats = await cur.fetchone()
 
                 # Conversation stats
-                cur.execute("""
+                await cur.execute("""
                     SELECT
                         COUNT(*) as total_conversations,
                         SUM(message_count) as total_messages
                     FROM chat_sessions
                     WHERE tenant_id = %s AND user_id = %s
                 """, (tenant_id, user_id))
-                conv_stats = cur.fetchone()
+                conv_stats = await cur.fetchone()
 
                 # Most discussed topics
-                cur.execute("""
+                await cur.execute("""
                     SELECT title, COUNT(*) as msg_count
                     FROM chat_sessions
                     WHERE tenant_id = %s AND user_id = %s AND title IS NOT NULL
@@ -1024,7 +1154,7 @@ class MemoryService:
                     ORDER BY msg_count DESC
                     LIMIT 5
                 """, (tenant_id, user_id))
-                topics = [r["title"] for r in cur.fetchall()]
+                topics = [r["title"] for r in await cur.fetchall()]
 
         total_conv = conv_stats["total_conversations"] or 0
         total_msg = conv_stats["total_messages"] or 0
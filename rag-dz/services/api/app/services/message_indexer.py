@@ -0,0 +1,342 @@
+"""
+Message Indexer - Indexation vectorielle des messages par lots
+==============================================================
+Indexation Qdrant des messages de chat hors du chemin des requêtes
+
+- Outbox transactionnelle: add_message insère une ligne dans
+  chat_message_index_outbox dans la même transaction que le message
+  (migration 024), puis réveille l'indexeur (aucune tâche par message)
+- Workers: MESSAGE_INDEX_WORKERS boucles réclament des lots
+  (FOR UPDATE SKIP LOCKED + bail), un appel embeddings et un upsert Qdrant
+  par lot; le travail en cours est borné à workers x batch_size messages
+- Rafales: après un réveil, court délai (linger) pour grouper les messages
+- Échecs: le lot repasse en file avec backoff exponentiel; au-delà de
+  MESSAGE_INDEX_MAX_ATTEMPTS la ligne est marquée failed_at (lettre morte)
+- Redémarrage / crash: les lignes restent en base, le bail expiré les
+  rend de nouveau réclamables (par ce worker ou un autre process)
+- Lag: messages en attente, âge du plus ancien, lettres mortes
+  (/health/message-indexer, jauges Prometheus)
+
+Configuration (env):
+- MESSAGE_INDEX_WORKERS: lots traités en parallèle (défaut 2)
+- MESSAGE_INDEX_BATCH_SIZE: messages par lot (défaut 64)
+- MESSAGE_INDEX_LINGER_SEC: attente de regroupement après réveil (défaut 0.2)
+- MESSAGE_INDEX_POLL_SEC: scrutation de l'outbox sans réveil (défaut 5)
+- MESSAGE_INDEX_LEASE_SEC: bail d'un lot réclamé (défaut 120)
+- MESSAGE_INDEX_MAX_ATTEMPTS: tentatives avant lettre morte (défaut 8)
+- MESSAGE_INDEX_RETRY_BASE_SEC / MESSAGE_INDEX_RETRY_MAX_SEC: backoff (défaut 2 / 600)
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+try:
+    from ..monitoring import MESSAGE_INDEX_LAG_SECONDS, MESSAGE_INDEX_PENDING
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_INDEX_WORKERS = int(os.getenv("MESSAGE_INDEX_WORKERS", "2"))
+MESSAGE_INDEX_BATCH_SIZE = int(os.getenv("MESSAGE_INDEX_BATCH_SIZE", "64"))
+MESSAGE_INDEX_LINGER_SEC = float(os.getenv("MESSAGE_INDEX_LINGER_SEC", "0.2"))
+MESSAGE_INDEX_POLL_SEC = float(os.getenv("MESSAGE_INDEX_POLL_SEC", "5"))
+MESSAGE_INDEX_LEASE_SEC = float(os.getenv("MESSAGE_INDEX_LEASE_SEC", "120"))
+MESSAGE_INDEX_MAX_ATTEMPTS = int(os.getenv("MESSAGE_INDEX_MAX_ATTEMPTS", "8"))
+MESSAGE_INDEX_RETRY_BASE_SEC = float(os.getenv("MESSAGE_INDEX_RETRY_BASE_SEC", "2"))
+MESSAGE_INDEX_RETRY_MAX_SEC = float(os.getenv("MESSAGE_INDEX_RETRY_MAX_SEC", "600"))
+
+# Ligne réclamée: id, message_id, session_id, tenant_id, user_id, attempts, content, created_at
+IndexItem = Dict[str, Any]
+
+
+# ============================================
+# OUTBOX POSTGRES
+# ============================================
+
+ENQUEUE_SQL = """
+    INSERT INTO chat_message_index_outbox (message_id, session_id, tenant_id, user_id)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (message_id) DO NOTHING
+"""
+
+# Le bail (next_attempt_at) rend le lot à nouveau réclamable si le worker meurt
+CLAIM_SQL = """
+    WITH claimed AS (
+        SELECT id FROM chat_message_index_outbox
+        WHERE failed_at IS NULL AND next_attempt_at <= NOW()
+        ORDER BY next_attempt_at, id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE chat_message_index_outbox o
+    SET attempts = o.attempts + 1,
+        next_attempt_at = NOW() + make_interval(secs => %s)
+    FROM claimed, chat_messages m
+    WHERE o.id = claimed.id AND m.id = o.message_id
+    RETURNING o.id, o.message_id, o.session_id, o.tenant_id, o.user_id, o.attempts,
+              m.content, m.created_at
+"""
+
+COMPLETE_SQL = "DELETE FROM chat_message_index_outbox WHERE id = ANY(%s)"
+
+RETRY_SQL = """
+    UPDATE chat_message_index_outbox
+    SET last_error = %s,
+        next_attempt_at = NOW() + make_interval(secs => LEAST(%s * power(2, attempts - 1), %s)),
+        failed_at = CASE WHEN attempts >= %s THEN NOW() END
+    WHERE id = ANY(%s)
+"""
+
+LAG_SQL = """
+    SELECT COUNT(*) FILTER (WHERE failed_at IS NULL),
+           COUNT(*) FILTER (WHERE failed_at IS NOT NULL),
+           COALESCE(EXTRACT(EPOCH FROM NOW() - MIN(created_at) FILTER (WHERE failed_at IS NULL)), 0)
+    FROM chat_message_index_outbox
+"""
+
+
+async def enqueue_message_index(cur, message_id: str, session_id: str, tenant_id: str, user_id) -> None:
+    """Ajoute le message à l'outbox (à appeler dans la transaction d'insertion du message)"""
+    await cur.execute(ENQUEUE_SQL, (message_id, session_id, tenant_id, user_id), prepare=True)
+
+
+class PostgresIndexOutbox:
+    """Outbox chat_message_index_outbox (lots multi-tenants: contexte super-admin)"""
+
+    async def claim(self, limit: int, lease_sec: float) -> List[IndexItem]:
+        from ..db import get_tenant_connection
+        from psycopg.rows import dict_row
+
+        async with get_tenant_connection(is_superadmin=True) as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute(CLAIM_SQL, (limit, lease_sec), prepare=True)
+                rows = await cur.fetchall()
+        for row in rows:
+            for key in ("message_id", "session_id", "tenant_id"):
+                row[key] = str(row[key])
+        return rows
+
+    async def complete(self, ids: List[int]) -> None:
+        from ..db import get_tenant_connection
+
+        async with get_tenant_connection(is_superadmin=True) as conn:
+            await conn.execute(COMPLETE_SQL, (ids,), prepare=True)
+
+    async def retry(
+        self,
+        ids: List[int],
+        error: str,
+        max_attempts: int,
+        retry_base_sec: float,
+        retry_max_sec: float,
+    ) -> None:
+        from ..db import get_tenant_connection
+
+        async with get_tenant_connection(is_superadmin=True) as conn:
+            await conn.execute(
+                RETRY_SQL, (error[:1000], retry_base_sec, retry_max_sec, max_attempts, ids), prepare=True
+            )
+
+    async def lag(self) -> Dict[str, Any]:
+        from ..db import get_tenant_connection
+
+        async with get_tenant_connection(is_superadmin=True) as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(LAG_SQL, prepare=True)
+                pending, failed, oldest = await cur.fetchone()
+        return {"pending": int(pending), "failed": int(failed), "oldest_pending_sec": round(float(oldest), 1)}
+
+
+async def index_with_vector_store(items: List[IndexItem]) -> int:
+    """Sink par défaut: QdrantVectorStore du MemoryService"""
+    from .memory_service import get_memory_service
+
+    return await get_memory_service().vector_store.upsert_messages(items)
+
+
+# ============================================
+# INDEXEUR
+# ============================================
+
+class MessageIndexer:
+    """
+    Workers d'indexation vectorielle alimentés par l'outbox
+
+    notify() est appelé après le commit d'un message; sans réveil (autre
+    process, reprises), l'outbox est scrutée toutes les poll_interval_sec.
+    """
+
+    def __init__(
+        self,
+        outbox=None,
+        sink: Optional[Callable[[List[IndexItem]], Awaitable[int]]] = None,
+        workers: int = MESSAGE_INDEX_WORKERS,
+        batch_size: int = MESSAGE_INDEX_BATCH_SIZE,
+        linger_sec: float = MESSAGE_INDEX_LINGER_SEC,
+        poll_interval_sec: float = MESSAGE_INDEX_POLL_SEC,
+        lease_sec: float = MESSAGE_INDEX_LEASE_SEC,
+        max_attempts: int = MESSAGE_INDEX_MAX_ATTEMPTS,
+        retry_base_sec: float = MESSAGE_INDEX_RETRY_BASE_SEC,
+        retry_max_sec: float = MESSAGE_INDEX_RETRY_MAX_SEC,
+    ):
+        self.outbox = outbox or PostgresIndexOutbox()
+        self._sink = sink or index_with_vector_store
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.linger_sec = linger_sec
+        self.poll_interval_sec = poll_interval_sec
+        self.lease_sec = lease_sec
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_sec = retry_base_sec
+        self.retry_max_sec = retry_max_sec
+        self._wakeup: Optional[asyncio.Event] = None
+        self._notified = 0
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self.stats = {
+            "notified": 0, "indexed": 0, "skipped": 0, "batches": 0,
+            "failures": 0, "retried": 0, "dead_lettered": 0,
+        }
+        self.lag: Dict[str, Any] = {"pending": None, "failed": None, "oldest_pending_sec": None}
+        self.last_batch_ms: Optional[float] = None
+
+    # ----------------------------------------
+    # CHEMIN REQUÊTE
+    # ----------------------------------------
+
+    def notify(self, count: int = 1) -> None:
+        """Signale des messages commités dans l'outbox (sans I/O)"""
+        self.stats["notified"] += count
+        self._notified += count
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # ----------------------------------------
+    # CYCLE DE VIE
+    # ----------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Démarre les workers; l'outbox restante (redémarrage) est reprise au 1er cycle"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"message-indexer-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Message indexer started (workers={self.workers}, batch={self.batch_size})")
+
+    async def stop(self) -> None:
+        """Termine les lots en cours; le reste attend dans l'outbox"""
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval_sec)
+            except asyncio.TimeoutError:
+                pass
+            if self._stopping:
+                return
+            if 0 < self._notified < self.batch_size and self.linger_sec > 0:
+                await asyncio.sleep(self.linger_sec)  # la rafale remplit le lot
+            self._wakeup.clear()
+            self._notified = 0
+            try:
+                while await self.run_once() == self.batch_size and not self._stopping:
+                    pass  # arriéré: lots pleins à la suite
+                await self.refresh_lag()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Message indexer error: {e}")
+
+    # ----------------------------------------
+    # LOTS
+    # ----------------------------------------
+
+    async def run_once(self) -> int:
+        """Réclame et indexe un lot; retourne le nombre de lignes réclamées"""
+        items = await self.outbox.claim(self.batch_size, self.lease_sec)
+        if not items:
+            return 0
+
+        start = time.perf_counter()
+        ids = [item["id"] for item in items]
+        try:
+            indexed = await self._sink([item for item in items if (item.get("content") or "").strip()])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["failures"] += 1
+            dead = sum(1 for item in items if item["attempts"] >= self.max_attempts)
+            self.stats["retried"] += len(items) - dead
+            self.stats["dead_lettered"] += dead
+            logger.warning(f"Message index batch failed ({len(items)} messages): {e!r}")
+            await self.outbox.retry(ids, repr(e), self.max_attempts, self.retry_base_sec, self.retry_max_sec)
+            return len(items)
+
+        await self.outbox.complete(ids)
+        self.last_batch_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.stats["batches"] += 1
+        self.stats["indexed"] += indexed
+        self.stats["skipped"] += len(items) - indexed
+        return len(items)
+
+    # ----------------------------------------
+    # STATS
+    # ----------------------------------------
+
+    async def refresh_lag(self) -> Dict[str, Any]:
+        """Lag de l'outbox (tous process confondus)"""
+        try:
+            self.lag = await self.outbox.lag()
+        except Exception as e:
+            logger.warning(f"Message indexer lag query failed: {e}")
+            return self.lag
+        if METRICS_AVAILABLE:
+            MESSAGE_INDEX_PENDING.labels(state="pending").set(self.lag["pending"])
+            MESSAGE_INDEX_PENDING.labels(state="failed").set(self.lag["failed"])
+            MESSAGE_INDEX_LAG_SECONDS.set(self.lag["oldest_pending_sec"])
+        return self.lag
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            **self.lag,
+            "last_batch_ms": self.last_batch_ms,
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+            "running": self.running,
+        }
+
+
+# ============================================
+# INSTANCE GLOBALE
+# ============================================
+
+_message_indexer: Optional[MessageIndexer] = None
+
+
+def get_message_indexer() -> MessageIndexer:
+    global _message_indexer
+    if _message_indexer is None:
+        _message_indexer = MessageIndexer()
+    return _message_indexer
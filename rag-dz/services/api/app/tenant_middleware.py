@@ -4,29 +4,33 @@ Multi-Tenant Context Middleware - Phase 3
 Extrait tenant_id de chaque requête et configure la session PostgreSQL RLS
 
 Support:
-- Header X-Tenant-ID (actuel)
 - JWT avec tenant_id (Phase 4)
 - API Key avec tenant associé (existant)
+- Header X-Tenant-ID: ignoré (injection de tenant), tentative loggée
 """
 
 import logging
 from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
 from typing import Optional
 from uuid import UUID
 
+from .core.asgi import ASGIMiddleware, send_with_headers
+
 logger = logging.getLogger(__name__)
 
 
-class TenantContextMiddleware(BaseHTTPMiddleware):
+class TenantContextMiddleware(ASGIMiddleware):
     """
     Middleware pour extraire et valider le tenant_id de chaque requête
 
     Ordre de priorité:
-    1. Header X-Tenant-ID (direct)
-    2. JWT payload (Phase 4)
-    3. API Key associé à un tenant (existant)
+    1. JWT payload (Phase 4)
+    2. API Key associé à un tenant (existant)
+
+    Le header X-Tenant-ID n'est jamais utilisé: un client authentifié pour
+    un tenant pourrait sinon lire les données d'un autre.
 
     Stocke le tenant_id dans request.state.tenant_id pour usage par DB session
     """
@@ -45,14 +49,16 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
         "/api/auth/refresh",
     }
 
-    async def dispatch(self, request: Request, call_next):
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        request = Request(scope, receive)
+
         # Autoriser OPTIONS pour CORS
         if request.method == "OPTIONS":
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
         # Autoriser routes publiques
         if self._is_public_route(request.url.path):
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
         # Extraire tenant_id
         tenant_id = await self._extract_tenant_id(request)
@@ -67,26 +73,28 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
                 logger.info(f"Using DEFAULT_TENANT_ID for development: {tenant_id}")
             else:
                 logger.warning(f"No tenant_id for request: {request.url.path}")
-                return JSONResponse(
-                    status_code=403,
+                response = JSONResponse(
+                    status_code=401,
                     content={
                         "error": "Tenant ID required",
-                        "message": "X-Tenant-ID header or valid JWT required"
+                        "message": "Valid JWT or API key required"
                     }
                 )
+                return await response(scope, receive, send)
 
         # Valider format UUID
         try:
             tenant_uuid = UUID(tenant_id)
         except ValueError:
             logger.error(f"Invalid tenant_id format: {tenant_id}")
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=400,
                 content={
                     "error": "Invalid tenant ID format",
                     "message": "Tenant ID must be a valid UUID"
                 }
             )
+            return await response(scope, receive, send)
 
         # Stocker dans request.state pour usage par DB session
         request.state.tenant_id = str(tenant_uuid)
@@ -94,13 +102,8 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
         # Log pour debugging
         logger.debug(f"Request tenant_id: {tenant_uuid} | Route: {request.url.path}")
 
-        # Continuer la requête
-        response = await call_next(request)
-
-        # Ajouter header dans la réponse (utile pour debugging)
-        response.headers["X-Tenant-Context"] = str(tenant_uuid)
-
-        return response
+        # Continuer la requête, header ajouté dans la réponse (utile pour debugging)
+        await self.app(scope, receive, send_with_headers(send, lambda: {"X-Tenant-Context": str(tenant_uuid)}))
 
     def _is_public_route(self, path: str) -> bool:
         """Vérifier si la route est publique"""
@@ -120,24 +123,25 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
         Extraire tenant_id depuis différentes sources
 
         Priorité:
-        1. Header X-Tenant-ID (actuel - pour tests et API directe)
-        2. JWT payload tenant_id (Phase 4)
-        3. API Key → tenant mapping (existant via request.state.tenant)
+        1. JWT payload tenant_id (Phase 4)
+        2. API Key → tenant mapping (existant via request.state.tenant)
+
+        Le header X-Tenant-ID est ignoré (tentative d'injection loggée).
         """
 
-        # 1. Header X-Tenant-ID (direct)
-        tenant_id = request.headers.get("X-Tenant-ID")
-        if tenant_id:
-            logger.debug(f"Tenant ID from header: {tenant_id}")
-            return tenant_id
+        header_tenant_id = request.headers.get("X-Tenant-ID")
+        if header_tenant_id:
+            logger.warning(
+                f"SECURITY: X-Tenant-ID header IGNORED ({header_tenant_id}) on {request.url.path}"
+            )
 
-        # 2. JWT payload (Phase 4 - à implémenter)
+        # 1. JWT payload
         tenant_id = self._extract_from_jwt(request)
         if tenant_id:
             logger.debug(f"Tenant ID from JWT: {tenant_id}")
             return tenant_id
 
-        # 3. API Key → tenant (existant via AuthMiddleware)
+        # 2. API Key → tenant (existant via AuthMiddleware)
         if hasattr(request.state, "tenant") and request.state.tenant:
             tenant_id = request.state.tenant.get("id")
             if tenant_id:
@@ -187,7 +191,7 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
             return None
 
 
-class SuperAdminMiddleware(BaseHTTPMiddleware):
+class SuperAdminMiddleware(ASGIMiddleware):
     """
     Middleware optionnel pour mode super-admin
 
@@ -198,7 +202,9 @@ class SuperAdminMiddleware(BaseHTTPMiddleware):
     # Super-admin API keys (à configurer via env)
     SUPERADMIN_KEYS = set()  # Rempli depuis config au démarrage
 
-    async def dispatch(self, request: Request, call_next):
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        request = Request(scope, receive)
+
         # Vérifier si c'est un super-admin
         api_key = request.headers.get("X-API-Key", "")
 
@@ -209,7 +215,7 @@ class SuperAdminMiddleware(BaseHTTPMiddleware):
         else:
             request.state.is_superadmin = False
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
 
 
 # Helper function pour récupérer tenant_id depuis request
@@ -38,6 +38,7 @@ Endpoints STT:
 - GET  /api/voice/stt/health     - Health check
 - POST /api/voice/stt/transcribe - Transcription complète
 - POST /api/voice/stt/quick      - Transcription rapide
+- WS   /api/voice/stt/stream     - Transcription temps réel (partiels + fin d'énoncé)
 
 Endpoints TTS:
 - GET  /api/voice/tts/health     - Health check
@@ -77,6 +78,9 @@ from .stt_models import (
     STTStatus,
     STTModelInfo,
     STTError,
+    # Streaming models
+    STTStreamEventType,
+    STTStreamEvent,
     # Constants
     SUPPORTED_AUDIO_FORMATS,
     ALLOWED_EXTENSIONS,
@@ -93,6 +97,14 @@ from .stt_service import (
     detect_audio_format,
     get_audio_duration,
     get_audio_metadata,
+    pcm_to_wav_bytes,
+)
+
+from .stt_streaming import (
+    StreamingSTTSession,
+    SileroStreamingVAD,
+    EnergyVAD,
+    decode_pcm16,
 )
 
 from .stt_router import router as stt_router
@@ -195,6 +207,15 @@ __all__ = [
     "detect_audio_format",
     "get_audio_duration",
     "get_audio_metadata",
+    "pcm_to_wav_bytes",
+    
+    # Streaming
+    "StreamingSTTSession",
+    "SileroStreamingVAD",
+    "EnergyVAD",
+    "decode_pcm16",
+    "STTStreamEventType",
+    "STTStreamEvent",
     
     # Enums
     "STTLanguage",
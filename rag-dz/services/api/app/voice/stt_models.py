@@ -200,6 +200,32 @@ class STTBatchResponse(BaseModel):
     processing_time_ms: int
 
 
+# ============================================
+# STREAMING MODELS
+# ============================================
+
+class STTStreamEventType(str, Enum):
+    """Types d'événements du flux STT temps réel"""
+    READY = "ready"                        # Session prête à recevoir l'audio
+    SPEECH_START = "speech_start"          # Début de parole détecté (VAD)
+    PARTIAL = "partial"                    # Transcription partielle (instable)
+    END_OF_UTTERANCE = "end_of_utterance"  # Fin d'énoncé (silence détecté)
+    FINAL = "final"                        # Transcription finale de l'énoncé
+    ERROR = "error"
+
+
+class STTStreamEvent(BaseModel):
+    """Événement émis sur le WebSocket STT streaming"""
+    type: STTStreamEventType
+    utterance_id: Optional[int] = Field(None, description="Numéro de l'énoncé dans la session")
+    text: Optional[str] = Field(None, description="Texte (partial/final)")
+    start: Optional[float] = Field(None, description="Début de l'énoncé (s depuis le début du flux)")
+    end: Optional[float] = Field(None, description="Fin de l'énoncé (s)")
+    language: Optional[str] = Field(None, description="Langue détectée (final)")
+    reason: Optional[str] = Field(None, description="Raison de fin d'énoncé (silence, max_duration, flush)")
+    message: Optional[str] = Field(None, description="Message d'erreur")
+
+
 # ============================================
 # STATUS / HEALTH MODELS
 # ============================================
@@ -294,3 +320,8 @@ DARIJA_PROMPTS = {
     "commerce": "نص تجاري جزائري، facture, bon de livraison, prix, DZD",
     "legal": "نص قانوني جزائري، عقد، محكمة، موثق",
 }
+
+
+# Streaming: PCM 16 bits mono 16 kHz (format attendu par Whisper et Silero VAD)
+STREAM_SAMPLE_RATE = 16000
+STREAM_ENCODINGS = ["pcm16", "opus"]
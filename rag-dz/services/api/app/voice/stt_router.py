@@ -5,12 +5,13 @@ Endpoints Speech-to-Text pour arabe/darija/français/anglais
 Avec intégration DARIJA_NLP post-processing
 """
 
+import asyncio
 import json
 import logging
 from typing import Optional
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Depends
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Depends, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
 
 from .stt_models import (
@@ -23,8 +24,14 @@ from .stt_models import (
     STTDialect,
     ALLOWED_EXTENSIONS,
     MAX_FILE_SIZE_MB,
+    STTStreamEvent,
+    STTStreamEventType,
+    STREAM_ENCODINGS,
 )
 from .stt_service import get_stt_service, STTService
+from .stt_streaming import OpusFrameDecoder, decode_pcm16
+from ..core.tenant_cache import resolve_tenant
+from ..core.usage_meter import record_usage
 
 
 logger = logging.getLogger(__name__)
@@ -280,6 +287,145 @@ async def stt_quick(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================
+# STREAMING ENDPOINT
+# ============================================
+
+# Fin de session ("end"): attente max des derniers finals puis de leur envoi
+STREAM_END_TIMEOUT_SEC = 10.0
+
+
+@router.websocket("/stt/stream")
+async def stt_stream(
+    websocket: WebSocket,
+    api_key: str = Query(..., description="API key for authentication"),
+    language_hint: Optional[str] = Query(None, description="Indice langue: ar, fr, en, auto"),
+    encoding: str = Query("pcm16", description="pcm16 (16 kHz mono) ou opus"),
+    min_silence_ms: int = Query(500, ge=100, le=5000, description="Silence de fin d'énoncé"),
+    partial_interval_ms: int = Query(800, ge=200, le=10000, description="Intervalle des partiels"),
+    partials: Optional[bool] = Query(None, description="Partiels (défaut: seulement avec un backend local)"),
+):
+    """
+    🎧 Transcription temps réel via WebSocket
+    
+    Authentification: ?api_key=... (fermeture 4001 si invalide)
+    
+    Client → serveur:
+    - Messages binaires: trames audio (PCM 16 bits LE mono 16 kHz, ou paquets Opus)
+    - {"type": "flush"}: termine l'énoncé en cours
+    - {"type": "end"}: termine l'énoncé en cours et ferme la session
+    
+    Serveur → client (JSON STTStreamEvent):
+    - ready, speech_start, partial, end_of_utterance, final, error
+    
+    Les partiels sont désactivés par défaut avec l'API OpenAI (un appel
+    facturé par partiel): ?partials=true pour les demander quand même.
+    Chaque final est comptabilisé (secondes audio) pour le tenant.
+    
+    end_of_utterance est émis dès que le VAD détecte la fin de parole,
+    avant la transcription finale: l'agent peut commencer à préparer sa réponse.
+    """
+    # Authenticate
+    tenant = await resolve_tenant(api_key)
+    if not tenant:
+        await websocket.close(code=4001, reason="Invalid API key")
+        return
+
+    await websocket.accept()
+    
+    if encoding not in STREAM_ENCODINGS:
+        await websocket.send_json({"type": STTStreamEventType.ERROR.value, "message": f"Encodage non supporté: {encoding}"})
+        await websocket.close(code=1003)
+        return
+    
+    try:
+        decode = OpusFrameDecoder() if encoding == "opus" else decode_pcm16
+    except RuntimeError as e:
+        await websocket.send_json({"type": STTStreamEventType.ERROR.value, "message": str(e)})
+        await websocket.close(code=1011)
+        return
+    
+    request = STTRequest(enable_timestamps=False)
+    if language_hint:
+        try:
+            request.language_hint = STTLanguage(language_hint)
+        except ValueError:
+            request.language_hint = STTLanguage.AUTO
+    
+    service = get_stt_service()
+    model_used = request.model.value if request.model else service.default_model
+    
+    def on_final(event: STTStreamEvent, latency_ms: int) -> None:
+        record_usage({
+            "tenant_id": tenant["id"],
+            "route": websocket.url.path,
+            "method": "WS",
+            "audio_seconds": round(event.end - event.start, 3),
+            "latency_ms": latency_ms,
+            "model_used": model_used,
+            "status_code": 200,
+        })
+    
+    session = service.create_stream_session(
+        request,
+        partials=partials,
+        min_silence_ms=min_silence_ms,
+        partial_interval_ms=partial_interval_ms,
+        on_final=on_final,
+    )
+    
+    async def send_events():
+        while True:
+            event: Optional[STTStreamEvent] = await session.events.get()
+            if event is None:  # Fin de session: tout a été envoyé
+                return
+            await websocket.send_text(event.model_dump_json(exclude_none=True))
+    
+    sender = asyncio.create_task(send_events())
+    session.emit(STTStreamEvent(type=STTStreamEventType.READY))
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            if message.get("bytes") is not None:
+                await session.feed(decode(message["bytes"]))
+                continue
+            
+            try:
+                control = json.loads(message.get("text") or "{}")
+            except json.JSONDecodeError:
+                continue
+            if control.get("type") in ("flush", "end"):
+                await session.flush()
+            if control.get("type") == "end":
+                # Derniers finals puis envoi des événements restants, borné:
+                # l'émetteur a pu mourir (client parti) sans vider la file
+                try:
+                    await asyncio.wait_for(session.wait_finals(), STREAM_END_TIMEOUT_SEC)
+                except asyncio.TimeoutError:
+                    logger.warning("STT stream end: final transcription timed out")
+                session.emit(None)
+                await asyncio.wait([sender], timeout=STREAM_END_TIMEOUT_SEC)
+                await websocket.close()
+                break
+    
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"STT stream error: {e}")
+        try:
+            await websocket.send_json({"type": STTStreamEventType.ERROR.value, "message": str(e)})
+        except Exception:
+            pass
+    finally:
+        sender.cancel()
+        await session.close()
+        logger.info(f"STT stream closed (tenant {tenant['id']}): {session.stats['utterances']} utterances, {session.stats['partials']} partials")
+
+
 # ============================================
 # DEMO ENDPOINTS
 # ============================================
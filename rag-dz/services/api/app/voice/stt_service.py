@@ -8,12 +8,15 @@ Avec intégration Whisper (OpenAI API ou local) + DARIJA_NLP
 import os
 import io
 import time
+import wave
 import tempfile
 import logging
 from pathlib import Path
 from typing import Optional, Dict, Any, Tuple, List
 from datetime import datetime
 
+import numpy as np
+
 # Audio processing
 try:
     import soundfile as sf
@@ -51,7 +54,9 @@ from .stt_models import (
     MAX_DURATION_SEC,
     WHISPER_LANG_MAP,
     DARIJA_PROMPTS,
+    STREAM_SAMPLE_RATE,
 )
+from .stt_streaming import StreamingSTTSession
 
 # DARIJA_NLP integration
 try:
@@ -135,6 +140,20 @@ def get_audio_duration(file_bytes: bytes, audio_format: str) -> float:
         return 0.0
 
 
+def pcm_to_wav_bytes(audio: np.ndarray, sample_rate: int = STREAM_SAMPLE_RATE) -> bytes:
+    """
+    Encode un signal float32 mono en WAV PCM 16 bits (pour les backends fichier)
+    """
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
 def get_audio_metadata(file_bytes: bytes, audio_format: str) -> Dict[str, Any]:
     """
     Extrait les métadonnées audio
@@ -351,6 +370,62 @@ class STTService:
             processing_time_ms=processing_time_ms,
         )
     
+    # ----------------------------------------
+    # STREAMING TRANSCRIPTION
+    # ----------------------------------------
+    
+    async def transcribe_pcm(
+        self,
+        audio: np.ndarray,
+        request: Optional[STTRequest] = None,
+    ) -> Tuple[str, str]:
+        """
+        Transcrit un énoncé PCM (float32 16 kHz) issu du flux streaming
+        
+        Pas de validation fichier ni de normalisation darija: les énoncés
+        sont courts et la latence prime.
+        
+        Returns:
+            (texte nettoyé, code langue)
+        """
+        request = request or STTRequest()
+        text_raw, language_detected, _ = await self._transcribe_backend(
+            file_bytes=pcm_to_wav_bytes(audio),
+            audio_format="wav",
+            request=request,
+        )
+        text = clean_text(text_raw) if self.enable_darija_nlp else text_raw.strip()
+        return text, WHISPER_LANG_MAP.get(language_detected, language_detected)
+    
+    def create_stream_session(
+        self,
+        request: Optional[STTRequest] = None,
+        partials: Optional[bool] = None,
+        **session_options,
+    ) -> StreamingSTTSession:
+        """
+        Crée une session de transcription streaming (VAD incrémental + partiels)
+        
+        Chaque partiel retranscrit tout l'énoncé en cours: avec l'API OpenAI,
+        c'est un appel facturé par partiel sur un audio qui grandit. Les
+        partiels ne sont donc actifs par défaut qu'avec un backend local.
+        
+        Args:
+            request: Options de transcription appliquées à chaque énoncé
+            partials: Forcer (True) ou couper (False) les partiels; None = selon le backend
+            **session_options: Réglages VAD (min_silence_ms, partial_interval_ms, on_final, ...)
+        """
+        request = request or STTRequest(enable_timestamps=False)
+        if partials is None:
+            partials = self.openai_client is None
+        if not partials:
+            session_options["partial_interval_ms"] = None
+        
+        async def transcribe(audio: np.ndarray) -> Tuple[str, str]:
+            return await self.transcribe_pcm(audio, request)
+        
+        return StreamingSTTSession(transcribe, **session_options)
+    
     # ----------------------------------------
     # BACKEND TRANSCRIPTION
     # ----------------------------------------
@@ -0,0 +1,441 @@
+"""
+STT_VOICE - Streaming temps réel
+================================
+Transcription incrémentale d'un flux audio (WebSocket)
+
+Pipeline par session:
+1. Décodage des trames (PCM 16 bits ou Opus) → float32 16 kHz
+2. Silero VAD incrémental (fenêtres de 32 ms, état LSTM conservé)
+3. Transcriptions partielles périodiques pendant la parole
+4. Fin d'énoncé après un silence → événement end_of_utterance + final
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+
+import numpy as np
+
+from .stt_models import STREAM_SAMPLE_RATE, STTStreamEvent, STTStreamEventType
+
+# Silero VAD (vendored faster_whisper)
+try:
+    from faster_whisper.vad import get_vad_model
+    SILERO_VAD_AVAILABLE = True
+except ImportError:
+    SILERO_VAD_AVAILABLE = False
+
+# Décodage Opus (optionnel)
+try:
+    import opuslib
+    OPUS_AVAILABLE = True
+except ImportError:
+    OPUS_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+# Fenêtre Silero VAD v5/v6 à 16 kHz
+VAD_WINDOW_SAMPLES = 512
+VAD_CONTEXT_SAMPLES = 64
+
+# File d'événements bornée: un client qui ne lit plus perd les plus anciens
+EVENT_QUEUE_SIZE = 256
+# Latences de final conservées pour les stats de session
+LATENCY_SAMPLES = 100
+
+# (audio float32 16 kHz) -> (texte, langue)
+TranscribeFn = Callable[[np.ndarray], Awaitable[Tuple[str, str]]]
+# (événement final, latence de transcription en ms)
+FinalCallback = Callable[[STTStreamEvent, int], None]
+
+
+# ============================================
+# AUDIO DECODING
+# ============================================
+
+def decode_pcm16(frame: bytes) -> np.ndarray:
+    """Convertit des trames PCM 16 bits little-endian mono en float32 [-1, 1]"""
+    if len(frame) % 2:
+        frame = frame[:-1]
+    return np.frombuffer(frame, dtype="<i2").astype(np.float32) / 32768.0
+
+
+class OpusFrameDecoder:
+    """Décode des paquets Opus (un paquet par message WebSocket)"""
+
+    def __init__(self, sample_rate: int = STREAM_SAMPLE_RATE, frame_ms: int = 20):
+        if not OPUS_AVAILABLE:
+            raise RuntimeError("Décodage Opus indisponible (pip install opuslib)")
+        self._decoder = opuslib.Decoder(sample_rate, 1)
+        self._frame_size = sample_rate * frame_ms // 1000
+
+    def __call__(self, packet: bytes) -> np.ndarray:
+        return decode_pcm16(self._decoder.decode(packet, self._frame_size))
+
+
+# ============================================
+# INCREMENTAL VAD
+# ============================================
+
+class SileroStreamingVAD:
+    """
+    Silero VAD incrémental
+
+    Le modèle vendored (faster_whisper/vad.py) traite un fichier complet.
+    Ici on garde l'état LSTM (h, c) et les 64 derniers échantillons de
+    contexte entre deux fenêtres, ce qui donne les mêmes probabilités
+    qu'un passage sur le fichier entier, fenêtre par fenêtre.
+    """
+
+    def __init__(self):
+        if not SILERO_VAD_AVAILABLE:
+            raise RuntimeError("Silero VAD indisponible (faster_whisper + onnxruntime requis)")
+        self._session = get_vad_model().session
+        self.reset()
+
+    def reset(self) -> None:
+        self._h = np.zeros((1, 1, 128), dtype=np.float32)
+        self._c = np.zeros((1, 1, 128), dtype=np.float32)
+        self._context = np.zeros((1, VAD_CONTEXT_SAMPLES), dtype=np.float32)
+
+    def __call__(self, window: np.ndarray) -> float:
+        """Probabilité de parole pour une fenêtre de 512 échantillons"""
+        window = window.reshape(1, VAD_WINDOW_SAMPLES).astype(np.float32, copy=False)
+        batch = np.concatenate([self._context, window], axis=1)
+        output, self._h, self._c = self._session.run(
+            None, {"input": batch, "h": self._h, "c": self._c}
+        )
+        self._context = window[:, -VAD_CONTEXT_SAMPLES:]
+        return float(np.ravel(output)[0])
+
+
+class EnergyVAD:
+    """VAD de secours basé sur l'énergie (si Silero n'est pas installé)"""
+
+    def __init__(self, speech_rms: float = 0.02):
+        self.speech_rms = speech_rms
+
+    def reset(self) -> None:
+        pass
+
+    def __call__(self, window: np.ndarray) -> float:
+        rms = float(np.sqrt(np.mean(np.square(window)))) if window.size else 0.0
+        return min(1.0, rms / (2 * self.speech_rms))
+
+
+def create_vad():
+    """Silero VAD si disponible, sinon VAD énergétique"""
+    if SILERO_VAD_AVAILABLE:
+        try:
+            return SileroStreamingVAD()
+        except Exception as e:
+            logger.warning(f"Silero VAD unavailable ({e}), using energy VAD")
+    return EnergyVAD()
+
+
+# ============================================
+# STREAMING SESSION
+# ============================================
+
+class StreamingSTTSession:
+    """
+    Session de transcription streaming (une par connexion WebSocket)
+
+    feed() consomme l'audio au fil de l'eau. Les événements (speech_start,
+    partial, end_of_utterance, final) sont poussés via emit() dans
+    self.events (bornée) et lus par le WebSocket. Partiels et finals tournent en tâche de fond et ne
+    bloquent jamais l'ingestion; le final d'un énoncé annule le partiel
+    en cours, et les finals sont émis dans l'ordre des énoncés.
+    """
+
+    def __init__(
+        self,
+        transcribe_fn: TranscribeFn,
+        vad=None,
+        threshold: float = 0.5,
+        neg_threshold: Optional[float] = None,
+        min_silence_ms: int = 500,
+        min_speech_ms: int = 250,
+        speech_pad_ms: int = 200,
+        partial_interval_ms: Optional[int] = 800,
+        max_utterance_sec: float = 30.0,
+        sample_rate: int = STREAM_SAMPLE_RATE,
+        on_final: Optional[FinalCallback] = None,
+    ):
+        """
+        Args:
+            transcribe_fn: Transcription async d'un énoncé (audio float32 16 kHz)
+            vad: Callable fenêtre -> probabilité (défaut: Silero ou énergie)
+            threshold: Probabilité au-dessus de laquelle une fenêtre est de la parole
+            neg_threshold: Probabilité en dessous de laquelle c'est du silence
+            min_silence_ms: Silence qui termine un énoncé (latence de fin de tour)
+            min_speech_ms: Énoncés plus courts ignorés (bruits, clics)
+            speech_pad_ms: Audio conservé avant le début de parole détecté
+            partial_interval_ms: Intervalle entre deux transcriptions partielles
+                (None ou 0: pas de partiels, chacun retranscrit tout l'énoncé)
+            max_utterance_sec: Un énoncé plus long est coupé (limite Whisper 30s)
+            on_final: Appelé à chaque final émis (métrage de l'usage)
+        """
+        self.transcribe_fn = transcribe_fn
+        self.vad = vad or create_vad()
+        self.threshold = threshold
+        self.neg_threshold = neg_threshold if neg_threshold is not None else max(threshold - 0.15, 0.01)
+        self.sample_rate = sample_rate
+        self.min_silence_samples = sample_rate * min_silence_ms // 1000
+        self.min_speech_samples = sample_rate * min_speech_ms // 1000
+        self.pad_samples = sample_rate * speech_pad_ms // 1000
+        self.partial_interval_samples = sample_rate * partial_interval_ms // 1000 if partial_interval_ms else 0
+        self.max_utterance_samples = int(sample_rate * max_utterance_sec)
+        self.on_final = on_final
+
+        self.events: "asyncio.Queue[Optional[STTStreamEvent]]" = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+
+        self._pending = np.zeros(0, dtype=np.float32)  # < 1 fenêtre VAD
+        self._pre_roll: Deque[np.ndarray] = deque()
+        self._pre_roll_samples = 0
+        self._utterance: List[np.ndarray] = []
+        self._utterance_samples = 0
+        self._utterance_start = 0
+        self._utterance_id = 0
+        self._triggered = False
+        self._silence_samples = 0
+        self._samples_since_partial = 0
+        self._position = 0  # Échantillons traités depuis le début du flux
+        self._partial_task: Optional[asyncio.Task] = None
+        self._final_task: Optional[asyncio.Task] = None  # Dernier final planifié (chaîne ordonnée)
+        self.stats = {
+            "utterances": 0,
+            "partials": 0,
+            "skipped_short": 0,
+            "dropped_events": 0,
+            "final_latency_ms": deque(maxlen=LATENCY_SAMPLES),
+        }
+
+    # ----------------------------------------
+    # INGESTION
+    # ----------------------------------------
+
+    def emit(self, event: Optional[STTStreamEvent]) -> None:
+        """Pousse un événement (None = fin de session), en retirant le plus ancien si la file est pleine"""
+        if self.events.full():
+            self.events.get_nowait()
+            self.stats["dropped_events"] += 1
+        self.events.put_nowait(event)
+
+    async def feed(self, audio: np.ndarray) -> None:
+        """Ajoute de l'audio float32 16 kHz au flux"""
+        if self._pending.size:
+            audio = np.concatenate([self._pending, audio])
+        usable = audio.size - audio.size % VAD_WINDOW_SAMPLES
+        self._pending = audio[usable:].copy()
+
+        for offset in range(0, usable, VAD_WINDOW_SAMPLES):
+            await self._process_window(audio[offset:offset + VAD_WINDOW_SAMPLES])
+
+    async def flush(self) -> None:
+        """
+        Termine l'énoncé en cours (fin de flux ou demande explicite du client)
+
+        Le final est transcrit en tâche de fond: wait_finals() pour l'attendre.
+        """
+        if self._pending.size:
+            window = np.pad(self._pending, (0, VAD_WINDOW_SAMPLES - self._pending.size))
+            self._pending = np.zeros(0, dtype=np.float32)
+            if self._triggered:
+                self._append_speech(window)
+            self._position += VAD_WINDOW_SAMPLES
+        if self._triggered:
+            await self._end_utterance("flush")
+
+    async def wait_finals(self) -> None:
+        """Attend les transcriptions finales planifiées (chacune attend la précédente)"""
+        if self._final_task:
+            await asyncio.wait([self._final_task])
+
+    async def close(self) -> None:
+        await self._cancel_partial()
+        task, self._final_task = self._final_task, None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _process_window(self, window: np.ndarray) -> None:
+        probability = self.vad(window)
+        self._position += VAD_WINDOW_SAMPLES
+
+        if not self._triggered:
+            if probability >= self.threshold:
+                self._start_utterance(window)
+            else:
+                self._push_pre_roll(window)
+            return
+
+        self._append_speech(window)
+        if probability >= self.threshold:
+            self._silence_samples = 0
+        elif probability < self.neg_threshold:
+            self._silence_samples += VAD_WINDOW_SAMPLES
+
+        if self._silence_samples >= self.min_silence_samples:
+            await self._end_utterance("silence")
+        elif self._utterance_samples >= self.max_utterance_samples:
+            await self._end_utterance("max_duration")
+        elif self.partial_interval_samples and self._samples_since_partial >= self.partial_interval_samples:
+            self._samples_since_partial = 0
+            self._schedule_partial()
+
+    # ----------------------------------------
+    # UTTERANCE STATE
+    # ----------------------------------------
+
+    def _push_pre_roll(self, window: np.ndarray) -> None:
+        self._pre_roll.append(window)
+        self._pre_roll_samples += window.size
+        while self._pre_roll and self._pre_roll_samples - self._pre_roll[0].size >= self.pad_samples:
+            self._pre_roll_samples -= self._pre_roll.popleft().size
+
+    def _start_utterance(self, window: np.ndarray) -> None:
+        self._triggered = True
+        self._utterance_id += 1
+        self._utterance = list(self._pre_roll)
+        self._utterance_samples = self._pre_roll_samples
+        self._pre_roll.clear()
+        self._pre_roll_samples = 0
+        self._utterance_start = self._position - VAD_WINDOW_SAMPLES - self._utterance_samples
+        self._silence_samples = 0
+        self._samples_since_partial = 0
+        self._append_speech(window)
+        self.emit(STTStreamEvent(
+            type=STTStreamEventType.SPEECH_START,
+            utterance_id=self._utterance_id,
+            start=round(self._utterance_start / self.sample_rate, 3),
+        ))
+
+    def _append_speech(self, window: np.ndarray) -> None:
+        self._utterance.append(window)
+        self._utterance_samples += window.size
+        self._samples_since_partial += window.size
+
+    async def _end_utterance(self, reason: str) -> None:
+        utterance_id = self._utterance_id
+        # Garder speech_pad_ms de silence final, retirer le reste
+        trailing = max(0, self._silence_samples - self.pad_samples)
+        audio = np.concatenate(self._utterance) if self._utterance else np.zeros(0, dtype=np.float32)
+        if trailing:
+            audio = audio[:audio.size - trailing]
+        start = self._utterance_start / self.sample_rate
+        end = start + audio.size / self.sample_rate
+
+        self._triggered = False
+        self._utterance = []
+        self._utterance_samples = 0
+        self._silence_samples = 0
+        await self._cancel_partial()
+
+        if audio.size - self.pad_samples < self.min_speech_samples:
+            self.stats["skipped_short"] += 1
+            return
+
+        self.emit(STTStreamEvent(
+            type=STTStreamEventType.END_OF_UTTERANCE,
+            utterance_id=utterance_id,
+            start=round(start, 3),
+            end=round(end, 3),
+            reason=reason,
+        ))
+
+        self._final_task = asyncio.create_task(self._run_final(
+            utterance_id, audio, start, end, reason, previous=self._final_task
+        ))
+
+    async def _run_final(
+        self,
+        utterance_id: int,
+        audio: np.ndarray,
+        start: float,
+        end: float,
+        reason: str,
+        previous: Optional[asyncio.Task],
+    ) -> None:
+        """Transcription finale en tâche de fond, émise après celle de l'énoncé précédent"""
+        started = time.perf_counter()
+        try:
+            text, language = await self.transcribe_fn(audio)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Streaming STT final transcription failed: {e}")
+            if previous:
+                await asyncio.wait([previous])
+            self.emit(STTStreamEvent(
+                type=STTStreamEventType.ERROR, utterance_id=utterance_id, message=str(e)
+            ))
+            return
+
+        latency_ms = int((time.perf_counter() - started) * 1000)
+        if previous:
+            await asyncio.wait([previous])
+        self.stats["utterances"] += 1
+        self.stats["final_latency_ms"].append(latency_ms)
+        event = STTStreamEvent(
+            type=STTStreamEventType.FINAL,
+            utterance_id=utterance_id,
+            text=text,
+            start=round(start, 3),
+            end=round(end, 3),
+            language=language,
+            reason=reason,
+        )
+        self.emit(event)
+        if self.on_final:
+            try:
+                self.on_final(event, latency_ms)
+            except Exception as e:
+                logger.warning(f"Streaming STT final callback failed: {e}")
+
+    # ----------------------------------------
+    # PARTIALS
+    # ----------------------------------------
+
+    def _schedule_partial(self) -> None:
+        # Un seul partiel à la fois: si le précédent tourne encore, on saute
+        if self._partial_task and not self._partial_task.done():
+            return
+        audio = np.concatenate(self._utterance)
+        self._partial_task = asyncio.create_task(
+            self._run_partial(self._utterance_id, audio, self._utterance_start)
+        )
+
+    async def _run_partial(self, utterance_id: int, audio: np.ndarray, start_sample: int) -> None:
+        try:
+            text, _ = await self.transcribe_fn(audio)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Streaming STT partial transcription failed: {e}")
+            return
+        if utterance_id != self._utterance_id or not self._triggered:
+            return  # Énoncé déjà finalisé
+        self.stats["partials"] += 1
+        self.emit(STTStreamEvent(
+            type=STTStreamEventType.PARTIAL,
+            utterance_id=utterance_id,
+            text=text,
+            start=round(start_sample / self.sample_rate, 3),
+            end=round((start_sample + audio.size) / self.sample_rate, 3),
+        ))
+
+    async def _cancel_partial(self) -> None:
+        task, self._partial_task = self._partial_task, None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,232 @@
+"""
+TTS_VOICE - Cache audio disque
+==============================
+Cache adressé par contenu des audios synthétisés
+
+Les phrases répétées (salutations, menus, réponses types en darija) sont
+servies depuis le disque sans rappeler le backend (ElevenLabs/OpenAI payants).
+
+- Clé: SHA-256 de (texte normalisé, backend, voix, langue, dialecte, vitesse,
+  hauteur, volume, émotion, format, sample rate)
+- Stockage: <cache_dir>/<2 premiers hex>/<clé>.<format>, écriture atomique
+- Éviction LRU par taille totale (mtime = dernier accès, survit au redémarrage)
+
+Configuration (env):
+- TTS_CACHE_ENABLED: activer le cache (défaut true)
+- TTS_CACHE_DIR: dossier du cache
+- TTS_CACHE_MAX_MB: taille max (défaut 512)
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from .tts_models import TTSRequest
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "iafactory_tts_cache")
+
+
+def normalize_cache_text(text: str) -> str:
+    """Forme canonique du texte pour la clé (Unicode NFC + espaces)"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def tts_cache_key(text: str, request: TTSRequest, backend: str, voice_id: Optional[str]) -> str:
+    """
+    Clé de cache: tout ce qui change l'audio produit par le backend
+
+    Le silence ajouté (add_silence_*) est appliqué après le cache et n'en fait
+    donc pas partie: la même phrase est réutilisée quel que soit le padding.
+    """
+    payload = {
+        "text": normalize_cache_text(text),
+        "backend": backend,
+        "voice": voice_id or "default",
+        "language": request.language.value,
+        "dialect": request.dialect.value if request.dialect else None,
+        "speed": round(request.speed, 2),
+        "pitch": round(request.pitch, 2),
+        "volume": round(request.volume, 2),
+        "emotion": request.emotion.value,
+        "format": request.format.value,
+        "sample_rate": request.sample_rate,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class TTSAudioCache:
+    """
+    Cache LRU disque des audios TTS
+
+    Thread-safe; les méthodes sont synchrones (appeler via asyncio.to_thread
+    depuis le code async).
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_size_mb: float = 512):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # clé → taille (ordre LRU)
+        self._paths: Dict[str, Path] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """Reconstruit l'index LRU depuis le disque (ordre = mtime)"""
+        files = []
+        for path in self.cache_dir.glob("*/*"):
+            if path.name.startswith(".") or not path.is_file():
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.stem, path, stat.st_size))
+
+        for _, key, path, size in sorted(files):
+            self._entries[key] = size
+            self._paths[key] = path
+            self._total_bytes += size
+
+        if files:
+            logger.info(f"TTS cache: {len(files)} entries, {self._total_bytes / 1024 / 1024:.1f} MB in {self.cache_dir}")
+        self._evict()
+
+    def _path_for(self, key: str, audio_format: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.{audio_format}"
+
+    # ----------------------------------------
+    # GET / PUT
+    # ----------------------------------------
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Retourne l'audio en cache ou None"""
+        with self._lock:
+            path = self._paths.get(key)
+            if path is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # Dernier accès (LRU persistant)
+        except OSError:
+            with self._lock:
+                self._drop(key)
+                self.stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self.stats["hits"] += 1
+        return data
+
+    def put(self, key: str, audio_bytes: bytes, audio_format: str) -> None:
+        """Enregistre un audio (écriture atomique), puis éviction LRU"""
+        if not audio_bytes or len(audio_bytes) > self.max_bytes:
+            return
+
+        path = self._path_for(key, audio_format)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio_bytes)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"TTS cache write failed: {e}")
+            with self._lock:
+                self.stats["errors"] += 1
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries[key]
+            self._entries[key] = len(audio_bytes)
+            self._entries.move_to_end(key)
+            self._paths[key] = path
+            self._total_bytes += len(audio_bytes)
+            self.stats["writes"] += 1
+            self._evict()
+
+    def contains(self, key: str) -> bool:
+        return key in self._paths
+
+    def clear(self) -> int:
+        """Vide le cache, retourne le nombre d'entrées supprimées"""
+        with self._lock:
+            keys = list(self._entries)
+            for key in keys:
+                self._remove_file(self._paths.get(key))
+                self._drop(key)
+        return len(keys)
+
+    # ----------------------------------------
+    # LRU
+    # ----------------------------------------
+
+    def _evict(self) -> None:
+        """Supprime les entrées les moins récemment utilisées (sous self._lock)"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._remove_file(self._paths.get(key))
+            self._drop(key)
+            self.stats["evictions"] += 1
+
+    def _drop(self, key: str) -> None:
+        size = self._entries.pop(key, 0)
+        self._paths.pop(key, None)
+        self._total_bytes -= size
+
+    @staticmethod
+    def _remove_file(path: Optional[Path]) -> None:
+        if path is None:
+            return
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    # ----------------------------------------
+    # STATS
+    # ----------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_ratio": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "size_mb": round(self._total_bytes / 1024 / 1024, 2),
+                "max_size_mb": round(self.max_bytes / 1024 / 1024, 2),
+                "cache_dir": str(self.cache_dir),
+            }
+
+
+def create_tts_cache() -> Optional[TTSAudioCache]:
+    """Cache configuré par l'environnement (None si désactivé ou indisponible)"""
+    if os.getenv("TTS_CACHE_ENABLED", "true").lower() not in ("true", "1", "yes"):
+        return None
+    try:
+        return TTSAudioCache(
+            cache_dir=os.getenv("TTS_CACHE_DIR", DEFAULT_CACHE_DIR),
+            max_size_mb=float(os.getenv("TTS_CACHE_MAX_MB", "512")),
+        )
+    except OSError as e:
+        logger.warning(f"TTS cache disabled: {e}")
+        return None
@@ -207,6 +207,7 @@ class TTSResponse(BaseModel):
     # Format
     format: str = Field("mp3", description="Format audio")
     sample_rate: int = Field(22050, description="Taux d'échantillonnage")
+    cached: bool = Field(False, description="Audio servi depuis le cache")
     
     # Timestamp
     timestamp: datetime = Field(default_factory=datetime.utcnow)
@@ -250,6 +251,9 @@ class TTSStatus(BaseModel):
     )
     max_text_length: int = Field(5000, description="Longueur max texte")
     
+    # Cache audio (hits, misses, taille)
+    cache: Optional[Dict[str, Any]] = Field(None, description="Statistiques du cache audio")
+    
     # Version
     version: str = Field("1.0.0")
     service: str = Field("TTS_VOICE")
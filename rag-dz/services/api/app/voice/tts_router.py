@@ -6,11 +6,11 @@ Architecture extensible avec backend mock par défaut
 """
 
 import logging
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 from fastapi import APIRouter, HTTPException, Depends, Query, Body
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from .tts_models import (
     TTSRequest,
@@ -94,6 +94,9 @@ async def tts_status(service: TTSService = Depends(get_service)):
             "/api/voice/tts/simple": "POST - Synthèse rapide",
             "/api/voice/tts/voices": "GET - Voix disponibles",
             "/api/voice/tts/batch": "POST - Synthèse batch",
+            "/api/voice/tts/batch/stream": "POST - Synthèse batch streamée (NDJSON)",
+            "/api/voice/tts/cache": "GET/DELETE - Cache audio (stats, purge)",
+            "/api/voice/tts/cache/prewarm": "POST - Pré-remplir le cache",
         },
         "capabilities": {
             "languages": ["ar", "fr", "en", "it", "de"],
@@ -225,7 +228,8 @@ async def tts_batch(
     """
     📦 Synthèse vocale batch (plusieurs textes)
     
-    Synthétise plusieurs textes en une seule requête.
+    Synthétise plusieurs textes en une seule requête, en parallèle
+    (limite de concurrence par backend), résultats dans l'ordre des items.
     
     Options:
     - items: Liste de textes avec leurs options
@@ -252,6 +256,65 @@ async def tts_batch(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/tts/batch/stream")
+async def tts_batch_stream(
+    request: TTSBatchRequest,
+    service: TTSService = Depends(get_service),
+):
+    """
+    📦⚡ Synthèse batch streamée
+    
+    Même entrée que /tts/batch; chaque item (TTSBatchResultItem) est envoyé
+    en JSON sur sa propre ligne dès qu'il est synthétisé (ordre de fin,
+    identifier les items par id).
+    """
+    async def ndjson():
+        async for item in service.synthesize_batch_stream(request):
+            yield item.model_dump_json() + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+# ============================================
+# CACHE ENDPOINTS
+# ============================================
+
+@router.get("/tts/cache")
+async def tts_cache_stats(service: TTSService = Depends(get_service)):
+    """
+    💾 Statistiques du cache audio (hits, misses, taille, évictions)
+    """
+    if not service.cache:
+        return {"enabled": False}
+    return {"enabled": True, **service.cache.get_stats()}
+
+
+@router.post("/tts/cache/prewarm")
+async def tts_cache_prewarm(
+    requests: List[TTSRequest] = Body(..., max_length=200),
+    service: TTSService = Depends(get_service),
+):
+    """
+    🔥 Pré-remplit le cache audio avec des phrases fréquentes
+    
+    Salutations, menus vocaux, réponses types: synthétisées une fois,
+    servies ensuite depuis le cache sans coût backend.
+    """
+    if not service.cache:
+        raise HTTPException(status_code=400, detail="Cache TTS désactivé (TTS_CACHE_ENABLED)")
+    return await service.prewarm_cache(requests)
+
+
+@router.delete("/tts/cache")
+async def tts_cache_clear(service: TTSService = Depends(get_service)):
+    """
+    🧹 Vide le cache audio
+    """
+    if not service.cache:
+        return {"cleared": 0}
+    return {"cleared": service.cache.clear()}
+
+
 # ============================================
 # VOICES ENDPOINTS
 # ============================================
@@ -24,7 +24,9 @@ import base64
 import time
 import logging
 import asyncio
-from typing import Optional, Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List, AsyncIterator
 from datetime import datetime
 
 # HTTP client
@@ -59,6 +61,9 @@ try:
 except ImportError:
     GTTS_AVAILABLE = False
 
+from ..core.model_registry import get_model_registry
+from .tts_cache import TTSAudioCache, create_tts_cache, tts_cache_key
+
 # Models
 from .tts_models import (
     TTSRequest,
@@ -66,6 +71,7 @@ from .tts_models import (
     TTSStatus,
     TTSSimpleRequest,
     TTSVoice,
+    TTSBatchItem,
     TTSBatchRequest,
     TTSBatchResponse,
     TTSBatchResultItem,
@@ -95,6 +101,30 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+# ============================================
+# COQUI XTTS (modèle partagé)
+# ============================================
+
+XTTS_MODEL_NAME = "tts_models/multilingual/multi-dataset/xtts_v2"
+XTTS_MODEL_KEY = "xtts_v2"
+
+
+def _load_xtts():
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = CoquiTTS(XTTS_MODEL_NAME).to(device)
+    logger.info(f"Coqui XTTS loaded on {device}")
+    return model
+
+
+if COQUI_AVAILABLE:
+    get_model_registry().register(XTTS_MODEL_KEY, _load_xtts, kind="tts")
+    get_model_registry().register_preloader("xtts", lambda: get_model_registry().get(XTTS_MODEL_KEY))
+
+
+# Positionné quand un backend retombe sur le mock (erreur API): ne pas mettre en cache
+_mock_fallback_used: ContextVar[bool] = ContextVar("tts_mock_fallback_used", default=False)
+
+
 # ============================================
 # ELEVENLABS CONFIGURATION
 # ============================================
@@ -128,6 +158,25 @@ ELEVENLABS_DEFAULT_VOICE = {
     "it": "matilda",
 }
 
+# ============================================
+# CONCURRENCY LIMITS
+# ============================================
+
+# Synthèses simultanées max par backend (API distantes vs modèle local)
+# Surcharge via TTS_CONCURRENCY_<BACKEND> (ex: TTS_CONCURRENCY_ELEVENLABS=2)
+DEFAULT_BACKEND_CONCURRENCY = {
+    "openai": 8,
+    "elevenlabs": 4,
+    "gtts": 4,
+    "coqui": 1,  # Un modèle XTTS partagé: sérialisé sur le pool local
+}
+
+
+def backend_concurrency(backend: str) -> int:
+    default = DEFAULT_BACKEND_CONCURRENCY.get(backend, 4)
+    return max(1, int(os.getenv(f"TTS_CONCURRENCY_{backend.upper()}", default)))
+
+
 # ============================================
 # OPENAI TTS CONFIGURATION
 # ============================================
@@ -219,6 +268,8 @@ class TTSService:
         openai_api_key: Optional[str] = None,
         elevenlabs_api_key: Optional[str] = None,
         enable_darija_nlp: bool = True,
+        enable_cache: bool = True,
+        cache: Optional[TTSAudioCache] = None,
     ):
         """
         Initialise le service TTS
@@ -228,6 +279,8 @@ class TTSService:
             openai_api_key: Clé API OpenAI (optionnel)
             elevenlabs_api_key: Clé API ElevenLabs (optionnel)
             enable_darija_nlp: Activer normalisation texte via DARIJA_NLP
+            enable_cache: Activer le cache audio disque (TTS_CACHE_*)
+            cache: Cache audio explicite (sinon créé depuis l'environnement)
         """
         self.backend_type = backend_type
         self.enable_darija_nlp = enable_darija_nlp and DARIJA_NLP_AVAILABLE
@@ -236,15 +289,27 @@ class TTSService:
         self.openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
         self.elevenlabs_api_key = elevenlabs_api_key or os.getenv("ELEVENLABS_API_KEY")
         
-        # Clients (à initialiser selon le backend)
+        # Clients partagés entre requêtes (créés à la première utilisation)
         self.openai_client = None
-        self.elevenlabs_client = None
-        self.coqui_model = None
+        self.elevenlabs_client: Optional[httpx.AsyncClient] = None
+        
+        # Parallélisme borné par backend + pool pour les backends locaux (Coqui, gTTS)
+        self.max_concurrency = backend_concurrency(backend_type)
+        self._backend_semaphore: Optional[asyncio.Semaphore] = None
+        self._local_executor: Optional[ThreadPoolExecutor] = None
         
         # Voix disponibles
         self.voices: Dict[str, TTSVoice] = {v.id: v for v in DEFAULT_VOICES}
         
-        logger.info(f"TTSService initialized - Backend: {backend_type}, DARIJA_NLP: {self.enable_darija_nlp}")
+        # Cache audio (phrases répétées servies sans appel backend)
+        self.cache: Optional[TTSAudioCache] = cache if cache is not None else (
+            create_tts_cache() if enable_cache else None
+        )
+        
+        logger.info(
+            f"TTSService initialized - Backend: {backend_type}, DARIJA_NLP: {self.enable_darija_nlp}, "
+            f"cache: {self.cache is not None}"
+        )
     
     # ----------------------------------------
     # MAIN SYNTHESIS METHOD
@@ -258,7 +323,7 @@ class TTSService:
         1. Validation texte
         2. Normalisation texte (si arabe/darija + DARIJA_NLP actif)
         3. Sélection voix
-        4. Synthèse via backend
+        4. Synthèse via backend (ou cache audio si la phrase est connue)
         5. Post-processing audio (silence, etc.)
         6. Encodage base64
         
@@ -295,12 +360,26 @@ class TTSService:
         # 3. Sélection voix
         voice = self._select_voice(request.voice_id, request.language, request.dialect)
         
-        # 4. Synthèse via backend
-        audio_bytes = await self._synthesize_backend(
-            text=text,
-            request=request,
-            voice=voice,
-        )
+        # 4. Synthèse via backend (cache disque si disponible)
+        cache_key = None
+        audio_bytes = None
+        if self.cache and self.backend_type != "mock":
+            cache_key = tts_cache_key(text, request, self.backend_type, voice.id if voice else None)
+            audio_bytes = await asyncio.to_thread(self.cache.get, cache_key)
+        cached = audio_bytes is not None
+        
+        if not cached:
+            fallback_token = _mock_fallback_used.set(False)
+            try:
+                audio_bytes = await self._synthesize_backend(
+                    text=text,
+                    request=request,
+                    voice=voice,
+                )
+                if cache_key and audio_bytes and not _mock_fallback_used.get():
+                    await asyncio.to_thread(self.cache.put, cache_key, audio_bytes, request.format.value)
+            finally:
+                _mock_fallback_used.reset(fallback_token)
         
         # 5. Post-processing
         if request.add_silence_start > 0 or request.add_silence_end > 0:
@@ -332,6 +411,7 @@ class TTSService:
             processing_time_ms=processing_time_ms,
             format=request.format.value,
             sample_rate=request.sample_rate,
+            cached=cached,
         )
     
     async def synthesize_simple(self, text: str, language: str = "ar") -> TTSResponse:
@@ -370,7 +450,19 @@ class TTSService:
         """
         if self.backend_type == "mock":
             return self._synthesize_mock(text, request, voice)
-        elif self.backend_type == "openai":
+        
+        if self._backend_semaphore is None:
+            self._backend_semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._backend_semaphore:
+            return await self._dispatch_backend(text, request, voice)
+    
+    async def _dispatch_backend(
+        self,
+        text: str,
+        request: TTSRequest,
+        voice: Optional[TTSVoice],
+    ) -> bytes:
+        if self.backend_type == "openai":
             return await self._synthesize_openai(text, request, voice)
         elif self.backend_type == "elevenlabs":
             return await self._synthesize_elevenlabs(text, request, voice)
@@ -394,6 +486,7 @@ class TTSService:
         Génère un court silence ou des bytes vides.
         """
         logger.info(f"Mock TTS: '{text[:50]}...' (lang={request.language}, voice={voice.id if voice else 'default'})")
+        _mock_fallback_used.set(True)
         
         # Générer un silence de la durée estimée
         duration = estimate_audio_duration(text, request.speed)
@@ -422,7 +515,9 @@ class TTSService:
             return self._synthesize_mock(text, request, voice)
         
         try:
-            client = AsyncOpenAI(api_key=self.openai_api_key)
+            if self.openai_client is None:
+                self.openai_client = AsyncOpenAI(api_key=self.openai_api_key)
+            client = self.openai_client
             
             # Sélection voix
             openai_voice = "nova"  # Défaut
@@ -504,29 +599,33 @@ class TTSService:
             except Exception as e:
                 logger.warning(f"Emotion handling error: {e}")
             
-            # Appel API
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}",
-                    headers={
-                        "xi-api-key": self.elevenlabs_api_key,
-                        "Content-Type": "application/json",
-                        "Accept": "audio/mpeg",
-                    },
-                    json={
-                        "text": text,
-                        "model_id": "eleven_multilingual_v2",  # Supporte arabe!
-                        "voice_settings": voice_settings,
-                    },
+            # Appel API (client HTTP partagé: connexions keep-alive réutilisées)
+            if self.elevenlabs_client is None:
+                self.elevenlabs_client = httpx.AsyncClient(
+                    timeout=30.0,
+                    limits=httpx.Limits(max_connections=self.max_concurrency),
                 )
-                
-                if response.status_code != 200:
-                    logger.error(f"ElevenLabs error {response.status_code}: {response.text}")
-                    return self._synthesize_mock(text, request, voice)
-                
-                audio_bytes = response.content
-                logger.info(f"ElevenLabs TTS success: {len(audio_bytes)} bytes, voice={voice_name}")
-                return audio_bytes
+            response = await self.elevenlabs_client.post(
+                f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}",
+                headers={
+                    "xi-api-key": self.elevenlabs_api_key,
+                    "Content-Type": "application/json",
+                    "Accept": "audio/mpeg",
+                },
+                json={
+                    "text": text,
+                    "model_id": "eleven_multilingual_v2",  # Supporte arabe!
+                    "voice_settings": voice_settings,
+                },
+            )
+            
+            if response.status_code != 200:
+                logger.error(f"ElevenLabs error {response.status_code}: {response.text}")
+                return self._synthesize_mock(text, request, voice)
+            
+            audio_bytes = response.content
+            logger.info(f"ElevenLabs TTS success: {len(audio_bytes)} bytes, voice={voice_name}")
+            return audio_bytes
             
         except Exception as e:
             logger.error(f"ElevenLabs TTS error: {e}")
@@ -549,12 +648,6 @@ class TTSService:
             return self._synthesize_mock(text, request, voice)
         
         try:
-            # Initialiser le modèle si nécessaire
-            if self.coqui_model is None:
-                device = "cuda" if torch.cuda.is_available() else "cpu"
-                self.coqui_model = CoquiTTS("tts_models/multilingual/multi-dataset/xtts_v2").to(device)
-                logger.info(f"Coqui XTTS loaded on {device}")
-            
             # Mapper la langue
             lang_map = {
                 "ar": "ar",
@@ -575,30 +668,32 @@ class TTSService:
             loop = asyncio.get_event_loop()
             
             def run_tts():
-                buffer = io.BytesIO()
-                if speaker_wav:
-                    # Voice cloning
-                    self.coqui_model.tts_to_file(
-                        text=text,
-                        speaker_wav=speaker_wav,
-                        language=language,
-                        file_path=buffer,
-                    )
-                else:
-                    # Voix par défaut
-                    wav = self.coqui_model.tts(text=text, language=language)
-                    # Convertir en bytes (wav)
-                    import numpy as np
-                    import wave
+                # Modèle partagé (préchargé via MODEL_PRELOAD=xtts, sinon chargé ici hors boucle)
+                with get_model_registry().lease(XTTS_MODEL_KEY) as coqui_model:
                     buffer = io.BytesIO()
-                    with wave.open(buffer, 'wb') as wf:
-                        wf.setnchannels(1)
-                        wf.setsampwidth(2)
-                        wf.setframerate(22050)
-                        wf.writeframes((np.array(wav) * 32767).astype(np.int16).tobytes())
-                return buffer.getvalue()
+                    if speaker_wav:
+                        # Voice cloning
+                        coqui_model.tts_to_file(
+                            text=text,
+                            speaker_wav=speaker_wav,
+                            language=language,
+                            file_path=buffer,
+                        )
+                    else:
+                        # Voix par défaut
+                        wav = coqui_model.tts(text=text, language=language)
+                        # Convertir en bytes (wav)
+                        import numpy as np
+                        import wave
+                        buffer = io.BytesIO()
+                        with wave.open(buffer, 'wb') as wf:
+                            wf.setnchannels(1)
+                            wf.setsampwidth(2)
+                            wf.setframerate(22050)
+                            wf.writeframes((np.array(wav) * 32767).astype(np.int16).tobytes())
+                    return buffer.getvalue()
             
-            audio_bytes = await loop.run_in_executor(None, run_tts)
+            audio_bytes = await loop.run_in_executor(self._get_local_executor(), run_tts)
             
             logger.info(f"Coqui TTS success: {len(audio_bytes)} bytes, lang={language}")
             return audio_bytes
@@ -644,7 +739,7 @@ class TTSService:
                 buffer.seek(0)
                 return buffer.read()
             
-            audio_bytes = await loop.run_in_executor(None, run_gtts)
+            audio_bytes = await loop.run_in_executor(self._get_local_executor(), run_gtts)
             
             logger.info(f"gTTS success: {len(audio_bytes)} bytes, lang={language}")
             return audio_bytes
@@ -653,6 +748,27 @@ class TTSService:
             logger.error(f"gTTS error: {e}")
             return self._synthesize_mock(text, request, voice)
     
+    def _get_local_executor(self) -> ThreadPoolExecutor:
+        """Pool dédié aux backends locaux (taille = limite du backend)"""
+        if self._local_executor is None:
+            self._local_executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix=f"tts-{self.backend_type}",
+            )
+        return self._local_executor
+    
+    async def aclose(self) -> None:
+        """Ferme les clients HTTP et le pool local"""
+        if self.elevenlabs_client is not None:
+            await self.elevenlabs_client.aclose()
+            self.elevenlabs_client = None
+        if self.openai_client is not None:
+            await self.openai_client.close()
+            self.openai_client = None
+        if self._local_executor is not None:
+            self._local_executor.shutdown(wait=False)
+            self._local_executor = None
+    
     # ----------------------------------------
     # VOICE SELECTION
     # ----------------------------------------
@@ -732,43 +848,100 @@ class TTSService:
             logger.warning(f"Failed to add silence: {e}")
             return audio_bytes
     
+    # ----------------------------------------
+    # CACHE PRE-WARMING
+    # ----------------------------------------
+    
+    async def prewarm_cache(self, requests: List[TTSRequest]) -> Dict[str, int]:
+        """
+        Pré-remplit le cache audio (salutations, menus, réponses types)
+        
+        Returns:
+            Compteurs: already_cached, synthesized, failed
+        """
+        counts = {"already_cached": 0, "synthesized": 0, "failed": 0}
+        if not self.cache:
+            return counts
+        
+        for request in requests:
+            try:
+                response = await self.synthesize(request)
+                counts["already_cached" if response.cached else "synthesized"] += 1
+            except Exception as e:
+                logger.warning(f"TTS prewarm failed for '{request.text[:30]}': {e}")
+                counts["failed"] += 1
+        
+        logger.info(f"TTS cache prewarm: {counts}")
+        return counts
+    
+    async def prewarm_from_file(self, path: str) -> Dict[str, int]:
+        """
+        Pré-remplit le cache depuis un fichier de phrases
+        
+        Une phrase par ligne, préfixe langue optionnel ("fr|Bonjour"),
+        lignes vides et commentaires (#) ignorés.
+        """
+        requests = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                language, _, text = line.partition("|") if "|" in line[:6] else ("ar", "", line)
+                try:
+                    requests.append(TTSRequest(
+                        text=text.strip(),
+                        language=TTSLanguage(language.strip() or "ar"),
+                        dialect=TTSDialect.DARIJA if language.strip() in ("", "ar") else None,
+                    ))
+                except ValueError as e:
+                    logger.warning(f"TTS prewarm: ligne ignorée '{line[:30]}': {e}")
+        return await self.prewarm_cache(requests)
+    
     # ----------------------------------------
     # BATCH PROCESSING
     # ----------------------------------------
     
+    async def _synthesize_batch_item(self, item: TTSBatchItem, audio_format: AudioFormat) -> TTSBatchResultItem:
+        """Synthèse d'un item batch (les erreurs deviennent un résultat en échec)"""
+        try:
+            request = TTSRequest(
+                text=item.text,
+                language=TTSLanguage(item.language) if item.language else TTSLanguage.ARABIC,
+                voice_id=item.voice_id,
+                format=audio_format,
+            )
+            
+            response = await self.synthesize(request)
+            
+            return TTSBatchResultItem(
+                id=item.id,
+                success=True,
+                audio_base64=response.audio_base64,
+                duration_sec=response.duration_sec,
+            )
+            
+        except Exception as e:
+            return TTSBatchResultItem(
+                id=item.id,
+                success=False,
+                error=str(e),
+            )
+    
     async def synthesize_batch(self, batch_request: TTSBatchRequest) -> TTSBatchResponse:
         """
         Synthèse batch (plusieurs textes)
+        
+        Les items sont synthétisés en parallèle, dans la limite de concurrence
+        du backend (voir DEFAULT_BACKEND_CONCURRENCY). Les résultats gardent
+        l'ordre de la requête.
         """
         start_time = time.time()
-        results: List[TTSBatchResultItem] = []
-        total_duration = 0.0
         
-        for item in batch_request.items:
-            try:
-                request = TTSRequest(
-                    text=item.text,
-                    language=TTSLanguage(item.language) if item.language else TTSLanguage.ARABIC,
-                    voice_id=item.voice_id,
-                    format=batch_request.format,
-                )
-                
-                response = await self.synthesize(request)
-                
-                results.append(TTSBatchResultItem(
-                    id=item.id,
-                    success=True,
-                    audio_base64=response.audio_base64,
-                    duration_sec=response.duration_sec,
-                ))
-                total_duration += response.duration_sec
-                
-            except Exception as e:
-                results.append(TTSBatchResultItem(
-                    id=item.id,
-                    success=False,
-                    error=str(e),
-                ))
+        results: List[TTSBatchResultItem] = await asyncio.gather(*(
+            self._synthesize_batch_item(item, batch_request.format)
+            for item in batch_request.items
+        ))
         
         processing_time_ms = int((time.time() - start_time) * 1000)
         
@@ -777,10 +950,28 @@ class TTSService:
             total=len(results),
             success_count=sum(1 for r in results if r.success),
             error_count=sum(1 for r in results if not r.success),
-            total_duration_sec=total_duration,
+            total_duration_sec=sum(r.duration_sec for r in results),
             processing_time_ms=processing_time_ms,
         )
     
+    async def synthesize_batch_stream(self, batch_request: TTSBatchRequest) -> AsyncIterator[TTSBatchResultItem]:
+        """
+        Synthèse batch streamée: chaque item est émis dès qu'il est prêt
+        
+        L'ordre d'émission est l'ordre de fin de synthèse (utiliser item.id).
+        Si le consommateur s'arrête, les synthèses restantes sont annulées.
+        """
+        tasks = [
+            asyncio.create_task(self._synthesize_batch_item(item, batch_request.format))
+            for item in batch_request.items
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
     # ----------------------------------------
     # HEALTH CHECK
     # ----------------------------------------
@@ -794,7 +985,7 @@ class TTSService:
             "mock": True,  # Toujours disponible
             "openai": self.openai_api_key is not None,
             "elevenlabs": self.elevenlabs_api_key is not None,
-            "coqui": self.coqui_model is not None,
+            "coqui": COQUI_AVAILABLE and get_model_registry().is_loaded(XTTS_MODEL_KEY),
             "gtts": True,  # Gratuit, toujours disponible
         }
         
@@ -806,6 +997,7 @@ class TTSService:
             available_voices=available_voices,
             backend_type=self.backend_type,
             backends_status=backends_status,
+            cache=self.cache.get_stats() if self.cache else None,
         )
 
 
@@ -295,6 +295,8 @@ class VoiceAgentStreamChunk(BaseModel):
     chunk_type: Literal["text", "audio", "status", "error"] = Field(...)
     content: str = Field(..., description="Contenu du chunk")
     is_final: bool = Field(False)
+    sequence: Optional[int] = Field(None, description="Index de la phrase (text/audio)")
+    metadata: Optional[Dict[str, Any]] = Field(None, description="Détails (langue, durée, réponse finale...)")
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -5,6 +5,8 @@ Endpoints pour l'agent vocal iaFactoryDZ
 
 Routes principales:
 - POST /chat      - Pipeline complet (audio/texte → réponse)
+- POST /chat/stream - Pipeline streamé (NDJSON: phrases + audio au fil de l'eau)
+- WS   /stream    - Conversation temps réel (audio micro → phrases + audio)
 - POST /text      - Pipeline texte seulement
 - POST /audio     - Pipeline audio seulement
 - GET  /health    - État du service
@@ -12,12 +14,15 @@ Routes principales:
 - Gestion conversations
 """
 
+import asyncio
+import json
 import logging
 from typing import Optional, List
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
 
 from .voice_agent_models import (
     VoiceAgentRequest,
@@ -25,13 +30,18 @@ from .voice_agent_models import (
     VoiceAgentTextRequest,
     VoiceAgentAudioRequest,
     VoiceAgentStatus,
+    VoiceAgentStreamChunk,
     ConversationState,
     AgentMode,
     AgentLanguage,
     AgentDialect,
     ConversationSummary,
 )
-from .voice_agent_service import get_voice_agent_service
+from .voice_agent_service import get_voice_agent_service, RAGPrefetch
+from .stt_models import STTRequest, STTLanguage, STTStreamEvent, STTStreamEventType
+from .stt_streaming import decode_pcm16
+from ..core.tenant_cache import resolve_tenant
+from ..core.usage_meter import record_usage
 
 
 logger = logging.getLogger(__name__)
@@ -126,6 +136,203 @@ async def voice_chat(request: VoiceAgentRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================
+# STREAMING ENDPOINTS
+# ============================================
+
+@router.post("/chat/stream")
+async def voice_chat_stream(request: VoiceAgentRequest):
+    """
+    ⚡ Pipeline vocal streamé
+    
+    Mêmes entrées que /chat, mais la réponse est envoyée au fil de l'eau
+    (une ligne JSON VoiceAgentStreamChunk par événement):
+    - status "transcript": texte reconnu
+    - text (sequence=i): phrase i de la réponse
+    - audio (sequence=i): audio de la phrase i (synthétisé pendant que le LLM continue)
+    - status "done": VoiceAgentResponse complète dans metadata
+    """
+    service = get_voice_agent_service()
+    
+    async def ndjson():
+        try:
+            async for chunk in service.process_stream(request):
+                yield chunk.model_dump_json(exclude_none=True) + "\n"
+        except Exception as e:
+            logger.error(f"Voice chat stream error: {e}")
+            error = VoiceAgentStreamChunk(chunk_type="error", content=str(e), is_final=True)
+            yield error.model_dump_json(exclude_none=True) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+# Fin de session ("end"): attente max des derniers finals et de la dernière réponse
+STREAM_END_TIMEOUT_SEC = 30.0
+
+
+@router.websocket("/stream")
+async def voice_stream(
+    websocket: WebSocket,
+    api_key: str = Query(..., description="API key for authentication"),
+):
+    """
+    🎙️ Conversation vocale temps réel
+    
+    Authentification: ?api_key=... (fermeture 4001 si invalide). Chaque tour
+    est compté dans l'usage du tenant (audio entrant, latence, modèle).
+    
+    Client → serveur:
+    - Premier message texte: configuration JSON (champs de VoiceAgentRequest,
+      sans audio/texte: mode, voice_id, use_rag, conversation_id, ...)
+    - Messages binaires: audio micro (PCM 16 bits LE mono 16 kHz)
+    - {"type": "flush"}: termine l'énoncé en cours
+    - {"type": "end"}: ferme la session
+    
+    Serveur → client (JSON):
+    - Événements STT (ready, speech_start, partial, end_of_utterance, final)
+    - Chunks VoiceAgentStreamChunk de la réponse (transcript, text, audio, done)
+    
+    Recouvrement des étapes:
+    - RAG démarre dès qu'une transcription partielle est stable
+      (deux partiels identiques) et est réutilisé si le final correspond
+    - Si l'utilisateur reprend la parole, la réponse en cours est annulée
+    """
+    # Authenticate
+    tenant = await resolve_tenant(api_key)
+    if not tenant:
+        await websocket.close(code=4001, reason="Invalid API key")
+        return
+    
+    tenant_id = tenant["id"]
+    await websocket.accept()
+    
+    try:
+        config = json.loads(await websocket.receive_text() or "{}")
+        config.pop("audio_base64", None)
+        config.pop("text", None)
+        base_request = VoiceAgentRequest(text="", **config)
+    except (json.JSONDecodeError, ValidationError, TypeError) as e:
+        await websocket.send_json({"chunk_type": "error", "content": f"Configuration invalide: {e}", "is_final": True})
+        await websocket.close(code=1003)
+        return
+    except WebSocketDisconnect:
+        return
+    
+    service = get_voice_agent_service()
+    stt_request = STTRequest(enable_timestamps=False)
+    if base_request.language_hint:
+        try:
+            stt_request.language_hint = STTLanguage(base_request.language_hint.value)
+        except ValueError:
+            stt_request.language_hint = STTLanguage.AUTO
+    session = service.stt_service.create_stream_session(stt_request)
+    
+    send_lock = asyncio.Lock()
+    conversation_id = base_request.conversation_id
+    turn: Optional[asyncio.Task] = None
+    prefetch: Optional[RAGPrefetch] = None
+    last_partial: Optional[str] = None
+    
+    async def send(payload: str) -> None:
+        async with send_lock:
+            await websocket.send_text(payload)
+    
+    def cancel_turn() -> None:
+        if turn and not turn.done():
+            turn.cancel()
+    
+    async def run_turn(text: str, rag_prefetch: Optional[RAGPrefetch], audio_seconds: float) -> None:
+        nonlocal conversation_id
+        request = base_request.model_copy(update={"text": text, "conversation_id": conversation_id})
+        async for chunk in service.process_stream(request, rag_prefetch=rag_prefetch):
+            if chunk.content == "transcript" and chunk.metadata:
+                conversation_id = chunk.metadata.get("conversation_id", conversation_id)
+            elif chunk.content == "done" and chunk.metadata:
+                record_usage({
+                    "tenant_id": tenant_id,
+                    "route": websocket.url.path,
+                    "method": "WS",
+                    "audio_seconds": audio_seconds,
+                    "latency_ms": chunk.metadata.get("total_processing_time_ms"),
+                    "model_used": chunk.metadata.get("model_used"),
+                    "status_code": 200,
+                })
+            await send(chunk.model_dump_json(exclude_none=True))
+    
+    async def handle_events() -> None:
+        nonlocal turn, prefetch, last_partial
+        while True:
+            event: Optional[STTStreamEvent] = await session.events.get()
+            if event is None:  # Fin de session: tous les événements traités
+                return
+            await send(event.model_dump_json(exclude_none=True))
+            
+            if event.type == STTStreamEventType.SPEECH_START:
+                # Barge-in: l'utilisateur reprend la parole
+                cancel_turn()
+                last_partial = None
+            elif event.type == STTStreamEventType.PARTIAL and event.text:
+                if event.text == last_partial and not (prefetch and prefetch.matches(event.text)):
+                    if prefetch:
+                        prefetch.cancel()
+                    prefetch = service.start_rag_prefetch(event.text, base_request)
+                last_partial = event.text
+            elif event.type == STTStreamEventType.FINAL:
+                last_partial = None
+                rag_prefetch, prefetch = prefetch, None
+                if not event.text or not event.text.strip():
+                    if rag_prefetch:
+                        rag_prefetch.cancel()
+                    continue
+                cancel_turn()
+                audio_seconds = round((event.end or 0.0) - (event.start or 0.0), 3)
+                turn = asyncio.create_task(run_turn(event.text, rag_prefetch, audio_seconds))
+    
+    events_task = asyncio.create_task(handle_events())
+    session.emit(STTStreamEvent(type=STTStreamEventType.READY))
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            if message.get("bytes") is not None:
+                await session.feed(decode_pcm16(message["bytes"]))
+                continue
+            
+            try:
+                control = json.loads(message.get("text") or "{}")
+            except json.JSONDecodeError:
+                continue
+            if control.get("type") in ("flush", "end"):
+                await session.flush()
+            if control.get("type") == "end":
+                # Laisser finir la dernière réponse, borné: la boucle d'événements
+                # a pu mourir (client parti) sans vider la file
+                try:
+                    await asyncio.wait_for(session.wait_finals(), STREAM_END_TIMEOUT_SEC)
+                except asyncio.TimeoutError:
+                    logger.warning("Voice stream end: final transcription timed out")
+                session.emit(None)
+                await asyncio.wait([events_task], timeout=STREAM_END_TIMEOUT_SEC)
+                if turn:
+                    await asyncio.wait([turn], timeout=STREAM_END_TIMEOUT_SEC)
+                await websocket.close()
+                break
+    
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Voice stream error: {e}")
+    finally:
+        events_task.cancel()
+        cancel_turn()
+        if prefetch:
+            prefetch.cancel()
+        await session.close()
+
+
 # ============================================
 # TEXT-ONLY ENDPOINT
 # ============================================
@@ -9,10 +9,13 @@ qui comprend et parle darija algérienne.
 """
 
 import os
+import re
 import time
+import asyncio
 import logging
 import base64
-from typing import Optional, Dict, Any, List, Tuple
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
 from datetime import datetime
 import uuid
 
@@ -23,6 +26,7 @@ from .voice_agent_models import (
     VoiceAgentTextRequest,
     VoiceAgentAudioRequest,
     VoiceAgentStatus,
+    VoiceAgentStreamChunk,
     ConversationState,
     ConversationMessage,
     ConversationContext,
@@ -82,6 +86,58 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+# ============================================
+# SENTENCE SEGMENTATION (streaming TTS)
+# ============================================
+
+# Fin de phrase: ponctuation (latine/arabe) suivie d'un espace, ou saut de ligne
+SENTENCE_END_RE = re.compile(r'[.!?؟…]+["»”)\]]*\s+|\n+')
+MIN_SENTENCE_CHARS = 20
+MAX_CONCURRENT_SENTENCE_TTS = int(os.getenv("VOICE_AGENT_MAX_CONCURRENT_TTS", "3"))
+
+
+def split_sentences(buffer: str, min_chars: int = MIN_SENTENCE_CHARS) -> Tuple[List[str], str]:
+    """
+    Coupe le texte LLM aux fins de phrase
+    
+    Les phrases plus courtes que min_chars sont fusionnées avec la suivante
+    (évite de synthétiser "Oui." seul). Le reste non terminé est retourné
+    pour être complété par les tokens suivants.
+    
+    Returns:
+        (phrases complètes, reste)
+    """
+    sentences = []
+    start = 0
+    for match in SENTENCE_END_RE.finditer(buffer):
+        if match.end() - start < min_chars:
+            continue
+        sentence = buffer[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, buffer[start:]
+
+
+def _normalize_query(text: str) -> str:
+    """Forme canonique pour comparer transcription partielle et finale"""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+@dataclass
+class RAGPrefetch:
+    """Récupération RAG lancée sur une transcription partielle stable"""
+    query: str
+    task: "asyncio.Task[Dict[str, Any]]"
+    
+    def matches(self, text: str) -> bool:
+        return _normalize_query(self.query) == _normalize_query(text)
+    
+    def cancel(self) -> None:
+        if not self.task.done():
+            self.task.cancel()
+
+
 # ============================================
 # CONVERSATION STORE (In-Memory)
 # ============================================
@@ -338,32 +394,17 @@ class VoiceAgentService:
                 voice_used = tts_result.get("voice_id")
         
         # Mettre à jour la conversation
-        user_message = ConversationMessage(
-            role="user",
-            content=input_text,
-            language=detected_language,
-            dialect=detected_dialect,
-            is_arabizi=is_arabizi,
-            intent=intent_result.intent,
-            intent_confidence=intent_result.confidence,
-        )
-        
-        assistant_message = ConversationMessage(
-            role="assistant",
-            content=output_text,
-            audio_base64=output_audio_base64,
+        self._record_turn(
+            conversation,
+            input_text,
+            output_text,
+            output_audio_base64,
+            detected_language,
+            detected_dialect,
+            is_arabizi,
+            intent_result,
         )
         
-        conversation.messages.append(user_message)
-        conversation.messages.append(assistant_message)
-        conversation.message_count = len(conversation.messages)
-        conversation.total_user_chars += len(input_text)
-        conversation.total_assistant_chars += len(output_text)
-        conversation.detected_language = detected_language
-        conversation.detected_dialect = detected_dialect
-        
-        self.conversations.update(conversation)
-        
         # Calculer temps total
         total_time_ms = int((time.time() - start_time) * 1000)
         
@@ -391,6 +432,311 @@ class VoiceAgentService:
             voice_used=voice_used,
         )
     
+    # ----------------------------------------
+    # STREAMING TURN PIPELINE
+    # ----------------------------------------
+    
+    def start_rag_prefetch(self, text: str, request: VoiceAgentRequest) -> Optional[RAGPrefetch]:
+        """
+        Lance la récupération RAG sur une transcription partielle stable
+        
+        Le résultat est réutilisé par process_stream si la transcription
+        finale correspond; sinon il est annulé et relancé.
+        """
+        if not (request.use_rag and self.enable_rag and self.rag_service):
+            return None
+        
+        conversation = self.conversations.get(request.conversation_id) if request.conversation_id else None
+        country = conversation.context.country if conversation else ConversationContext().country
+        
+        async def retrieve() -> Dict[str, Any]:
+            nlp = await self._process_nlp(text)
+            return await self._process_rag(
+                nlp.get("normalized", text), country, request.rag_collection, request.rag_top_k
+            )
+        
+        return RAGPrefetch(query=text, task=asyncio.create_task(retrieve()))
+    
+    async def process_stream(
+        self,
+        request: VoiceAgentRequest,
+        rag_prefetch: Optional[RAGPrefetch] = None,
+    ) -> AsyncIterator[VoiceAgentStreamChunk]:
+        """
+        Traite un tour de conversation en streaming (étapes chevauchées)
+        
+        Contrairement à process(), la latence n'est plus la somme des étapes:
+        - RAG peut démarrer sur une transcription partielle (rag_prefetch)
+        - Les tokens LLM sont streamés et coupés aux fins de phrase
+        - Chaque phrase est synthétisée (TTS) pendant que le LLM continue
+        
+        Chunks émis:
+        - status "transcript": texte d'entrée (après STT/NLP)
+        - text (sequence=i): phrase i de la réponse
+        - audio (sequence=i): audio base64 de la phrase i, dans l'ordre
+        - status "done" (is_final): réponse complète (sans audio) + timings
+        - error: échec d'une étape bloquante
+        """
+        start_time = time.time()
+        pipeline_steps: List[ProcessingStepResult] = []
+        
+        def elapsed_ms() -> int:
+            return int((time.time() - start_time) * 1000)
+        
+        # Tâches de fond du tour: annulées si le consommateur abandonne (barge-in, déconnexion)
+        rag_task: Optional[asyncio.Task] = None
+        tts_tasks: List[asyncio.Task] = []
+        
+        try:
+            conversation = self._get_or_create_conversation(request.conversation_id, request.context)
+            
+            # 1. Input (STT ou texte)
+            input_text = ""
+            detected_language = "ar"
+            detected_dialect = "darija"
+            is_arabizi = False
+            
+            if request.audio_base64:
+                stt_result = await self._process_stt(request.audio_base64, request.language_hint, request.dialect)
+                pipeline_steps.append(stt_result["step"])
+                if not stt_result["success"]:
+                    if rag_prefetch:
+                        rag_prefetch.cancel()
+                    yield VoiceAgentStreamChunk(chunk_type="error", content="Erreur transcription audio", is_final=True)
+                    return
+                input_text = stt_result["text"]
+                detected_language = stt_result.get("language", "ar")
+                detected_dialect = stt_result.get("dialect", "darija")
+                is_arabizi = stt_result.get("is_arabizi", False)
+            elif request.text:
+                input_text = request.text
+            else:
+                yield VoiceAgentStreamChunk(chunk_type="error", content="Aucun input (audio ou texte) fourni", is_final=True)
+                return
+            
+            # 2. RAG: réutiliser le prefetch si la transcription n'a pas changé
+            use_rag = request.use_rag and self.enable_rag and self.rag_service
+            if rag_prefetch and use_rag and rag_prefetch.matches(input_text):
+                rag_task = rag_prefetch.task
+            else:
+                if rag_prefetch:
+                    rag_prefetch.cancel()
+            
+            # 3. NLP + intention
+            nlp_result = await self._process_nlp(input_text)
+            pipeline_steps.append(nlp_result["step"])
+            input_text_normalized = nlp_result.get("normalized", input_text)
+            if nlp_result.get("is_arabizi"):
+                is_arabizi = True
+            if nlp_result.get("dialect"):
+                detected_dialect = nlp_result["dialect"]
+            
+            if use_rag and rag_task is None:
+                rag_task = asyncio.create_task(self._process_rag(
+                    input_text_normalized,
+                    conversation.context.country,
+                    request.rag_collection,
+                    request.rag_top_k,
+                ))
+            
+            intent_result = self._detect_intent(input_text_normalized)
+            pipeline_steps.append(ProcessingStepResult(
+                step=ProcessingStep.INTENT,
+                success=True,
+                duration_ms=1,
+                output={"intent": intent_result.intent.value, "confidence": intent_result.confidence}
+            ))
+            
+            yield VoiceAgentStreamChunk(
+                chunk_type="status",
+                content="transcript",
+                metadata={
+                    "conversation_id": conversation.id,
+                    "input_text": input_text,
+                    "language": detected_language,
+                    "dialect": detected_dialect,
+                    "intent": intent_result.intent.value,
+                },
+            )
+            
+            rag_context = ""
+            rag_sources = []
+            rag_used = False
+            if rag_task is not None:
+                try:
+                    rag_result = await rag_task
+                except asyncio.CancelledError:
+                    rag_result = None
+                if rag_result:
+                    pipeline_steps.append(rag_result["step"])
+                    if rag_result["success"]:
+                        rag_context = rag_result.get("context", "")
+                        rag_sources = rag_result.get("sources", [])
+                        rag_used = True
+            
+            # 4. LLM streamé + TTS par phrase
+            system_prompt_to_use = request.system_prompt
+            if not system_prompt_to_use and request.tenant:
+                if request.tenant.lower() in ["swiss", "ch", "switzerland", "suisse"]:
+                    system_prompt_to_use = SYSTEM_PROMPT_CH
+            
+            synthesize = request.return_audio and self.enable_tts
+            tts_limit = asyncio.Semaphore(MAX_CONCURRENT_SENTENCE_TTS)
+            next_audio = 0
+            sentences: List[str] = []
+            first_audio_ms: Optional[int] = None
+            audio_duration_sec = 0.0
+            voice_used = None
+            
+            async def synthesize_sentence(sentence: str) -> Dict[str, Any]:
+                async with tts_limit:
+                    return await self._process_tts(sentence, detected_language, detected_dialect, request.voice_id)
+            
+            def audio_chunk(index: int, tts_result: Dict[str, Any]) -> Optional[VoiceAgentStreamChunk]:
+                nonlocal first_audio_ms, audio_duration_sec, voice_used
+                if not tts_result["success"]:
+                    return None
+                if first_audio_ms is None:
+                    first_audio_ms = elapsed_ms()
+                audio_duration_sec += tts_result.get("duration_sec") or 0.0
+                voice_used = tts_result.get("voice_id")
+                return VoiceAgentStreamChunk(
+                    chunk_type="audio",
+                    content=tts_result.get("audio_base64") or "",
+                    sequence=index,
+                    metadata={"duration_sec": tts_result.get("duration_sec")},
+                )
+            
+            def emit_sentence(sentence: str) -> VoiceAgentStreamChunk:
+                sentences.append(sentence)
+                if synthesize:
+                    tts_tasks.append(asyncio.create_task(synthesize_sentence(sentence)))
+                return VoiceAgentStreamChunk(chunk_type="text", content=sentence, sequence=len(sentences) - 1)
+            
+            llm_start = time.time()
+            first_token_ms: Optional[int] = None
+            buffer = ""
+            output_parts: List[str] = []
+            model_used = self.default_model
+            llm_error: Optional[str] = None
+            
+            try:
+                async for delta, model in self._stream_llm(
+                    input_text_normalized,
+                    conversation,
+                    request.mode,
+                    rag_context,
+                    system_prompt_to_use,
+                    request.temperature,
+                    request.max_tokens,
+                ):
+                    if first_token_ms is None:
+                        first_token_ms = elapsed_ms()
+                    model_used = model or model_used
+                    output_parts.append(delta)
+                    buffer += delta
+                    
+                    complete, buffer = split_sentences(buffer)
+                    for sentence in complete:
+                        yield emit_sentence(sentence)
+                    
+                    # Envoyer l'audio déjà prêt, dans l'ordre des phrases
+                    while next_audio < len(tts_tasks) and tts_tasks[next_audio].done():
+                        chunk = audio_chunk(next_audio, tts_tasks[next_audio].result())
+                        next_audio += 1
+                        if chunk:
+                            yield chunk
+            except Exception as e:
+                logger.error(f"LLM streaming error: {e}")
+                llm_error = str(e)
+            
+            if buffer.strip():
+                yield emit_sentence(buffer.strip())
+            
+            output_text = "".join(output_parts).strip()
+            pipeline_steps.append(ProcessingStepResult(
+                step=ProcessingStep.LLM,
+                success=llm_error is None,
+                duration_ms=int((time.time() - llm_start) * 1000),
+                output={
+                    "tokens": len(output_text.split()),
+                    "model": model_used,
+                    "first_token_ms": first_token_ms,
+                    "sentences": len(sentences),
+                },
+                error=llm_error,
+            ))
+            
+            if llm_error and not output_text:
+                for task in tts_tasks:
+                    task.cancel()
+                yield VoiceAgentStreamChunk(chunk_type="error", content="Erreur génération réponse", is_final=True)
+                return
+            
+            # 5. Audio restant (dans l'ordre)
+            tts_start = time.time()
+            for index in range(next_audio, len(tts_tasks)):
+                chunk = audio_chunk(index, await tts_tasks[index])
+                if chunk:
+                    yield chunk
+            if tts_tasks:
+                pipeline_steps.append(ProcessingStepResult(
+                    step=ProcessingStep.TTS,
+                    success=first_audio_ms is not None,
+                    duration_ms=int((time.time() - tts_start) * 1000),
+                    output={
+                        "sentences": len(tts_tasks),
+                        "first_audio_ms": first_audio_ms,
+                        "duration_sec": round(audio_duration_sec, 2),
+                    },
+                ))
+            
+            self._record_turn(
+                conversation,
+                input_text,
+                output_text,
+                None,
+                detected_language,
+                detected_dialect,
+                is_arabizi,
+                intent_result,
+            )
+            
+            response = VoiceAgentResponse(
+                conversation_id=conversation.id,
+                success=True,
+                input_text=input_text,
+                input_text_normalized=input_text_normalized if input_text_normalized != input_text else None,
+                output_text=output_text,
+                audio_duration_sec=audio_duration_sec if tts_tasks else None,
+                detected_language=detected_language,
+                detected_dialect=detected_dialect,
+                is_arabizi=is_arabizi,
+                intent=intent_result.intent,
+                intent_confidence=intent_result.confidence,
+                rag_used=rag_used,
+                rag_sources=rag_sources,
+                rag_context=rag_context if rag_context else None,
+                pipeline_steps=pipeline_steps,
+                total_processing_time_ms=elapsed_ms(),
+                message_index=len(conversation.messages),
+                conversation_length=conversation.message_count,
+                model_used=model_used,
+                voice_used=voice_used,
+            )
+            yield VoiceAgentStreamChunk(
+                chunk_type="status",
+                content="done",
+                is_final=True,
+                metadata=response.model_dump(mode="json"),
+            )
+        finally:
+            pending = [task for task in (rag_task, *tts_tasks) if task is not None and not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+    
     # ----------------------------------------
     # PIPELINE STEPS
     # ----------------------------------------
@@ -541,6 +887,36 @@ class VoiceAgentService:
                 )
             }
     
+    def _build_llm_messages(
+        self,
+        user_input: str,
+        conversation: ConversationState,
+        mode: AgentMode,
+        rag_context: str,
+        custom_system_prompt: Optional[str],
+    ) -> List[Dict[str, str]]:
+        """Construit les messages LLM (system prompt + historique + input)"""
+        # Construire le system prompt
+        system_prompt = custom_system_prompt or SYSTEM_PROMPTS.get(mode, SYSTEM_PROMPTS[AgentMode.ASSISTANT])
+        
+        # Ajouter contexte RAG si disponible
+        if rag_context:
+            system_prompt += f"\n\nContexte documentaire:\n{rag_context}"
+        
+        # Construire les messages
+        messages = [{"role": "system", "content": system_prompt}]
+        
+        # Ajouter historique conversation (limité)
+        for msg in conversation.messages[-10:]:  # 10 derniers messages
+            messages.append({
+                "role": msg.role,
+                "content": msg.content
+            })
+        
+        # Ajouter le nouveau message
+        messages.append({"role": "user", "content": user_input})
+        return messages
+    
     async def _process_llm(
         self,
         user_input: str,
@@ -555,25 +931,9 @@ class VoiceAgentService:
         start = time.time()
         
         try:
-            # Construire le system prompt
-            system_prompt = custom_system_prompt or SYSTEM_PROMPTS.get(mode, SYSTEM_PROMPTS[AgentMode.ASSISTANT])
-            
-            # Ajouter contexte RAG si disponible
-            if rag_context:
-                system_prompt += f"\n\nContexte documentaire:\n{rag_context}"
-            
-            # Construire les messages
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Ajouter historique conversation (limité)
-            for msg in conversation.messages[-10:]:  # 10 derniers messages
-                messages.append({
-                    "role": msg.role,
-                    "content": msg.content
-                })
-            
-            # Ajouter le nouveau message
-            messages.append({"role": "user", "content": user_input})
+            messages = self._build_llm_messages(
+                user_input, conversation, mode, rag_context, custom_system_prompt
+            )
             
             # Appeler LLM
             if self.openai_client:
@@ -617,6 +977,39 @@ class VoiceAgentService:
                 )
             }
     
+    async def _stream_llm(
+        self,
+        user_input: str,
+        conversation: ConversationState,
+        mode: AgentMode,
+        rag_context: str,
+        custom_system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+    ) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        """Génération LLM streamée: yield (delta texte, modèle)"""
+        messages = self._build_llm_messages(user_input, conversation, mode, rag_context, custom_system_prompt)
+        
+        if not self.openai_client:
+            # Mock response, streamée mot par mot
+            for word in f"[Mock LLM] Réponse à: {user_input[:50]}...".split(" "):
+                yield word + " ", "mock"
+            return
+        
+        stream = await self.openai_client.chat.completions.create(
+            model=self.default_model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta, chunk.model
+    
     async def _process_tts(
         self,
         text: str,
@@ -713,6 +1106,44 @@ class VoiceAgentService:
         
         return self.conversations.create(context)
     
+    def _record_turn(
+        self,
+        conversation: ConversationState,
+        input_text: str,
+        output_text: str,
+        output_audio_base64: Optional[str],
+        detected_language: str,
+        detected_dialect: str,
+        is_arabizi: bool,
+        intent_result: IntentDetectionResult,
+    ) -> None:
+        """Ajoute l'échange user/assistant à la conversation"""
+        user_message = ConversationMessage(
+            role="user",
+            content=input_text,
+            language=detected_language,
+            dialect=detected_dialect,
+            is_arabizi=is_arabizi,
+            intent=intent_result.intent,
+            intent_confidence=intent_result.confidence,
+        )
+        
+        assistant_message = ConversationMessage(
+            role="assistant",
+            content=output_text,
+            audio_base64=output_audio_base64,
+        )
+        
+        conversation.messages.append(user_message)
+        conversation.messages.append(assistant_message)
+        conversation.message_count = len(conversation.messages)
+        conversation.total_user_chars += len(input_text)
+        conversation.total_assistant_chars += len(output_text)
+        conversation.detected_language = detected_language
+        conversation.detected_dialect = detected_dialect
+        
+        self.conversations.update(conversation)
+    
     def _error_response(
         self,
         conversation_id: str,
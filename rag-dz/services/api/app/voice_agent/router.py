@@ -10,6 +10,7 @@ import logging
 import time
 
 from .transcription_service import get_transcription_service
+from .whisper_engine import TranscriptionQueueFull
 from .keywords_service import generate_keywords
 from .repository import save_transcription
 from .emotional_intelligence import analyze_intent_and_emotion
@@ -97,13 +98,16 @@ async def transcribe_audio(
         # Service de transcription
         service = get_transcription_service()
 
-        # Transcription
-        result = service.transcribe_file(
-            audio_file=file.file,
-            filename=file.filename,
-            language=language,
-            professional_context=professional_context,
-        )
+        # Transcription (file batchée partagée entre requêtes concurrentes)
+        try:
+            result = await service.transcribe_file_async(
+                audio_file=file.file,
+                filename=file.filename,
+                language=language,
+                professional_context=professional_context,
+            )
+        except TranscriptionQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
 
         # Mesurer temps de traitement
         processing_time_ms = int((time.time() - start_time) * 1000)
@@ -238,6 +242,8 @@ async def transcribe_audio(
 
         return JSONResponse(content=result)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur API transcribe: {e}")
         raise HTTPException(status_code=500, detail=str(e))
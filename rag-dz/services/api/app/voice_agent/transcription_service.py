@@ -4,7 +4,9 @@ Médecins, avocats, experts-comptables (Suisse, France, Algérie)
 """
 
 import os
+import asyncio
 import logging
+import shutil
 import tempfile
 from pathlib import Path
 from typing import Optional, Dict, Any, BinaryIO
@@ -13,6 +15,12 @@ from .whisper_engine import get_whisper_engine
 logger = logging.getLogger(__name__)
 
 
+def _write_temp_file(audio_file: BinaryIO, temp_path: Path) -> None:
+    """Copie l'upload vers temp_path par blocs (appelé dans un thread)"""
+    with open(temp_path, "wb") as f:
+        shutil.copyfileobj(audio_file, f, length=1024 * 1024)
+
+
 class TranscriptionService:
     """
     Service de transcription vocale professionnel
@@ -106,6 +114,56 @@ class TranscriptionService:
             if temp_path.exists():
                 temp_path.unlink()
 
+    async def transcribe_file_async(
+        self,
+        audio_file: BinaryIO,
+        filename: str,
+        language: Optional[str] = None,
+        professional_context: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Version async de transcribe_file via la file batchée du moteur
+
+        Les uploads concurrents sont regroupés dans des lots partagés au lieu
+        d'être transcrits un par un. Lève TranscriptionQueueFull si la file
+        est saturée.
+        """
+        # Nom unique: deux uploads concurrents peuvent avoir le même nom
+        temp_path = self.temp_dir / f"{os.urandom(8).hex()}_{Path(filename).name}"
+        # Écriture hors de la boucle d'événements, par blocs
+        write = asyncio.ensure_future(asyncio.to_thread(_write_temp_file, audio_file, temp_path))
+        try:
+            await asyncio.shield(write)
+
+            logger.info(f"Transcription fichier (file batchée): {filename} (context={professional_context})")
+
+            # Une fois en file, le worker supprime le fichier (même si cette
+            # requête est annulée pendant qu'il le lit encore)
+            future = self.engine.submit(str(temp_path), language=language, vad_filter=True, delete_after=True)
+        except BaseException:
+            # Annulée pendant l'écriture: le thread doit finir avant la suppression
+            await asyncio.gather(write, return_exceptions=True)
+            if temp_path.exists():
+                temp_path.unlink()
+            raise
+
+        try:
+            result = await asyncio.wrap_future(future)
+
+            result["filename"] = filename
+            result["professional_context"] = professional_context
+
+            if professional_context:
+                result["cleaned_text"] = self._clean_transcription(
+                    result["text"], professional_context
+                )
+
+            return result
+
+        except Exception as e:
+            logger.error(f"Erreur transcription {filename}: {e}")
+            raise
+
     def transcribe_url(
         self,
         audio_url: str,
@@ -208,7 +266,10 @@ def get_transcription_service(
     compute_type: Optional[str] = None,
 ) -> TranscriptionService:
     """
-    Crée une instance du service de transcription (SINGLETON SUPPRIMÉ)
+    Crée une instance du service de transcription
+
+    Le service est léger: le moteur Whisper (modèle + file batchée) est
+    partagé par configuration via get_whisper_engine.
 
     Hardware Aware: Auto-détecte GPU vs CPU
 
@@ -220,7 +281,6 @@ def get_transcription_service(
     Returns:
         Nouvelle instance TranscriptionService
     """
-    # Créer NOUVELLE instance (pas de cache)
     return TranscriptionService(
         model_size=model_size or "base",
         device=device,
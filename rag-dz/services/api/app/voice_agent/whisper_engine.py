@@ -4,13 +4,63 @@ Moteur de reconnaissance vocale souverain (4x plus rapide)
 """
 
 import os
+import asyncio
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-from faster_whisper import WhisperModel
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
+from faster_whisper.audio import pad_or_trim
+from faster_whisper.tokenizer import Tokenizer
+from faster_whisper.transcribe import (
+    Segment,
+    TranscriptionOptions,
+    get_suppressed_tokens,
+    restore_speech_timestamps,
+)
+from faster_whisper.vad import VadOptions, collect_chunks, get_speech_timestamps
+
+from ..core.model_registry import get_model_registry
 
 logger = logging.getLogger(__name__)
 
+SAMPLING_RATE = 16000
+
+
+class TranscriptionQueueFull(RuntimeError):
+    """File d'attente de transcription saturée (back-pressure vers l'API)"""
+
+
+@dataclass
+class _PreparedAudio:
+    """Audio découpé par VAD, prêt pour le décodage batché"""
+
+    audio_path: str
+    duration: float
+    duration_after_vad: float
+    clip_timestamps: List[dict]
+    features: List[np.ndarray]
+    chunks_metadata: List[dict]
+    language: str
+    language_probability: float
+
+
+@dataclass
+class _QueuedRequest:
+    """Requête en attente dans la file de transcription batchée"""
+
+    audio_path: str
+    options: Tuple[Any, ...]
+    future: Future
+    delete_after: bool = False  # Fichier temporaire supprimé par le worker
+    enqueued_at: float = field(default_factory=time.monotonic)
+
 
 class WhisperEngine:
     """
@@ -46,6 +96,9 @@ class WhisperEngine:
         device: str = "auto",
         compute_type: str = "int8",  # Changé vers int8 (CPU compatible)
         download_root: Optional[str] = None,
+        batch_size: int = 8,
+        max_queue_size: int = 64,
+        max_batch_wait_ms: float = 50.0,
     ):
         """
         Initialise le moteur Faster-Whisper
@@ -55,6 +108,9 @@ class WhisperEngine:
             device: Device à utiliser (auto, cpu, cuda)
             compute_type: Précision (int8, float16, int8, int8_float16)
             download_root: Dossier de téléchargement des modèles
+            batch_size: Nombre de segments VAD décodés ensemble
+            max_queue_size: Taille max de la file de transcription (back-pressure)
+            max_batch_wait_ms: Attente max pour regrouper des requêtes concurrentes
         """
         self.model_size = model_size
         self.device = self._detect_device() if device == "auto" else device
@@ -73,8 +129,21 @@ class WhisperEngine:
             f"device={self.device}, compute={compute_type}"
         )
 
-        # Charger le modèle
-        self.model = self._load_model()
+        # Modèle partagé via le registre (un exemplaire par configuration)
+        self.model_key = f"whisper:{model_size}:{self.device}:{compute_type}"
+        registry = get_model_registry()
+        registry.register(self.model_key, self._load_model, kind="whisper")
+        registry.get(self.model_key)  # Chargement immédiat (échec visible à l'initialisation)
+
+        # Décodage batché (VAD + segments de 30s décodés ensemble)
+        self.batch_size = max(1, batch_size)
+        self.max_batch_wait = max_batch_wait_ms / 1000.0
+
+        # File bornée partagée par les requêtes API concurrentes
+        self._queue: "queue.Queue[_QueuedRequest]" = queue.Queue(maxsize=max_queue_size)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self.stats = {"batches": 0, "files": 0, "chunks": 0, "rejected": 0}
 
     def _detect_device(self) -> str:
         """Détecte automatiquement le meilleur device (CPU/GPU)"""
@@ -89,6 +158,11 @@ class WhisperEngine:
         logger.info("Utilisation du CPU")
         return "cpu"
 
+    @property
+    def model(self) -> WhisperModel:
+        """Modèle Faster-Whisper (résident dans le registre, rechargé si déchargé)"""
+        return get_model_registry().get(self.model_key)
+
     def _load_model(self) -> WhisperModel:
         """Charge le modèle Faster-Whisper"""
         try:
@@ -112,6 +186,7 @@ class WhisperEngine:
         beam_size: int = 5,
         vad_filter: bool = True,
         word_timestamps: bool = False,
+        batch_size: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         Transcrit un fichier audio
@@ -123,6 +198,7 @@ class WhisperEngine:
             beam_size: Taille du beam search (5 par défaut, bon compromis)
             vad_filter: Utiliser Voice Activity Detection (recommandé)
             word_timestamps: Retourner timestamps par mot
+            batch_size: Si défini, décodage batché des segments VAD (audio long)
 
         Returns:
             Dict avec:
@@ -131,93 +207,447 @@ class WhisperEngine:
                 - language: Langue détectée
                 - duration: Durée audio (secondes)
         """
-        try:
-            logger.info(f"Transcription: {audio_path} (lang={language})")
+        with get_model_registry().lease(self.model_key):
+            try:
+                logger.info(f"Transcription: {audio_path} (lang={language})")
+
+                if batch_size:
+                    # Audio long: segments VAD décodés par lots
+                    segments, info = self.batched_pipeline.transcribe(
+                        audio_path,
+                        language=language,
+                        task=task,
+                        beam_size=beam_size,
+                        vad_filter=vad_filter,
+                        word_timestamps=word_timestamps,
+                        batch_size=batch_size,
+                    )
+                else:
+                    segments, info = self.model.transcribe(
+                        audio_path,
+                        language=language,
+                        task=task,
+                        beam_size=beam_size,
+                        vad_filter=vad_filter,
+                        word_timestamps=word_timestamps,
+                    )
+
+                result = self._format_result(
+                    segments,
+                    language=info.language,
+                    language_probability=info.language_probability,
+                    duration=info.duration,
+                    duration_after_vad=info.duration_after_vad if vad_filter else None,
+                    word_timestamps=word_timestamps,
+                )
+
+                logger.info(
+                    f"Transcription réussie: {len(result['segments'])} segments, "
+                    f"lang={info.language} ({info.language_probability:.2%})"
+                )
+
+                return result
 
-            # Transcription
-            segments, info = self.model.transcribe(
-                audio_path,
-                language=language,
-                task=task,
-                beam_size=beam_size,
-                vad_filter=vad_filter,
-                word_timestamps=word_timestamps,
-            )
+            except Exception as e:
+                logger.error(f"Erreur transcription: {e}")
+                raise
 
-            # Collecter les segments
-            segments_list = []
-            full_text = []
-
-            for segment in segments:
-                segment_dict = {
-                    "start": segment.start,
-                    "end": segment.end,
-                    "text": segment.text.strip(),
-                }
-
-                if word_timestamps and hasattr(segment, "words"):
-                    segment_dict["words"] = [
-                        {
-                            "start": word.start,
-                            "end": word.end,
-                            "word": word.word,
-                            "probability": word.probability,
-                        }
-                        for word in segment.words
-                    ]
-
-                segments_list.append(segment_dict)
-                full_text.append(segment.text.strip())
-
-            result = {
-                "text": " ".join(full_text),
-                "segments": segments_list,
-                "language": info.language,
-                "language_probability": info.language_probability,
-                "duration": info.duration,
-                "duration_after_vad": info.duration_after_vad if vad_filter else None,
+    @property
+    def batched_pipeline(self) -> BatchedInferencePipeline:
+        """
+        Pipeline de décodage batché sur le modèle résident
+
+        Objet léger créé par appel: il ne doit pas garder le modèle en vie
+        après un déchargement par le registre (et porte un état par transcription).
+        """
+        return BatchedInferencePipeline(model=self.model)
+
+    @staticmethod
+    def _format_result(
+        segments,
+        language: str,
+        language_probability: float,
+        duration: float,
+        duration_after_vad: Optional[float],
+        word_timestamps: bool,
+    ) -> Dict[str, Any]:
+        """Convertit les segments faster-whisper en dict de réponse"""
+        segments_list = []
+        full_text = []
+
+        for segment in segments:
+            segment_dict = {
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text.strip(),
             }
 
-            logger.info(
-                f"Transcription réussie: {len(segments_list)} segments, "
-                f"lang={info.language} ({info.language_probability:.2%})"
+            if word_timestamps and segment.words:
+                segment_dict["words"] = [
+                    {
+                        "start": word.start,
+                        "end": word.end,
+                        "word": word.word,
+                        "probability": word.probability,
+                    }
+                    for word in segment.words
+                ]
+
+            segments_list.append(segment_dict)
+            full_text.append(segment.text.strip())
+
+        return {
+            "text": " ".join(full_text),
+            "segments": segments_list,
+            "language": language,
+            "language_probability": language_probability,
+            "duration": duration,
+            "duration_after_vad": duration_after_vad,
+        }
+
+    def _prepare_audio(
+        self, audio_path: str, language: Optional[str], vad_filter: bool
+    ) -> _PreparedAudio:
+        """Décode l'audio, le découpe par VAD en segments <= 30s et calcule les features"""
+        model = self.model
+        chunk_length = model.feature_extractor.chunk_length
+        audio = decode_audio(audio_path, sampling_rate=SAMPLING_RATE)
+        duration = audio.shape[0] / SAMPLING_RATE
+
+        if vad_filter:
+            vad_parameters = VadOptions(
+                max_speech_duration_s=chunk_length, min_silence_duration_ms=160
+            )
+            clip_timestamps = get_speech_timestamps(audio, vad_parameters)
+        elif duration < chunk_length:
+            clip_timestamps = [{"start": 0, "end": audio.shape[0]}]
+        else:
+            raise ValueError(
+                f"{audio_path}: audio > {chunk_length}s sans VAD, utiliser vad_filter=True"
             )
 
-            return result
+        duration_after_vad = (
+            sum(clip["end"] - clip["start"] for clip in clip_timestamps) / SAMPLING_RATE
+        )
+        features: List[np.ndarray] = []
+        chunks_metadata: List[dict] = []
+        if duration_after_vad:
+            audio_chunks, chunks_metadata = collect_chunks(
+                audio, clip_timestamps, max_duration=chunk_length
+            )
+            features = [model.feature_extractor(chunk)[..., :-1] for chunk in audio_chunks]
+
+        language_probability = 1.0
+        if not model.model.is_multilingual:
+            language = "en"
+        elif language is None:
+            if features:
+                language, language_probability, _ = model.detect_language(
+                    features=np.concatenate(features, axis=1)
+                )
+            else:
+                language, language_probability = "en", 0.0
+
+        return _PreparedAudio(
+            audio_path=audio_path,
+            duration=duration,
+            duration_after_vad=duration_after_vad,
+            clip_timestamps=clip_timestamps,
+            features=[pad_or_trim(feature) for feature in features],
+            chunks_metadata=chunks_metadata,
+            language=language,
+            language_probability=language_probability,
+        )
 
-        except Exception as e:
-            logger.error(f"Erreur transcription: {e}")
-            raise
+    def _batch_options(self, tokenizer: Tokenizer, beam_size: int) -> TranscriptionOptions:
+        """Options de décodage identiques à BatchedInferencePipeline.transcribe"""
+        return TranscriptionOptions(
+            beam_size=beam_size,
+            best_of=5,
+            patience=1,
+            length_penalty=1,
+            repetition_penalty=1,
+            no_repeat_ngram_size=0,
+            log_prob_threshold=-1.0,
+            no_speech_threshold=0.6,
+            compression_ratio_threshold=2.4,
+            condition_on_previous_text=False,
+            prompt_reset_on_temperature=0.5,
+            temperatures=[0.0],
+            initial_prompt=None,
+            prefix=None,
+            suppress_blank=True,
+            suppress_tokens=get_suppressed_tokens(tokenizer, [-1]),
+            without_timestamps=True,
+            max_initial_timestamp=0.0,
+            word_timestamps=False,
+            prepend_punctuations="\"'“¿([{-",
+            append_punctuations="\"'.。,，!！?？:：”)]}、",
+            multilingual=False,
+            max_new_tokens=None,
+            clip_timestamps=[],
+            hallucination_silence_threshold=None,
+            hotwords=None,
+        )
 
     def transcribe_batch(
         self,
         audio_paths: List[str],
-        batch_size: int = 8,
-        **kwargs,
+        batch_size: Optional[int] = None,
+        language: Optional[str] = None,
+        task: str = "transcribe",
+        beam_size: int = 5,
+        vad_filter: bool = True,
+        word_timestamps: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         Transcrit plusieurs fichiers audio en batch (plus rapide)
 
+        Les fichiers sont découpés par VAD en segments <= 30s, puis les segments
+        de TOUS les fichiers de même langue sont décodés ensemble par lots de
+        batch_size. Un appel CTranslate2 traite donc plusieurs fichiers courts
+        à la fois au lieu d'un fichier par cœur.
+
         Args:
             audio_paths: Liste des chemins audio
-            batch_size: Taille du batch (8 recommandé)
-            **kwargs: Paramètres de transcribe()
+            batch_size: Segments décodés par lot (défaut: self.batch_size)
+            language: Code langue ou None pour détection par fichier
+            task: "transcribe" ou "translate"
+            beam_size: Taille du beam search
+            vad_filter: Découpage VAD (requis pour l'audio > 30s)
+            word_timestamps: Timestamps par mot (décodage batché par fichier)
 
         Returns:
-            Liste des résultats de transcription
+            Liste des résultats de transcription (même ordre que audio_paths)
         """
-        results = []
-
-        for audio_path in audio_paths:
+        batch_size = batch_size or self.batch_size
+        results: List[Optional[Dict[str, Any]]] = [None] * len(audio_paths)
+
+        if word_timestamps:
+            # L'alignement des mots dépend du fichier: lots par fichier uniquement
+            for index, audio_path in enumerate(audio_paths):
+                try:
+                    results[index] = self.transcribe(
+                        audio_path,
+                        language=language,
+                        task=task,
+                        beam_size=beam_size,
+                        vad_filter=vad_filter,
+                        word_timestamps=True,
+                        batch_size=batch_size,
+                    )
+                except Exception as e:
+                    logger.error(f"Erreur batch {audio_path}: {e}")
+                    results[index] = {"error": str(e), "audio_path": audio_path}
+            return results
+
+        # 1. Préparation (décodage audio, VAD, features, langue)
+        prepared: Dict[int, _PreparedAudio] = {}
+        for index, audio_path in enumerate(audio_paths):
             try:
-                result = self.transcribe(audio_path, **kwargs)
-                results.append(result)
+                prepared[index] = self._prepare_audio(audio_path, language, vad_filter)
             except Exception as e:
                 logger.error(f"Erreur batch {audio_path}: {e}")
-                results.append({"error": str(e), "audio_path": audio_path})
+                results[index] = {"error": str(e), "audio_path": audio_path}
+
+        # 2. Regrouper les segments de tous les fichiers par langue
+        by_language: Dict[str, List[Tuple[int, int]]] = {}
+        for index, item in prepared.items():
+            for chunk_index in range(len(item.features)):
+                by_language.setdefault(item.language, []).append((index, chunk_index))
+
+        # 3. Décodage batché partagé entre fichiers
+        outputs: Dict[Tuple[int, int], List[dict]] = {}
+        failed: Dict[int, str] = {}
+        pipeline = self.batched_pipeline
+        for lang, refs in by_language.items():
+            tokenizer = Tokenizer(
+                pipeline.model.hf_tokenizer,
+                pipeline.model.model.is_multilingual,
+                task=task,
+                language=lang,
+            )
+            options = self._batch_options(tokenizer, beam_size)
+            for start in range(0, len(refs), batch_size):
+                batch_refs = refs[start : start + batch_size]
+                features = np.stack(
+                    [prepared[i].features[c] for i, c in batch_refs]
+                )
+                metadata = [prepared[i].chunks_metadata[c] for i, c in batch_refs]
+                try:
+                    batch_outputs = pipeline.forward(features, tokenizer, metadata, options)
+                except Exception as e:
+                    logger.error(f"Erreur décodage batch ({lang}, {len(batch_refs)} segments): {e}")
+                    for i, _ in batch_refs:
+                        failed[i] = str(e)
+                    continue
+                outputs.update(zip(batch_refs, batch_outputs))
+                self.stats["batches"] += 1
+                self.stats["chunks"] += len(batch_refs)
+
+        # 4. Réassembler par fichier et restaurer les timestamps d'origine
+        for index, item in prepared.items():
+            if index in failed:
+                results[index] = {"error": failed[index], "audio_path": item.audio_path}
+                continue
+
+            raw_segments = [
+                Segment(
+                    id=0,
+                    seek=segment["seek"],
+                    start=round(segment["start"], 3),
+                    end=round(segment["end"], 3),
+                    text=segment["text"],
+                    tokens=segment["tokens"],
+                    avg_logprob=segment["avg_logprob"],
+                    compression_ratio=segment["compression_ratio"],
+                    no_speech_prob=segment["no_speech_prob"],
+                    words=None,
+                    temperature=0.0,
+                )
+                for chunk_index in range(len(item.features))
+                for segment in outputs[(index, chunk_index)]
+            ]
+            segments = restore_speech_timestamps(
+                raw_segments, item.clip_timestamps, SAMPLING_RATE
+            )
+            results[index] = self._format_result(
+                segments,
+                language=item.language,
+                language_probability=item.language_probability,
+                duration=item.duration,
+                duration_after_vad=item.duration_after_vad if vad_filter else None,
+                word_timestamps=False,
+            )
+            self.stats["files"] += 1
 
+        logger.info(
+            f"Batch transcription: {len(audio_paths)} fichiers, "
+            f"{sum(len(refs) for refs in by_language.values())} segments, batch_size={batch_size}"
+        )
         return results
 
+    def submit(
+        self,
+        audio_path: str,
+        language: Optional[str] = None,
+        task: str = "transcribe",
+        beam_size: int = 5,
+        vad_filter: bool = True,
+        delete_after: bool = False,
+    ) -> Future:
+        """
+        Ajoute un fichier à la file de transcription batchée
+
+        Les requêtes arrivant dans la fenêtre max_batch_wait_ms sont regroupées
+        dans un même transcribe_batch. La file est bornée: si elle est pleine,
+        TranscriptionQueueFull est levée immédiatement (à traduire en 503).
+
+        Avec delete_after=True, le worker devient propriétaire du fichier et le
+        supprime une fois la requête traitée ou annulée (l'appelant ne doit plus
+        y toucher). Si submit lève, le fichier reste à l'appelant.
+
+        Returns:
+            Future résolu avec le résultat de transcription
+        """
+        self._ensure_worker()
+        request = _QueuedRequest(
+            audio_path=audio_path,
+            options=(language, task, beam_size, vad_filter),
+            future=Future(),
+            delete_after=delete_after,
+        )
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            self.stats["rejected"] += 1
+            raise TranscriptionQueueFull(
+                f"File de transcription pleine ({self._queue.maxsize} requêtes en attente)"
+            )
+        return request.future
+
+    async def transcribe_async(self, audio_path: str, **kwargs) -> Dict[str, Any]:
+        """Version async de submit(): attend le résultat sans bloquer la boucle"""
+        return await asyncio.wrap_future(self.submit(audio_path, **kwargs))
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._batch_worker, name="whisper-batch", daemon=True
+                )
+                self._worker.start()
+
+    def _batch_worker(self) -> None:
+        """Regroupe les requêtes en attente et les transcrit par lots"""
+        while True:
+            pending = [self._queue.get()]
+            deadline = pending[0].enqueued_at + self.max_batch_wait
+            while len(pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    pending.append(
+                        self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+
+            # Un lot par jeu d'options (langue, tâche, beam, VAD)
+            groups: Dict[Tuple[Any, ...], List[_QueuedRequest]] = {}
+            for request in pending:
+                if request.future.set_running_or_notify_cancel():
+                    groups.setdefault(request.options, []).append(request)
+                else:
+                    # Annulée avant traitement (client parti): rien à décoder
+                    self._release(request)
+
+            for (language, task, beam_size, vad_filter), requests in groups.items():
+                try:
+                    try:
+                        with get_model_registry().lease(self.model_key):
+                            results = self.transcribe_batch(
+                                [request.audio_path for request in requests],
+                                language=language,
+                                task=task,
+                                beam_size=beam_size,
+                                vad_filter=vad_filter,
+                            )
+                    finally:
+                        for request in requests:
+                            self._release(request)
+                except Exception as e:
+                    logger.error(f"Erreur file de transcription: {e}")
+                    for request in requests:
+                        request.future.set_exception(e)
+                    continue
+
+                for request, result in zip(requests, results):
+                    if "error" in result:
+                        request.future.set_exception(RuntimeError(result["error"]))
+                    else:
+                        request.future.set_result(result)
+
+    @staticmethod
+    def _release(request: _QueuedRequest) -> None:
+        """Supprime le fichier d'une requête dont le worker est propriétaire"""
+        if not request.delete_after:
+            return
+        try:
+            Path(request.audio_path).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Suppression impossible {request.audio_path}: {e}")
+
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """Statistiques de la file de transcription batchée"""
+        return {
+            **self.stats,
+            "queued": self._queue.qsize(),
+            "max_queue_size": self._queue.maxsize,
+            "batch_size": self.batch_size,
+        }
+
     def detect_language(self, audio_path: str) -> Dict[str, float]:
         """
         Détecte la langue d'un fichier audio
@@ -265,15 +695,21 @@ def _detect_optimal_config() -> tuple[str, str]:
         return ("base", "int8")  # CPU compatible
 
 
+_engines: Dict[Tuple[str, str, str], WhisperEngine] = {}
+_engines_lock = threading.Lock()
+
+
 def get_whisper_engine(
     model_size: Optional[str] = None,
     device: str = "auto",
     compute_type: Optional[str] = None,
 ) -> WhisperEngine:
     """
-    Crée une instance du moteur Whisper avec détection hardware intelligente
+    Retourne le moteur Whisper pour une configuration, avec détection hardware intelligente
 
-    SINGLETON SUPPRIMÉ: Permet changement dynamique de config
+    Une instance est partagée par configuration (model_size, device, compute_type):
+    les requêtes concurrentes utilisent le même modèle chargé et la même file
+    de transcription batchée. Changer de config crée simplement un autre moteur.
 
     Args:
         model_size: Taille du modèle (None = auto-detect)
@@ -281,7 +717,7 @@ def get_whisper_engine(
         compute_type: Précision (None = auto-detect)
 
     Returns:
-        Nouvelle instance WhisperEngine
+        Instance WhisperEngine partagée pour cette configuration
 
     Hardware Aware:
         - GPU NVIDIA présent (Suisse) → float16 + large-v3
@@ -294,9 +730,21 @@ def get_whisper_engine(
         compute_type = compute_type or detected_compute
         logger.info(f"Config auto-détectée: {model_size} + {compute_type}")
 
-    # Créer NOUVELLE instance (pas de singleton)
-    return WhisperEngine(
-        model_size=model_size,
-        device=device,
-        compute_type=compute_type,
-    )
+    key = (model_size, device, compute_type)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = WhisperEngine(
+                model_size=model_size,
+                device=device,
+                compute_type=compute_type,
+                batch_size=int(os.getenv("WHISPER_BATCH_SIZE", "8")),
+                max_queue_size=int(os.getenv("WHISPER_MAX_QUEUE_SIZE", "64")),
+                max_batch_wait_ms=float(os.getenv("WHISPER_MAX_BATCH_WAIT_MS", "50")),
+            )
+            _engines[key] = engine
+    return engine
+
+
+# Préchargement au démarrage (MODEL_PRELOAD=whisper): config auto-détectée
+get_model_registry().register_preloader("whisper", get_whisper_engine)
@@ -1,17 +1,40 @@
 """
 WebSocket support for real-time updates
 Extended with chat room support for multi-user messaging
+
+Room broadcasts, presence and typing go through a broker backend
+(app/core/ws_broker.py): in-memory for a single process, Redis for
+several workers / replicas. Persistent room messages carry a per-room
+"seq" so clients can resume after a reconnect.
 """
+import os
+import asyncio
 import logging
 import json
-from typing import Dict, Set, Optional, List
+from typing import Dict, Set, Optional, List, Callable
 from fastapi import WebSocket, WebSocketDisconnect
 from dataclasses import dataclass, asdict, field
 from datetime import datetime
 from enum import Enum
 
+from .core.ws_broker import WSBroker, create_broker
+
+try:
+    from .monitoring import WS_CONNECTIONS, WS_SEND_QUEUE_DEPTH
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Fan-out: file d'envoi bornée par connexion
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_SEND_TIMEOUT_SEC = float(os.getenv("WS_SEND_TIMEOUT_SEC", "10"))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "disconnect")
+
+# Code de fermeture envoyé à un client trop lent ("Try Again Later")
+WS_CLOSE_SLOW_CONSUMER = 1013
+
 
 # ============================================================
 # WebSocket Event Types
@@ -113,26 +136,169 @@ class UserConnection:
         return False
 
 
+# ============================================================
+# Per-connection send queue
+# ============================================================
+
+class SlowConsumerPolicy(str, Enum):
+    """What to do when a client's send queue is full"""
+    DISCONNECT = "disconnect"    # fermer (le client se reconnecte et resynchronise)
+    DROP_OLDEST = "drop_oldest"  # garder les messages les plus récents
+    DROP_NEW = "drop_new"        # ignorer le nouveau message
+
+
+def encode_message(message: dict) -> str:
+    """Serialize once per broadcast (same format as WebSocket.send_json)"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class ConnectionSender:
+    """
+    Bounded send queue of one WebSocket, drained by its own task
+
+    A slow client only fills its own queue; when full, the slow consumer
+    policy applies. A send blocked longer than send_timeout_sec closes it.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        tenant_id: str,
+        user_id: Optional[int] = None,
+        max_queue: int = WS_SEND_QUEUE_SIZE,
+        send_timeout_sec: float = WS_SEND_TIMEOUT_SEC,
+        policy: Optional[str] = None,
+        stats: Optional[Dict[str, int]] = None,
+        on_close: Optional[Callable[["ConnectionSender", str], None]] = None,
+    ):
+        self.websocket = websocket
+        self.tenant_id = tenant_id
+        self.user_id = user_id
+        self.send_timeout_sec = send_timeout_sec
+        self.policy = SlowConsumerPolicy(policy or WS_SLOW_CONSUMER_POLICY)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.stats = stats if stats is not None else {"sent": 0, "dropped": 0, "slow_disconnects": 0}
+        self.closed = False
+        self._on_close = on_close
+        self._task = asyncio.create_task(self._drain(), name=f"ws-sender-{tenant_id}-{user_id}")
+
+    def enqueue(self, text: str) -> bool:
+        """Queue a serialized message without waiting (False if not queued)"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.policy == SlowConsumerPolicy.DROP_NEW:
+            self.stats["dropped"] += 1
+            return False
+        if self.policy == SlowConsumerPolicy.DROP_OLDEST:
+            self.queue.get_nowait()
+            self.queue.put_nowait(text)
+            self.stats["dropped"] += 1
+            return True
+
+        self.stats["slow_disconnects"] += 1
+        self._fail(f"send queue full ({self.queue.maxsize})")
+        return False
+
+    async def _drain(self):
+        try:
+            while not self.closed:
+                text = await self.queue.get()
+                # asyncio.timeout: pas de tâche intermédiaire par envoi (wait_for)
+                async with asyncio.timeout(self.send_timeout_sec):
+                    await self.websocket.send_text(text)
+                self.stats["sent"] += 1
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.stats["slow_disconnects"] += 1
+            self._fail(f"send blocked more than {self.send_timeout_sec}s")
+        except Exception as e:  # WebSocketDisconnect, transport fermé
+            self._fail(f"send failed: {e!r}")
+
+    def _fail(self, reason: str):
+        if self.closed:
+            return
+        logger.warning(f"Closing WebSocket sender (tenant {self.tenant_id}, user {self.user_id}): {reason}")
+        self.closed = True
+        if self._on_close:
+            self._on_close(self, reason)
+        self.close()
+
+    def close(self):
+        """Stop the drain task (pending messages are discarded)"""
+        self.closed = True
+        if not self._task.done() and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+
 class ConnectionManager:
     """Manage WebSocket connections with room support"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        send_queue_size: int = WS_SEND_QUEUE_SIZE,
+        send_timeout_sec: float = WS_SEND_TIMEOUT_SEC,
+        slow_consumer_policy: Optional[str] = None,
+        broker: Optional[WSBroker] = None,
+    ):
         # tenant_id -> Set of WebSocket connections (legacy)
         self.active_connections: Dict[str, Set[WebSocket]] = {}
 
-        # user_id -> UserConnection (new: tracks user's connection + rooms)
+        # user_id -> UserConnection (new: tracks user's connection + rooms on this node)
         self.user_connections: Dict[int, UserConnection] = {}
 
-        # room_id -> Set of user_ids (who's in which room)
+        # room_id -> Set of user_ids (who's in which room, local connections)
         self.room_members: Dict[str, Set[int]] = {}
 
         # Track typing indicators: room_id -> Set of user_ids
         self.typing_users: Dict[str, Set[int]] = {}
 
+        # WebSocket -> send queue + drain task (fan-out)
+        self.send_queue_size = send_queue_size
+        self.send_timeout_sec = send_timeout_sec
+        self.slow_consumer_policy = SlowConsumerPolicy(slow_consumer_policy or WS_SLOW_CONSUMER_POLICY)
+        self.senders: Dict[WebSocket, ConnectionSender] = {}
+        self.stats = {"sent": 0, "dropped": 0, "slow_disconnects": 0}
+
+        # Cross-node rooms, presence, typing and sequence numbers
+        self.broker = broker or create_broker()
+        self._background: Set[asyncio.Task] = set()
+
+    async def start(self):
+        """Connect the broker (messages from other nodes are delivered locally)"""
+        await self.broker.start(self._deliver_remote)
+
+    async def stop(self):
+        await self.close_all()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        await self.broker.stop()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
     async def connect(self, websocket: WebSocket, tenant_id: str, user_id: int = None):
         """Accept and store WebSocket connection"""
         await websocket.accept()
 
+        self.senders[websocket] = ConnectionSender(
+            websocket,
+            tenant_id,
+            user_id,
+            max_queue=self.send_queue_size,
+            send_timeout_sec=self.send_timeout_sec,
+            policy=self.slow_consumer_policy,
+            stats=self.stats,
+            on_close=self._on_sender_closed,
+        )
+
         # Legacy: tenant-based connections
         if tenant_id not in self.active_connections:
             self.active_connections[tenant_id] = set()
@@ -151,22 +317,29 @@ class ConnectionManager:
 
     def disconnect(self, websocket: WebSocket, tenant_id: str, user_id: int = None):
         """Remove WebSocket connection"""
+        sender = self.senders.pop(websocket, None)
+        if sender is not None:
+            sender.close()
+
         # Legacy cleanup
         if tenant_id in self.active_connections:
             self.active_connections[tenant_id].discard(websocket)
             if not self.active_connections[tenant_id]:
                 del self.active_connections[tenant_id]
 
-        # New: user-based cleanup
-        if user_id and user_id in self.user_connections:
+        # New: user-based cleanup (skip if the user already reconnected on another socket)
+        if user_id and user_id in self.user_connections and self.user_connections[user_id].websocket is websocket:
             user_conn = self.user_connections[user_id]
             # Remove from all rooms
             for room_id in user_conn.rooms:
                 if room_id in self.room_members:
                     self.room_members[room_id].discard(user_id)
+                    if not self.room_members[room_id]:
+                        del self.room_members[room_id]
                 # Clear typing indicator
                 if room_id in self.typing_users:
                     self.typing_users[room_id].discard(user_id)
+                self._spawn(self.broker.leave(room_id, user_id))
 
             del self.user_connections[user_id]
             logger.info(f"WebSocket disconnected for user {user_id}")
@@ -190,6 +363,7 @@ class ConnectionManager:
 
         # Track in user's connection
         self.user_connections[user_id].rooms.add(room_id)
+        await self.broker.join(room_id, user_id)
 
         logger.info(f"User {user_id} joined room {room_id}")
 
@@ -202,7 +376,8 @@ class ConnectionManager:
                 sender_id=user_id,
                 data={"user_id": user_id}
             ).to_dict(),
-            exclude_user=user_id
+            exclude_user=user_id,
+            persist=False
         )
         return True
 
@@ -219,6 +394,7 @@ class ConnectionManager:
         # Clear typing
         if room_id in self.typing_users:
             self.typing_users[room_id].discard(user_id)
+        await self.broker.leave(room_id, user_id)
 
         logger.info(f"User {user_id} left room {room_id}")
 
@@ -230,17 +406,53 @@ class ConnectionManager:
                 room_id=room_id,
                 sender_id=user_id,
                 data={"user_id": user_id}
-            ).to_dict()
+            ).to_dict(),
+            persist=False
         )
 
+    async def resume_room(self, user_id: int, room_id: str, last_seq: int) -> bool:
+        """
+        Replay the room messages a reconnecting user missed after last_seq
+
+        Returns False (and asks the client to resync) when some of them are
+        no longer in the replay log.
+        """
+        if user_id not in self.user_connections:
+            return False
+        websocket = self.user_connections[user_id].websocket
+        try:
+            texts, complete = await self.broker.replay(room_id, last_seq)
+        except Exception as e:
+            logger.warning(f"Replay unavailable for room {room_id}: {e}")
+            texts, complete = [], False
+        for text in texts:
+            self._enqueue(websocket, text)
+        if not complete:
+            self._enqueue(websocket, encode_message({"type": "resync_required", "room_id": room_id}))
+        return complete
+
     def get_room_users(self, room_id: str) -> List[int]:
-        """Get list of connected users in a room"""
+        """Get list of users in a room connected to this node"""
         return list(self.room_members.get(room_id, set()))
 
     def is_user_in_room(self, user_id: int, room_id: str) -> bool:
-        """Check if user is in a room"""
+        """Check if user is in a room on this node"""
         return room_id in self.room_members and user_id in self.room_members[room_id]
 
+    async def get_room_presence(self, room_id: str) -> Dict[str, List[int]]:
+        """Online and typing users of a room across all nodes"""
+        try:
+            return {
+                "online_users": await self.broker.room_members(room_id),
+                "typing_users": await self.broker.typing_users(room_id),
+            }
+        except Exception as e:
+            logger.warning(f"Room presence unavailable from broker, local view only: {e}")
+            return {
+                "online_users": self.get_online_users_in_room(room_id),
+                "typing_users": self.get_typing_users(room_id),
+            }
+
     # ============================================================
     # Typing Indicators
     # ============================================================
@@ -256,6 +468,7 @@ class ConnectionManager:
             self.typing_users[room_id].add(user_id)
         else:
             self.typing_users[room_id].discard(user_id)
+        await self.broker.set_typing(room_id, user_id, is_typing)
 
         await self.broadcast_to_room(
             room_id,
@@ -265,7 +478,8 @@ class ConnectionManager:
                 sender_id=user_id,
                 data={"user_id": user_id}
             ).to_dict(),
-            exclude_user=user_id
+            exclude_user=user_id,
+            persist=False
         )
 
     def get_typing_users(self, room_id: str) -> List[int]:
@@ -276,8 +490,26 @@ class ConnectionManager:
     # Message Sending
     # ============================================================
 
+    def _on_sender_closed(self, sender: ConnectionSender, reason: str):
+        """Send queue failed or saturated: drop the connection everywhere and close it"""
+        self.disconnect(sender.websocket, sender.tenant_id, sender.user_id)
+        asyncio.create_task(self._close_websocket(sender.websocket, WS_CLOSE_SLOW_CONSUMER, reason))
+
+    async def _close_websocket(self, websocket: WebSocket, code: int, reason: str):
+        try:
+            await asyncio.wait_for(websocket.close(code=code, reason=reason[:120]), self.send_timeout_sec)
+        except Exception:
+            pass  # déjà fermée ou client injoignable
+
+    def _enqueue(self, websocket: WebSocket, text: str) -> bool:
+        sender = self.senders.get(websocket)
+        return sender.enqueue(text) if sender is not None else False
+
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Send message to specific connection"""
+        if websocket in self.senders:
+            self._enqueue(websocket, encode_message(message))
+            return
         try:
             await websocket.send_json(message)
         except Exception as e:
@@ -289,64 +521,87 @@ class ConnectionManager:
             logger.debug(f"User {user_id} not connected, message not sent")
             return False
 
-        try:
-            await self.user_connections[user_id].websocket.send_json(message)
-            return True
-        except Exception as e:
-            logger.error(f"Error sending to user {user_id}: {e}")
-            return False
+        return self._enqueue(self.user_connections[user_id].websocket, encode_message(message))
 
     async def broadcast_to_room(
         self,
         room_id: str,
         message: dict,
-        exclude_user: int = None
-    ):
-        """Broadcast message to all users in a room"""
+        exclude_user: int = None,
+        persist: bool = True
+    ) -> int:
+        """
+        Broadcast message to all users in a room
+
+        Serialized once, published through the broker (other nodes) and
+        queued on every local member's connection without waiting for
+        delivery. Persistent messages get a "seq" and are kept for replay;
+        presence and typing events are sent with persist=False.
+        Returns the number of local connections the message was queued on.
+        """
+        _, text = await self.broker.publish_room(room_id, encode_message(message), exclude_user, persist)
+        return self._deliver_room(room_id, text, exclude_user)
+
+    def _deliver_room(self, room_id: str, text: str, exclude_user: Optional[int] = None) -> int:
         if room_id not in self.room_members:
-            return
+            return 0
 
-        disconnected_users = []
-        for user_id in self.room_members[room_id]:
+        queued = 0
+        # Copie: une file saturée peut déconnecter un membre pendant la boucle
+        for user_id in list(self.room_members[room_id]):
             if exclude_user and user_id == exclude_user:
                 continue
 
-            if user_id not in self.user_connections:
-                continue
+            user_conn = self.user_connections.get(user_id)
+            if user_conn is not None and self._enqueue(user_conn.websocket, text):
+                queued += 1
+        return queued
 
-            try:
-                await self.user_connections[user_id].websocket.send_json(message)
-            except WebSocketDisconnect:
-                disconnected_users.append(user_id)
-            except Exception as e:
-                logger.error(f"Error broadcasting to user {user_id} in room {room_id}: {e}")
-                disconnected_users.append(user_id)
-
-        # Clean up disconnected users
-        for user_id in disconnected_users:
-            if user_id in self.user_connections:
-                tenant_id = self.user_connections[user_id].tenant_id
-                websocket = self.user_connections[user_id].websocket
-                self.disconnect(websocket, tenant_id, user_id)
-
-    async def broadcast_to_tenant(self, tenant_id: str, message: dict):
+    async def broadcast_to_tenant(self, tenant_id: str, message: dict) -> int:
         """Broadcast message to all connections of a tenant (legacy)"""
+        text = encode_message(message)
+        await self.broker.publish_tenant(tenant_id, text)
+        return self._deliver_tenant(tenant_id, text)
+
+    def _deliver_tenant(self, tenant_id: str, text: str) -> int:
         if tenant_id not in self.active_connections:
-            return
+            return 0
+        return sum(self._enqueue(connection, text) for connection in list(self.active_connections[tenant_id]))
+
+    def _deliver_remote(self, meta: Dict, text: str):
+        """Message published by another node: deliver to local connections"""
+        if meta.get("kind") == "room":
+            self._deliver_room(meta["room_id"], text, meta.get("exclude"))
+        elif meta.get("kind") == "tenant":
+            self._deliver_tenant(meta["tenant_id"], text)
+
+    async def close_all(self, code: int = 1001):
+        """Shutdown: stop every drain task and close the sockets ("Going Away")"""
+        senders = list(self.senders.values())
+        for sender in senders:
+            self.disconnect(sender.websocket, sender.tenant_id, sender.user_id)
+        await asyncio.gather(
+            *(self._close_websocket(sender.websocket, code, "server shutdown") for sender in senders)
+        )
 
-        disconnected = set()
-        for connection in self.active_connections[tenant_id]:
-            try:
-                await connection.send_json(message)
-            except WebSocketDisconnect:
-                disconnected.add(connection)
-            except Exception as e:
-                logger.error(f"Error broadcasting to tenant {tenant_id}: {e}")
-                disconnected.add(connection)
-
-        # Clean up disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection, tenant_id)
+    def get_stats(self) -> Dict:
+        """Fan-out metrics: connections, send queue depth, drops, slow consumers"""
+        depths = [sender.queue.qsize() for sender in self.senders.values()]
+        if METRICS_AVAILABLE:
+            WS_CONNECTIONS.set(len(depths))
+            WS_SEND_QUEUE_DEPTH.labels(stat="total").set(sum(depths))
+            WS_SEND_QUEUE_DEPTH.labels(stat="max").set(max(depths, default=0))
+        return {
+            **self.stats,
+            "connections": len(depths),
+            "users": len(self.user_connections),
+            "rooms": len(self.room_members),
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "queue_size": self.send_queue_size,
+            "policy": self.slow_consumer_policy.value,
+            "broker": self.broker.get_stats(),
+        }
 
     async def send_progress_update(
         self,
@@ -0,0 +1,36 @@
+-- Migration 020: NOTIFY on API key / tenant changes
+-- Date: 2026-10-19
+-- Purpose: Invalidation du cache API key → tenant (app/core/tenant_cache.py)
+--          Les workers API écoutent le canal api_key_changes (LISTEN)
+
+-- Clé révoquée, modifiée (plan, quotas) ou supprimée
+CREATE OR REPLACE FUNCTION notify_api_key_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('api_key_changes', json_build_object('key_hash', OLD.key_hash)::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tr_api_keys_notify_change ON api_keys;
+
+CREATE TRIGGER tr_api_keys_notify_change
+    AFTER UPDATE OR DELETE ON api_keys
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_api_key_change();
+
+-- Tenant suspendu/réactivé ou renommé: toutes ses clés
+CREATE OR REPLACE FUNCTION notify_tenant_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('api_key_changes', json_build_object('tenant_id', OLD.id)::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tr_tenants_notify_change ON tenants;
+
+CREATE TRIGGER tr_tenants_notify_change
+    AFTER UPDATE OF status, name OR DELETE ON tenants
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_tenant_change();
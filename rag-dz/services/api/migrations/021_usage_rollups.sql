@@ -0,0 +1,42 @@
+-- Migration 021: Usage rollups per tenant / minute
+-- Date: 2026-10-19
+-- Purpose: Agrégats pré-calculés pour billing et quotas (app/core/usage_meter.py)
+--          Mis à jour dans la même transaction que chaque lot de usage_events
+
+CREATE TABLE IF NOT EXISTS usage_rollups_minute (
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,  -- date_trunc('minute', created_at)
+
+    requests INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,          -- status_code >= 500
+    tokens_input BIGINT NOT NULL DEFAULT 0,
+    tokens_output BIGINT NOT NULL DEFAULT 0,
+    audio_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    ocr_pages INTEGER NOT NULL DEFAULT 0,
+    latency_ms_total BIGINT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (tenant_id, bucket)
+);
+
+-- Agrégats globaux par période (billing mensuel, tableaux de bord)
+CREATE INDEX IF NOT EXISTS idx_usage_rollups_bucket ON usage_rollups_minute(bucket DESC);
+
+-- RLS: mêmes règles que usage_events
+ALTER TABLE usage_rollups_minute ENABLE ROW LEVEL SECURITY;
+ALTER TABLE usage_rollups_minute FORCE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS usage_rollups_tenant ON usage_rollups_minute;
+
+CREATE POLICY usage_rollups_tenant ON usage_rollups_minute
+    FOR ALL
+    TO PUBLIC
+    USING (
+        tenant_id = get_current_tenant()
+        OR is_superadmin()
+    )
+    WITH CHECK (
+        tenant_id = get_current_tenant()
+        OR is_superadmin()
+    );
+
+COMMENT ON TABLE usage_rollups_minute IS 'Per-tenant usage aggregated per minute (billing, quota checks)';
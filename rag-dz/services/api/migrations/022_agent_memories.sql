@@ -0,0 +1,30 @@
+-- Migration 022: Agent long-term memories
+-- Date: 2026-10-19
+-- Purpose: Persistance de LongTermMemory (app/services/agent_memory.py, backend postgres/supabase)
+--          Embeddings normalisés en float32 (BYTEA): chargés par utilisateur dans une matrice NumPy
+
+CREATE TABLE IF NOT EXISTS agent_memories (
+    id TEXT PRIMARY KEY,
+    memory_type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    metadata JSONB NOT NULL DEFAULT '{}'::jsonb,
+    importance TEXT NOT NULL DEFAULT 'medium',
+    embedding BYTEA,                            -- float32 little-endian, norme L2 = 1
+
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    last_accessed TIMESTAMP NOT NULL DEFAULT NOW(),
+    access_count INTEGER NOT NULL DEFAULT 0,
+
+    user_id TEXT,
+    session_id TEXT,
+    agent_id TEXT,
+    tags TEXT[] NOT NULL DEFAULT '{}'
+);
+
+-- Chargement d'un utilisateur (ordre d'insertion)
+CREATE INDEX IF NOT EXISTS idx_agent_memories_user ON agent_memories(user_id, created_at);
+
+-- forget(older_than / importance_below)
+CREATE INDEX IF NOT EXISTS idx_agent_memories_created ON agent_memories(created_at);
+
+COMMENT ON TABLE agent_memories IS 'Agent long-term memories with float32 embeddings (vector search done in-process)';
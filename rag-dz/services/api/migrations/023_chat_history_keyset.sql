@@ -0,0 +1,43 @@
+-- Migration 023: Chat history keyset pagination
+-- Date: 2026-10-19
+-- Purpose: Index composites pour la pagination par curseur de MemoryService
+--          get_messages: (session_id, created_at, id) et get_sessions: (tenant_id, user_id, is_archived, last_message_at, id)
+--          Remplace les index partiels/mono-colonne qui obligeaient à trier au-delà de la première page
+
+-- ============================================================
+-- chat_sessions: last_message_at devient la clé de tri keyset
+-- ============================================================
+
+-- NULLS LAST n'est pas exprimable dans une comparaison de tuples: on comble puis on interdit NULL
+UPDATE chat_sessions
+SET last_message_at = COALESCE(started_at, created_at, NOW())
+WHERE last_message_at IS NULL;
+
+ALTER TABLE chat_sessions ALTER COLUMN last_message_at SET DEFAULT NOW();
+ALTER TABLE chat_sessions ALTER COLUMN last_message_at SET NOT NULL;
+
+-- Liste des conversations: WHERE tenant_id, user_id, is_archived
+-- ORDER BY last_message_at DESC, id DESC (parcours d'index sans tri, reprise au curseur)
+CREATE INDEX IF NOT EXISTS idx_sessions_user_recent
+    ON chat_sessions(tenant_id, user_id, is_archived, last_message_at DESC, id DESC);
+
+-- Couverts par idx_sessions_user_recent
+DROP INDEX IF EXISTS idx_sessions_active;
+DROP INDEX IF EXISTS idx_sessions_last_msg;
+
+-- ============================================================
+-- chat_messages: (created_at, id) départage les messages de même horodatage
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_messages_session_keyset
+    ON chat_messages(session_id, created_at DESC, id DESC);
+
+-- Préfixe de idx_messages_session_keyset
+DROP INDEX IF EXISTS idx_messages_created;
+DROP INDEX IF EXISTS idx_messages_session;
+
+ANALYZE chat_sessions;
+ANALYZE chat_messages;
+
+COMMENT ON INDEX idx_sessions_user_recent IS 'Keyset pagination for MemoryService.get_sessions (cursor: last_message_at, id)';
+COMMENT ON INDEX idx_messages_session_keyset IS 'Keyset pagination for MemoryService.get_messages (cursor: created_at, id)';
@@ -0,0 +1,48 @@
+-- Migration 024: Chat message vector indexing outbox
+-- Date: 2026-10-19
+-- Purpose: File persistante d'indexation Qdrant des messages (app/services/message_indexer.py)
+--          Ligne insérée dans la transaction de MemoryService.add_message, supprimée une fois indexée
+--          Survit aux redémarrages; backoff et lettres mortes (failed_at) après MESSAGE_INDEX_MAX_ATTEMPTS
+
+CREATE TABLE IF NOT EXISTS chat_message_index_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    message_id UUID NOT NULL UNIQUE REFERENCES chat_messages(id) ON DELETE CASCADE,
+    session_id UUID NOT NULL,
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL,
+
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- bail du lot réclamé, puis backoff
+    last_error TEXT,
+    failed_at TIMESTAMPTZ,                               -- lettre morte: plus réclamée
+
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Réclamation des lots: ORDER BY next_attempt_at, id ... FOR UPDATE SKIP LOCKED
+CREATE INDEX IF NOT EXISTS idx_msg_index_outbox_due
+    ON chat_message_index_outbox(next_attempt_at, id) WHERE failed_at IS NULL;
+
+-- Lettres mortes (inspection / rejeu manuel: UPDATE ... SET failed_at = NULL, attempts = 0)
+CREATE INDEX IF NOT EXISTS idx_msg_index_outbox_failed
+    ON chat_message_index_outbox(failed_at) WHERE failed_at IS NOT NULL;
+
+-- RLS: insertion dans le contexte tenant du message, workers en super-admin
+ALTER TABLE chat_message_index_outbox ENABLE ROW LEVEL SECURITY;
+ALTER TABLE chat_message_index_outbox FORCE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS msg_index_outbox_tenant ON chat_message_index_outbox;
+
+CREATE POLICY msg_index_outbox_tenant ON chat_message_index_outbox
+    FOR ALL
+    TO PUBLIC
+    USING (
+        tenant_id = get_current_tenant()
+        OR is_superadmin()
+    )
+    WITH CHECK (
+        tenant_id = get_current_tenant()
+        OR is_superadmin()
+    );
+
+COMMENT ON TABLE chat_message_index_outbox IS 'Transactional outbox for batched Qdrant indexing of chat messages';
@@ -0,0 +1,13 @@
+-- Migration 025: Usage event idempotency key
+-- Date: 2026-10-19
+-- Purpose: Identifiant attribué à l'enregistrement (app/core/usage_meter.py), conservé dans les
+--          fichiers de déversement. Un lot expiré côté client mais committé côté serveur est
+--          rejoué sans doublon: ON CONFLICT (event_id) DO NOTHING, rollups calculés sur les
+--          seules lignes réellement insérées
+
+ALTER TABLE usage_events ADD COLUMN IF NOT EXISTS event_id UUID;
+
+-- Lignes antérieures: event_id NULL, jamais en conflit
+CREATE UNIQUE INDEX IF NOT EXISTS idx_usage_events_event_id ON usage_events(event_id);
+
+COMMENT ON COLUMN usage_events.event_id IS 'Idempotency key set when the event is recorded (batch replays insert each event once)';
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+BENCH_MIDDLEWARE - Surcoût de la pile de middlewares
+====================================================
+Compare BaseHTTPMiddleware (ancienne pile) et middlewares ASGI purs
+(app/core/asgi.py) à travail égal: 4 couches comme dans app/main.py
+(request id, auth, tenant, rate limit), chacune pose un header et/ou
+écrit dans request.state.
+
+Routes mesurées:
+- /health: réponse JSON minimale (surcoût par requête)
+- /api/llm/stream: StreamingResponse de N tokens, type réponse LLM
+  (temps jusqu'au premier token et durée totale du flux)
+
+Les requêtes sont envoyées directement à l'application ASGI (sans réseau
+ni client HTTP) pour isoler le coût des middlewares.
+
+Usage:
+    python scripts/bench_middleware.py
+    python scripts/bench_middleware.py --requests 5000 --tokens 500
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+# Ajouter le path du service (app.*)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.asgi import ASGIMiddleware, send_with_headers  # noqa: E402
+
+LAYERS = ("X-Request-Id", "X-Auth", "X-Tenant-Context", "X-RateLimit-Remaining")
+
+
+# ============================================
+# PILES COMPARÉES
+# ============================================
+
+def legacy_layer(header: str):
+    class Layer(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            setattr(request.state, header, "1")
+            response = await call_next(request)
+            response.headers[header] = "1"
+            return response
+    return Layer
+
+
+def asgi_layer(header: str):
+    class Layer(ASGIMiddleware):
+        async def handle(self, scope, receive, send):
+            scope.setdefault("state", {})[header] = "1"
+            await self.app(scope, receive, send_with_headers(send, lambda: {header: "1"}))
+    return Layer
+
+
+def build_app(layer_factory, tokens: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/api/llm/stream")
+    async def llm_stream(request: Request):
+        async def generate():
+            for i in range(tokens):
+                yield f"data: token {i}\n\n"
+                await asyncio.sleep(0)  # rend la main comme un vrai flux LLM
+        return StreamingResponse(generate(), media_type="text/event-stream")
+
+    for header in reversed(LAYERS):
+        app.add_middleware(layer_factory(header))
+    return app
+
+
+# ============================================
+# CLIENT ASGI MINIMAL
+# ============================================
+
+async def call(app, path: str):
+    """Retourne (temps jusqu'au premier octet de corps, durée totale) en secondes"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "server": ("bench", 80), "client": ("127.0.0.1", 1),
+        "headers": [(b"host", b"bench")],
+    }
+    pending = [{"type": "http.request", "body": b"", "more_body": False}]
+    disconnected = asyncio.Event()
+    start = time.perf_counter()
+    first_body = None
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal first_body
+        if message["type"] == "http.response.body" and message.get("body") and first_body is None:
+            first_body = time.perf_counter() - start
+
+    await app(scope, receive, send)
+    total = time.perf_counter() - start
+    disconnected.set()
+    return first_body or total, total
+
+
+async def measure(app, path: str, requests: int):
+    for _ in range(min(100, requests)):  # warm-up
+        await call(app, path)
+    samples = [await call(app, path) for _ in range(requests)]
+    return [s[0] for s in samples], [s[1] for s in samples]
+
+
+def summary(values):
+    values = sorted(values)
+    p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+    return statistics.mean(values) * 1e6, statistics.median(values) * 1e6, p99 * 1e6
+
+
+async def run(requests: int, stream_requests: int, tokens: int):
+    stacks = {
+        "BaseHTTPMiddleware": build_app(legacy_layer, tokens),
+        "ASGI pur": build_app(asgi_layer, tokens),
+    }
+
+    print(f"/health - {requests} requêtes, {len(LAYERS)} couches (µs)")
+    print(f"{'pile':<20}{'moyenne':>10}{'p50':>10}{'p99':>10}")
+    for name, app in stacks.items():
+        _, totals = await measure(app, "/health", requests)
+        print(f"{name:<20}" + "".join(f"{v:>10.1f}" for v in summary(totals)))
+
+    print(f"\n/api/llm/stream - {stream_requests} flux de {tokens} tokens (µs)")
+    print(f"{'pile':<20}{'1er token p50':>15}{'total p50':>12}{'total p99':>12}")
+    for name, app in stacks.items():
+        firsts, totals = await measure(app, "/api/llm/stream", stream_requests)
+        _, first_p50, _ = summary(firsts)
+        _, total_p50, total_p99 = summary(totals)
+        print(f"{name:<20}{first_p50:>15.1f}{total_p50:>12.1f}{total_p99:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Surcoût BaseHTTPMiddleware vs ASGI pur")
+    parser.add_argument("--requests", type=int, default=2000, help="requêtes /health par pile")
+    parser.add_argument("--stream-requests", type=int, default=200, help="flux par pile")
+    parser.add_argument("--tokens", type=int, default=200, help="tokens par flux")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.stream_requests, args.tokens))
+
+
+if __name__ == "__main__":
+    main()
@@ -48,6 +48,35 @@ def mock_request():
     return request
 
 
+async def call_tenant_middleware(path: str, headers: dict):
+    """Appelle TenantContextMiddleware (ASGI) sur une requête GET; retourne (status, app atteinte)."""
+    from app.tenant_middleware import TenantContextMiddleware
+    from starlette.responses import JSONResponse
+
+    reached = []
+    messages = []
+
+    async def app(scope, receive, send):
+        reached.append(scope["path"])
+        await JSONResponse({"ok": True})(scope, receive, send)
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    await TenantContextMiddleware(app)(scope, receive, send)
+    return messages[0]["status"], bool(reached)
+
+
 # === TEST CLASSES ===
 
 class TestTenantInjectionBlocked:
@@ -167,22 +196,10 @@ class TestTenantMiddlewareIntegration:
     """
 
     @pytest.mark.asyncio
-    async def test_protected_route_requires_jwt(self, mock_request):
+    async def test_protected_route_requires_jwt(self):
         """
         Route protégée sans JWT retourne 401.
         """
-        from app.tenant_middleware import TenantContextMiddleware
-        from starlette.responses import JSONResponse
-
-        mock_request.headers = Headers({
-            "X-Tenant-ID": str(uuid4())  # Header seul, pas de JWT
-        })
-        mock_request.state.tenant = None
-        mock_request.url.path = "/api/conversations"  # Route protégée
-
-        async def mock_call_next(request):
-            return JSONResponse({"ok": True})
-
         with patch("app.tenant_middleware.TenantContextMiddleware._extract_from_jwt") as mock_jwt:
             mock_jwt.return_value = None
 
@@ -191,31 +208,25 @@ class TestTenantMiddlewareIntegration:
                 settings_mock.environment = "production"  # Pas de default tenant
                 mock_settings.return_value = settings_mock
 
-                middleware = TenantContextMiddleware(app=MagicMock())
-                response = await middleware.dispatch(mock_request, mock_call_next)
+                status, reached = await call_tenant_middleware(
+                    "/api/conversations",
+                    {"X-Tenant-ID": str(uuid4())},  # Header seul, pas de JWT
+                )
 
-                # DOIT être 401 (pas de JWT)
-                assert response.status_code == 401
+        # DOIT être 401 (pas de JWT)
+        assert status == 401
+        assert not reached
 
     @pytest.mark.asyncio
-    async def test_public_route_bypasses_tenant_check(self, mock_request):
+    async def test_public_route_bypasses_tenant_check(self):
         """
         Routes publiques n'ont pas besoin de tenant_id.
         """
-        from app.tenant_middleware import TenantContextMiddleware
-        from starlette.responses import JSONResponse
-
-        mock_request.headers = Headers({})
-        mock_request.url.path = "/health"  # Route publique
-
-        async def mock_call_next(request):
-            return JSONResponse({"status": "healthy"})
-
-        middleware = TenantContextMiddleware(app=MagicMock())
-        response = await middleware.dispatch(mock_request, mock_call_next)
+        status, reached = await call_tenant_middleware("/health", {})
 
         # Route publique = 200 même sans tenant
-        assert response.status_code == 200
+        assert status == 200
+        assert reached
 
 
 class TestTenantIsolationRLS:
@@ -0,0 +1,174 @@
+"""
+Unit tests for the agent long-term memory vector index
+"""
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from app.services import agent_memory
+from app.services.agent_memory import LongTermMemory, MemoryStore, MemoryType, UserVectorIndex
+
+DIM = 32
+
+
+def brute_force(vectors, query, k):
+    """Ancienne implémentation: cosinus sur chaque vecteur puis tri complet"""
+    scores = [float(np.dot(v, query) / (np.linalg.norm(v) * np.linalg.norm(query))) for v in vectors]
+    return sorted(range(len(vectors)), key=lambda i: scores[i], reverse=True)[:k]
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(42)
+
+
+@pytest.fixture
+def memory(monkeypatch, rng):
+    """LongTermMemory en mémoire avec des embeddings déterministes par texte"""
+    vectors = {}
+
+    async def fake_embedding(text):
+        if text not in vectors:
+            vectors[text] = rng.normal(size=DIM).tolist()
+        return vectors[text]
+
+    ltm = LongTermMemory("memory")
+    ltm.embeddings_client = object()
+    monkeypatch.setattr(ltm, "_get_embedding", fake_embedding)
+    ltm.vectors = vectors
+    return ltm
+
+
+class SharedStore(MemoryStore):
+    """Persistance partagée entre deux workers (LongTermMemory distincts)"""
+
+    name = "shared"
+
+    def __init__(self):
+        self.rows = {}
+        self.loads = []
+        self.touched = []
+
+    async def load_user(self, user_id, created_since=None):
+        self.loads.append(created_since)
+        return [
+            (memory, vector) for memory, vector in self.rows.values()
+            if memory.user_id == user_id and (created_since is None or memory.created_at >= created_since)
+        ]
+
+    async def save(self, memory, vector):
+        self.rows[memory.id] = (memory, vector)
+
+    async def touch(self, memories):
+        self.touched.extend(memory.id for memory in memories)
+
+
+class TestUserVectorIndex:
+    """Test suite for UserVectorIndex"""
+
+    def test_top_k_matches_exact_cosine(self, rng):
+        vectors = rng.normal(size=(300, DIM))
+        index = UserVectorIndex(DIM)
+        for i, v in enumerate(vectors):
+            index.add(f"m{i}", v)
+        query = rng.normal(size=DIM)
+
+        hits = index.search(UserVectorIndex.normalize(query), k=5)
+
+        assert [memory_id for memory_id, _ in hits] == [f"m{i}" for i in brute_force(vectors, query, 5)]
+        assert index.vectors.dtype == np.float32
+        assert np.allclose(np.linalg.norm(index.vectors[:len(index)], axis=1), 1.0, atol=1e-5)
+
+    def test_remove_moves_last_row(self, rng):
+        index = UserVectorIndex(DIM)
+        vectors = rng.normal(size=(3, DIM))
+        for i, v in enumerate(vectors):
+            index.add(f"m{i}", v)
+
+        assert index.remove("m0")
+        assert not index.remove("m0")
+        assert index.ids == ["m2", "m1"] and index.rows == {"m2": 0, "m1": 1}
+        assert index.search(UserVectorIndex.normalize(vectors[2]), k=1)[0][0] == "m2"
+
+    def test_type_filter_and_dimension_check(self, rng):
+        index = UserVectorIndex(DIM)
+        v = rng.normal(size=DIM)
+        index.add("episodic", v, type_code=2)
+        index.add("semantic", v * 0.5 + rng.normal(size=DIM) * 0.01, type_code=3)
+
+        assert [m for m, _ in index.search(UserVectorIndex.normalize(v), k=5, type_code=3)] == ["semantic"]
+        with pytest.raises(ValueError):
+            index.add("bad", np.ones(DIM + 1))
+
+    def test_hnsw_index_for_large_users(self, rng):
+        pytest.importorskip("hnswlib")
+        index = UserVectorIndex(DIM, hnsw_threshold=200)
+        vectors = rng.normal(size=(500, DIM))
+        index.add_many([f"m{i}" for i in range(500)], vectors / np.linalg.norm(vectors, axis=1, keepdims=True), [0] * 500)
+
+        assert index.uses_hnsw
+        assert index.search(UserVectorIndex.normalize(vectors[123]), k=1)[0][0] == "m123"
+
+
+class TestLongTermMemoryRecall:
+    """Test suite for LongTermMemory.retrieve"""
+
+    @pytest.mark.asyncio
+    async def test_recall_only_searches_user_index(self, memory):
+        for i in range(20):
+            await memory.store(f"alice note {i}", user_id="alice")
+            await memory.store(f"bob note {i}", user_id="bob")
+
+        results = await memory.retrieve("alice note 7", user_id="alice", limit=3)
+
+        assert results[0].content == "alice note 7"
+        assert all(m.user_id == "alice" for m in results)
+        assert results[0].access_count == 1
+        assert results[0].embedding is None  # vecteur conservé dans l'index seulement
+        assert memory.indexed_count() == 40
+
+    @pytest.mark.asyncio
+    async def test_recall_filters_type_and_forgets(self, memory):
+        kept = await memory.store("rendez-vous à Oran", user_id="u1", memory_type=MemoryType.EPISODIC)
+        await memory.store("préférence: réponses courtes", user_id="u1", memory_type=MemoryType.SEMANTIC)
+
+        results = await memory.retrieve("rendez-vous à Oran", user_id="u1", memory_type=MemoryType.SEMANTIC)
+        assert [m.memory_type for m in results] == [MemoryType.SEMANTIC]
+
+        assert await memory.forget(memory_id=kept.id) == 1
+        assert kept.id not in memory.vector_indexes["u1"].rows
+        assert [m.content for m in await memory.retrieve("Oran", user_id="u1", limit=5)] == ["préférence: réponses courtes"]
+
+    @pytest.mark.asyncio
+    async def test_recall_picks_up_memories_stored_by_other_workers(self, memory):
+        store = SharedStore()
+        memory.persistence = store
+        other_worker = LongTermMemory("memory")
+        other_worker.persistence = store
+
+        await memory.store("alice aime le thé", user_id="alice")
+        assert [m.content for m in await memory.retrieve("thé", user_id="alice")] == ["alice aime le thé"]
+
+        other_worker.embeddings_client = memory.embeddings_client
+        other_worker._get_embedding = memory._get_embedding
+        await other_worker.store("alice habite Oran", user_id="alice")
+        assert "alice habite Oran" not in [m.content for m in await memory.retrieve("Oran", user_id="alice")]
+
+        # Après le délai de rechargement: seules les mémoires récentes sont relues
+        memory._loaded_users["alice"] -= timedelta(seconds=agent_memory.AGENT_MEMORY_RELOAD_SEC)
+        results = await memory.retrieve("alice habite Oran", user_id="alice", limit=5)
+
+        assert "alice habite Oran" in [m.content for m in results]
+        assert store.loads[0] is None and store.loads[-1] is not None
+        assert len(memory.user_memories["alice"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_recall_persists_access_stats(self, memory):
+        store = SharedStore()
+        memory.persistence = store
+        stored = await memory.store("rendez-vous à Oran", user_id="u1")
+
+        await memory.retrieve("rendez-vous à Oran", user_id="u1", limit=1)
+
+        assert store.touched == [stored.id]
@@ -0,0 +1,106 @@
+"""
+Unit tests for the pure ASGI middleware stack
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.security import middleware as security_middleware
+from app.security.middleware import EnhancedAuthMiddleware, RateLimitMiddleware
+from app.tenant_middleware import TenantContextMiddleware
+
+TENANT_ID = "550e8400-e29b-41d4-a716-446655440000"
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def api(monkeypatch, events):
+    async def fake_resolve(api_key):
+        return {"id": TENANT_ID, "plan": "pro"} if api_key == "good-key" else None
+
+    monkeypatch.setattr(security_middleware, "resolve_tenant", fake_resolve)
+    # tests/conftest.py désactive l'auth (ENABLE_API_KEY_AUTH=false): le tenant vient de la clé
+    monkeypatch.setattr(security_middleware.settings, "enable_api_key_auth", True)
+
+    api = FastAPI()
+
+    @api.get("/api/items")
+    async def items(request: Request):
+        return {"tenant": request.state.tenant["id"], "tenant_id": request.state.tenant_id}
+
+    @api.get("/api/stream")
+    async def stream():
+        async def tokens():
+            for i in range(3):
+                events.append(f"yield {i}")
+                yield f"token {i}\n"
+        return StreamingResponse(tokens(), media_type="text/plain")
+
+    api.add_middleware(RateLimitMiddleware)
+    api.add_middleware(TenantContextMiddleware)
+    api.add_middleware(EnhancedAuthMiddleware)
+    return api
+
+
+async def get(api, path, **headers):
+    transport = httpx.ASGITransport(app=api)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers=headers)
+
+
+class TestASGIMiddlewareStack:
+    """Test suite for the auth / tenant / rate limit middlewares"""
+
+    @pytest.mark.asyncio
+    async def test_state_and_headers_propagate(self, api):
+        response = await get(api, "/api/items", **{"X-API-Key": "good-key"})
+
+        assert response.status_code == 200
+        assert response.json() == {"tenant": TENANT_ID, "tenant_id": TENANT_ID}
+        assert response.headers["X-Tenant-Context"] == TENANT_ID
+        assert response.headers["X-Frame-Options"] == "DENY"
+        assert "X-RateLimit-Remaining" in response.headers
+
+    @pytest.mark.asyncio
+    async def test_rejections_short_circuit(self, api):
+        assert (await get(api, "/api/items")).status_code == 401
+        assert (await get(api, "/api/items", **{"X-API-Key": "bad-key"})).status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_streaming_body_is_not_buffered(self, api, events):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/api/stream", "raw_path": b"/api/stream",
+            "query_string": b"", "root_path": "", "server": ("test", 80), "client": ("127.0.0.1", 1234),
+            "headers": [(b"host", b"test"), (b"x-api-key", b"good-key")],
+        }
+
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await asyncio.Event().wait()  # client connecté jusqu'à la fin du flux
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                events.append(f"send {message['body'].decode().strip()}")
+            if message["type"] == "http.response.start":
+                headers = dict(message["headers"])
+                assert headers[b"x-tenant-context"] == TENANT_ID.encode()
+
+        await api(scope, receive, send)
+
+        # Chaque token part vers le client avant que le suivant ne soit généré
+        assert events == [
+            "yield 0", "send token 0",
+            "yield 1", "send token 1",
+            "yield 2", "send token 2",
+        ]
@@ -0,0 +1,165 @@
+"""
+Unit tests for the incremental context window
+"""
+import pytest
+
+from app.services import context_optimizer as co
+from app.services.context_optimizer import (
+    ContextCompressor,
+    IncrementalContextWindow,
+    TokenizerService,
+)
+
+
+class WordEncoder:
+    """Encodeur factice: un token par mot (tiktoken sans téléchargement)"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+class FakeCompressor(ContextCompressor):
+    def __init__(self, tokenizer):
+        super().__init__(tokenizer)
+        self.calls = []
+
+    async def summarize_into(self, previous_summary, messages, max_tokens=400, tenant_id=None):
+        self.calls.append(len(messages))
+        return f"résumé {len(self.calls)}"
+
+
+class DictStore:
+    def __init__(self):
+        self.states = {}
+
+    async def load(self, session_id, tenant_id):
+        return self.states.get((tenant_id, session_id))
+
+    async def save(self, session_id, tenant_id, state):
+        self.states[(tenant_id, session_id)] = state
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    co._token_counts.clear()
+    yield
+    co._token_counts.clear()
+
+
+def make_window(store=None):
+    tokenizer = TokenizerService("gpt-4o")
+    tokenizer._encoder = WordEncoder()
+    compressor = FakeCompressor(tokenizer)
+    return IncrementalContextWindow(tokenizer, compressor, store=store or DictStore(), summary_max_tokens=20)
+
+
+def history(n):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " + "mot " * 8}
+        for i in range(n)
+    ]
+
+
+class TestTokenizerService:
+    """Test suite for cached token counting"""
+
+    def test_counts_are_cached_and_include_overhead(self):
+        tokenizer = TokenizerService("gpt-4o")
+        tokenizer._encoder = encoder = WordEncoder()
+        messages = [{"role": "user", "content": "salam alikoum"}, {"role": "assistant", "content": "wa alikoum salam"}]
+
+        first = tokenizer.count_message_tokens(messages)
+        calls = encoder.calls
+        assert tokenizer.count_message_tokens(messages) == first == (4 + 1 + 2) + (4 + 1 + 3) + 2
+        assert encoder.calls == calls
+
+    def test_cache_is_keyed_by_text_digest(self):
+        tokenizer = TokenizerService("gpt-4o")
+        tokenizer._encoder = WordEncoder()
+        text = "mot " * 1000
+
+        assert tokenizer.count_tokens(text) == 1000
+        ((encoding, digest),) = co._token_counts
+        assert encoding == tokenizer.encoding_name and len(digest) == 20
+        assert tokenizer.count_tokens("mot " * 999) == 999
+
+
+class TestIncrementalContextWindow:
+    """Test suite for IncrementalContextWindow"""
+
+    @pytest.mark.asyncio
+    async def test_only_new_messages_are_tokenized(self):
+        window = make_window()
+        messages = history(10)
+
+        first = await window.build("s1", messages, budget=10_000, tenant_id="t1")
+        co._token_counts.clear()  # prouve que le 2e tour n'utilise que le cache de session
+        messages.append({"role": "user", "content": "nouvelle question"})
+        second = await window.build("s1", messages, budget=10_000, tenant_id="t1")
+
+        assert window.stats["tokenized_messages"] == 11
+        assert second["tokens"] == first["tokens"] + 4 + 1 + 2
+        assert len(second["messages"]) == 11 and not second["summarized"]
+
+    @pytest.mark.asyncio
+    async def test_summarizes_only_on_overflow(self):
+        store = DictStore()
+        window = make_window(store)
+        messages = []
+
+        for turn in range(40):
+            messages.append(history(40)[turn])
+            result = await window.build("s1", messages, budget=200, tenant_id="t1")
+            assert result["tokens"] <= 200
+
+        # ~15 tokens par message, fenêtre ramenée à 60 % du budget à chaque débordement
+        assert 1 < len(window.compressor.calls) < 10
+        assert result["messages"][0]["content"].endswith(f"résumé {len(window.compressor.calls)}")
+        assert result["messages"][-1]["content"] == messages[-1]["content"]
+        assert store.states[("t1", "s1")]["summarized_count"] == result["summarized_count"] > 0
+
+    @pytest.mark.asyncio
+    async def test_state_reloaded_from_session(self):
+        store = DictStore()
+        messages = history(30)
+        first = await make_window(store).build("s1", messages, budget=200, tenant_id="t1")
+
+        other_worker = make_window(store)
+        second = await other_worker.build("s1", messages, budget=200, tenant_id="t1")
+
+        assert other_worker.compressor.calls == []
+        assert second["messages"] == first["messages"]
+
+    @pytest.mark.asyncio
+    async def test_edited_history_resets_state(self):
+        window = make_window()
+        messages = history(30)
+        await window.build("s1", messages, budget=200, tenant_id="t1")
+        summarized = window.sessions["s1"].summarized_count
+
+        messages[summarized - 1] = {"role": "user", "content": "message supprimé"}
+        await window.build("s1", messages, budget=200, tenant_id="t1")
+
+        assert window.stats["resets"] == 1
+        assert window.sessions["s1"].summary == f"résumé {len(window.compressor.calls)}"
+
+    @pytest.mark.asyncio
+    async def test_fallback_compression_keeps_unknown_roles(self):
+        window = make_window()
+        messages = [
+            {"role": "user", "content": "question " + "mot " * 40},
+            {"role": "tool", "content": "résultat outil"},
+            {"role": "assistant", "content": "réponse courte"},
+        ]
+
+        result = await window.build("s1", messages, budget=30, tenant_id="t1")
+
+        assert result["tokens"] <= 30
+        assert [m["role"] for m in result["messages"]][-2:] == ["tool", "assistant"]
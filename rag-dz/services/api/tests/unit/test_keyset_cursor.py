@@ -0,0 +1,28 @@
+"""
+Unit tests for keyset pagination cursors (chat history)
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.pagination import decode_keyset_cursor, encode_keyset_cursor
+
+
+class TestKeysetCursor:
+    """Test suite for encode_keyset_cursor / decode_keyset_cursor"""
+
+    def test_round_trip_keeps_microseconds_and_timezone(self):
+        created_at = datetime(2026, 10, 19, 8, 30, 12, 345678, tzinfo=timezone(timedelta(hours=1)))
+        cursor = encode_keyset_cursor(created_at, "0b4c4d3e-7f0a-4c55-9d43-2f1f6f7c1a10")
+
+        assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+        assert decode_keyset_cursor(cursor) == (created_at, "0b4c4d3e-7f0a-4c55-9d43-2f1f6f7c1a10")
+
+    def test_ties_on_timestamp_give_distinct_cursors(self):
+        created_at = datetime(2026, 10, 19, tzinfo=timezone.utc)
+        assert encode_keyset_cursor(created_at, "a") != encode_keyset_cursor(created_at, "b")
+
+    @pytest.mark.parametrize("cursor", ["", "pas-un-curseur", "WzFd", "eyJhIjogMX0"])
+    def test_invalid_cursor_raises_value_error(self, cursor):
+        with pytest.raises(ValueError):
+            decode_keyset_cursor(cursor)
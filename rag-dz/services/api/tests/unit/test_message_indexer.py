@@ -0,0 +1,192 @@
+"""
+Unit tests for the batched message indexer (outbox, retries, restarts)
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.message_indexer import MessageIndexer
+
+
+class MemoryOutbox:
+    """Outbox en mémoire: mêmes règles de bail, backoff et lettre morte que CLAIM_SQL/RETRY_SQL"""
+
+    def __init__(self):
+        self.rows = {}
+        self.next_id = 1
+
+    def add(self, n, content="salam"):
+        for _ in range(n):
+            self.rows[self.next_id] = {
+                "id": self.next_id, "message_id": f"m{self.next_id}", "session_id": "s1",
+                "tenant_id": "t1", "user_id": 7, "attempts": 0, "content": content,
+                "next_attempt_at": time.monotonic(), "failed_at": None, "created_at": time.monotonic(),
+            }
+            self.next_id += 1
+
+    async def claim(self, limit, lease_sec):
+        now = time.monotonic()
+        due = [r for r in self.rows.values() if r["failed_at"] is None and r["next_attempt_at"] <= now]
+        claimed = []
+        for row in sorted(due, key=lambda r: (r["next_attempt_at"], r["id"]))[:limit]:
+            row["attempts"] += 1
+            row["next_attempt_at"] = now + lease_sec
+            claimed.append(dict(row))
+        return claimed
+
+    async def complete(self, ids):
+        for i in ids:
+            self.rows.pop(i, None)
+
+    async def retry(self, ids, error, max_attempts, retry_base_sec, retry_max_sec):
+        now = time.monotonic()
+        for i in ids:
+            row = self.rows[i]
+            row["next_attempt_at"] = now + min(retry_base_sec * 2 ** (row["attempts"] - 1), retry_max_sec)
+            if row["attempts"] >= max_attempts:
+                row["failed_at"] = now
+
+    async def lag(self):
+        pending = [r for r in self.rows.values() if r["failed_at"] is None]
+        oldest = min((r["created_at"] for r in pending), default=time.monotonic())
+        return {
+            "pending": len(pending),
+            "failed": len(self.rows) - len(pending),
+            "oldest_pending_sec": round(time.monotonic() - oldest, 1),
+        }
+
+
+class FakeSink:
+    """Embeddings + upsert Qdrant factices: enregistre les lots, peut échouer ou bloquer"""
+
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.failures = 0
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, items):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("qdrant unavailable")
+            self.batches.append([item["message_id"] for item in items])
+            return len(items)
+        finally:
+            self.active -= 1
+
+
+def make_indexer(outbox, sink, **kwargs):
+    kwargs.setdefault("batch_size", 4)
+    kwargs.setdefault("workers", 1)
+    kwargs.setdefault("linger_sec", 0)
+    kwargs.setdefault("poll_interval_sec", 60)
+    kwargs.setdefault("retry_base_sec", 0)
+    return MessageIndexer(outbox=outbox, sink=sink, **kwargs)
+
+
+async def wait_until(predicate, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.005)
+
+
+class TestMessageIndexer:
+    """Test suite for MessageIndexer"""
+
+    @pytest.mark.asyncio
+    async def test_burst_is_indexed_in_batches(self):
+        outbox, sink = MemoryOutbox(), FakeSink()
+        indexer = make_indexer(outbox, sink)
+
+        outbox.add(10)
+        assert await indexer.run_once() == 4
+        assert await indexer.run_once() == 4
+        assert await indexer.run_once() == 2
+        assert await indexer.run_once() == 0
+
+        assert [len(b) for b in sink.batches] == [4, 4, 2]
+        assert sink.batches[0] == ["m1", "m2", "m3", "m4"]
+        assert outbox.rows == {}
+        assert indexer.get_stats()["indexed"] == 10
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_retried_then_dead_lettered(self):
+        outbox, sink = MemoryOutbox(), FakeSink()
+        indexer = make_indexer(outbox, sink, max_attempts=3)
+        outbox.add(2)
+
+        sink.failures = 1
+        await indexer.run_once()
+        assert len(outbox.rows) == 2 and indexer.stats["retried"] == 2
+        await indexer.run_once()
+        assert outbox.rows == {} and sink.batches == [["m1", "m2"]]
+
+        outbox.add(1)
+        sink.failures = 3
+        for _ in range(3):
+            await indexer.run_once()
+        assert await indexer.run_once() == 0  # plus réclamé
+        assert indexer.stats["dead_lettered"] == 1
+        assert (await indexer.refresh_lag())["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_backoff_delays_retry(self):
+        outbox, sink = MemoryOutbox(), FakeSink()
+        indexer = make_indexer(outbox, sink, retry_base_sec=30)
+        outbox.add(1)
+        sink.failures = 1
+
+        await indexer.run_once()
+
+        assert await indexer.run_once() == 0
+        assert outbox.rows[1]["next_attempt_at"] - time.monotonic() > 25
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_reclaimed_after_crash(self):
+        outbox, sink = MemoryOutbox(), FakeSink()
+        outbox.add(3)
+        await outbox.claim(3, lease_sec=0.01)  # worker mort avant complete()
+
+        indexer = make_indexer(outbox, sink)
+        assert await indexer.run_once() == 0
+        await asyncio.sleep(0.02)
+        assert await indexer.run_once() == 3
+        assert outbox.rows == {}
+
+    @pytest.mark.asyncio
+    async def test_start_drains_outbox_left_by_previous_process(self):
+        outbox, sink = MemoryOutbox(), FakeSink()
+        outbox.add(9)
+        indexer = make_indexer(outbox, sink)
+
+        await indexer.start()
+        await wait_until(lambda: not outbox.rows)
+        await indexer.stop()
+
+        assert [len(b) for b in sink.batches] == [4, 4, 1]
+        assert indexer.get_stats()["pending"] == 0 and not indexer.running
+
+    @pytest.mark.asyncio
+    async def test_notifications_coalesce_and_concurrency_is_bounded(self):
+        outbox, sink = MemoryOutbox(), FakeSink(delay=0.02)
+        indexer = make_indexer(outbox, sink, workers=2, batch_size=8, linger_sec=0.05)
+        await indexer.start()
+        await asyncio.sleep(0.01)
+
+        for _ in range(40):  # rafale: un message commité puis notify() à chaque fois
+            outbox.add(1)
+            indexer.notify()
+            await asyncio.sleep(0)
+        await wait_until(lambda: not outbox.rows)
+        await indexer.stop()
+
+        assert sum(len(b) for b in sink.batches) == 40
+        assert len(sink.batches) <= 6
+        assert sink.max_active <= 2
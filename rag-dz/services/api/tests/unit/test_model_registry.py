@@ -0,0 +1,121 @@
+"""
+Unit tests for the shared model registry (residency + LRU memory budget)
+"""
+import threading
+import time
+
+import pytest
+
+from app.core.model_registry import ModelRegistry
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+
+
+def counting_loader(name, loads, delay=0.0):
+    def load():
+        time.sleep(delay)
+        loads.append(name)
+        return FakeModel(name)
+    return load
+
+
+class TestModelRegistry:
+    """Test suite for ModelRegistry"""
+
+    def test_single_instance_under_concurrent_loads(self):
+        registry = ModelRegistry()
+        loads = []
+        registry.register("whisper", counting_loader("whisper", loads, delay=0.05))
+
+        instances = []
+        threads = [
+            threading.Thread(target=lambda: instances.append(registry.get("whisper")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert loads == ["whisper"]
+        assert len({id(instance) for instance in instances}) == 1
+        stats = registry.stats()["models"][0]
+        assert stats["loads"] == 1 and stats["hits"] == 7
+        assert stats["load_time_ms"] >= 50
+
+    def test_lru_unloads_idle_models_over_budget(self):
+        registry = ModelRegistry(memory_budget_mb=1000, min_idle_sec=0)
+        loads = []
+        for name in ("a", "b", "c"):
+            registry.register(name, counting_loader(name, loads), size_mb=400)
+
+        registry.get("a")
+        registry.get("b")
+        registry.get("a")  # b devient le moins récemment utilisé
+        registry.get("c")
+
+        assert registry.is_loaded("a") and registry.is_loaded("c")
+        assert not registry.is_loaded("b")
+        assert registry.stats()["resident_mb"] == 800
+
+        registry.get("b")  # rechargé à la demande
+        assert loads == ["a", "b", "c", "b"]
+
+    def test_leased_and_pinned_models_are_not_unloaded(self):
+        registry = ModelRegistry(memory_budget_mb=500, min_idle_sec=0)
+        loads = []
+        registry.register("pinned", counting_loader("pinned", loads), size_mb=300, pinned=True)
+        registry.register("leased", counting_loader("leased", loads), size_mb=300)
+        registry.register("new", counting_loader("new", loads), size_mb=300)
+
+        registry.get("pinned")
+        with registry.lease("leased"):
+            registry.get("new")
+            assert registry.is_loaded("pinned") and registry.is_loaded("leased")
+
+        assert registry.stats()["resident_mb"] == 900  # budget dépassé, rien d'inactif
+
+    def test_recently_used_models_are_kept(self):
+        registry = ModelRegistry(memory_budget_mb=500, min_idle_sec=60)
+        loads = []
+        registry.register("a", counting_loader("a", loads), size_mb=300)
+        registry.register("b", counting_loader("b", loads), size_mb=300)
+
+        registry.get("a")
+        registry.get("b")
+        assert registry.is_loaded("a")
+
+    def test_preload_reports_each_alias(self):
+        registry = ModelRegistry()
+        loads = []
+        registry.register("xtts_v2", counting_loader("xtts_v2", loads))
+        registry.register_preloader("xtts", lambda: registry.get("xtts_v2"))
+
+        def broken():
+            raise RuntimeError("no weights")
+        registry.register_preloader("reranker", broken)
+
+        results = registry.preload(["xtts", "reranker", "unknown"])
+
+        assert results["xtts"] == "loaded"
+        assert results["reranker"].startswith("error")
+        assert results["unknown"] == "unknown model"
+        assert registry.is_loaded("xtts_v2")
+
+    def test_failed_load_is_not_cached(self):
+        registry = ModelRegistry()
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("download failed")
+            return FakeModel("ok")
+
+        registry.register("model", flaky)
+        with pytest.raises(OSError):
+            registry.get("model")
+        assert registry.get("model").name == "ok"
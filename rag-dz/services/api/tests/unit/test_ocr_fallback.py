@@ -0,0 +1,119 @@
+"""
+Unit tests for the concurrent LLM vision fallback on PDF pages
+"""
+import asyncio
+import io
+import threading
+
+import pytest
+from PIL import Image
+
+from app.ocr import ocr_dz_pipeline
+from app.ocr.ocr_dz_pipeline import OCRPipeline, PageOCRResult, PageRoute, prepare_vision_image
+
+VISION_TEXT = "Texte relu par le modèle de vision: arrêté du ministre des finances."
+
+
+def scanned_page(page_number, size=(1240, 1754)):
+    return Image.new("L", size, color=page_number * 10)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    ocr_dz_pipeline._fallback_cache.clear()
+    yield
+    ocr_dz_pipeline._fallback_cache.clear()
+
+
+@pytest.fixture
+def scanned_pdf(monkeypatch):
+    """PDF factice de 6 pages scannées, toutes à faible confiance Tesseract"""
+    monkeypatch.setattr(ocr_dz_pipeline, "_count_pdf_pages", lambda path, poppler_path=None: 6)
+    monkeypatch.setattr(ocr_dz_pipeline, "_extract_text_layer", lambda path, max_pages: [])
+    monkeypatch.setattr(
+        ocr_dz_pipeline, "_rasterize_pdf_page",
+        lambda path, page_number, dpi, poppler_path=None: scanned_page(page_number),
+    )
+
+    def low_confidence_ocr(self, image, language_hint=None, config=None):
+        return PageOCRResult(page_number=1, text="x", language="unknown", confidence=0.1)
+
+    monkeypatch.setattr(OCRPipeline, "extract_text_from_image", low_confidence_ocr)
+
+
+def counting_provider(monkeypatch, delay=0.05):
+    state = {"calls": 0, "in_flight": 0, "peak": 0, "sizes": []}
+    lock = threading.Lock()
+
+    async def vision(self, image_bytes, language_hint=None):
+        with lock:
+            state["calls"] += 1
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            state["sizes"].append(Image.open(io.BytesIO(image_bytes)).size)
+        await asyncio.sleep(delay)
+        with lock:
+            state["in_flight"] -= 1
+        return VISION_TEXT
+
+    monkeypatch.setattr(OCRPipeline, "_claude_vision_ocr", vision)
+    return state
+
+
+class TestVisionFallback:
+    """Test suite for the PDF vision fallback"""
+
+    def test_pages_run_concurrently_within_limit(self, scanned_pdf, monkeypatch):
+        state = counting_provider(monkeypatch)
+        pipeline = OCRPipeline(page_workers=1, fallback_concurrency=3)
+
+        result = pipeline.extract_text_from_pdf(b"%PDF-1.4", dpi=150)
+
+        assert state["calls"] == 6
+        assert state["peak"] == 3
+        assert all(p.route == PageRoute.LLM_FALLBACK for p in result.pages_detail)
+        assert result.fallback_used
+
+    def test_identical_pages_hit_cache(self, scanned_pdf, monkeypatch):
+        state = counting_provider(monkeypatch, delay=0)
+        pipeline = OCRPipeline(page_workers=1, fallback_concurrency=1)
+
+        pipeline.extract_text_from_pdf(b"%PDF-1.4", max_pages=2)
+        pipeline.extract_text_from_pdf(b"%PDF-1.4", max_pages=2)
+
+        assert state["calls"] == 2
+        assert pipeline.get_status()["fallback_cache"]["hits"] == 2
+
+    def test_images_are_downscaled_before_upload(self, scanned_pdf, monkeypatch):
+        monkeypatch.setattr(
+            ocr_dz_pipeline, "_rasterize_pdf_page",
+            lambda path, page_number, dpi, poppler_path=None: scanned_page(page_number, (2480, 3508)),
+        )
+        state = counting_provider(monkeypatch, delay=0)
+        pipeline = OCRPipeline(page_workers=1)
+
+        pipeline.extract_text_from_pdf(b"%PDF-1.4", max_pages=1)
+
+        assert max(state["sizes"][0]) == ocr_dz_pipeline.OCR_FALLBACK_MAX_SIDE
+
+    def test_prepare_vision_image_compresses_png(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (3000, 4000), color=(250, 250, 250)).save(buffer, format="PNG")
+
+        prepared = prepare_vision_image(buffer.getvalue())
+
+        assert prepared[:3] == b"\xff\xd8\xff"
+        assert max(Image.open(io.BytesIO(prepared)).size) == ocr_dz_pipeline.OCR_FALLBACK_MAX_SIDE
+
+    def test_sync_fallback_from_worker_thread(self, monkeypatch):
+        counting_provider(monkeypatch, delay=0)
+        pipeline = OCRPipeline()
+        buffer = io.BytesIO()
+        scanned_page(1).save(buffer, format="PNG")
+        results = []
+
+        thread = threading.Thread(target=lambda: results.append(pipeline.fallback_llm_ocr(buffer.getvalue())))
+        thread.start()
+        thread.join()
+
+        assert results == [VISION_TEXT]
@@ -0,0 +1,217 @@
+"""
+Unit tests for the persistent OCR batch job queue
+"""
+import asyncio
+import importlib
+import io
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.ocr import ocr_dz_pipeline, ocr_jobs
+from app.ocr.ocr_dz_pipeline import OCRPipeline, PageOCRResult
+from app.ocr.ocr_jobs import OCRJob, OCRJobFile, OCRJobManager, OCRJobStatus, OCRJobStore
+
+# app.ocr réexporte le routeur sous le même nom que le module
+ocr_router = importlib.import_module("app.ocr.ocr_router")
+
+
+class FakePage:
+    def __init__(self, page_number):
+        self.page_number = page_number
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def ocred_pages(monkeypatch):
+    """PDF factice de 5 pages scannées; retourne la liste des pages OCRisées"""
+    ocred = []
+    count = lambda path, poppler_path=None: 5
+    monkeypatch.setattr(ocr_dz_pipeline, "_count_pdf_pages", count)
+    monkeypatch.setattr(ocr_jobs, "_count_pdf_pages", count)
+    monkeypatch.setattr(ocr_dz_pipeline, "_extract_text_layer", lambda path, max_pages: [])
+    monkeypatch.setattr(
+        ocr_dz_pipeline, "_rasterize_pdf_page",
+        lambda path, page_number, dpi, poppler_path=None: FakePage(page_number),
+    )
+
+    def fake_ocr(self, image, language_hint=None, config=None):
+        page_number = getattr(image, "page_number", 0)
+        ocred.append(page_number)
+        return PageOCRResult(
+            page_number=1,
+            text=f"Page {page_number}: arrêté ministériel du 12 mars 2024",
+            language="fr",
+            confidence=0.9,
+        )
+
+    monkeypatch.setattr(OCRPipeline, "extract_text_from_image", fake_ocr)
+    return ocred
+
+
+def make_manager(tmp_path, workers=2):
+    return OCRJobManager(
+        store=OCRJobStore(str(tmp_path)),
+        workers=workers,
+        pipeline_factory=lambda enable_fallback: OCRPipeline(enable_fallback=False, page_workers=1),
+    )
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("L", (50, 50), color=255).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def staged(tmp_path, *files):
+    """Fichiers déjà sur disque (comme les uploads copiés par le router)"""
+    uploads = tmp_path / "uploads"
+    uploads.mkdir(exist_ok=True)
+    paths = []
+    for name, data in files:
+        (uploads / name).write_bytes(data)
+        paths.append((name, uploads / name))
+    return paths
+
+
+async def wait_done(manager, job_id):
+    async for summary in manager.watch(job_id, poll_interval=0.05):
+        pass
+    return summary
+
+
+class TestOCRJobs:
+    """Test suite for OCRJobManager"""
+
+    @pytest.mark.asyncio
+    async def test_job_runs_in_background_and_persists(self, tmp_path, ocred_pages):
+        manager = make_manager(tmp_path)
+        job = await manager.submit(staged(tmp_path, ("jo.pdf", b"%PDF-1.4 ..."), ("scan.png", png_bytes())))
+        assert job.status == OCRJobStatus.QUEUED
+        assert job.files[0].is_pdf and not job.files[1].is_pdf
+        assert not (tmp_path / "uploads" / "jo.pdf").exists()  # déplacé dans inputs/
+
+        summary = await wait_done(manager, job.job_id)
+        await manager.stop()
+
+        assert summary["status"] == "completed"
+        assert summary["files_done"] == 2
+        assert job.files[0].pages_done == 5 and job.files[0].pages_total == 5
+        results = [result async for _, result in manager.results(job.job_id)]
+        assert results[0].pages == 5 and "Page 5" in results[0].text
+        assert results[1] is not None
+
+        reloaded = OCRJobStore(str(tmp_path)).load(job.job_id)
+        assert reloaded.status == OCRJobStatus.COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_interrupted_pdf_resumes_after_last_persisted_page(self, tmp_path, ocred_pages):
+        store = OCRJobStore(str(tmp_path))
+        job = OCRJob(
+            job_id="abc123",
+            status=OCRJobStatus.RUNNING,
+            enable_fallback=False,
+            files=[OCRJobFile(index=0, filename="jo.pdf", is_pdf=True, status=OCRJobStatus.RUNNING)],
+        )
+        store.create(job, staged(tmp_path, ("jo.pdf", b"%PDF-1.4 ...")))
+        for page_number in (1, 2):
+            store.append_page("abc123", 0, PageOCRResult(
+                page_number=page_number, text=f"Page {page_number} déjà faite", language="fr", confidence=0.9,
+            ))
+        with open(tmp_path / "abc123" / "pages" / "0.jsonl", "a") as f:
+            f.write('{"page_number": 3, "te')  # arrêt brutal pendant l'écriture
+
+        manager = make_manager(tmp_path)
+        assert await manager.start() == 1
+        summary = await wait_done(manager, "abc123")
+        await manager.stop()
+
+        assert summary["status"] == "completed"
+        assert ocred_pages == [3, 4, 5]
+        result = store.read_result("abc123", 0)
+        assert [p.page_number for p in result.pages_detail] == [1, 2, 3, 4, 5]
+        assert "Page 1 déjà faite" in result.text
+
+    @pytest.mark.asyncio
+    async def test_cancel_skips_queued_files(self, tmp_path, ocred_pages):
+        manager = make_manager(tmp_path, workers=1)
+        await manager.start()
+        job = await manager.submit(staged(tmp_path, *[(f"doc{i}.pdf", b"%PDF-1.4") for i in range(3)]))
+        await manager.cancel(job.job_id)
+        await asyncio.sleep(0.1)
+        await manager.stop()
+
+        assert job.status == OCRJobStatus.CANCELLED
+        assert all(f.status == OCRJobStatus.CANCELLED for f in job.files)
+        assert len(ocred_pages) <= 5
+
+    @pytest.mark.asyncio
+    async def test_invalid_job_id_is_not_found(self, tmp_path):
+        manager = make_manager(tmp_path)
+        assert manager.get("../etc") is None
+        assert not await manager.delete("../etc")
+
+
+@pytest.fixture
+def jobs_client(tmp_path, monkeypatch, ocred_pages):
+    """API jobs avec un tenant par requête (en-tête X-Test-Tenant → request.state.tenant_id)"""
+    manager = make_manager(tmp_path / "jobs")
+    monkeypatch.setattr(ocr_router, "get_ocr_job_manager", lambda: manager)
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def tenant_state(request: Request, call_next):
+        request.state.tenant_id = request.headers.get("X-Test-Tenant")
+        return await call_next(request)
+
+    app.include_router(ocr_router.router)
+    with TestClient(app) as client:
+        yield client, manager
+
+
+class TestOCRJobsAPI:
+    """Test suite for the /api/ocr/jobs endpoints"""
+
+    def test_upload_is_streamed_into_job_inputs(self, jobs_client):
+        client, manager = jobs_client
+        response = client.post(
+            "/api/ocr/jobs",
+            files=[("files", ("jo.pdf", b"%PDF-1.4 ...", "application/pdf"))],
+            headers={"X-Test-Tenant": "tenant-a"},
+        )
+
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert response.json()["tenant_id"] == "tenant-a"
+        assert manager.store.input_path(job_id, 0).read_bytes() == b"%PDF-1.4 ..."
+
+    def test_empty_upload_is_rejected_and_cleaned_up(self, jobs_client):
+        client, manager = jobs_client
+        response = client.post(
+            "/api/ocr/jobs",
+            files=[("files", ("vide.pdf", b"", "application/pdf"))],
+            headers={"X-Test-Tenant": "tenant-a"},
+        )
+
+        assert response.status_code == 400
+        assert list(manager.store.root.iterdir()) == []
+
+    def test_jobs_are_scoped_to_tenant(self, jobs_client):
+        client, _ = jobs_client
+        owner, other = {"X-Test-Tenant": "tenant-a"}, {"X-Test-Tenant": "tenant-b"}
+        job_id = client.post(
+            "/api/ocr/jobs", files=[("files", ("jo.pdf", b"%PDF-1.4", "application/pdf"))], headers=owner,
+        ).json()["job_id"]
+
+        assert [j["job_id"] for j in client.get("/api/ocr/jobs", headers=owner).json()["jobs"]] == [job_id]
+        assert client.get("/api/ocr/jobs", headers=other).json()["jobs"] == []
+        for path in (f"/api/ocr/jobs/{job_id}", f"/api/ocr/jobs/{job_id}/events", f"/api/ocr/jobs/{job_id}/results"):
+            assert client.get(path, headers=other).status_code == 404
+        assert client.delete(f"/api/ocr/jobs/{job_id}?purge=true", headers=other).status_code == 404
+
+        assert client.get(f"/api/ocr/jobs/{job_id}", headers=owner).status_code == 200
+        assert client.delete(f"/api/ocr/jobs/{job_id}?purge=true", headers=owner).json()["deleted"]
@@ -0,0 +1,219 @@
+"""
+Unit tests for parallel page-level PDF OCR
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.ocr import ocr_dz_pipeline
+from app.ocr.ocr_dz_pipeline import (
+    OCREngine,
+    OCRPipeline,
+    PageOCRResult,
+    PageRoute,
+    estimate_page_image_mb,
+)
+from app.ocr.ocr_utils import score_text_layer
+
+DIGITAL_PAGE = (
+    "Article 1er. — Le présent décret a pour objet de fixer les modalités "
+    "d'application des dispositions de la loi relative à l'investissement."
+)
+
+
+class FakePage:
+    """Image rastérisée factice (compte les pages vivantes)"""
+
+    def __init__(self, tracker, page_number):
+        self.tracker = tracker
+        self.page_number = page_number
+
+    def close(self):
+        self.tracker.release()
+
+
+class PageTracker:
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.confidences = {}
+        self.alive = 0
+        self.peak = 0
+        self.rasterized = []
+        self.lock = threading.Lock()
+
+    def rasterize(self, pdf_path, page_number, dpi, poppler_path=None):
+        with self.lock:
+            self.alive += 1
+            self.peak = max(self.peak, self.alive)
+            self.rasterized.append(page_number)
+        return FakePage(self, page_number)
+
+    def release(self):
+        with self.lock:
+            self.alive -= 1
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    tracker = PageTracker()
+    monkeypatch.setattr(ocr_dz_pipeline, "_rasterize_pdf_page", tracker.rasterize)
+    monkeypatch.setattr(ocr_dz_pipeline, "_count_pdf_pages", lambda path, poppler_path=None: 12)
+    monkeypatch.setattr(ocr_dz_pipeline, "_extract_text_layer", lambda path, max_pages: [])
+
+    def fake_ocr(self, image, language_hint=None, config=None):
+        time.sleep(tracker.delays.get(image.page_number, 0.01))
+        return PageOCRResult(
+            page_number=1,
+            text=f"Page {image.page_number} الجريدة الرسمية",
+            language="mixed",
+            confidence=tracker.confidences.get(image.page_number, 0.9),
+        )
+
+    monkeypatch.setattr(OCRPipeline, "extract_text_from_image", fake_ocr)
+    return tracker
+
+
+class TestParallelPdfOCR:
+    """Test suite for OCRPipeline.iter_pdf_pages"""
+
+    def test_pages_yielded_in_order_despite_completion_order(self, tracker):
+        tracker.delays = {1: 0.1}
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            pipeline = OCRPipeline(enable_fallback=False, page_workers=4, page_executor=executor)
+            pages = [page.page_number for page in pipeline.iter_pdf_pages(b"%PDF-1.4", dpi=150)]
+
+        assert pages == list(range(1, 13))
+        assert sorted(tracker.rasterized) == list(range(1, 13))
+
+    def test_memory_cap_bounds_pages_in_flight(self, tracker):
+        page_mb = estimate_page_image_mb(300)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            pipeline = OCRPipeline(
+                enable_fallback=False,
+                page_workers=8,
+                memory_cap_mb=page_mb * 3,
+                page_executor=executor,
+            )
+            assert pipeline.page_window(300) == 3
+            list(pipeline.iter_pdf_pages(b"%PDF-1.4", dpi=300))
+
+        assert tracker.peak <= 3
+        assert tracker.alive == 0
+
+    def test_sequential_path_and_max_pages(self, tracker):
+        pipeline = OCRPipeline(enable_fallback=False, page_workers=1)
+        result = pipeline.extract_text_from_pdf(b"%PDF-1.4", max_pages=5)
+
+        assert result.pages == 5
+        assert [p.page_number for p in result.pages_detail] == [1, 2, 3, 4, 5]
+        assert tracker.rasterized == [1, 2, 3, 4, 5]
+        assert "Page 5" in result.text
+
+    def test_failed_page_does_not_abort_document(self, tracker, monkeypatch):
+        def flaky(pdf_path, page_number, dpi, poppler_path=None):
+            if page_number == 2:
+                raise RuntimeError("poppler crash")
+            return tracker.rasterize(pdf_path, page_number, dpi)
+
+        monkeypatch.setattr(ocr_dz_pipeline, "_rasterize_pdf_page", flaky)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pipeline = OCRPipeline(enable_fallback=False, page_workers=2, page_executor=executor)
+            pages = list(pipeline.iter_pdf_pages(b"%PDF-1.4", max_pages=3))
+
+        assert [p.confidence for p in pages] == [0.9, 0.0, 0.9]
+
+    def test_temp_file_removed_when_generator_closed(self, tracker, monkeypatch):
+        paths = []
+        count = ocr_dz_pipeline._count_pdf_pages
+
+        def record(path, poppler_path=None):
+            paths.append(path)
+            return count(path)
+
+        monkeypatch.setattr(ocr_dz_pipeline, "_count_pdf_pages", record)
+        pipeline = OCRPipeline(enable_fallback=False, page_workers=1)
+        pages = pipeline.iter_pdf_pages(b"%PDF-1.4")
+        next(pages)
+        assert os.path.exists(paths[0])
+
+        pages.close()
+        assert not os.path.exists(paths[0])
+
+    @pytest.mark.asyncio
+    async def test_async_stream(self, tracker):
+        pipeline = OCRPipeline(enable_fallback=False, page_workers=1)
+        pages = [page.page_number async for page in pipeline.stream_pdf_pages(b"%PDF-1.4", max_pages=3)]
+
+        assert pages == [1, 2, 3]
+
+
+class TestTextLayerRouting:
+    """Test suite for the native text layer pre-pass"""
+
+    def test_score_text_layer(self):
+        assert score_text_layer(DIGITAL_PAGE) > 0.8
+        assert score_text_layer("المادة الأولى: يهدف هذا المرسوم إلى تحديد كيفيات تطبيق أحكام القانون") > 0.8
+        assert score_text_layer("") == 0.0
+        assert score_text_layer("12") == 0.0  # page scannée avec un numéro de page
+        assert score_text_layer("(cid:12)(cid:44)(cid:3) " * 20) == 0.0
+        assert score_text_layer(" ".join(DIGITAL_PAGE)) < 0.6  # texte espacé lettre par lettre
+
+    def test_only_scanned_or_garbled_pages_are_ocred(self, tracker, monkeypatch):
+        layer = [DIGITAL_PAGE, "", DIGITAL_PAGE, "(cid:5)(cid:9) " * 30]
+        monkeypatch.setattr(ocr_dz_pipeline, "_extract_text_layer", lambda path, max_pages: layer[:max_pages])
+
+        pipeline = OCRPipeline(enable_fallback=False, page_workers=1)
+        result = pipeline.extract_text_from_pdf(b"%PDF-1.4", max_pages=4)
+
+        assert tracker.rasterized == [2, 4]
+        routes = [p.route for p in result.pages_detail]
+        assert routes == [PageRoute.TEXT_LAYER, PageRoute.OCR, PageRoute.TEXT_LAYER, PageRoute.OCR]
+        assert result.pages_detail[0].engine == OCREngine.TEXT_LAYER
+        assert result.pages_detail[1].text_layer_score == 0.0
+        assert result.engine == OCREngine.HYBRID
+        assert "Article 1er" in result.text and "Page 2" in result.text
+
+    def test_fully_digital_pdf_skips_rasterization(self, tracker, monkeypatch):
+        monkeypatch.setattr(
+            ocr_dz_pipeline, "_extract_text_layer", lambda path, max_pages: [DIGITAL_PAGE] * max_pages
+        )
+        pipeline = OCRPipeline(page_workers=1)
+        result = pipeline.extract_text_from_pdf(b"%PDF-1.4")
+
+        assert tracker.rasterized == []
+        assert result.pages == 12
+        assert result.engine == OCREngine.TEXT_LAYER
+
+    def test_llm_fallback_only_for_low_confidence_ocr_pages(self, tracker, monkeypatch):
+        layer = [DIGITAL_PAGE, "", ""]
+        monkeypatch.setattr(ocr_dz_pipeline, "_extract_text_layer", lambda path, max_pages: layer[:max_pages])
+        tracker.confidences = {3: 0.1}
+        calls = []
+
+        async def fake_fallback(self, image_bytes, language_hint=None):
+            calls.append(image_bytes)
+            return "Texte relu par le modèle de vision, page trois du journal officiel."
+
+        monkeypatch.setattr(OCRPipeline, "fallback_llm_ocr_async", fake_fallback)
+        monkeypatch.setattr(ocr_dz_pipeline, "_encode_vision_image", lambda image: f"page-{image.page_number}")
+
+        pipeline = OCRPipeline(page_workers=1, enable_fallback=True)
+        result = pipeline.extract_text_from_pdf(b"%PDF-1.4", max_pages=3)
+
+        assert calls == ["page-3"]
+        assert [p.route for p in result.pages_detail] == [
+            PageRoute.TEXT_LAYER, PageRoute.OCR, PageRoute.LLM_FALLBACK,
+        ]
+        assert result.fallback_used
+
+
+def test_page_pool_uses_spawn(monkeypatch):
+    monkeypatch.setattr(ocr_dz_pipeline, "_page_pool", None)
+    pool = ocr_dz_pipeline._get_page_pool(1)
+    try:
+        assert pool._mp_context.get_start_method() == "spawn"
+    finally:
+        ocr_dz_pipeline.shutdown_page_pool()
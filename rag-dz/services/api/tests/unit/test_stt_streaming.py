@@ -0,0 +1,284 @@
+"""
+Unit tests for streaming STT (incremental VAD session)
+"""
+import asyncio
+import importlib
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.voice.stt_models import STTStreamEvent, STTStreamEventType
+from app.voice.stt_service import STTService
+from app.voice.stt_streaming import EVENT_QUEUE_SIZE, EnergyVAD, StreamingSTTSession, decode_pcm16
+
+# app.voice réexporte le routeur sous le même nom que le module
+stt_router = importlib.import_module("app.voice.stt_router")
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(SAMPLE_RATE * seconds), dtype=np.float32)
+
+
+def drain(session: StreamingSTTSession):
+    events = []
+    while not session.events.empty():
+        events.append(session.events.get_nowait())
+    return events
+
+
+async def feed_in_frames(session: StreamingSTTSession, audio: np.ndarray, frame_ms: int = 20):
+    step = SAMPLE_RATE * frame_ms // 1000
+    for offset in range(0, audio.size, step):
+        await session.feed(audio[offset:offset + step])
+
+
+class TestStreamingSTTSession:
+    """Test suite for StreamingSTTSession"""
+
+    @pytest.mark.asyncio
+    async def test_emits_end_of_utterance_then_final(self):
+        """Silence after speech closes the utterance before the final text"""
+        transcribed = []
+
+        async def transcribe(audio):
+            transcribed.append(audio.size)
+            return "bonjour", "fr"
+
+        session = StreamingSTTSession(transcribe, vad=EnergyVAD(), min_silence_ms=300, partial_interval_ms=10000)
+        await feed_in_frames(session, np.concatenate([silence(0.5), tone(1.0), silence(0.5)]))
+        await session.wait_finals()
+
+        events = drain(session)
+        types = [event.type for event in events]
+        assert types == [
+            STTStreamEventType.SPEECH_START,
+            STTStreamEventType.END_OF_UTTERANCE,
+            STTStreamEventType.FINAL,
+        ]
+        final = events[-1]
+        assert final.text == "bonjour"
+        assert final.reason == "silence"
+        assert final.start == pytest.approx(0.3, abs=0.05)  # includes speech pad
+        assert final.end - final.start == pytest.approx(1.4, abs=0.1)
+        assert len(transcribed) == 1
+
+    @pytest.mark.asyncio
+    async def test_partials_during_long_speech(self):
+        """Partials are emitted while the user is still speaking"""
+        async def transcribe(audio):
+            await asyncio.sleep(0)
+            return f"{audio.size}", "ar"
+
+        session = StreamingSTTSession(transcribe, vad=EnergyVAD(), partial_interval_ms=300)
+        await feed_in_frames(session, tone(1.5))
+        await asyncio.sleep(0.01)
+
+        partials = [e for e in drain(session) if e.type == STTStreamEventType.PARTIAL]
+        assert partials
+        assert all(e.utterance_id == 1 for e in partials)
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_partials_can_be_disabled(self):
+        calls = []
+
+        async def transcribe(audio):
+            calls.append(audio.size)
+            return "x", "ar"
+
+        session = StreamingSTTSession(transcribe, vad=EnergyVAD(), partial_interval_ms=None)
+        await feed_in_frames(session, tone(1.5))
+        await asyncio.sleep(0.01)
+
+        assert calls == []
+        assert session.stats["partials"] == 0
+        await session.close()
+
+    def test_partials_default_off_with_paid_backend(self):
+        """Each partial re-sends the whole utterance: not by default on the OpenAI API"""
+        service = STTService(use_openai=False)
+        assert service.create_stream_session().partial_interval_samples > 0
+
+        service.openai_client = object()
+        assert service.create_stream_session().partial_interval_samples == 0
+        assert service.create_stream_session(partials=True).partial_interval_samples > 0
+
+    def test_event_queue_is_bounded(self):
+        async def transcribe(audio):
+            return "x", "fr"
+
+        session = StreamingSTTSession(transcribe, vad=EnergyVAD())
+        for utterance_id in range(EVENT_QUEUE_SIZE + 10):
+            session.emit(STTStreamEvent(type=STTStreamEventType.SPEECH_START, utterance_id=utterance_id))
+
+        events = drain(session)
+        assert len(events) == EVENT_QUEUE_SIZE
+        assert events[0].utterance_id == 10  # les plus anciens sont retirés
+        assert session.stats["dropped_events"] == 10
+
+    @pytest.mark.asyncio
+    async def test_short_noise_is_ignored_and_flush_closes_utterance(self):
+        async def transcribe(audio):
+            return "texte", "fr"
+
+        session = StreamingSTTSession(transcribe, vad=EnergyVAD(), min_speech_ms=250, min_silence_ms=300)
+        await feed_in_frames(session, np.concatenate([tone(0.05), silence(0.6)]))
+        assert [e.type for e in drain(session)] == [STTStreamEventType.SPEECH_START]
+        assert session.stats["skipped_short"] == 1
+
+        await feed_in_frames(session, tone(0.8))
+        await session.flush()
+        await session.wait_finals()
+        events = drain(session)
+        assert events[-1].type == STTStreamEventType.FINAL
+        assert events[-1].reason == "flush"
+        assert events[-1].utterance_id == 2
+
+    @pytest.mark.asyncio
+    async def test_max_duration_splits_utterance(self):
+        async def transcribe(audio):
+            return "x", "fr"
+
+        session = StreamingSTTSession(
+            transcribe, vad=EnergyVAD(), max_utterance_sec=1.0, partial_interval_ms=10000
+        )
+        await feed_in_frames(session, tone(2.5))
+        await session.wait_finals()
+        finals = [e for e in drain(session) if e.type == STTStreamEventType.FINAL]
+        assert [e.reason for e in finals] == ["max_duration", "max_duration"]
+
+    @pytest.mark.asyncio
+    async def test_finals_run_in_background_and_stay_ordered(self):
+        """A slow final does not block feed(), and a faster later final waits for it"""
+        release_first = asyncio.Event()
+        calls = 0
+
+        async def transcribe(audio):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                await release_first.wait()
+                return "premier", "fr"
+            return "second", "fr"
+
+        session = StreamingSTTSession(
+            transcribe, vad=EnergyVAD(), min_silence_ms=300, partial_interval_ms=10000
+        )
+        utterance = np.concatenate([tone(0.6), silence(0.5)])
+        await asyncio.wait_for(feed_in_frames(session, np.concatenate([utterance, utterance])), 1.0)
+        await asyncio.sleep(0.01)
+
+        assert calls == 2
+        assert STTStreamEventType.FINAL not in [e.type for e in drain(session)]
+
+        release_first.set()
+        await session.wait_finals()
+        finals = [e for e in drain(session) if e.type == STTStreamEventType.FINAL]
+        assert [(e.utterance_id, e.text) for e in finals] == [(1, "premier"), (2, "second")]
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_pending_final(self):
+        async def transcribe(audio):
+            await asyncio.sleep(10)
+            return "jamais", "fr"
+
+        session = StreamingSTTSession(transcribe, vad=EnergyVAD(), min_silence_ms=300)
+        await feed_in_frames(session, np.concatenate([tone(0.6), silence(0.5)]))
+        task = session._final_task
+
+        await asyncio.wait_for(session.close(), 1.0)
+
+        assert task.cancelled()
+
+    def test_decode_pcm16(self):
+        frame = np.array([0, 16384, -32768], dtype="<i2").tobytes()
+        assert decode_pcm16(frame + b"\x00").tolist() == [0.0, 0.5, -1.0]
+
+
+class FakeSTTService:
+    default_model = "whisper-1"
+
+    def create_stream_session(self, request, partials=None, **options):
+        async def transcribe(audio):
+            await asyncio.sleep(0.05)
+            return "salam", "ar"
+
+        return StreamingSTTSession(transcribe, vad=EnergyVAD(), **options)
+
+
+@pytest.fixture
+def usage_records(monkeypatch):
+    records = []
+    monkeypatch.setattr(stt_router, "record_usage", records.append)
+    return records
+
+
+@pytest.fixture
+def stream_client(monkeypatch, usage_records):
+    async def resolve_tenant(api_key):
+        return {"id": "tenant-a"} if api_key == "good-key" else None
+
+    monkeypatch.setattr(stt_router, "resolve_tenant", resolve_tenant)
+    monkeypatch.setattr(stt_router, "get_stt_service", lambda: FakeSTTService())
+    app = FastAPI()
+    app.include_router(stt_router.router)
+    return TestClient(app)
+
+
+def stream_path(api_key: str) -> str:
+    return f"/api/voice/stt/stream?api_key={api_key}&min_silence_ms=300"
+
+
+class TestSTTStreamEndpoint:
+    """Test suite for the /stt/stream WebSocket"""
+
+    def test_invalid_api_key_is_rejected(self, stream_client):
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with stream_client.websocket_connect(stream_path("bad-key")) as ws:
+                ws.receive_json()
+        assert exc.value.code == 4001
+
+    def test_end_sends_pending_final_then_closes(self, stream_client):
+        pcm = (np.concatenate([tone(0.6), silence(0.1)]) * 32767).astype("<i2").tobytes()
+
+        with stream_client.websocket_connect(stream_path("good-key")) as ws:
+            assert ws.receive_json()["type"] == "ready"
+            ws.send_bytes(pcm)
+            ws.send_json({"type": "end"})
+
+            events = []
+            with pytest.raises(WebSocketDisconnect):
+                while True:
+                    events.append(ws.receive_json())
+
+        assert [e["type"] for e in events] == ["speech_start", "end_of_utterance", "final"]
+        assert events[-1]["text"] == "salam"
+
+    def test_each_final_records_usage(self, stream_client, usage_records):
+        pcm = (np.concatenate([tone(0.6), silence(0.1)]) * 32767).astype("<i2").tobytes()
+
+        with stream_client.websocket_connect(stream_path("good-key")) as ws:
+            assert ws.receive_json()["type"] == "ready"
+            ws.send_bytes(pcm)
+            ws.send_json({"type": "end"})
+            with pytest.raises(WebSocketDisconnect):
+                while True:
+                    ws.receive_json()
+
+        assert len(usage_records) == 1
+        record = usage_records[0]
+        assert record["tenant_id"] == "tenant-a"
+        assert record["route"] == "/api/voice/stt/stream"
+        assert record["method"] == "WS"
+        assert record["audio_seconds"] == pytest.approx(0.7, abs=0.1)
+        assert record["latency_ms"] >= 50
@@ -0,0 +1,121 @@
+"""
+Unit tests for the cached API key → tenant resolution
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.core.tenant_cache import TenantCache, TenantResolver, hash_api_key
+
+TENANT = {"id": "t-1", "name": "Sonatrach", "plan": "pro"}
+
+
+def make_resolver(tenants, delay=0.0, **cache_kwargs):
+    calls = []
+
+    async def lookup(key_hash):
+        calls.append(key_hash)
+        await asyncio.sleep(delay)
+        return tenants.get(key_hash)
+
+    return TenantResolver(cache=TenantCache(**cache_kwargs), lookup=lookup), calls
+
+
+class TestTenantResolver:
+    """Test suite for TenantResolver"""
+
+    @pytest.mark.asyncio
+    async def test_valid_key_hits_database_once(self):
+        resolver, calls = make_resolver({hash_api_key("ragdz_prod_abc"): TENANT})
+
+        for _ in range(5):
+            assert await resolver.resolve("ragdz_prod_abc") == TENANT
+
+        assert len(calls) == 1
+        assert resolver.cache.get_stats()["hits"] == 4
+
+    @pytest.mark.asyncio
+    async def test_invalid_key_is_negatively_cached(self):
+        resolver, calls = make_resolver({})
+
+        assert await resolver.resolve("bad-key") is None
+        assert await resolver.resolve("bad-key") is None
+
+        assert len(calls) == 1
+        assert resolver.cache.get_stats()["negative_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_negative_entries_expire_sooner(self):
+        resolver, calls = make_resolver({}, negative_ttl_sec=0.01)
+
+        await resolver.resolve("bad-key")
+        await asyncio.sleep(0.02)
+        await resolver.resolve("bad-key")
+
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_lookup(self):
+        resolver, calls = make_resolver({hash_api_key("k"): TENANT}, delay=0.02)
+
+        results = await asyncio.gather(*(resolver.resolve("k") for _ in range(10)))
+
+        assert results == [TENANT] * 10
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_database_errors_are_not_cached(self):
+        attempts = []
+
+        async def flaky(key_hash):
+            attempts.append(key_hash)
+            if len(attempts) == 1:
+                raise ConnectionError("pool exhausted")
+            return TENANT
+
+        resolver = TenantResolver(cache=TenantCache(), lookup=flaky)
+
+        assert await resolver.resolve("k") is None
+        assert await resolver.resolve("k") == TENANT
+
+    @pytest.mark.asyncio
+    async def test_revocation_notify_invalidates_key(self):
+        tenants = {hash_api_key("k"): TENANT}
+        resolver, calls = make_resolver(tenants)
+        await resolver.resolve("k")
+
+        del tenants[hash_api_key("k")]  # UPDATE api_keys SET revoked = true
+        resolver.handle_invalidation(json.dumps({"key_hash": hash_api_key("k")}))
+
+        assert await resolver.resolve("k") is None
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_tenant_notify_invalidates_all_its_keys(self):
+        resolver, calls = make_resolver({hash_api_key("a"): TENANT, hash_api_key("b"): TENANT})
+        await resolver.resolve("a")
+        await resolver.resolve("b")
+
+        resolver.handle_invalidation(json.dumps({"tenant_id": "t-1"}))
+
+        assert resolver.cache.get_stats()["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_revocation_during_lookup_is_not_recached(self):
+        resolver, calls = make_resolver({hash_api_key("k"): TENANT}, delay=0.02)
+
+        pending = asyncio.create_task(resolver.resolve("k"))
+        await asyncio.sleep(0.005)
+        resolver.handle_invalidation(hash_api_key("k"))
+        await pending
+
+        assert resolver.cache.get(hash_api_key("k")) == (False, None)
+
+    def test_lru_bound(self):
+        cache = TenantCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, TENANT)
+
+        assert cache.get("a") == (False, None)
+        assert cache.get_stats()["evictions"] == 1
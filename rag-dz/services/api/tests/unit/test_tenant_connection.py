@@ -0,0 +1,234 @@
+"""
+Unit tests for pooled tenant connections (transaction-local RLS context)
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("psycopg")
+
+from app import db
+from app.models.memory_models import ChatMessageCreate, MessageRole
+from app.pagination import encode_keyset_cursor
+from app.services import memory_service
+from app.services.memory_service import MemoryService, build_messages_page_query
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, params=None, prepare=None):
+        await self.conn.execute(sql, params, prepare=prepare)
+
+    async def fetchone(self):
+        return self.conn.results.pop(0) if self.conn.results else None
+
+    async def fetchall(self):
+        return self.conn.results.pop(0) if self.conn.results else []
+
+
+class FakeTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        self.conn.log.append(("BEGIN", None))
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.conn.log.append(("ROLLBACK" if exc_type else "COMMIT", None))
+        return False
+
+
+class FakeConnection:
+    """Connexion async factice: journalise les requêtes, rejoue des résultats préparés"""
+
+    def __init__(self, results=None):
+        self.log = []
+        self.results = list(results or [])
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    def cursor(self, row_factory=None):
+        return FakeCursor(self)
+
+    async def execute(self, sql, params=None, prepare=None):
+        self.log.append((" ".join(sql.split()), params))
+
+    @property
+    def statements(self):
+        return [sql for sql, _ in self.log]
+
+    def rls_contexts(self):
+        return [params for sql, params in self.log if "set_config" in sql]
+
+
+@pytest.fixture
+def fake_conn(monkeypatch):
+    conn = FakeConnection()
+
+    @asynccontextmanager
+    async def pooled_connection():
+        yield conn
+
+    monkeypatch.setattr(db, "get_async_db_connection", pooled_connection)
+    return conn
+
+
+def message_row(message_id="m1", session_id="s1", content="salam"):
+    return {
+        "id": message_id, "session_id": session_id, "role": "user", "content": content,
+        "tokens_input": 3, "tokens_output": 0, "metadata": "{}",
+        "created_at": datetime(2026, 10, 19, tzinfo=timezone.utc),
+    }
+
+
+class TestTenantConnection:
+    """Test suite for get_tenant_connection / set_rls_context"""
+
+    @pytest.mark.asyncio
+    async def test_rls_context_is_set_inside_transaction_before_queries(self, fake_conn):
+        async with db.get_tenant_connection("tenant-a", 7) as conn:
+            await conn.execute("SELECT * FROM chat_sessions", None)
+
+        assert fake_conn.statements[0] == "BEGIN"
+        assert "set_config('app.current_tenant_id', %s, true)" in fake_conn.statements[1]
+        assert fake_conn.log[1][1] == ("tenant-a", "7", "false")
+        assert fake_conn.statements[2:] == ["SELECT * FROM chat_sessions", "COMMIT"]
+
+    @pytest.mark.asyncio
+    async def test_exception_rolls_back(self, fake_conn):
+        with pytest.raises(RuntimeError):
+            async with db.get_tenant_connection("tenant-a") as conn:
+                await conn.execute("DELETE FROM chat_sessions", None)
+                raise RuntimeError("boom")
+
+        assert fake_conn.statements[-1] == "ROLLBACK"
+        assert "COMMIT" not in fake_conn.statements
+
+    @pytest.mark.asyncio
+    async def test_superadmin_flag_and_empty_defaults(self, fake_conn):
+        async with db.get_tenant_connection(is_superadmin=True):
+            pass
+
+        assert fake_conn.rls_contexts() == [("", "", "true")]
+
+
+class TestMemoryServicePooledPaths:
+    """Test suite for MemoryService on pooled connections"""
+
+    @pytest.mark.asyncio
+    async def test_add_message_sets_session_owner_before_insert(self, fake_conn, monkeypatch):
+        notified = []
+        indexer = SimpleNamespace(notify=lambda: notified.append(1))
+        monkeypatch.setattr(memory_service, "get_message_indexer", lambda: indexer)
+        fake_conn.results = [{"user_id": 7}, message_row()]
+
+        message = await MemoryService().add_message(
+            "s1", "tenant-a", ChatMessageCreate(role=MessageRole.USER, content="salam", tokens_input=3)
+        )
+
+        statements = fake_conn.statements
+        update = next(i for i, sql in enumerate(statements) if sql.startswith("UPDATE chat_sessions"))
+        insert = next(i for i, sql in enumerate(statements) if sql.startswith("INSERT INTO chat_messages"))
+        owner_context = max(i for i, sql in enumerate(statements[:insert]) if "set_config" in sql)
+        assert statements[0] == "BEGIN" and "set_config" in statements[1]
+        assert update < owner_context < insert
+        assert fake_conn.rls_contexts() == [("tenant-a", "", "false"), ("tenant-a", "7", "false")]
+        assert statements[-1] == "COMMIT"
+        assert message.content == "salam" and notified == [1]
+
+    @pytest.mark.asyncio
+    async def test_add_message_rejects_foreign_session(self, fake_conn):
+        fake_conn.results = [None]  # UPDATE ... WHERE id AND tenant_id: aucune ligne
+
+        with pytest.raises(ValueError):
+            await MemoryService().add_message(
+                "session-autre-tenant", "tenant-a", ChatMessageCreate(role=MessageRole.USER, content="salam")
+            )
+
+        assert not any(sql.startswith("INSERT") for sql in fake_conn.statements)
+        assert fake_conn.statements[-1] == "ROLLBACK"
+
+
+class TestMessagesPageQuery:
+    """Test suite for build_messages_page_query"""
+
+    def test_first_page_fetches_one_extra_row(self):
+        sql, params = build_messages_page_query("s1", limit=20)
+
+        assert "ORDER BY m.created_at DESC, m.id DESC" in sql
+        assert "(m.created_at, m.id) <" not in sql
+        assert params == ["s1", 21]
+
+    def test_cursor_bounds_the_keyset_directly(self):
+        created_at = datetime(2026, 10, 19, 8, 30, 12, 345678, tzinfo=timezone.utc)
+        cursor = encode_keyset_cursor(created_at, "0b4c4d3e-7f0a-4c55-9d43-2f1f6f7c1a10")
+
+        sql, params = build_messages_page_query("s1", limit=20, before_id="ignoré", cursor=cursor)
+
+        assert "(m.created_at, m.id) < (%s, %s::uuid)" in sql
+        assert "SELECT b.created_at" not in sql
+        assert params == ["s1", created_at, "0b4c4d3e-7f0a-4c55-9d43-2f1f6f7c1a10", 21]
+
+    def test_before_id_is_resolved_within_the_session(self):
+        sql, params = build_messages_page_query("s1", limit=20, before_id="m9")
+
+        assert "SELECT b.created_at, b.id FROM chat_messages b" in " ".join(sql.split())
+        assert params == ["s1", "m9", "s1", 21]
+
+    @pytest.mark.parametrize("cursor", ["pas-un-curseur", "WzFd"])
+    def test_invalid_cursor_raises_value_error(self, cursor):
+        with pytest.raises(ValueError):
+            build_messages_page_query("s1", limit=20, cursor=cursor)
+
+
+class TestGetMessages:
+    """Test suite for MemoryService.get_messages"""
+
+    @pytest.mark.asyncio
+    async def test_session_owner_is_the_rls_user_never_superadmin(self, fake_conn):
+        fake_conn.results = [{"user_id": 7}, [message_row("m3", content="3"), message_row("m2", content="2")]]
+
+        messages, has_more = await MemoryService().get_messages("s1", "tenant-a", limit=5)
+
+        owner_sql, owner_params = fake_conn.log[2]
+        assert "set_config('app.current_user_id'" in owner_sql and "cs.user_id = %s" not in owner_sql
+        # Contexte tenant sans superadmin, puis seul l'utilisateur propriétaire est posé
+        assert fake_conn.rls_contexts() == [("tenant-a", "", "false"), owner_params]
+        assert owner_params == ["s1", "tenant-a"]
+        assert fake_conn.statements[3].startswith("SELECT * FROM chat_messages m")
+        assert [m.content for m in messages] == ["2", "3"] and not has_more
+
+    @pytest.mark.asyncio
+    async def test_has_more_when_extra_row_is_returned(self, fake_conn):
+        fake_conn.results = [{"user_id": 7}, [message_row(f"m{i}", content=str(i)) for i in (3, 2, 1)]]
+
+        messages, has_more = await MemoryService().get_messages("s1", "tenant-a", limit=2, user_id=7)
+
+        assert fake_conn.log[2][1] == ["s1", "tenant-a", 7]
+        assert fake_conn.log[3][1] == ["s1", 3]
+        assert [m.content for m in messages] == ["2", "3"] and has_more
+
+    @pytest.mark.asyncio
+    async def test_foreign_session_returns_no_messages(self, fake_conn):
+        fake_conn.results = [None]
+
+        assert await MemoryService().get_messages("s1", "tenant-a", user_id=8) == ([], False)
+        assert not any(sql.startswith("SELECT * FROM chat_messages") for sql in fake_conn.statements)
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_raises_before_querying(self, fake_conn):
+        with pytest.raises(ValueError):
+            await MemoryService().get_messages("s1", "tenant-a", cursor="pas-un-curseur")
+        assert fake_conn.log == []
@@ -0,0 +1,73 @@
+"""
+Unit tests for concurrent TTS batch synthesis
+"""
+import asyncio
+
+import pytest
+
+from app.voice.tts_models import TTSBatchItem, TTSBatchRequest
+from app.voice.tts_service import TTSService
+
+
+def make_service(backend="elevenlabs", concurrency=3):
+    service = TTSService(backend_type=backend, enable_cache=False, enable_darija_nlp=False)
+    service.max_concurrency = concurrency
+    return service
+
+
+def batch(*texts):
+    return TTSBatchRequest(items=[TTSBatchItem(id=str(i), text=text) for i, text in enumerate(texts)])
+
+
+class TestSynthesizeBatch:
+    """Test suite for TTSService.synthesize_batch"""
+
+    @pytest.mark.asyncio
+    async def test_parallel_bounded_by_backend_limit(self):
+        service = make_service(concurrency=3)
+        in_flight = 0
+        peak = 0
+
+        async def backend(text, request, voice):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+            return text.encode()
+
+        service._dispatch_backend = backend
+
+        response = await service.synthesize_batch(batch(*[f"phrase {i}" for i in range(10)]))
+
+        assert peak == 3
+        assert response.success_count == 10
+        assert [item.id for item in response.items] == [str(i) for i in range(10)]
+
+    @pytest.mark.asyncio
+    async def test_item_errors_do_not_fail_batch(self):
+        service = make_service()
+
+        async def backend(text, request, voice):
+            return text.encode()
+
+        service._dispatch_backend = backend
+
+        response = await service.synthesize_batch(batch("Salam", "   ", "Saha"))
+
+        assert [item.success for item in response.items] == [True, False, True]
+        assert response.error_count == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_in_completion_order(self):
+        service = make_service(concurrency=5)
+
+        async def backend(text, request, voice):
+            await asyncio.sleep(0.05 if text == "lent" else 0)
+            return text.encode()
+
+        service._dispatch_backend = backend
+
+        ids = [item.id async for item in service.synthesize_batch_stream(batch("lent", "rapide"))]
+
+        assert ids == ["1", "0"]
@@ -0,0 +1,117 @@
+"""
+Unit tests for the content-addressed TTS audio cache
+"""
+import os
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.voice.tts_cache import TTSAudioCache, tts_cache_key
+from app.voice.tts_models import TTSRequest
+from app.voice.tts_service import TTSService
+
+
+def make_service(tmp_path, backend="openai"):
+    cache = TTSAudioCache(cache_dir=str(tmp_path), max_size_mb=1)
+    return TTSService(backend_type=backend, cache=cache, enable_darija_nlp=False)
+
+
+class TestTTSCacheKey:
+    """Test suite for cache key derivation"""
+
+    def test_whitespace_does_not_change_key(self):
+        request = TTSRequest(text="x")
+        assert tts_cache_key("Salam  alikoum\n", request, "openai", "nova") == \
+            tts_cache_key("Salam alikoum", request, "openai", "nova")
+
+    def test_voice_speed_and_format_change_key(self):
+        base = tts_cache_key("Salam", TTSRequest(text="x"), "openai", "nova")
+        assert base != tts_cache_key("Salam", TTSRequest(text="x"), "openai", "alloy")
+        assert base != tts_cache_key("Salam", TTSRequest(text="x", speed=1.2), "openai", "nova")
+        assert base != tts_cache_key("Salam", TTSRequest(text="x", format="wav"), "openai", "nova")
+        assert base != tts_cache_key("Salam", TTSRequest(text="x"), "elevenlabs", "nova")
+
+
+class TestTTSAudioCache:
+    """Test suite for TTSAudioCache"""
+
+    def test_lru_eviction_by_size(self, tmp_path):
+        cache = TTSAudioCache(cache_dir=str(tmp_path), max_size_mb=0.25)
+        chunk = b"x" * 100_000
+        cache.put("a" * 64, chunk, "mp3")
+        cache.put("b" * 64, chunk, "mp3")
+        assert cache.get("a" * 64) == chunk  # a plus récent que b
+        cache.put("c" * 64, chunk, "mp3")
+
+        assert cache.contains("a" * 64) and cache.contains("c" * 64)
+        assert not cache.contains("b" * 64)
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1 and stats["entries"] == 2
+
+    def test_index_survives_restart(self, tmp_path):
+        cache = TTSAudioCache(cache_dir=str(tmp_path), max_size_mb=1)
+        cache.put("d" * 64, b"audio", "wav")
+
+        reopened = TTSAudioCache(cache_dir=str(tmp_path), max_size_mb=1)
+        assert reopened.get("d" * 64) == b"audio"
+        assert reopened.get("e" * 64) is None
+        assert reopened.get_stats()["hit_ratio"] == 0.5
+
+    def test_restart_keeps_lru_order_from_mtime(self, tmp_path):
+        cache = TTSAudioCache(cache_dir=str(tmp_path), max_size_mb=1)
+        cache.put("old" + "0" * 61, b"x" * 400_000, "mp3")
+        cache.put("new" + "0" * 61, b"x" * 400_000, "mp3")
+        old_path = next(tmp_path.glob("*/old*"))
+        past = time.time() - 3600
+        os.utime(old_path, (past, past))
+
+        reopened = TTSAudioCache(cache_dir=str(tmp_path), max_size_mb=1)
+        reopened.put("third" + "0" * 59, b"x" * 400_000, "mp3")
+        assert not reopened.contains("old" + "0" * 61)
+        assert reopened.contains("new" + "0" * 61)
+
+
+class TestTTSServiceCache:
+    """Test suite for cache integration in TTSService.synthesize"""
+
+    @pytest.mark.asyncio
+    async def test_repeated_phrase_skips_backend(self, tmp_path):
+        service = make_service(tmp_path)
+        service._synthesize_backend = AsyncMock(return_value=b"mp3-bytes")
+
+        first = await service.synthesize(TTSRequest(text="Marhba bik", voice_id="default"))
+        second = await service.synthesize(TTSRequest(text="Marhba  bik", voice_id="default"))
+
+        assert service._synthesize_backend.await_count == 1
+        assert not first.cached and second.cached
+        assert first.audio_base64 == second.audio_base64
+        assert (await service.health()).cache["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_mock_fallback_is_not_cached(self, tmp_path):
+        service = make_service(tmp_path)
+
+        async def failing_backend(text, request, voice):
+            return service._synthesize_mock(text, request, voice) or b"silence"
+
+        service._synthesize_openai = failing_backend
+
+        await service.synthesize(TTSRequest(text="Sahit"))
+        response = await service.synthesize(TTSRequest(text="Sahit"))
+
+        assert not response.cached
+        assert service.cache.get_stats()["writes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_prewarm_from_file(self, tmp_path):
+        service = make_service(tmp_path / "cache")
+        service._synthesize_backend = AsyncMock(return_value=b"audio")
+        phrases = tmp_path / "phrases.txt"
+        phrases.write_text("# accueil\nمرحبا بيك\nfr|Bonjour et bienvenue\n\n", encoding="utf-8")
+
+        first = await service.prewarm_from_file(str(phrases))
+        second = await service.prewarm_from_file(str(phrases))
+
+        assert first == {"already_cached": 0, "synthesized": 2, "failed": 0}
+        assert second == {"already_cached": 2, "synthesized": 0, "failed": 0}
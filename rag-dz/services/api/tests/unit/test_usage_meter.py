@@ -0,0 +1,240 @@
+"""
+Unit tests for the batched usage metering pipeline
+"""
+import asyncio
+import json
+import uuid
+
+import pytest
+
+from app.core.usage_meter import UsageMeter, usage_row
+
+errors = pytest.importorskip("psycopg.errors")
+
+
+class FakeWriter:
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.calls = 0
+        self.fail = False
+        self.fail_after = None
+        self.delay = delay
+        self.reject = set()
+
+    async def __call__(self, rows):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail or (self.fail_after is not None and self.calls > self.fail_after):
+            raise ConnectionError("postgres down")
+        if any(row[1] in self.reject for row in rows):
+            raise errors.ForeignKeyViolation("tenant_id not present in table tenants")
+        self.batches.append(list(rows))
+
+
+def event(i, tenant="t1"):
+    return {"tenant_id": tenant, "request_id": f"req-{i}", "route": "/api/query", "latency_ms": 12}
+
+
+def make_meter(tmp_path, writer, **kwargs):
+    kwargs.setdefault("batch_size", 3)
+    kwargs.setdefault("flush_interval_sec", 60)
+    return UsageMeter(writer=writer, spill_dir=str(tmp_path / "spill"), **kwargs)
+
+
+class TestUsageMeter:
+    """Test suite for UsageMeter"""
+
+    def test_usage_row_defaults(self):
+        row = usage_row({"tenant_id": "t1", "route": "/x"})
+        assert row[:11] == ("t1", None, "/x", "POST", 0, 0, 0, 0, 0, "unknown", 200)
+        assert uuid.UUID(row[11]) != uuid.UUID(usage_row({"tenant_id": "t1"})[11])
+        assert row[12].tzinfo is not None
+
+    @pytest.mark.asyncio
+    async def test_flush_in_batches(self, tmp_path):
+        writer = FakeWriter()
+        meter = make_meter(tmp_path, writer)
+        for i in range(7):
+            assert meter.record(event(i))
+
+        assert await meter.flush() == 7
+        assert [len(b) for b in writer.batches] == [3, 3, 1]
+        assert [row[1] for row in writer.batches[0]] == ["req-0", "req-1", "req-2"]
+        assert meter.get_stats()["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_full_batch_wakes_background_flush(self, tmp_path):
+        writer = FakeWriter()
+        meter = make_meter(tmp_path, writer)
+        await meter.start()
+        for i in range(3):
+            meter.record(event(i))
+        await asyncio.sleep(0.05)
+
+        assert len(writer.batches) == 1
+        await meter.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_remaining_events(self, tmp_path):
+        writer = FakeWriter()
+        meter = make_meter(tmp_path, writer)
+        await meter.start()
+        meter.record(event(0))
+        await meter.stop()
+
+        assert [row[1] for batch in writer.batches for row in batch] == ["req-0"]
+
+    @pytest.mark.asyncio
+    async def test_spill_when_database_fails_then_replay(self, tmp_path):
+        writer = FakeWriter()
+        meter = make_meter(tmp_path, writer)
+        writer.fail = True
+        for i in range(5):
+            meter.record(event(i))
+
+        assert await meter.flush() == 0
+        stats = meter.get_stats()
+        assert stats["spilled"] == 5 and stats["queued"] == 0
+        assert stats["spill_files"] == 2
+
+        writer.fail = False
+        meter.record(event(5))
+        assert await meter.flush() == 6
+        assert sorted(row[1] for batch in writer.batches for row in batch) == [f"req-{i}" for i in range(6)]
+        assert meter.get_stats()["spill_files"] == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_database_times_out_to_disk(self, tmp_path):
+        writer = FakeWriter(delay=0.5)
+        meter = make_meter(tmp_path, writer, flush_timeout_sec=0.05)
+        meter.record(event(0))
+
+        await meter.flush()
+        assert writer.batches == []
+        assert meter.get_stats()["spilled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_timed_out_batch_is_replayed_with_the_same_event_ids(self, tmp_path):
+        """The server may commit a batch after the client timed out: the replay must be deduplicable"""
+        writer = FakeWriter(delay=0.2)
+        meter = make_meter(tmp_path, writer, flush_timeout_sec=0.05)
+        meter.record(event(0))
+        (recorded,) = list(meter._queue)
+        await meter.flush()
+
+        writer.delay = 0
+        assert await meter.flush() == 1
+        (replayed,) = writer.batches[0]
+        assert replayed[-2] == recorded[-2]
+        assert replayed[-1] == recorded[-1]
+
+    @pytest.mark.asyncio
+    async def test_spill_file_without_event_id_is_replayed(self, tmp_path):
+        writer = FakeWriter()
+        meter = make_meter(tmp_path, writer)
+        spill_dir = tmp_path / "spill"
+        spill_dir.mkdir()
+        legacy = [*usage_row(event(0))[:-2], "2026-10-19T10:00:00+00:00"]
+        (spill_dir / "1_0.jsonl").write_text(json.dumps(legacy) + "\n")
+
+        assert await meter.flush() == 1
+        (row,) = writer.batches[0]
+        assert row[1] == "req-0"
+        uuid.UUID(row[-2])
+
+    @pytest.mark.asyncio
+    async def test_rejected_spill_file_does_not_block_others(self, tmp_path):
+        writer = FakeWriter()
+        meter = make_meter(tmp_path, writer, batch_size=1)
+        writer.fail = True
+        meter.record(event(0))
+        meter.record(event(1))
+        await meter.flush()
+
+        writer.fail = False
+        writer.reject = {"req-0"}
+        meter.record(event(2))
+        await meter.flush()
+
+        assert sorted(row[1] for batch in writer.batches for row in batch) == ["req-1", "req-2"]
+        assert meter.get_stats()["rejected"] == 1
+        assert len(list((tmp_path / "spill").glob("*.rejected"))) == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_rows_are_isolated_from_their_batch(self, tmp_path):
+        writer = FakeWriter()
+        writer.reject = {"req-4"}
+        meter = make_meter(tmp_path, writer, batch_size=4)
+        for i in range(8):
+            meter.record(event(i))
+
+        assert await meter.flush() == 7
+        assert sorted(row[1] for batch in writer.batches for row in batch) == [
+            f"req-{i}" for i in range(8) if i != 4
+        ]
+        stats = meter.get_stats()
+        assert stats["rejected"] == 1 and stats["spilled"] == 0 and stats["spill_files"] == 0
+        rejected = list((tmp_path / "spill").glob("*.rejected"))
+        assert len(rejected) == 1 and "req-4" in rejected[0].read_text()
+
+    @pytest.mark.asyncio
+    async def test_transient_error_during_replay_keeps_spill_file(self, tmp_path):
+        writer = FakeWriter()
+        meter = make_meter(tmp_path, writer)
+        writer.fail = True
+        meter.record(event(0))
+        await meter.flush()
+
+        # La base accepte le lot courant puis expire sur le rejeu: rien n'est écarté
+        writer.fail = False
+        writer.fail_after = writer.calls + 1
+        meter.record(event(1))
+        assert await meter.flush() == 1
+
+        assert meter.get_stats()["spill_files"] == 1 and meter.get_stats()["rejected"] == 0
+        assert not list((tmp_path / "spill").glob("*.rejected"))
+
+        writer.fail_after = None
+        assert await meter.flush() == 1
+        assert sorted(row[1] for batch in writer.batches for row in batch) == ["req-0", "req-1"]
+
+    @pytest.mark.asyncio
+    async def test_unexpected_error_is_retried_not_rejected(self, tmp_path):
+        async def broken(rows):
+            raise RuntimeError("connection pool closed")
+
+        meter = make_meter(tmp_path, broken)
+        meter.record(event(0))
+        await meter.flush()
+
+        assert meter.get_stats()["spilled"] == 1 and meter.get_stats()["rejected"] == 0
+
+    @pytest.mark.asyncio
+    async def test_partially_replayed_file_keeps_only_remaining_rows(self, tmp_path):
+        writer = FakeWriter()
+        meter = make_meter(tmp_path, writer, batch_size=4)
+        writer.fail = True
+        for i in range(4):
+            meter.record(event(i))
+        await meter.flush()
+
+        # Lot refusé (req-0), la moitié saine passe, puis la base tombe
+        writer.fail = False
+        writer.reject = {"req-0"}
+        writer.fail_after = writer.calls + 4  # [0-3], [0, 1], [0], [1] puis panne
+        await meter.flush()
+
+        assert [row[1] for batch in writer.batches for row in batch] == ["req-1"]
+        assert meter.get_stats()["rejected"] == 1
+        (spill_file,) = (tmp_path / "spill").glob("*.jsonl")
+        assert [json.loads(line)[1] for line in spill_file.read_text().splitlines()] == ["req-2", "req-3"]
+
+        writer.fail_after = None
+        assert await meter.flush() == 2
+        assert meter.get_stats()["spill_files"] == 0
+
+    def test_drops_when_queue_full(self, tmp_path):
+        meter = make_meter(tmp_path, FakeWriter(), max_queue=2)
+        assert meter.record(event(0)) and meter.record(event(1))
+        assert not meter.record(event(2))
+        assert meter.get_stats()["dropped"] == 1
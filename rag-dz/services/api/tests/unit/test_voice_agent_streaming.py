@@ -0,0 +1,213 @@
+"""
+Unit tests for the overlapped voice agent turn pipeline (process_stream)
+"""
+import asyncio
+import importlib
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.voice.stt_streaming import EnergyVAD, StreamingSTTSession
+from app.voice.voice_agent_models import VoiceAgentRequest, VoiceAgentStreamChunk
+from app.voice.voice_agent_service import VoiceAgentService, split_sentences
+
+# app.voice réexporte le routeur sous le même nom que le module
+voice_agent_router = importlib.import_module("app.voice.voice_agent_router")
+
+
+def make_service():
+    with patch("app.voice.voice_agent_service.get_stt_service"), \
+            patch("app.voice.voice_agent_service.get_tts_service"):
+        service = VoiceAgentService(enable_rag=False)
+    service.openai_client = None
+    return service
+
+
+class TestSplitSentences:
+    """Test suite for sentence segmentation of streamed LLM output"""
+
+    def test_keeps_unfinished_remainder(self):
+        sentences, rest = split_sentences("Bonjour, je suis votre assistant. Comment je peux")
+        assert sentences == ["Bonjour, je suis votre assistant."]
+        assert rest == "Comment je peux"
+
+    def test_merges_short_sentences(self):
+        sentences, rest = split_sentences("Oui. Le tarif est de 3.5 DA par minute! ")
+        assert sentences == ["Oui. Le tarif est de 3.5 DA par minute!"]
+        assert rest == ""
+
+    def test_arabic_question_mark(self):
+        sentences, rest = split_sentences("واش راك اليوم يا خويا؟ لاباس")
+        assert sentences == ["واش راك اليوم يا خويا؟"]
+        assert rest == "لاباس"
+
+
+class TestProcessStream:
+    """Test suite for VoiceAgentService.process_stream"""
+
+    @pytest.mark.asyncio
+    async def test_audio_follows_sentence_order(self):
+        service = make_service()
+        tokens = ["Première phrase assez longue. ", "Deuxième ", "phrase un peu plus longue. ", "Fin du message"]
+
+        async def stream_llm(*args, **kwargs):
+            for token in tokens:
+                await asyncio.sleep(0)
+                yield token, "test-model"
+
+        async def tts(text, *args):
+            # La première phrase est la plus lente à synthétiser
+            await asyncio.sleep(0.05 if text.startswith("Première") else 0)
+            return {"success": True, "audio_base64": text, "duration_sec": 1.0, "voice_id": "v1"}
+
+        service._stream_llm = stream_llm
+        service._process_tts = tts
+
+        request = VoiceAgentRequest(text="Salam, quels sont vos tarifs ?", use_rag=False)
+        chunks = [chunk async for chunk in service.process_stream(request)]
+
+        assert chunks[0].chunk_type == "status" and chunks[0].content == "transcript"
+        texts = [c.content for c in chunks if c.chunk_type == "text"]
+        audio = [c for c in chunks if c.chunk_type == "audio"]
+        assert texts == ["Première phrase assez longue.", "Deuxième phrase un peu plus longue.", "Fin du message"]
+        assert [c.sequence for c in audio] == [0, 1, 2]
+        assert [c.content for c in audio] == texts
+
+        done = chunks[-1]
+        assert done.is_final and done.content == "done"
+        assert done.metadata["output_text"] == "".join(tokens).strip()
+        assert done.metadata["audio_duration_sec"] == 3.0
+
+        conversation = service.conversations.get(done.metadata["conversation_id"])
+        assert [m.role for m in conversation.messages] == ["user", "assistant"]
+
+    @pytest.mark.asyncio
+    async def test_text_only_without_tts(self):
+        service = make_service()
+        request = VoiceAgentRequest(text="Bonjour", return_audio=False, use_rag=False)
+
+        chunks = [chunk async for chunk in service.process_stream(request)]
+
+        assert not [c for c in chunks if c.chunk_type == "audio"]
+        assert chunks[-1].metadata["output_text"].startswith("[Mock LLM]")
+
+    @pytest.mark.asyncio
+    async def test_missing_input_yields_error(self):
+        service = make_service()
+        chunks = [chunk async for chunk in service.process_stream(VoiceAgentRequest())]
+        assert len(chunks) == 1
+        assert chunks[0].chunk_type == "error" and chunks[0].is_final
+
+    @pytest.mark.asyncio
+    async def test_cancelled_turn_cancels_pending_tts(self):
+        """Barge-in cancels the consuming task: sentence TTS must not keep running"""
+        service = make_service()
+        cancelled = []
+        first_text = asyncio.Event()
+
+        async def stream_llm(*args, **kwargs):
+            yield "Première phrase assez longue. ", "test-model"
+            yield "Deuxième phrase un peu plus longue. ", "test-model"
+            await asyncio.sleep(10)  # le LLM génère encore
+            yield "Jamais.", "test-model"
+
+        async def tts(text, *args):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(text)
+                raise
+
+        service._stream_llm = stream_llm
+        service._process_tts = tts
+
+        async def consume():
+            request = VoiceAgentRequest(text="Salam", use_rag=False)
+            async for chunk in service.process_stream(request):
+                if chunk.chunk_type == "text":
+                    first_text.set()
+
+        turn = asyncio.create_task(consume())
+        await asyncio.wait_for(first_text.wait(), 1.0)
+        await asyncio.sleep(0.01)
+        turn.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await turn
+
+        assert cancelled == ["Première phrase assez longue.", "Deuxième phrase un peu plus longue."]
+
+
+class FakeVoiceAgentService:
+    """STT streaming réel (VAD énergie) + tour factice"""
+
+    def __init__(self):
+        async def transcribe(audio):
+            await asyncio.sleep(0.05)
+            return "salam", "ar"
+
+        self.stt_service = SimpleNamespace(
+            create_stream_session=lambda request: StreamingSTTSession(
+                transcribe, vad=EnergyVAD(), min_silence_ms=300
+            )
+        )
+
+    async def process_stream(self, request, rag_prefetch=None):
+        yield VoiceAgentStreamChunk(chunk_type="text", content=f"réponse à {request.text}", sequence=0)
+        await asyncio.sleep(0.05)
+        yield VoiceAgentStreamChunk(
+            chunk_type="status", content="done", is_final=True,
+            metadata={"total_processing_time_ms": 50, "model_used": "test-model"},
+        )
+
+
+@pytest.fixture
+def voice_client(monkeypatch):
+    usage = []
+
+    async def resolve_tenant(api_key):
+        return {"id": "tenant-a"} if api_key == "good-key" else None
+
+    monkeypatch.setattr(voice_agent_router, "resolve_tenant", resolve_tenant)
+    monkeypatch.setattr(voice_agent_router, "record_usage", usage.append)
+    monkeypatch.setattr(voice_agent_router, "get_voice_agent_service", FakeVoiceAgentService)
+    app = FastAPI()
+    app.include_router(voice_agent_router.router)
+    return TestClient(app), usage
+
+
+class TestVoiceStreamEndpoint:
+    """Test suite for the /stream WebSocket"""
+
+    def test_invalid_api_key_is_rejected(self, voice_client):
+        client, _ = voice_client
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect("/api/agent/voice/stream?api_key=bad-key") as ws:
+                ws.receive_json()
+        assert exc.value.code == 4001
+
+    def test_end_waits_for_last_turn_and_meters_tenant(self, voice_client):
+        client, usage = voice_client
+        t = np.arange(int(16000 * 0.6)) / 16000
+        pcm = (0.3 * np.sin(2 * np.pi * 220 * t) * 32767).astype("<i2").tobytes()
+
+        with client.websocket_connect("/api/agent/voice/stream?api_key=good-key") as ws:
+            ws.send_json({"use_rag": False})
+            assert ws.receive_json()["type"] == "ready"
+            ws.send_bytes(pcm)
+            ws.send_json({"type": "end"})
+
+            messages = []
+            with pytest.raises(WebSocketDisconnect):
+                while True:
+                    messages.append(ws.receive_json())
+
+        assert messages[-1]["content"] == "done"
+        assert "réponse à salam" in [m.get("content") for m in messages]
+        assert len(usage) == 1
+        assert usage[0]["tenant_id"] == "tenant-a" and usage[0]["method"] == "WS"
+        assert usage[0]["audio_seconds"] == pytest.approx(0.6, abs=0.1)
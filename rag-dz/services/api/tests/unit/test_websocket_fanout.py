@@ -0,0 +1,139 @@
+"""
+Unit tests for WebSocket fan-out with per-connection send queues
+"""
+import asyncio
+import json
+
+import pytest
+
+from app import websocket as ws_module
+from app.websocket import ConnectionManager
+
+
+class FakeWebSocket:
+    """WebSocket factice: enregistre les envois, peut bloquer"""
+
+    def __init__(self, blocked=False):
+        self.sent = []
+        self.closed_with = None
+        self.unblock = asyncio.Event()
+        if not blocked:
+            self.unblock.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.unblock.wait()
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = code
+
+
+async def room_with(manager, sockets, room_id="room-1"):
+    for user_id, websocket in sockets.items():
+        await manager.connect(websocket, "tenant-1", user_id)
+        await manager.join_room(user_id, room_id)
+    await asyncio.sleep(0)
+
+
+async def settle():
+    await asyncio.sleep(0.01)
+
+
+class TestConnectionManagerFanout:
+    """Test suite for ConnectionManager broadcast"""
+
+    @pytest.mark.asyncio
+    async def test_slow_client_does_not_stall_room(self):
+        manager = ConnectionManager(send_queue_size=16)
+        slow = FakeWebSocket(blocked=True)
+        fast = {user_id: FakeWebSocket() for user_id in range(2, 6)}
+        await room_with(manager, {1: slow, **fast})
+
+        queued = await asyncio.wait_for(
+            manager.send_chat_message("room-1", 2, {"content": "salam"}), timeout=0.5
+        )
+        await settle()
+
+        assert all(ws.sent[-1]["data"] == {"content": "salam"} for ws in fast.values())
+        assert slow.sent == []
+        assert manager.get_stats()["max_queue_depth"] >= 1
+
+        slow.unblock.set()
+        await settle()
+        assert slow.sent[-1]["data"] == {"content": "salam"}
+
+    @pytest.mark.asyncio
+    async def test_message_serialized_once_per_broadcast(self, monkeypatch):
+        manager = ConnectionManager()
+        await room_with(manager, {user_id: FakeWebSocket() for user_id in range(1, 11)})
+        calls = []
+        encode = ws_module.encode_message
+        monkeypatch.setattr(ws_module, "encode_message", lambda message: calls.append(1) or encode(message))
+
+        assert await manager.broadcast_to_room("room-1", {"event": "message:new"}) == 10
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_disconnects_slow_consumer(self):
+        manager = ConnectionManager(send_queue_size=2, slow_consumer_policy="disconnect")
+        slow = FakeWebSocket(blocked=True)
+        fast = FakeWebSocket()
+        await room_with(manager, {1: slow, 2: fast})
+
+        for i in range(5):
+            await manager.broadcast_to_room("room-1", {"n": i})
+            await settle()
+
+        assert manager.get_room_users("room-1") == [2]
+        assert 1 not in manager.user_connections
+        assert slow.closed_with == ws_module.WS_CLOSE_SLOW_CONSUMER
+        assert manager.get_stats()["slow_disconnects"] == 1
+        assert [m["n"] for m in fast.sent if "n" in m] == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest_keeps_latest_messages(self):
+        manager = ConnectionManager(send_queue_size=2, slow_consumer_policy="drop_oldest")
+        slow = FakeWebSocket(blocked=True)
+        await room_with(manager, {1: slow})
+        await settle()
+
+        for i in range(5):
+            await manager.broadcast_to_room("room-1", {"n": i})
+        slow.unblock.set()
+        await settle()
+
+        # Le drain tenait déjà le 1er message quand la file s'est remplie
+        assert [m["n"] for m in slow.sent if "n" in m][-2:] == [3, 4]
+        assert manager.get_stats()["dropped"] >= 2
+        assert manager.is_user_in_room(1, "room-1")
+
+    @pytest.mark.asyncio
+    async def test_send_timeout_disconnects(self):
+        manager = ConnectionManager(send_timeout_sec=0.05)
+        stuck = FakeWebSocket(blocked=True)
+        await room_with(manager, {1: stuck})
+
+        await manager.send_to_user(1, {"type": "ping"})
+        await asyncio.sleep(0.1)
+
+        assert 1 not in manager.user_connections
+        assert manager.get_stats()["connections"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stale_disconnect_keeps_new_connection(self):
+        manager = ConnectionManager()
+        old, new = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(old, "tenant-1", 7)
+        await manager.connect(new, "tenant-1", 7)
+
+        manager.disconnect(old, "tenant-1", 7)
+
+        assert manager.user_connections[7].websocket is new
+        assert await manager.send_to_user(7, {"type": "pong"})
+
+        await manager.close_all()
+        assert new.closed_with == 1001
+        assert manager.get_stats()["connections"] == 0
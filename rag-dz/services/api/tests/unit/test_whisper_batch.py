@@ -0,0 +1,284 @@
+"""
+Unit tests for batched Whisper transcription (cross-file batches, shared queue, back-pressure)
+"""
+import asyncio
+import io
+import sys
+import threading
+import time
+from types import ModuleType, SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+try:
+    import faster_whisper  # noqa: F401
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    FASTER_WHISPER_AVAILABLE = False
+
+FASTER_WHISPER_NAMES = {
+    "faster_whisper": ["BatchedInferencePipeline", "WhisperModel", "decode_audio"],
+    "faster_whisper.audio": ["pad_or_trim"],
+    "faster_whisper.tokenizer": ["Tokenizer"],
+    "faster_whisper.transcribe": [
+        "Segment", "TranscriptionOptions", "get_suppressed_tokens", "restore_speech_timestamps",
+    ],
+    "faster_whisper.vad": ["VadOptions", "collect_chunks", "get_speech_timestamps"],
+}
+
+
+def import_without_faster_whisper(*module_names):
+    """Importe les modules avec un faster_whisper factice (modèle absent): file et lots restent testés"""
+    stubs = {}
+    for name, attributes in FASTER_WHISPER_NAMES.items():
+        stubs[name] = ModuleType(name)
+        for attribute in attributes:
+            setattr(stubs[name], attribute, None)
+    saved = {name: sys.modules.get(name) for name in stubs}
+    sys.modules.update(stubs)
+    try:
+        return [__import__(name, fromlist=["_"]) for name in module_names]
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+if not FASTER_WHISPER_AVAILABLE:
+    import_without_faster_whisper("app.voice_agent.whisper_engine", "app.voice_agent.router")
+
+from app.core.model_registry import ModelRegistry
+from app.voice_agent import router as voice_agent_router
+from app.voice_agent import transcription_service, whisper_engine
+from app.voice_agent.whisper_engine import TranscriptionQueueFull, WhisperEngine, _PreparedAudio
+
+
+class FakeWhisperModel:
+    def __init__(self, model_size, **kwargs):
+        self.model_size = model_size
+        self.hf_tokenizer = None
+        self.model = SimpleNamespace(is_multilingual=True)
+
+
+class FakePipeline:
+    """forward() factice: un segment par chunk (texte et début portés par les métadonnées)"""
+
+    def __init__(self):
+        self.model = FakeWhisperModel("tiny")
+        self.calls = []
+
+    def forward(self, features, tokenizer, metadata, options):
+        self.calls.append((tokenizer.language, len(features)))
+        return [
+            [{
+                "seek": 0, "start": meta["start"], "end": meta["start"] + 0.4, "text": meta["text"], "tokens": [],
+                "avg_logprob": 0.0, "compression_ratio": 1.0, "no_speech_prob": 0.0,
+            }]
+            for meta in metadata
+        ]
+
+
+def fake_prepare(audio_path, language, vad_filter):
+    """a.wav: 3 chunks fr séparés d'1s de silence, b.wav: 1 chunk fr, ar.wav: 1 chunk ar, bad.wav: erreur"""
+    name = audio_path.rsplit("/", 1)[-1].split(".")[0]
+    if name == "bad":
+        raise ValueError("audio illisible")
+    chunks = 3 if name == "a" else 1
+    return _PreparedAudio(
+        audio_path=audio_path,
+        duration=2.0 * chunks,
+        duration_after_vad=1.0 * chunks,
+        clip_timestamps=[{"start": c * 32000, "end": c * 32000 + 16000} for c in range(chunks)],
+        features=[np.zeros((80, 3000), dtype=np.float32) for _ in range(chunks)],
+        chunks_metadata=[{"text": f"{name}-{c}", "start": c + 0.5} for c in range(chunks)],
+        language="ar" if name == "ar" else "fr",
+        language_probability=1.0,
+    )
+
+
+class BlockingBatch:
+    """transcribe_batch factice: enregistre les lots et peut bloquer le worker"""
+
+    def __init__(self):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, audio_paths, **kwargs):
+        self.batches.append(list(audio_paths))
+        self.started.set()
+        self.release.wait(timeout=5)
+        return [{"text": path, "segments": []} for path in audio_paths]
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    registry = ModelRegistry()
+    monkeypatch.setattr(whisper_engine, "get_model_registry", lambda: registry)
+    monkeypatch.setattr(whisper_engine, "WhisperModel", FakeWhisperModel)
+    return WhisperEngine(
+        model_size="tiny", device="cpu", download_root=str(tmp_path / "models"),
+        batch_size=4, max_queue_size=2, max_batch_wait_ms=20,
+    )
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+class TestTranscribeBatch:
+    """Test suite for WhisperEngine.transcribe_batch"""
+
+    @pytest.mark.skipif(not FASTER_WHISPER_AVAILABLE, reason="restauration des timestamps de faster_whisper")
+    def test_chunks_of_all_files_share_batches_per_language(self, engine, monkeypatch):
+        pipeline = FakePipeline()
+        monkeypatch.setattr(engine, "_prepare_audio", fake_prepare)
+        monkeypatch.setattr(engine, "_batch_options", lambda tokenizer, beam_size: None)
+        monkeypatch.setattr(whisper_engine, "Tokenizer", lambda *args, **kwargs: SimpleNamespace(**kwargs))
+        monkeypatch.setattr(WhisperEngine, "batched_pipeline", property(lambda self: pipeline))
+
+        results = engine.transcribe_batch(["/x/a.wav", "/x/bad.wav", "/x/ar.wav", "/x/b.wav"])
+
+        assert sorted(pipeline.calls) == [("ar", 1), ("fr", 4)]
+        assert results[0]["text"] == "a-0 a-1 a-2"
+        assert [s["start"] for s in results[0]["segments"]] == [0.5, 2.5, 4.5]  # silences VAD réinsérés
+        assert results[1] == {"error": "audio illisible", "audio_path": "/x/bad.wav"}
+        assert results[2]["text"] == "ar-0" and results[2]["language"] == "ar"
+        assert results[3]["text"] == "b-0"
+        assert engine.stats["files"] == 3 and engine.stats["chunks"] == 5
+
+
+class TestTranscriptionQueue:
+    """Test suite for WhisperEngine.submit and the batch worker"""
+
+    def test_concurrent_submissions_are_grouped(self, engine, monkeypatch):
+        batch = BlockingBatch()
+        monkeypatch.setattr(engine, "transcribe_batch", batch)
+
+        futures = [engine.submit(f"/x/{i}.wav") for i in range(2)]
+
+        assert [f.result(timeout=2)["text"] for f in futures] == ["/x/0.wav", "/x/1.wav"]
+        assert batch.batches == [["/x/0.wav", "/x/1.wav"]]
+
+    def test_full_queue_raises_and_counts_rejection(self, engine, monkeypatch):
+        batch = BlockingBatch()
+        batch.release.clear()
+        monkeypatch.setattr(engine, "transcribe_batch", batch)
+
+        first = engine.submit("/x/0.wav")
+        assert batch.started.wait(timeout=2)  # worker occupé, file vide
+        queued = [engine.submit(f"/x/{i}.wav") for i in (1, 2)]
+
+        with pytest.raises(TranscriptionQueueFull):
+            engine.submit("/x/3.wav")
+        assert engine.get_queue_stats()["rejected"] == 1
+
+        batch.release.set()
+        assert first.result(timeout=2) and all(f.result(timeout=2) for f in queued)
+
+    def test_worker_deletes_owned_files_even_if_cancelled(self, engine, monkeypatch, tmp_path):
+        batch = BlockingBatch()
+        batch.release.clear()
+        monkeypatch.setattr(engine, "transcribe_batch", batch)
+        done, cancelled = tmp_path / "done.wav", tmp_path / "cancelled.wav"
+        done.write_bytes(b"a")
+        cancelled.write_bytes(b"b")
+
+        first = engine.submit(str(done), delete_after=True)
+        assert batch.started.wait(timeout=2)
+        queued = engine.submit(str(cancelled), delete_after=True)
+        assert queued.cancel()
+        assert done.exists()  # encore lu par le worker
+
+        batch.release.set()
+        first.result(timeout=2)
+        wait_until(lambda: not done.exists() and not cancelled.exists())
+        assert batch.batches == [[str(done)]]
+
+
+class TestTranscribeFileAsync:
+    """Test suite for TranscriptionService.transcribe_file_async"""
+
+    @pytest.mark.asyncio
+    async def test_cancelled_request_leaves_file_to_worker(self, engine, monkeypatch, tmp_path):
+        batch = BlockingBatch()
+        batch.release.clear()
+        monkeypatch.setattr(engine, "transcribe_batch", batch)
+        monkeypatch.setattr(transcription_service, "get_whisper_engine", lambda **kwargs: engine)
+        service = transcription_service.TranscriptionService()
+        service.temp_dir = tmp_path / "uploads"
+        service.temp_dir.mkdir()
+
+        task = asyncio.create_task(service.transcribe_file_async(io.BytesIO(b"audio"), "note.wav"))
+        await asyncio.to_thread(batch.started.wait, 2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert len(list(service.temp_dir.glob("*_note.wav"))) == 1  # le worker le lit encore
+        batch.release.set()
+        await asyncio.to_thread(wait_until, lambda: not list(service.temp_dir.glob("*_note.wav")))
+
+    @pytest.mark.asyncio
+    async def test_queue_full_removes_file(self, engine, monkeypatch, tmp_path):
+        def reject(*args, **kwargs):
+            raise TranscriptionQueueFull("File de transcription pleine")
+
+        monkeypatch.setattr(engine, "submit", reject)
+        monkeypatch.setattr(transcription_service, "get_whisper_engine", lambda **kwargs: engine)
+        service = transcription_service.TranscriptionService()
+        service.temp_dir = tmp_path / "uploads"
+        service.temp_dir.mkdir()
+
+        with pytest.raises(TranscriptionQueueFull):
+            await service.transcribe_file_async(io.BytesIO(b"audio"), "note.wav")
+        assert list(service.temp_dir.iterdir()) == []
+
+
+    @pytest.mark.asyncio
+    async def test_upload_is_written_off_the_event_loop(self, engine, monkeypatch, tmp_path):
+        batch = BlockingBatch()
+        monkeypatch.setattr(engine, "transcribe_batch", batch)
+        monkeypatch.setattr(transcription_service, "get_whisper_engine", lambda **kwargs: engine)
+        service = transcription_service.TranscriptionService()
+        service.temp_dir = tmp_path / "uploads"
+        service.temp_dir.mkdir()
+        readers = []
+
+        class TrackedUpload(io.BytesIO):
+            def read(self, *args):
+                readers.append(threading.get_ident())
+                return super().read(*args)
+
+        result = await service.transcribe_file_async(TrackedUpload(b"audio"), "note.wav")
+
+        assert result["filename"] == "note.wav"
+        assert readers and threading.get_ident() not in readers
+
+
+def test_transcribe_endpoint_returns_503_when_queue_full(monkeypatch):
+    class SaturatedService:
+        async def transcribe_file_async(self, **kwargs):
+            raise TranscriptionQueueFull("File de transcription pleine (64 requêtes en attente)")
+
+    monkeypatch.setattr(voice_agent_router, "get_transcription_service", lambda: SaturatedService())
+    app = FastAPI()
+    app.include_router(voice_agent_router.router)
+    app.dependency_overrides[voice_agent_router.get_current_tenant_id] = lambda: "tenant-a"
+
+    response = TestClient(app).post(
+        "/api/voice-agent/transcribe", files={"file": ("note.wav", b"audio", "audio/wav")}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+    assert "pleine" in response.json()["detail"]
@@ -0,0 +1,134 @@
+"""
+Unit tests for the WebSocket broker (sequence numbers, replay, cross-node delivery)
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.core.ws_broker import InMemoryBroker, RedisBroker, decode_envelope, encode_envelope, with_seq
+from app.routers.websocket_router import parse_last_seq
+from app.websocket import ConnectionManager
+
+from tests.unit.test_websocket_fanout import FakeWebSocket, room_with, settle
+
+
+class LoopbackBroker(InMemoryBroker):
+    """Broker mémoire relié à ses pairs comme par un canal pub/sub"""
+
+    def __init__(self, bus, **kwargs):
+        super().__init__(**kwargs)
+        self.bus = bus
+        bus.append(self)
+
+    async def _publish_envelope(self, meta, text):
+        await super()._publish_envelope(meta, text)
+        data = encode_envelope(meta, text)
+        for peer in self.bus:
+            peer._on_envelope(data)
+
+
+def received(websocket, event=None):
+    return [m for m in websocket.sent if event is None or m.get("event") == event]
+
+
+class TestWSBroker:
+    """Test suite for the broker backends and ConnectionManager integration"""
+
+    def test_with_seq_and_envelope(self):
+        text = with_seq('{"event":"message:new","data":{"content":"é"}}', 7)
+        assert json.loads(text) == {"seq": 7, "event": "message:new", "data": {"content": "é"}}
+
+        meta, payload = decode_envelope(encode_envelope({"node": "a", "kind": "room"}, text))
+        assert meta == {"node": "a", "kind": "room"} and payload == text
+
+    def test_with_seq_on_empty_object(self):
+        assert json.loads(with_seq("{}", 3)) == {"seq": 3}
+
+    @pytest.mark.asyncio
+    async def test_redis_room_keys_share_a_cluster_slot(self):
+        broker = RedisBroker(prefix="ws")
+        calls = []
+
+        async def publish_script(keys, args):
+            calls.append((keys, args))
+            return 1
+
+        broker._publish_script = publish_script
+        seq, text = await broker.publish_room("room-1", "{}")
+
+        (keys, args), = calls
+        assert keys == ["ws:seq:{room-1}", "ws:log:{room-1}"]
+        assert args[-1] == broker.channel  # canal pub/sub passé hors KEYS
+        assert (seq, json.loads(text)) == (1, {"seq": 1})
+
+    def test_last_seq_from_client_is_validated(self):
+        assert parse_last_seq(42) == 42
+        assert parse_last_seq("7") == 7
+        assert parse_last_seq(0) == 0
+        for invalid in ("abc", None, -1, True, [], float("inf")):
+            assert parse_last_seq(invalid) is None
+
+    @pytest.mark.asyncio
+    async def test_room_messages_carry_seq_presence_does_not(self):
+        manager = ConnectionManager(broker=InMemoryBroker())
+        alice, bob = FakeWebSocket(), FakeWebSocket()
+        await room_with(manager, {1: alice, 2: bob})
+
+        await manager.send_chat_message("room-1", 1, {"content": "salam"})
+        await manager.send_chat_message("room-1", 1, {"content": "labas"})
+        await manager.set_typing(2, "room-1", True)
+        await settle()
+
+        assert [m["seq"] for m in received(bob, "message:new")] == [1, 2]
+        assert all("seq" not in m for m in received(alice, "user:typing") + received(alice, "user:online"))
+        assert (await manager.get_room_presence("room-1")) == {"online_users": [1, 2], "typing_users": [2]}
+
+    @pytest.mark.asyncio
+    async def test_resume_replays_missed_messages(self):
+        manager = ConnectionManager(broker=InMemoryBroker(replay_size=3))
+        await room_with(manager, {1: FakeWebSocket()})
+        for i in range(5):
+            await manager.send_chat_message("room-1", 1, {"n": i})
+
+        reconnected = FakeWebSocket()
+        await manager.connect(reconnected, "tenant-1", 2)
+        await manager.join_room(2, "room-1")
+
+        assert await manager.resume_room(2, "room-1", last_seq=3)
+        assert not await manager.resume_room(2, "room-1", last_seq=1)  # seq 2 sorti du journal
+        await settle()
+
+        assert [m["seq"] for m in received(reconnected, "message:new")] == [4, 5]
+        assert reconnected.sent[-1] == {"type": "resync_required", "room_id": "room-1"}
+
+    @pytest.mark.asyncio
+    async def test_typing_indicator_expires(self):
+        broker = InMemoryBroker(typing_ttl_sec=0.01)
+        await broker.set_typing("room-1", 1, True)
+        assert await broker.typing_users("room-1") == [1]
+
+        await asyncio.sleep(0.02)
+        assert await broker.typing_users("room-1") == []
+
+    @pytest.mark.asyncio
+    async def test_broadcast_reaches_members_on_other_nodes(self):
+        bus = []
+        node_a = ConnectionManager(broker=LoopbackBroker(bus))
+        node_b = ConnectionManager(broker=LoopbackBroker(bus))
+        await node_a.start()
+        await node_b.start()
+        alice, bob, carol = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await room_with(node_a, {1: alice})
+        await room_with(node_b, {2: bob, 3: carol})
+
+        await node_a.broadcast_to_room("room-1", {"event": "message:new", "n": 1}, exclude_user=3)
+        await node_b.broadcast_to_tenant("tenant-1", {"type": "progress"})
+        await settle()
+
+        assert [m["n"] for m in received(alice, "message:new")] == [1]  # une seule livraison locale
+        assert [m["n"] for m in received(bob, "message:new")] == [1]
+        assert received(carol, "message:new") == []
+        assert {"type": "progress"} in alice.sent and {"type": "progress"} in bob.sent
+        assert [m["data"]["user_id"] for m in received(alice, "user:online")] == [2, 3]
+        assert node_b.broker.get_stats()["received"] >= 2